@@ -0,0 +1,329 @@
+"""Pick driver buffer and read block sizes, and adapt the block size while running.
+
+Two numbers decide whether a continuous acquisition survives a busy Pi:
+
+* The driver's input buffer size. When the application does not read for
+  longer than the buffer holds, the driver overwrites unread samples and
+  the next read fails with ``-200279``. The driver's default buffer holds
+  about one second at high rates.
+* The read block size. Small blocks give low latency but every read and
+  every consumer callback has a fixed cost; large blocks amortise that cost
+  but delay every sample by up to a block.
+
+:func:`plan_acquisition` derives both from the sample rate and channel
+count: blocks of ``target_latency`` seconds within
+``[min_block_seconds, max_block_seconds]``, and a buffer of
+``buffer_seconds`` (at least four of the largest blocks) within a memory
+limit. :func:`tune_input_buffer` applies the buffer size to a task before it
+starts; ``cli.start_continuous_ai_task(..., autotune=True)`` does that.
+
+While running, a :class:`BlockSizeTuner` watches a source's driver backlog
+and how much of each block period its consumers spend in callbacks. It
+doubles the block size when the backlog passes ``backlog_limit`` of the
+buffer or consumers are busy for more than ``busy_high`` of the time, and
+halves it back towards the planned size once consumers are idle (below
+``busy_low``) and nothing is queued in the driver::
+
+    task = start_continuous_ai_task("dev1", "ai0:7", rate=100000.0, autotune=True)
+    plan = plan_acquisition(100000.0, task.number_of_channels)
+    reader = StreamingReader(task, plan.samples_per_block, max_samples_per_block=plan.max_samples_per_block)
+    tuner = BlockSizeTuner(reader, plan).attach()
+
+Every decision, including its inputs, is logged at INFO level on the
+``nidaqmx_on_pi.autotune`` logger and kept in :attr:`BlockSizeTuner.decisions`.
+"""
+
+import logging
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TARGET_LATENCY = 0.1
+# Below ~100 reads per second the per-call cost dominates on a Pi.
+MIN_BLOCK_SECONDS = 0.01
+MAX_BLOCK_SECONDS = 0.5
+BUFFER_SECONDS = 5.0
+MAX_BUFFER_BYTES = 64 * 1024 * 1024
+# Driver-side bytes per sample for 16-bit devices such as the USB-600x family.
+DRIVER_BYTES_PER_SAMPLE = 2
+MIN_BLOCK_SAMPLES = 10
+
+
+class AcquisitionPlan:
+    """Block and buffer sizes chosen for one acquisition."""
+
+    def __init__(
+        self,
+        rate: float,
+        num_channels: int,
+        samples_per_block: int,
+        min_samples_per_block: int,
+        max_samples_per_block: int,
+        input_buffer_size: int,
+    ):
+        self.rate = rate
+        self.num_channels = num_channels
+        self.samples_per_block = samples_per_block
+        self.min_samples_per_block = min_samples_per_block
+        self.max_samples_per_block = max_samples_per_block
+        self.input_buffer_size = input_buffer_size
+
+    @property
+    def block_seconds(self) -> float:
+        return self.samples_per_block / self.rate
+
+    @property
+    def buffer_seconds(self) -> float:
+        return self.input_buffer_size / self.rate
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "rate": self.rate,
+            "num_channels": self.num_channels,
+            "samples_per_block": self.samples_per_block,
+            "min_samples_per_block": self.min_samples_per_block,
+            "max_samples_per_block": self.max_samples_per_block,
+            "input_buffer_size": self.input_buffer_size,
+            "block_seconds": self.block_seconds,
+            "buffer_seconds": self.buffer_seconds,
+        }
+
+    def __repr__(self) -> str:
+        return (
+            f"AcquisitionPlan({self.num_channels} ch at {self.rate:g} S/s: block {self.samples_per_block} "
+            f"[{self.min_samples_per_block}, {self.max_samples_per_block}], buffer {self.input_buffer_size})"
+        )
+
+
+def plan_acquisition(
+    rate: float,
+    num_channels: int,
+    target_latency: float = DEFAULT_TARGET_LATENCY,
+    min_block_seconds: float = MIN_BLOCK_SECONDS,
+    max_block_seconds: float = MAX_BLOCK_SECONDS,
+    buffer_seconds: float = BUFFER_SECONDS,
+    max_buffer_bytes: int = MAX_BUFFER_BYTES,
+    bytes_per_sample: int = DRIVER_BYTES_PER_SAMPLE,
+) -> AcquisitionPlan:
+    """Choose block and driver buffer sizes for ``num_channels`` at ``rate``.
+
+    The result depends only on the arguments, so a logged plan can be
+    reproduced exactly. A source sized for ``max_samples_per_block`` holds
+    ``num_buffers`` such blocks, so lower ``max_block_seconds`` where memory
+    is tight.
+
+    Raises:
+        ValueError: If ``rate`` or ``num_channels`` is not positive.
+    """
+    if rate <= 0 or num_channels <= 0:
+        raise ValueError(
+            f"rate and num_channels must be positive, got {rate} and {num_channels}"
+        )
+    min_block = max(int(rate * min_block_seconds), MIN_BLOCK_SAMPLES)
+    max_block = max(int(rate * max_block_seconds), min_block)
+    # The buffer must hold several of the largest blocks, but stay within
+    # the memory limit; if it cannot, cap the largest block instead.
+    limit = max(max_buffer_bytes // (num_channels * bytes_per_sample), 4 * min_block)
+    buffer_size = min(max(int(rate * buffer_seconds), 4 * max_block), limit)
+    max_block = max(min(max_block, buffer_size // 4), min_block)
+    block = min(max(int(rate * target_latency), min_block), max_block)
+    return AcquisitionPlan(
+        float(rate), num_channels, block, min_block, max_block, buffer_size
+    )
+
+
+def tune_input_buffer(
+    task: Any, plan: Optional[AcquisitionPlan] = None, **kwargs: Any
+) -> AcquisitionPlan:
+    """Set an unstarted task's input buffer size from a plan.
+
+    Without ``plan`` one is made from the task's sample rate and channel
+    count; ``kwargs`` go to :func:`plan_acquisition`. The buffer is never
+    made smaller than the driver's default.
+    """
+    rate = float(task.timing.samp_clk_rate)
+    if plan is None:
+        plan = plan_acquisition(rate, task.number_of_channels, **kwargs)
+    default = int(task.in_stream.input_buf_size)
+    size = max(plan.input_buffer_size, default)
+    task.in_stream.input_buf_size = size
+    plan.input_buffer_size = size
+    logger.info(
+        "autotune: %s: input buffer %d samples/ch (%.2f s, driver default %d) for %d ch at %g S/s",
+        _task_name(task),
+        size,
+        size / rate,
+        default,
+        plan.num_channels,
+        rate,
+    )
+    return plan
+
+
+def _task_name(task: Any) -> str:
+    return str(getattr(task, "name", "task"))
+
+
+class TuningDecision:
+    """One block size change and the measurements that caused it."""
+
+    def __init__(
+        self,
+        old: int,
+        new: int,
+        reason: str,
+        backlog: Optional[int],
+        busy: Optional[float],
+    ):
+        self.time = time.time()
+        self.old = old
+        self.new = new
+        self.reason = reason
+        self.backlog = backlog
+        self.busy = busy
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "time": self.time,
+            "old": self.old,
+            "new": self.new,
+            "reason": self.reason,
+            "backlog": self.backlog,
+            "busy": self.busy,
+        }
+
+
+class BlockSizeTuner:
+    """Adapt a running block source's ``samples_per_block`` to its load.
+
+    Runs as a subscriber on the source's reader thread, so block size
+    changes take effect on the next read without locking. The source must
+    have been created with ``max_samples_per_block`` at least
+    ``plan.max_samples_per_block`` for the tuner to grow blocks that far.
+
+    Args:
+        source: A running or about to start block source; its ``task`` (if
+            any) is asked for the driver backlog after every block.
+        plan: Size limits and the preferred (latency target) block size.
+        interval: Seconds between load evaluations.
+        backlog_limit: Driver buffer fraction that triggers an immediate
+            increase.
+        busy_high: Callback time per wall time above which blocks grow.
+        busy_low: Callback time per wall time below which blocks shrink
+            back towards ``plan.samples_per_block``.
+        history: Number of decisions kept in :attr:`decisions`.
+    """
+
+    def __init__(
+        self,
+        source: Any,
+        plan: AcquisitionPlan,
+        interval: float = 1.0,
+        backlog_limit: float = 0.25,
+        busy_high: float = 0.5,
+        busy_low: float = 0.1,
+        history: int = 100,
+    ):
+        self.source = source
+        self.plan = plan
+        self.interval = interval
+        self.backlog_limit = backlog_limit
+        self.busy_high = busy_high
+        self.busy_low = busy_low
+        self.decisions: Deque[TuningDecision] = deque(maxlen=history)
+        self._max_block = min(plan.max_samples_per_block, source.max_samples_per_block)
+        self._window_started: Optional[float] = None
+        self._window_busy = 0.0
+        self._window_backlog = 0
+
+    def attach(self) -> "BlockSizeTuner":
+        self.source.subscribe(self._on_block)
+        logger.info(
+            "autotune: %s: starting at %d samples/block (%.1f ms), range [%d, %d], buffer %d samples/ch",
+            self._name,
+            self.source.samples_per_block,
+            1000 * self.source.samples_per_block / self.plan.rate,
+            self.plan.min_samples_per_block,
+            self._max_block,
+            self.plan.input_buffer_size,
+        )
+        return self
+
+    def detach(self) -> None:
+        self.source.unsubscribe(self._on_block)
+
+    @property
+    def _name(self) -> str:
+        task = getattr(self.source, "task", None)
+        return _task_name(task) if task is not None else type(self.source).__name__
+
+    def _backlog(self) -> Optional[int]:
+        task = getattr(self.source, "task", None)
+        if task is None:
+            return None
+        try:
+            return int(task.in_stream.avail_samp_per_chan)
+        except Exception:
+            return None
+
+    def _on_block(self, block: Any) -> None:
+        now = time.monotonic()
+        busy_total = self.source.stats.callback_latency.sum
+        backlog = self._backlog()
+        block_size = self.source.samples_per_block
+        if backlog is not None:
+            self._window_backlog = max(self._window_backlog, backlog)
+            if backlog > self.backlog_limit * self.plan.input_buffer_size:
+                self._resize(block_size * 2, "driver backlog", backlog, None)
+                self._start_window(now, busy_total)
+                return
+        if self._window_started is None:
+            self._start_window(now, busy_total)
+            return
+        elapsed = now - self._window_started
+        if elapsed < self.interval:
+            return
+        busy = (busy_total - self._window_busy) / elapsed
+        if busy > self.busy_high:
+            self._resize(block_size * 2, "consumers busy", self._window_backlog, busy)
+        elif (
+            busy < self.busy_low
+            and self._window_backlog <= block_size
+            and block_size > self.plan.samples_per_block
+        ):
+            self._resize(
+                max(block_size // 2, self.plan.samples_per_block),
+                "consumers idle",
+                self._window_backlog,
+                busy,
+            )
+        self._start_window(now, busy_total)
+
+    def _start_window(self, now: float, busy_total: float) -> None:
+        self._window_started = now
+        self._window_busy = busy_total
+        self._window_backlog = 0
+
+    def _resize(
+        self, new: int, reason: str, backlog: Optional[int], busy: Optional[float]
+    ) -> None:
+        old = self.source.samples_per_block
+        new = min(max(new, self.plan.min_samples_per_block), self._max_block)
+        if new == old:
+            return
+        self.source.samples_per_block = new
+        decision = TuningDecision(old, new, reason, backlog, busy)
+        self.decisions.append(decision)
+        logger.info(
+            "autotune: %s: block %d -> %d samples (%.1f ms): %s, backlog %s samples/ch of %d, busy %s",
+            self._name,
+            old,
+            new,
+            1000 * new / self.plan.rate,
+            reason,
+            backlog if backlog is not None else "?",
+            self.plan.input_buffer_size,
+            f"{busy:.0%}" if busy is not None else "?",
+        )
@@ -0,0 +1,165 @@
+"""Pluggable DAQ backends.
+
+Code in this package talks to the hardware through a backend object instead of
+calling ``nidaqmx.Task()`` or ``nidaqmx.system.System.local()`` directly. Two
+backends are provided:
+
+* ``"nidaqmx"`` (:class:`NidaqmxBackend`): the real NI-DAQmx driver.
+* ``"sim"`` (:class:`nidaqmx_on_pi.simulator.SimulatedBackend`): an
+  in-process simulator with synthetic waveforms and real-time pacing, so the
+  acquisition pipeline can run and be load-tested without a device.
+
+The default backend is taken from the ``NIDAQMX_ON_PI_BACKEND`` environment
+variable and falls back to ``"nidaqmx"``.
+"""
+
+import os
+from typing import Any, Callable, List, Optional, Sequence
+
+BACKEND_ENV_VAR = "NIDAQMX_ON_PI_BACKEND"
+BACKEND_NAMES = ("nidaqmx", "sim")
+
+
+class Backend:
+    """Interface shared by all DAQ backends."""
+
+    name = ""
+
+    def __init__(self) -> None:
+        self._device_listeners: List[Callable[[], None]] = []
+
+    def add_device_listener(self, callback: Callable[[], None]) -> None:
+        """Call ``callback()`` when the backend knows devices were added or removed.
+
+        Backends without hot-plug notifications never call it; see
+        :class:`nidaqmx_on_pi.inventory.DeviceInventory` for how those are
+        detected.
+        """
+        self._device_listeners = self._device_listeners + [callback]
+
+    def remove_device_listener(self, callback: Callable[[], None]) -> None:
+        self._device_listeners = [
+            cb for cb in self._device_listeners if cb is not callback
+        ]
+
+    def _notify_devices_changed(self) -> None:
+        for callback in self._device_listeners:
+            callback()
+
+    def create_task(self, new_task_name: str = "") -> Any:
+        """Create a new, empty task."""
+        raise NotImplementedError
+
+    def devices(self) -> Sequence[Any]:
+        """Return the devices known to the system."""
+        raise NotImplementedError
+
+    def device(self, name: str) -> Any:
+        """Return the device called ``name``."""
+        raise NotImplementedError
+
+    def device_names(self) -> List[str]:
+        """Return the names of all devices; cheaper than :meth:`devices` on hardware."""
+        return [device.name for device in self.devices()]
+
+    def tasks(self) -> Sequence[Any]:
+        """Return the tasks known to the system."""
+        raise NotImplementedError
+
+    def ai_reader(self, task: Any) -> Any:
+        """Return a multi-channel analog stream reader for ``task``."""
+        raise NotImplementedError
+
+    def ai_unscaled_reader(self, task: Any) -> Any:
+        """Return a reader of raw ADC codes (``read_int16``) for ``task``."""
+        raise NotImplementedError
+
+    def ao_writer(self, task: Any) -> Any:
+        """Return a multi-channel analog stream writer for ``task`` (no auto-start)."""
+        raise NotImplementedError
+
+    def do_writer(self, task: Any) -> Any:
+        """Return a multi-channel digital stream writer for ``task`` (no auto-start)."""
+        raise NotImplementedError
+
+
+class NidaqmxBackend(Backend):
+    """Backend that forwards to the installed NI-DAQmx driver."""
+
+    name = "nidaqmx"
+
+    def create_task(self, new_task_name: str = "") -> Any:
+        import nidaqmx
+
+        return nidaqmx.Task(new_task_name)
+
+    def _system(self) -> Any:
+        import nidaqmx.system
+
+        return nidaqmx.system.System.local()
+
+    def devices(self) -> Sequence[Any]:
+        return self._system().devices
+
+    def device(self, name: str) -> Any:
+        return self._system().devices[name]
+
+    def device_names(self) -> List[str]:
+        return list(self._system().devices.device_names)
+
+    def tasks(self) -> Sequence[Any]:
+        return self._system().tasks
+
+    def ai_reader(self, task: Any) -> Any:
+        from nidaqmx.stream_readers import AnalogMultiChannelReader
+
+        return AnalogMultiChannelReader(task.in_stream)
+
+    def ai_unscaled_reader(self, task: Any) -> Any:
+        from nidaqmx.stream_readers import AnalogUnscaledReader
+
+        return AnalogUnscaledReader(task.in_stream)
+
+    def ao_writer(self, task: Any) -> Any:
+        from nidaqmx.stream_writers import AnalogMultiChannelWriter
+
+        return AnalogMultiChannelWriter(task.out_stream, auto_start=False)
+
+    def do_writer(self, task: Any) -> Any:
+        from nidaqmx.stream_writers import DigitalMultiChannelWriter
+
+        return DigitalMultiChannelWriter(task.out_stream, auto_start=False)
+
+
+def get_backend(name: Optional[str] = None, **kwargs: Any) -> Backend:
+    """Return a backend by name.
+
+    Args:
+        name: ``"nidaqmx"`` or ``"sim"``. Defaults to the value of the
+            ``NIDAQMX_ON_PI_BACKEND`` environment variable, then ``"nidaqmx"``.
+        **kwargs: Passed to the backend constructor.
+
+    Raises:
+        ValueError: If the name is unknown.
+    """
+    if name is None:
+        name = os.environ.get(BACKEND_ENV_VAR, "nidaqmx")
+    if name == "nidaqmx":
+        return NidaqmxBackend(**kwargs)
+    if name == "sim":
+        from .simulator import SimulatedBackend
+
+        return SimulatedBackend(**kwargs)
+    raise ValueError(f"Unknown backend {name!r}; expected one of {BACKEND_NAMES}")
+
+
+def backend_for_task(task: Any) -> Backend:
+    """Return the backend that created ``task``.
+
+    Simulated tasks carry a reference to their backend; anything else is
+    assumed to be a real ``nidaqmx.Task``.
+    """
+    backend = getattr(task, "backend", None)
+    if isinstance(backend, Backend):
+        return backend
+    return NidaqmxBackend()
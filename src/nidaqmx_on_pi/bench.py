@@ -0,0 +1,874 @@
+"""Benchmarks for the acquisition pipeline.
+
+Run ``python -m nidaqmx_on_pi.bench`` to print the results of every
+registered benchmark on this machine, or pass benchmark names to run a
+subset. Acquisition benchmarks run against a simulated device, so they
+measure this package's own overhead; DSP benchmarks process synthetic blocks
+on one thread, so their samples per second is a per-core figure. On a
+Raspberry Pi compare it with ``channels * rate`` of the intended acquisition.
+
+``--channels``, ``--block`` and ``--rate`` accept comma-separated lists and
+every combination is run. Results can be saved with ``--json``/``--csv`` and
+compared against a stored JSON baseline with ``--baseline``; the command
+exits with status 1 when a metric got worse by more than ``--tolerance``::
+
+    python -m nidaqmx_on_pi.bench --channels 1,8 --block 100,1000 --json base.json
+    python -m nidaqmx_on_pi.bench --channels 1,8 --block 100,1000 --baseline base.json
+
+New benchmarks are added with the :func:`benchmark` decorator, whose
+function receives a :class:`BenchmarkCase` and returns a zero-argument
+callable that processes one block, or with :func:`scenario` for benchmarks
+that need to run a whole pipeline and report their own metrics.
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+# Direction of every reported metric: +1 when higher is better, -1 when lower is.
+METRIC_DIRECTIONS: Dict[str, int] = {
+    "samples_per_second": 1,
+    "blocks_per_second": 1,
+    "ms_per_block": -1,
+    "us_per_call": -1,
+    "latency_p50_ms": -1,
+    "latency_p99_ms": -1,
+    "latency_max_ms": -1,
+    "bytes_per_channel": -1,
+    "ms_per_frame": -1,
+    "mb_per_second": 1,
+    "overhead_percent": -1,
+    "rearm_samples": -1,
+    "reduction": 1,
+    "cold_start_ms": -1,
+    "warm_start_ms": -1,
+    "switch_ms": -1,
+    "realtime_factor": 1,
+}
+
+
+class BenchmarkCase:
+    """Parameters of one benchmark run."""
+
+    def __init__(
+        self,
+        num_channels: int = 8,
+        samples_per_block: int = 10000,
+        rate: float = 50000.0,
+    ):
+        self.num_channels = num_channels
+        self.samples_per_block = samples_per_block
+        self.rate = rate
+
+    def __repr__(self) -> str:
+        return f"BenchmarkCase(num_channels={self.num_channels}, samples_per_block={self.samples_per_block}, rate={self.rate:g})"
+
+
+class BenchmarkResult:
+    """Timing and metrics of one benchmark run."""
+
+    def __init__(
+        self,
+        name: str,
+        num_channels: int,
+        samples_per_block: int,
+        blocks: int,
+        seconds: float,
+        rate: float = 0.0,
+        metrics: Optional[Dict[str, float]] = None,
+    ):
+        self.name = name
+        self.num_channels = num_channels
+        self.samples_per_block = samples_per_block
+        self.blocks = blocks
+        self.seconds = seconds
+        self.rate = rate
+        self.metrics = dict(metrics or {})
+
+    @property
+    def seconds_per_block(self) -> float:
+        return self.seconds / self.blocks if self.blocks else 0.0
+
+    @property
+    def samples_per_second(self) -> float:
+        """Samples (all channels) processed per second on one core."""
+        return (
+            self.num_channels * self.samples_per_block * self.blocks / self.seconds
+            if self.seconds
+            else 0.0
+        )
+
+    @property
+    def key(self) -> str:
+        """Identifies the same benchmark and parameters across runs."""
+        key = f"{self.name}/ch={self.num_channels}/block={self.samples_per_block}"
+        return f"{key}/rate={self.rate:g}" if self.name in RATE_DEPENDENT else key
+
+    def all_metrics(self) -> Dict[str, float]:
+        metrics = {
+            "samples_per_second": self.samples_per_second,
+            "ms_per_block": self.seconds_per_block * 1e3,
+        }
+        metrics.update(self.metrics)
+        return metrics
+
+    def as_dict(self) -> Dict[str, Any]:
+        data: Dict[str, Any] = {
+            "name": self.name,
+            "num_channels": self.num_channels,
+            "samples_per_block": self.samples_per_block,
+            "rate": self.rate,
+            "blocks": self.blocks,
+            "seconds": self.seconds,
+        }
+        data.update(self.all_metrics())
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "BenchmarkResult":
+        fixed = {
+            "name",
+            "num_channels",
+            "samples_per_block",
+            "rate",
+            "blocks",
+            "seconds",
+            "samples_per_second",
+            "ms_per_block",
+        }
+        return cls(
+            data["name"],
+            data["num_channels"],
+            data["samples_per_block"],
+            data["blocks"],
+            data["seconds"],
+            data.get("rate", 0.0),
+            {key: value for key, value in data.items() if key not in fixed},
+        )
+
+    def __repr__(self) -> str:
+        return f"BenchmarkResult(name={self.name!r}, samples_per_second={self.samples_per_second:.3g})"
+
+
+BenchmarkSetup = Callable[[BenchmarkCase], Callable[[], None]]
+BenchmarkRunner = Callable[[BenchmarkCase, float], BenchmarkResult]
+BENCHMARKS: Dict[str, BenchmarkRunner] = {}
+# Benchmarks whose results depend on the sample rate; the others run once per
+# channel count and block size regardless of --rate.
+RATE_DEPENDENT: Set[str] = set()
+
+
+def benchmark(
+    name: str, uses_rate: bool = False
+) -> Callable[[BenchmarkSetup], BenchmarkSetup]:
+    """Register ``setup(case)``, which returns a callable processing one block."""
+
+    def decorator(setup: BenchmarkSetup) -> BenchmarkSetup:
+        def run(case: BenchmarkCase, min_seconds: float) -> BenchmarkResult:
+            blocks, seconds = _time_calls(setup(case), min_seconds)
+            return BenchmarkResult(
+                name,
+                case.num_channels,
+                case.samples_per_block,
+                blocks,
+                seconds,
+                case.rate,
+            )
+
+        BENCHMARKS[name] = run
+        if uses_rate:
+            RATE_DEPENDENT.add(name)
+        return setup
+
+    return decorator
+
+
+def scenario(
+    name: str, uses_rate: bool = False
+) -> Callable[[BenchmarkRunner], BenchmarkRunner]:
+    """Register ``run(case, min_seconds)``, which returns its own :class:`BenchmarkResult`."""
+
+    def decorator(run: BenchmarkRunner) -> BenchmarkRunner:
+        BENCHMARKS[name] = run
+        if uses_rate:
+            RATE_DEPENDENT.add(name)
+        return run
+
+    return decorator
+
+
+def _time_calls(step: Callable[[], Any], min_seconds: float) -> Tuple[int, float]:
+    """Call ``step`` for at least ``min_seconds`` after a warm-up call."""
+    step()
+    blocks = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < min_seconds:
+        step()
+        blocks += 1
+        elapsed = time.perf_counter() - start
+    return blocks, elapsed
+
+
+def run_benchmark(
+    name: str,
+    num_channels: int = 8,
+    samples_per_block: int = 10000,
+    min_seconds: float = 0.5,
+    rate: float = 50000.0,
+) -> BenchmarkResult:
+    """Run one benchmark for at least ``min_seconds``."""
+    return BENCHMARKS[name](
+        BenchmarkCase(num_channels, samples_per_block, rate), min_seconds
+    )
+
+
+def run_suite(
+    names: Iterable[str],
+    channels: Sequence[int] = (8,),
+    blocks: Sequence[int] = (10000,),
+    rates: Sequence[float] = (50000.0,),
+    min_seconds: float = 0.5,
+    progress: Optional[Callable[[BenchmarkResult], None]] = None,
+) -> List[BenchmarkResult]:
+    """Run every benchmark for every parameter combination."""
+    results = []
+    for name in names:
+        for num_channels, block, rate in itertools.product(
+            channels, blocks, rates if name in RATE_DEPENDENT else rates[:1]
+        ):
+            result = run_benchmark(name, num_channels, block, min_seconds, rate)
+            results.append(result)
+            if progress is not None:
+                progress(result)
+    return results
+
+
+# Reports
+def environment() -> Dict[str, Any]:
+    """Describe the machine, so results from different hosts are not confused."""
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def write_json(results: Sequence[BenchmarkResult], path: str) -> None:
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump(
+            {"environment": environment(), "results": [r.as_dict() for r in results]},
+            handle,
+            indent=2,
+        )
+
+
+def load_json(path: str) -> List[BenchmarkResult]:
+    with open(path, "r", encoding="utf-8") as handle:
+        return [
+            BenchmarkResult.from_dict(data) for data in json.load(handle)["results"]
+        ]
+
+
+def write_csv(results: Sequence[BenchmarkResult], path: str) -> None:
+    """One row per result; metric columns are the union over all results."""
+    rows = [r.as_dict() for r in results]
+    columns: List[str] = []
+    for row in rows:
+        columns.extend(key for key in row if key not in columns)
+    with open(path, "w", newline="", encoding="utf-8") as handle:
+        writer = csv.DictWriter(handle, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+class Comparison:
+    """One metric of one benchmark compared with the baseline."""
+
+    def __init__(
+        self, key: str, metric: str, baseline: float, current: float, tolerance: float
+    ):
+        self.key = key
+        self.metric = metric
+        self.baseline = baseline
+        self.current = current
+        self.tolerance = tolerance
+
+    @property
+    def change(self) -> float:
+        """Relative improvement; negative when the metric got worse."""
+        if self.baseline == 0:
+            return 0.0
+        return (
+            METRIC_DIRECTIONS.get(self.metric, 1)
+            * (self.current - self.baseline)
+            / abs(self.baseline)
+        )
+
+    @property
+    def regressed(self) -> bool:
+        return self.change < -self.tolerance
+
+    def __repr__(self) -> str:
+        return f"Comparison({self.key} {self.metric}: {self.baseline:.4g} -> {self.current:.4g}, {self.change:+.1%})"
+
+
+def compare(
+    results: Sequence[BenchmarkResult],
+    baseline: Sequence[BenchmarkResult],
+    tolerance: float = 0.1,
+) -> List[Comparison]:
+    """Compare every metric with a known direction against the matching baseline result."""
+    previous = {result.key: result for result in baseline}
+    comparisons = []
+    for result in results:
+        old = previous.get(result.key)
+        if old is None:
+            continue
+        old_metrics = old.all_metrics()
+        for metric, value in result.all_metrics().items():
+            if metric in METRIC_DIRECTIONS and metric in old_metrics:
+                comparisons.append(
+                    Comparison(
+                        result.key, metric, old_metrics[metric], value, tolerance
+                    )
+                )
+    return comparisons
+
+
+# Benchmarks
+def _signal(num_channels: int, samples_per_block: int) -> np.ndarray:
+    return np.random.default_rng(0).normal(size=(num_channels, samples_per_block))
+
+
+@benchmark("dsp.lowpass")
+def _bench_lowpass(case: BenchmarkCase) -> Callable[[], None]:
+    from .dsp import FirFilter, design_lowpass
+
+    stage = FirFilter(design_lowpass(1000.0, 50000.0, 101), case.num_channels)
+    data = _signal(case.num_channels, case.samples_per_block)
+    return lambda: stage.process(data)
+
+
+@benchmark("dsp.decimate10")
+def _bench_decimate(case: BenchmarkCase) -> Callable[[], None]:
+    from .dsp import Decimator
+
+    stage = Decimator(10, 50000.0, case.num_channels)
+    data = _signal(case.num_channels, case.samples_per_block)
+    return lambda: stage.process(data)
+
+
+@benchmark("dsp.stats")
+def _bench_stats(case: BenchmarkCase) -> Callable[[], None]:
+    from .dsp import WindowedStats
+
+    stage = WindowedStats(1000, case.num_channels)
+    data = _signal(case.num_channels, case.samples_per_block)
+    return lambda: stage.process(data)
+
+
+@benchmark("dsp.spectrum")
+def _bench_spectrum(case: BenchmarkCase) -> Callable[[], None]:
+    from .dsp import Spectrum
+
+    stage = Spectrum(1024, 50000.0, case.num_channels)
+    data = _signal(case.num_channels, case.samples_per_block)
+    return lambda: stage.process(data)
+
+
+def _simulated_task(case: BenchmarkCase, realtime: bool) -> Any:
+    """A started task on a simulated device with constant (cheap) waveforms."""
+    from .cli import start_continuous_ai_task
+    from .simulator import SimulatedBackend, SimulatedDevice, Waveform
+
+    waveforms = {
+        f"ai{i}": Waveform("dc", offset=0.1 * i) for i in range(case.num_channels)
+    }
+    device = SimulatedDevice("bench", num_ai=case.num_channels, waveforms=waveforms)
+    backend = SimulatedBackend([device], realtime=realtime)
+    task = start_continuous_ai_task(
+        "bench", f"ai0:{case.num_channels - 1}", rate=case.rate, backend=backend
+    )
+    task.in_stream.input_buf_size = max(
+        task.in_stream.input_buf_size, 4 * case.samples_per_block
+    )
+    return task
+
+
+@scenario("read.call")
+def _bench_read_call(case: BenchmarkCase, min_seconds: float) -> BenchmarkResult:
+    """Cost of one ``read_many_sample`` call into a preallocated buffer."""
+    from .backends import backend_for_task
+
+    task = _simulated_task(case, realtime=False)
+    try:
+        reader = backend_for_task(task).ai_reader(task)
+        data = np.empty((case.num_channels, case.samples_per_block))
+        blocks, seconds = _time_calls(
+            lambda: reader.read_many_sample(data, case.samples_per_block, 10.0),
+            min_seconds,
+        )
+    finally:
+        task.close()
+    return BenchmarkResult(
+        "read.call",
+        case.num_channels,
+        case.samples_per_block,
+        blocks,
+        seconds,
+        case.rate,
+        {"us_per_call": seconds / blocks * 1e6},
+    )
+
+
+@scenario("stream.blocks", uses_rate=True)
+def _bench_stream_blocks(case: BenchmarkCase, min_seconds: float) -> BenchmarkResult:
+    """Blocks per second through a StreamingReader, and its memory per channel.
+
+    Memory covers the reader's buffer pool plus a 10 s ring buffer, the
+    setup the GUI's live plot uses.
+    """
+    from .ringbuffer import RingBuffer
+    from .streaming import StreamingReader
+
+    task = _simulated_task(case, realtime=False)
+    try:
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        reader = StreamingReader(task, case.samples_per_block, queue_blocks=False)
+        ring = RingBuffer(case.num_channels, int(case.rate * 10))
+        allocated = tracemalloc.get_traced_memory()[0] - before
+        if not tracing:
+            tracemalloc.stop()
+        reader.subscribe(lambda block: ring.write(block.data))
+        reader.start()
+        time.sleep(min_seconds)
+        reader.stop()
+    finally:
+        task.close()
+    stats = reader.stats
+    return BenchmarkResult(
+        "stream.blocks",
+        case.num_channels,
+        case.samples_per_block,
+        stats.blocks,
+        stats.elapsed,
+        case.rate,
+        {
+            "blocks_per_second": stats.blocks_per_second,
+            "bytes_per_channel": allocated / case.num_channels,
+        },
+    )
+
+
+@scenario("stream.latency", uses_rate=True)
+def _bench_stream_latency(case: BenchmarkCase, min_seconds: float) -> BenchmarkResult:
+    """Time from a block's last sample being acquired to a ``get()`` consumer holding it.
+
+    Runs in real time on the simulator, whose acquisition start time is
+    known exactly, for at least ``min_seconds`` and five blocks.
+    """
+    from .streaming import StreamingReader
+
+    task = _simulated_task(case, realtime=True)
+    latencies: List[float] = []
+    duration = max(min_seconds, 5 * case.samples_per_block / case.rate)
+    try:
+        reader = StreamingReader(task, case.samples_per_block).start()
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            block = reader.get(timeout=1.0)
+            if block is None:
+                continue
+            now = time.monotonic()
+            latencies.append(
+                now - (task._t0 + (block.first_sample + block.num_samples) / case.rate)
+            )
+            block.release()
+        reader.stop()
+    finally:
+        task.close()
+    ms = np.array(latencies or [0.0]) * 1e3
+    return BenchmarkResult(
+        "stream.latency",
+        case.num_channels,
+        case.samples_per_block,
+        len(latencies),
+        duration,
+        case.rate,
+        {
+            "latency_p50_ms": float(np.percentile(ms, 50)),
+            "latency_p99_ms": float(np.percentile(ms, 99)),
+            "latency_max_ms": float(ms.max()),
+        },
+    )
+
+
+@scenario("gui.redraw", uses_rate=True)
+def _bench_gui_redraw(case: BenchmarkCase, min_seconds: float) -> BenchmarkResult:
+    """One live-plot frame (decimate a 2 s window and blit) rendered off-screen."""
+    from .plotting import LivePlot
+    from .ringbuffer import RingBuffer
+
+    ring = RingBuffer(case.num_channels, int(case.rate * 10))
+    ring.write(_signal(case.num_channels, int(case.rate * 2)))
+    plot = LivePlot(None, window_seconds=2.0)
+    plot.configure(
+        ring,
+        case.rate,
+        [f"ai{i}" for i in range(case.num_channels)],
+        [(-4.0, 4.0)] * case.num_channels,
+    )
+    block = _signal(case.num_channels, case.samples_per_block)
+
+    def frame() -> None:
+        ring.write(block)
+        plot.update()
+
+    blocks, seconds = _time_calls(frame, min_seconds)
+    return BenchmarkResult(
+        "gui.redraw",
+        case.num_channels,
+        case.samples_per_block,
+        blocks,
+        seconds,
+        case.rate,
+        {"ms_per_frame": seconds / blocks * 1e3},
+    )
+
+
+@scenario("record.write")
+def _bench_record_write(case: BenchmarkCase, min_seconds: float) -> BenchmarkResult:
+    """Sustained recording throughput to a temporary file, including the final flush."""
+    from .recording import ChannelInfo, Recorder
+
+    data = _signal(case.num_channels, case.samples_per_block)
+    channels = [ChannelInfo(f"bench/ai{i}") for i in range(case.num_channels)]
+    with tempfile.TemporaryDirectory() as directory:
+        recorder = Recorder(
+            os.path.join(directory, "bench.ndq"),
+            channels,
+            case.rate,
+            fsync_interval=None,
+        )
+        blocks = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < min_seconds:
+            recorder.write(data)
+            blocks += 1
+            if recorder.stats.samples_dropped:
+                # The disk cannot keep up; give the writer thread time.
+                time.sleep(0.001)
+        recorder.close()
+        seconds = time.perf_counter() - start
+        stats = recorder.stats
+    written_blocks = stats.samples_written // case.samples_per_block
+    return BenchmarkResult(
+        "record.write",
+        case.num_channels,
+        case.samples_per_block,
+        written_blocks,
+        seconds,
+        case.rate,
+        {"mb_per_second": stats.bytes_written / seconds / 1e6},
+    )
+
+
+@scenario("metrics.overhead", uses_rate=True)
+def _bench_metrics_overhead(case: BenchmarkCase, min_seconds: float) -> BenchmarkResult:
+    """Per-block cost of a reader's latency instrumentation, as a share of one core at ``rate``.
+
+    Each block is timed twice (driver read and subscriber callbacks), so one
+    call here is two timings and two histogram updates.
+    """
+    from .metrics import LatencyHistogram
+
+    read, callbacks = LatencyHistogram(), LatencyHistogram()
+
+    def instrument() -> None:
+        started = time.perf_counter()
+        read.observe(time.perf_counter() - started)
+        started = time.perf_counter()
+        callbacks.observe(time.perf_counter() - started)
+
+    blocks, seconds = _time_calls(instrument, min_seconds)
+    per_block = seconds / blocks
+    return BenchmarkResult(
+        "metrics.overhead",
+        case.num_channels,
+        case.samples_per_block,
+        blocks,
+        seconds,
+        case.rate,
+        {
+            "us_per_call": per_block * 1e6,
+            "overhead_percent": per_block * case.rate / case.samples_per_block * 100,
+        },
+    )
+
+
+@scenario("trigger.capture")
+def _bench_trigger_capture(case: BenchmarkCase, min_seconds: float) -> BenchmarkResult:
+    """Edge trigger detection and capture over blocks with sparse pulses, plus re-arm latency.
+
+    The throughput run puts one pulse every 50 blocks on channel 0, with
+    captures of 10% of a block before and after it. Re-arm latency is then
+    measured with a level trigger on a signal that is always above the
+    level: every sample is a trigger, so the first accepted one after each
+    capture and hold-off shows how many samples the capture stays blind
+    beyond its hold-off (0 means it re-arms on the very next sample).
+    """
+    from .trigger import EdgeTrigger, LevelTrigger, TriggeredCapture
+
+    n = case.samples_per_block
+    window = max(n // 10, 1)
+    blocks = [_signal(case.num_channels, n) * 0.1 for _ in range(50)]
+    blocks[0][0, n // 2 : n // 2 + 10] = 5.0
+    capture = TriggeredCapture(
+        EdgeTrigger(0, level=2.5, hysteresis=0.5),
+        pre_samples=window,
+        post_samples=window,
+        holdoff=n,
+    )
+    fed = iter(itertools.cycle(blocks))
+    count, seconds = _time_calls(lambda: capture.process(next(fed)), min_seconds)
+
+    holdoff = window
+    rearm = TriggeredCapture(
+        LevelTrigger(0, level=0.0),
+        pre_samples=window,
+        post_samples=window,
+        holdoff=holdoff,
+    )
+    high = np.ones((case.num_channels, n))
+    triggers: List[int] = []
+    for _ in range(20):
+        triggers.extend(c.trigger_sample for c in rearm.process(high))
+    gaps = np.diff(triggers) - (window + holdoff) if len(triggers) > 1 else np.zeros(1)
+    return BenchmarkResult(
+        "trigger.capture",
+        case.num_channels,
+        n,
+        count,
+        seconds,
+        case.rate,
+        {
+            "us_per_call": seconds / count * 1e6,
+            "rearm_samples": float(gaps.max()),
+            "reduction": capture.stats.reduction,
+        },
+    )
+
+
+@scenario("profile.start", uses_rate=True)
+def _bench_profile_start(case: BenchmarkCase, min_seconds: float) -> BenchmarkResult:
+    """Start-to-first-sample latency of a new task, a pooled task, and a profile switch.
+
+    Cold starts create, verify, commit and start a task, then close it;
+    warm starts restart the same pooled task; switches alternate between two
+    profiles on the same device. Each time runs until a sample is in the
+    driver buffer, so at low rates one sample period dominates. On the
+    simulator this measures the package's overhead; run it on hardware for
+    the driver's reservation cost.
+    """
+    from .profiles import TaskPool, TaskProfile
+    from .simulator import SimulatedBackend, SimulatedDevice
+
+    # Cold starts use their own device so the pool's reservations do not block them.
+    backend = SimulatedBackend(
+        [SimulatedDevice(name, num_ai=case.num_channels) for name in ("bench", "cold")]
+    )
+    channels = f"ai0:{case.num_channels - 1}"
+    first = TaskProfile.continuous_ai("bench", channels, case.rate, name="first")
+    second = TaskProfile.continuous_ai(
+        "bench", channels, case.rate, min_val=-5.0, max_val=5.0, name="second"
+    )
+    fresh = TaskProfile.continuous_ai("cold", channels, case.rate, name="fresh")
+    cold = TaskPool(backend)
+    pool = TaskPool(backend)
+    pool.get(first)
+    pool.get(second)
+    times: Dict[str, List[float]] = {"cold": [], "warm": [], "switch": []}
+
+    def timed(kind: str, call: Callable[[], Any]) -> None:
+        started = time.perf_counter()
+        call()
+        times[kind].append(time.perf_counter() - started)
+
+    deadline = time.perf_counter() + min_seconds
+    try:
+        while len(times["cold"]) < 5 or time.perf_counter() < deadline:
+            timed("cold", lambda: cold.start(fresh, wait_first_sample=True))
+            cold.discard(fresh)
+            timed("warm", lambda: pool.start(first, wait_first_sample=True))
+            timed("switch", lambda: pool.switch(second, wait_first_sample=True))
+            timed("switch", lambda: pool.switch(first, wait_first_sample=True))
+            pool.stop(first)
+    finally:
+        cold.close()
+        pool.close()
+    rounds = len(times["cold"])
+    return BenchmarkResult(
+        "profile.start",
+        case.num_channels,
+        case.samples_per_block,
+        rounds,
+        sum(times["cold"]),
+        case.rate,
+        {
+            "cold_start_ms": float(np.mean(times["cold"])) * 1e3,
+            "warm_start_ms": float(np.mean(times["warm"])) * 1e3,
+            "switch_ms": float(np.mean(times["switch"])) * 1e3,
+        },
+    )
+
+
+@scenario("replay.pipeline", uses_rate=True)
+def _bench_replay_pipeline(case: BenchmarkCase, min_seconds: float) -> BenchmarkResult:
+    """A recording replayed as fast as possible through a low-pass filter and an edge trigger.
+
+    No hardware or simulated driver is involved, so this is the throughput
+    of the processing pipeline itself. ``realtime_factor`` is how many times
+    faster than an acquisition at ``rate`` the pipeline keeps up.
+    """
+    from .dsp import FirFilter, design_lowpass
+    from .recording import ChannelInfo, write_recording
+    from .replay import ReplaySource
+    from .trigger import EdgeTrigger, TriggeredCapture
+
+    n = case.samples_per_block
+    data = np.concatenate(
+        [_signal(case.num_channels, n) * 0.1 for _ in range(20)], axis=1
+    )
+    data[0, n // 2 : n // 2 + 10] = 5.0
+    channels = [ChannelInfo(f"bench/ai{i}") for i in range(case.num_channels)]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "replay.ndq")
+        write_recording(path, data, channels, case.rate)
+        replay = ReplaySource(path, n, speed=None, queue_blocks=False, loop=True)
+        lowpass = FirFilter(
+            design_lowpass(case.rate / 20, case.rate, 31), case.num_channels
+        )
+        capture = TriggeredCapture(
+            EdgeTrigger(0, level=2.5, hysteresis=0.5),
+            pre_samples=max(n // 10, 1),
+            post_samples=max(n // 10, 1),
+        )
+        replay.subscribe(lambda block: lowpass.process(block.data))
+        capture.attach(replay)
+        replay.start()
+        time.sleep(min_seconds)
+        replay.close()
+    stats = replay.stats
+    return BenchmarkResult(
+        "replay.pipeline",
+        case.num_channels,
+        n,
+        stats.blocks,
+        stats.elapsed,
+        case.rate,
+        {
+            "blocks_per_second": stats.blocks_per_second,
+            "realtime_factor": stats.samples_per_second / case.rate,
+        },
+    )
+
+
+def _parse_list(text: str, kind: Callable[[str], Any]) -> List[Any]:
+    return [kind(item) for item in text.split(",") if item.strip()]
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m nidaqmx_on_pi.bench", description=__doc__.split("\n\n")[0]
+    )
+    parser.add_argument("names", nargs="*", help="benchmarks to run (default: all)")
+    parser.add_argument(
+        "--channels", default="8", help="comma-separated channel counts"
+    )
+    parser.add_argument(
+        "--block", default="10000", help="comma-separated samples per channel per block"
+    )
+    parser.add_argument(
+        "--rate",
+        default="50000",
+        help="comma-separated sample rates for rate-dependent benchmarks",
+    )
+    parser.add_argument(
+        "--seconds", type=float, default=0.5, help="minimum time per benchmark"
+    )
+    parser.add_argument(
+        "--json", help="write results (with machine details) to this JSON file"
+    )
+    parser.add_argument("--csv", help="write results to this CSV file")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.1,
+        help="allowed relative regression (default: 0.1)",
+    )
+    args = parser.parse_args(argv)
+    names: List[str] = args.names or sorted(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmarks {unknown}; available: {sorted(BENCHMARKS)}")
+
+    def report(result: BenchmarkResult) -> None:
+        extra = ", ".join(f"{key}={value:.4g}" for key, value in result.metrics.items())
+        print(
+            f"{result.name:<16} {result.num_channels:>4} {result.samples_per_block:>7} {result.rate:>9g} "
+            f"{result.seconds_per_block * 1e3:>10.3f} {result.samples_per_second / 1e6:>10.2f}  {extra}"
+        )
+        sys.stdout.flush()
+
+    print(
+        f"{'benchmark':<16} {'ch':>4} {'block':>7} {'rate':>9} {'ms/block':>10} {'MS/s/core':>10}  metrics"
+    )
+    results = run_suite(
+        names,
+        _parse_list(args.channels, int),
+        _parse_list(args.block, int),
+        _parse_list(args.rate, float),
+        args.seconds,
+        progress=report,
+    )
+    if args.json:
+        write_json(results, args.json)
+    if args.csv:
+        write_csv(results, args.csv)
+    if args.baseline:
+        comparisons = compare(results, load_json(args.baseline), args.tolerance)
+        regressions = [c for c in comparisons if c.regressed]
+        print(
+            f"\nCompared {len(comparisons)} metrics with {args.baseline}: {len(regressions)} regressions"
+        )
+        for comparison in regressions:
+            print(
+                f"  REGRESSION {comparison.key} {comparison.metric}: {comparison.baseline:.4g} -> "
+                f"{comparison.current:.4g} ({comparison.change:+.1%})"
+            )
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,31 +1,93 @@
 """Simple CLI for nidaqmx_on_pi scaffold."""
 
 import argparse
+import sys
+from typing import TYPE_CHECKING, Optional, Sequence
 import nidaqmx
 from nidaqmx.constants import AcquisitionType, TerminalConfiguration
 from . import greet
-from .gui import main as gui_main
+from .backends import BACKEND_NAMES, Backend, get_backend
+from .inventory import DeviceInventory
 
+if TYPE_CHECKING:
+    from .profiles import TaskPool
 
-def main() -> None:
-    parser = argparse.ArgumentParser(prog="nidaqmx_on_pi")
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if argv[:1] == ["run"]:
+        # Headless mode: keep tkinter and matplotlib out of the process.
+        from .daemon import main as daemon_main
+
+        sys.exit(daemon_main(argv[1:]))
+
+    parser = argparse.ArgumentParser(
+        prog="nidaqmx_on_pi",
+        epilog="Run 'nidaqmx_on_pi run --config FILE' for headless acquisition.",
+    )
     parser.add_argument("name", nargs="?", default="world")
     parser.add_argument("--gui", action="store_true", help="Launch the tkinter GUI")
-    args = parser.parse_args()
-    
+    parser.add_argument(
+        "--list-devices",
+        action="store_true",
+        help="List devices and their physical channels",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=BACKEND_NAMES,
+        default=None,
+        help="DAQ backend to use (default: $NIDAQMX_ON_PI_BACKEND or nidaqmx)",
+    )
+    parser.add_argument(
+        "--log-file",
+        help="With --gui, also log to this file (rotated at 10 MB, 5 kept)",
+    )
+    args = parser.parse_args(argv)
+
     if args.gui:
-        gui_main()
+        from .gui import main as gui_main
+
+        gui_main(get_backend(args.backend), args.log_file)
+    elif args.list_devices:
+        list_devices(get_backend(args.backend))
     else:
         print(greet(args.name))
 
 
-def start_continuous_ai_task(device: str = "dev3", channel: str = "ai0", rate: float = 1000.0, min_val: float = -10.0, max_val: float = 10.0) -> nidaqmx.Task:
+def list_devices(backend: Backend) -> None:
+    """Print each device with its product type, serial and physical channels."""
+    inventory = DeviceInventory(backend, check_interval=None)
+    for device in inventory.devices():
+        serial = device.serial_num if device.serial_num is not None else "N/A"
+        print(f"{device.name}: {device.product_type} (serial {serial})")
+        for label, names in (
+            ("AI", device.ai_channels),
+            ("AO", device.ao_channels),
+            ("DI", device.di_lines),
+            ("DO", device.do_lines),
+        ):
+            print(f"  {label}: {', '.join(names) if names else 'None'}")
+    inventory.close()
+
+
+def start_continuous_ai_task(
+    device: str = "dev3",
+    channel: str = "ai0",
+    rate: float = 1000.0,
+    min_val: float = -10.0,
+    max_val: float = 10.0,
+    backend: Optional[Backend] = None,
+    terminal_config: TerminalConfiguration = TerminalConfiguration.RSE,
+    input_buffer_size: Optional[int] = None,
+    autotune: bool = False,
+    pool: Optional["TaskPool"] = None,
+) -> nidaqmx.Task:
     """Create and start a continuous analog-input task for `device/channel`.
 
     The function returns a started `nidaqmx.Task` instance. Caller is
-    responsible for reading from the task (for example using a
-    `nidaqmx.stream_readers.AnalogSingleChannelReader`) and for calling
-    `task.close()` when finished.
+    responsible for reading from the task (for example by wrapping it in a
+    `streaming.StreamingReader`, which reads into pooled NumPy buffers on a
+    background thread) and for calling `task.close()` when finished.
 
     Args:
         device: NI device name (default "dev3").
@@ -33,17 +95,52 @@ def start_continuous_ai_task(device: str = "dev3", channel: str = "ai0", rate: f
         rate: Sample clock rate in samples per second.
         min_val: Minimum expected voltage.
         max_val: Maximum expected voltage.
+        backend: DAQ backend creating the task. Defaults to `get_backend()`;
+            pass a `SimulatedBackend` to run without hardware.
+        terminal_config: Input terminal configuration (default RSE).
+        input_buffer_size: Driver input buffer size in samples per channel.
+            Defaults to the driver's choice (about one second at high rates).
+        autotune: Size the input buffer from the rate and channel count with
+            `autotune.tune_input_buffer` unless `input_buffer_size` is given.
+        pool: Take the task from a `profiles.TaskPool` instead of creating
+            it. A task started before with the same settings is reused
+            without being created and verified again; stop it with
+            `pool.stop(...)` instead of closing it.
 
     Returns:
         A started `nidaqmx.Task` configured for continuous acquisition.
     """
-    task = nidaqmx.Task()
+    if pool is not None:
+        from .profiles import TaskProfile
+
+        profile = TaskProfile.continuous_ai(
+            device,
+            channel,
+            rate,
+            min_val,
+            max_val,
+            terminal_config.name,
+            input_buffer_size=input_buffer_size,
+            autotune=autotune,
+        )
+        return pool.start(profile)
+    if backend is None:
+        backend = get_backend()
+    task = backend.create_task()
     physical_channel = f"{device}/{channel}"
-    task.ai_channels.add_ai_voltage_chan(physical_channel,
-                                         terminal_config=TerminalConfiguration.RSE,
-                                         min_val=min_val,
-                                         max_val=max_val)
+    task.ai_channels.add_ai_voltage_chan(
+        physical_channel,
+        terminal_config=terminal_config,
+        min_val=min_val,
+        max_val=max_val,
+    )
     task.timing.cfg_samp_clk_timing(rate, sample_mode=AcquisitionType.CONTINUOUS)
+    if input_buffer_size is not None:
+        task.in_stream.input_buf_size = input_buffer_size
+    elif autotune:
+        from .autotune import tune_input_buffer
+
+        tune_input_buffer(task)
     task.start()
     return task
 
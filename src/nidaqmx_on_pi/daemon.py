@@ -0,0 +1,568 @@
+"""Headless acquisition driven by a declarative config file.
+
+``python -m nidaqmx_on_pi run --config acq.toml`` starts every task listed in
+the config, reads each one on its own :class:`StreamingReader` thread and
+feeds the blocks to the task's sinks until SIGTERM or SIGINT, then stops the
+readers, flushes and closes the sinks and releases the tasks.
+
+Example config::
+
+    backend = "nidaqmx"        # optional, see --backend
+    status_interval = 10.0     # seconds between status log lines
+    metrics_port = 9108        # optional Prometheus endpoint, see metrics.py
+
+    [[task]]
+    name = "vibration"
+    device = "dev1"
+    channels = "ai0:3"
+    rate = 10000.0
+    min_val = -10.0
+    max_val = 10.0
+    terminal_config = "RSE"
+    samples_per_block = 1000
+    raw = true
+    autotune = false           # size buffer and blocks from rate, see autotune.py
+
+    [[task.sink]]
+    type = "record"
+    path = "/data/{task}-{start}.ndq"
+    pyramid = true
+
+    [[task.sink]]
+    type = "trigger"           # only the windows around events, see trigger.py
+    path = "/data/{task}-{start}-events"
+    pre_seconds = 0.1
+    post_seconds = 0.4
+    trigger = { kind = "edge", channel = 0, level = 2.5, hysteresis = 0.1 }
+
+TOML needs Python 3.11+ or the ``tomli`` package; JSON configs with the same
+structure (``"task"`` being a list) work everywhere.
+
+Sinks are created by factories registered with :func:`register_sink`. A
+factory receives the :class:`TaskRunner` (whose ``task`` and ``reader`` exist
+at that point) and the sink's options, attaches itself to the reader and
+returns an object with a ``close()`` method.
+"""
+
+import argparse
+import json
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from nidaqmx.constants import TerminalConfiguration
+
+from .autotune import BlockSizeTuner, plan_acquisition
+from .backends import BACKEND_NAMES, Backend, get_backend
+from .metrics import MetricsCollector, MetricsServer
+from .recording import Recorder
+from .server import StreamServer
+from .sharedmem import SharedMemoryPublisher
+from .streaming import StreamingReader
+from .trigger import CaptureWriter, TriggeredCapture, make_trigger
+
+logger = logging.getLogger(__name__)
+
+SinkFactory = Callable[["TaskRunner", Dict[str, Any]], Any]
+SINK_TYPES: Dict[str, SinkFactory] = {}
+# Options each sink type cannot do without, checked when the config is loaded.
+SINK_REQUIRED: Dict[str, Tuple[str, ...]] = {}
+
+
+def register_sink(
+    name: str, required: Sequence[str] = ()
+) -> Callable[[SinkFactory], SinkFactory]:
+    """Register a sink factory under ``name`` for use in ``[[task.sink]]``.
+
+    ``required`` lists the options a config must give for this sink type.
+    """
+
+    def decorator(factory: SinkFactory) -> SinkFactory:
+        SINK_TYPES[name] = factory
+        SINK_REQUIRED[name] = tuple(required)
+        return factory
+
+    return decorator
+
+
+def load_config_file(path: str) -> Dict[str, Any]:
+    """Parse a TOML or JSON (by extension) config file into a dictionary."""
+    if path.endswith(".json"):
+        with open(path, "r", encoding="utf-8") as handle:
+            return json.load(handle)
+    try:
+        import tomllib
+    except ImportError:
+        try:
+            import tomli as tomllib  # type: ignore[no-redef]
+        except ImportError:
+            raise RuntimeError(
+                "Reading TOML configs needs Python 3.11+ or the 'tomli' package; use a .json config instead"
+            ) from None
+    with open(path, "rb") as handle:
+        return tomllib.load(handle)
+
+
+class TaskConfig:
+    """One continuous AI task and its sinks."""
+
+    def __init__(
+        self,
+        name: str,
+        device: str,
+        channels: str,
+        rate: float,
+        min_val: float = -10.0,
+        max_val: float = 10.0,
+        terminal_config: str = "RSE",
+        samples_per_block: Optional[int] = None,
+        num_buffers: int = 8,
+        raw: bool = False,
+        sinks: Optional[List[Dict[str, Any]]] = None,
+        input_buffer_size: Optional[int] = None,
+        autotune: bool = False,
+        target_latency: float = 0.1,
+    ):
+        self.name = name
+        self.device = device
+        self.channels = channels
+        self.rate = float(rate)
+        self.min_val = float(min_val)
+        self.max_val = float(max_val)
+        self.terminal_config = terminal_config
+        # Ten blocks per second unless configured.
+        self.samples_per_block = samples_per_block or max(int(self.rate / 10), 1)
+        self.num_buffers = num_buffers
+        self.raw = raw
+        self.sinks = list(sinks or [])
+        self.input_buffer_size = input_buffer_size
+        # With autotune the block size starts at target_latency seconds and
+        # samples_per_block is ignored.
+        self.autotune = autotune
+        self.target_latency = float(target_latency)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], index: int = 0) -> "TaskConfig":
+        """Build a task config, raising ``ValueError`` on missing or unknown keys."""
+        where = f"task {data.get('name', index)!r}"
+        for key in ("device", "channels", "rate"):
+            if key not in data:
+                raise ValueError(f"{where}: missing required key {key!r}")
+        known = {
+            "name",
+            "device",
+            "channels",
+            "rate",
+            "min_val",
+            "max_val",
+            "terminal_config",
+            "samples_per_block",
+            "num_buffers",
+            "raw",
+            "sink",
+            "input_buffer_size",
+            "autotune",
+            "target_latency",
+        }
+        unknown = set(data) - known
+        if unknown:
+            raise ValueError(f"{where}: unknown keys {sorted(unknown)}")
+        terminal_config = data.get("terminal_config", "RSE")
+        if str(terminal_config).upper() not in TerminalConfiguration.__members__:
+            raise ValueError(
+                f"{where}: unknown terminal_config {terminal_config!r}; "
+                f"expected one of {sorted(TerminalConfiguration.__members__)}"
+            )
+        sinks = data.get("sink", [])
+        if not isinstance(sinks, list) or not all(isinstance(s, dict) for s in sinks):
+            raise ValueError(
+                f"{where}: sink must be a list of tables; use [[task.sink]] in TOML"
+            )
+        for sink in sinks:
+            if sink.get("type") not in SINK_TYPES:
+                raise ValueError(
+                    f"{where}: unknown sink type {sink.get('type')!r}; expected one of {sorted(SINK_TYPES)}"
+                )
+            missing = [key for key in SINK_REQUIRED[sink["type"]] if key not in sink]
+            if missing:
+                raise ValueError(
+                    f"{where}: {sink['type']} sink is missing required keys {missing}"
+                )
+        return cls(
+            data.get("name", f"task{index}"),
+            data["device"],
+            data["channels"],
+            data["rate"],
+            data.get("min_val", -10.0),
+            data.get("max_val", 10.0),
+            terminal_config,
+            data.get("samples_per_block"),
+            data.get("num_buffers", 8),
+            bool(data.get("raw", False)),
+            sinks,
+            data.get("input_buffer_size"),
+            bool(data.get("autotune", False)),
+            data.get("target_latency", 0.1),
+        )
+
+
+class DaemonConfig:
+    """Top-level daemon configuration."""
+
+    def __init__(
+        self,
+        tasks: Sequence[TaskConfig],
+        backend: Optional[str] = None,
+        status_interval: float = 10.0,
+        metrics_port: Optional[int] = None,
+        metrics_host: str = "127.0.0.1",
+    ):
+        self.tasks = list(tasks)
+        self.backend = backend
+        self.status_interval = status_interval
+        self.metrics_port = metrics_port
+        self.metrics_host = metrics_host
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "DaemonConfig":
+        tasks = [
+            TaskConfig.from_dict(task, i) for i, task in enumerate(data.get("task", []))
+        ]
+        if not tasks:
+            raise ValueError("config defines no [[task]] entries")
+        names = [task.name for task in tasks]
+        if len(set(names)) != len(names):
+            raise ValueError(f"task names must be unique: {names}")
+        metrics_port = data.get("metrics_port")
+        return cls(
+            tasks,
+            data.get("backend"),
+            float(data.get("status_interval", 10.0)),
+            int(metrics_port) if metrics_port is not None else None,
+            data.get("metrics_host", "127.0.0.1"),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "DaemonConfig":
+        return cls.from_dict(load_config_file(path))
+
+
+class TaskRunner:
+    """Owns one task, its reader thread and its sinks."""
+
+    def __init__(self, config: TaskConfig):
+        self.config = config
+        self.task: Any = None
+        self.reader: Optional[StreamingReader] = None
+        self.tuner: Optional[BlockSizeTuner] = None
+        self.sinks: List[Any] = []
+        self.started_at = time.strftime("%Y%m%dT%H%M%S")
+
+    def start(self, backend: Backend) -> None:
+        from .cli import start_continuous_ai_task
+
+        config = self.config
+        self.task = start_continuous_ai_task(
+            config.device,
+            config.channels,
+            rate=config.rate,
+            min_val=config.min_val,
+            max_val=config.max_val,
+            backend=backend,
+            terminal_config=TerminalConfiguration[config.terminal_config.upper()],
+            input_buffer_size=config.input_buffer_size,
+            autotune=config.autotune,
+        )
+        plan = None
+        if config.autotune:
+            plan = plan_acquisition(
+                config.rate,
+                self.task.number_of_channels,
+                target_latency=config.target_latency,
+            )
+            plan.input_buffer_size = int(self.task.in_stream.input_buf_size)
+        self.reader = StreamingReader(
+            self.task,
+            samples_per_block=(
+                plan.samples_per_block if plan else config.samples_per_block
+            ),
+            num_buffers=config.num_buffers,
+            queue_blocks=False,
+            raw=config.raw,
+            max_samples_per_block=plan.max_samples_per_block if plan else None,
+        )
+        if plan is not None:
+            self.tuner = BlockSizeTuner(self.reader, plan).attach()
+        self.reader.on_error = lambda e: logger.error(
+            "Task %s stopped reading: %s", config.name, e
+        )
+        for options in config.sinks:
+            self.sinks.append(SINK_TYPES[options["type"]](self, options))
+        self.reader.start()
+        logger.info(
+            "Started task %s: %s/%s at %g S/s",
+            config.name,
+            config.device,
+            config.channels,
+            config.rate,
+        )
+
+    @property
+    def running(self) -> bool:
+        return self.reader is not None and self.reader.running
+
+    def stop(self) -> None:
+        """Stop reading, then close sinks and the task; never raises."""
+        steps: List[Callable[[], Any]] = []
+        if self.reader is not None:
+            steps.append(self.reader.stop)
+        steps.extend(sink.close for sink in self.sinks)
+        if self.task is not None:
+            steps.extend([self.task.stop, self.task.close])
+        for step in steps:
+            try:
+                step()
+            except Exception as e:
+                logger.error("Task %s: error during shutdown: %s", self.config.name, e)
+        self.sinks = []
+        self.task = None
+        logger.info("Stopped task %s", self.config.name)
+
+    def status(self) -> Dict[str, Any]:
+        status: Dict[str, Any] = {"running": self.running}
+        if self.reader is not None:
+            status["reader"] = self.reader.stats.as_dict()
+            status["samples_per_block"] = self.reader.samples_per_block
+        sink_stats = [
+            sink.stats.as_dict() for sink in self.sinks if hasattr(sink, "stats")
+        ]
+        if sink_stats:
+            status["sinks"] = sink_stats
+        return status
+
+
+@register_sink("record", required=("path",))
+def _record_sink(runner: TaskRunner, options: Dict[str, Any]) -> Recorder:
+    """Record to ``path``, which may contain ``{task}`` and ``{start}``."""
+    path = options["path"].format(task=runner.config.name, start=runner.started_at)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    kwargs = {
+        key: options[key]
+        for key in ("chunk_bytes", "max_buffer_bytes", "fsync_interval", "pyramid")
+        if key in options
+    }
+    recorder = Recorder.from_task(
+        runner.task,
+        path,
+        raw=runner.config.raw,
+        attrs={"task": runner.config.name},
+        **kwargs,
+    )
+    recorder.attach(runner.reader)
+    logger.info("Task %s recording to %s", runner.config.name, path)
+    return recorder
+
+
+@register_sink("serve")
+def _serve_sink(runner: TaskRunner, options: Dict[str, Any]) -> StreamServer:
+    """Publish blocks over TCP (see :mod:`nidaqmx_on_pi.server`)."""
+    server = StreamServer(
+        runner.reader,
+        host=options.get("host", "127.0.0.1"),
+        port=options.get("port", 0),
+        max_queue_frames=options.get("max_queue_frames", 32),
+    )
+    server.start()
+    host, port = server.address
+    logger.info("Task %s serving on %s:%d", runner.config.name, host, port)
+    return server
+
+
+@register_sink("shared_memory")
+def _shared_memory_sink(
+    runner: TaskRunner, options: Dict[str, Any]
+) -> SharedMemoryPublisher:
+    """Publish blocks into a shared-memory ring (see :mod:`nidaqmx_on_pi.sharedmem`)."""
+    name = options.get("name")
+    publisher = SharedMemoryPublisher(
+        runner.reader,
+        seconds=options.get("seconds", 10.0),
+        name=name.format(task=runner.config.name) if name else None,
+    )
+    logger.info(
+        "Task %s publishing to shared memory %s", runner.config.name, publisher.name
+    )
+    return publisher
+
+
+@register_sink("trigger", required=("path",))
+def _trigger_sink(runner: TaskRunner, options: Dict[str, Any]) -> CaptureWriter:
+    """Save the samples around trigger events to ``path`` (see :mod:`nidaqmx_on_pi.trigger`).
+
+    ``trigger`` holds the trigger settings, for example
+    ``{kind = "edge", channel = 0, level = 2.5}``; the window is given in
+    seconds with ``pre_seconds``, ``post_seconds`` and ``holdoff_seconds``.
+    """
+    rate = runner.config.rate
+    trigger_options = dict(options.get("trigger", {}))
+    if trigger_options.get("kind") == "slope":
+        trigger_options.setdefault("rate", rate)
+    capture = TriggeredCapture(
+        make_trigger(trigger_options),
+        pre_samples=int(options.get("pre_seconds", 0.1) * rate),
+        post_samples=max(int(options.get("post_seconds", 0.4) * rate), 1),
+        holdoff=int(options.get("holdoff_seconds", 0.0) * rate),
+    )
+    directory = options["path"].format(task=runner.config.name, start=runner.started_at)
+    writer = CaptureWriter.from_task(
+        runner.task,
+        directory,
+        raw=runner.config.raw,
+        attrs={"task": runner.config.name},
+        max_pending=options.get("max_pending", 64),
+    )
+    capture.attach(runner.reader)
+    writer.attach(capture)
+    logger.info(
+        "Task %s saving %r captures to %s",
+        runner.config.name,
+        capture.trigger,
+        directory,
+    )
+    return writer
+
+
+class AcquisitionDaemon:
+    """Run the tasks of a :class:`DaemonConfig` until asked to stop.
+
+    Args:
+        config: Tasks and sinks to run.
+        backend: Backend to use; defaults to the config's ``backend`` key,
+            then ``get_backend()``.
+    """
+
+    def __init__(self, config: DaemonConfig, backend: Optional[Backend] = None):
+        self.config = config
+        self.backend = backend
+        self.runners = [TaskRunner(task) for task in config.tasks]
+        # Readers report as "<task>", sinks as "<task>/<sink type>".
+        self.metrics = MetricsCollector()
+        self.metrics_server: Optional[MetricsServer] = None
+        self._stop_event = threading.Event()
+
+    def start(self) -> None:
+        """Start every task; if one fails, stop the ones already started."""
+        if self.backend is None:
+            self.backend = get_backend(self.config.backend)
+        started = []
+        try:
+            for runner in self.runners:
+                started.append(runner)
+                runner.start(self.backend)
+                self._register_metrics(runner)
+            if self.config.metrics_port is not None:
+                self.metrics_server = MetricsServer(
+                    self.metrics, self.config.metrics_host, self.config.metrics_port
+                ).start()
+                host, port = self.metrics_server.address
+                logger.info("Serving metrics on http://%s:%d/metrics", host, port)
+        except Exception:
+            for runner in reversed(started):
+                runner.stop()
+            raise
+
+    def _register_metrics(self, runner: TaskRunner) -> None:
+        name = runner.config.name
+        self.metrics.register(name, runner.reader)
+        for i, (options, sink) in enumerate(zip(runner.config.sinks, runner.sinks)):
+            if hasattr(sink, "stats"):
+                label = f"{name}/{options['type']}"
+                self.metrics.register(
+                    f"{label}.{i}" if label in self.metrics.names else label, sink
+                )
+
+    def request_stop(self) -> None:
+        """Ask :meth:`run` to return; safe to call from a signal handler."""
+        self._stop_event.set()
+
+    def stop(self) -> None:
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+            self.metrics_server = None
+        for runner in reversed(self.runners):
+            runner.stop()
+
+    def status(self) -> Dict[str, Any]:
+        return {runner.config.name: runner.status() for runner in self.runners}
+
+    def run(self) -> int:
+        """Start, wait for SIGTERM/SIGINT or all tasks failing, then stop.
+
+        Returns a process exit code: 0 after a requested stop, 1 when every
+        task stopped on its own (for example after a driver error).
+        """
+        previous = {}
+        if threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                previous[signum] = signal.signal(signum, lambda *_: self.request_stop())
+        exit_code = 0
+        try:
+            self.start()
+            while not self._stop_event.wait(self.config.status_interval):
+                for name, status in self.status().items():
+                    reader = status.get("reader", {})
+                    logger.info(
+                        "%s: %.0f S/s/ch, %d blocks, %d lost",
+                        name,
+                        reader.get("samples_per_second", 0.0),
+                        reader.get("blocks", 0),
+                        reader.get("lost", 0),
+                    )
+                if not any(runner.running for runner in self.runners):
+                    logger.error("All tasks have stopped; exiting")
+                    exit_code = 1
+                    break
+        finally:
+            self.stop()
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+        return exit_code
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Entry point for ``nidaqmx_on_pi run``."""
+    parser = argparse.ArgumentParser(
+        prog="nidaqmx_on_pi run", description="Run acquisition tasks headless."
+    )
+    parser.add_argument(
+        "--config", required=True, help="TOML or JSON acquisition config"
+    )
+    parser.add_argument(
+        "--backend",
+        choices=BACKEND_NAMES,
+        default=None,
+        help="DAQ backend (overrides the config's backend key)",
+    )
+    parser.add_argument(
+        "--log-level", default="INFO", help="Logging level (default: INFO)"
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(
+        level=args.log_level.upper(),
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
+
+    try:
+        config = DaemonConfig.load(args.config)
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"Invalid config {args.config}: {e}", file=sys.stderr)
+        return 2
+    if args.backend is not None:
+        config.backend = args.backend
+    return AcquisitionDaemon(config).run()
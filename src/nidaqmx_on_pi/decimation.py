@@ -0,0 +1,53 @@
+"""Min/max decimation of sample blocks for display.
+
+Kept free of GUI imports so headless code (recording readers, servers) can
+summarise data without pulling in matplotlib and Tk.
+"""
+
+from typing import Tuple
+
+import numpy as np
+
+
+def envelope_decimate(
+    data: np.ndarray, num_bins: int, first_sample: int = 0
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Reduce ``(channels, samples)`` data to a min/max envelope.
+
+    Bins are aligned to absolute sample indices (``first_sample`` is the index
+    of ``data[:, 0]``), so a scrolling trace does not shimmer as new samples
+    arrive. Leading samples that do not fill a whole bin are skipped.
+
+    Args:
+        data: Samples, one row per channel.
+        num_bins: Approximate number of output bins, typically the plot width
+            in pixels.
+        first_sample: Absolute index of the first sample in ``data``.
+
+    Returns:
+        ``(positions, envelope)``: sample positions relative to ``data[:, 0]``
+        with shape ``(points,)`` and values with shape ``(channels, points)``.
+        Each bin contributes its minimum followed by its maximum. Data that is
+        already short enough is returned unchanged.
+    """
+    num_channels, num_samples = data.shape
+    num_bins = max(int(num_bins), 1)
+    if num_samples <= 2 * num_bins:
+        return np.arange(num_samples), data
+
+    per_bin = num_samples // num_bins
+    skip = (-first_sample) % per_bin
+    num_bins = (num_samples - skip) // per_bin
+    binned = data[:, skip : skip + num_bins * per_bin].reshape(
+        num_channels, num_bins, per_bin
+    )
+
+    envelope = np.empty((num_channels, num_bins, 2), dtype=data.dtype)
+    np.min(binned, axis=2, out=envelope[:, :, 0])
+    np.max(binned, axis=2, out=envelope[:, :, 1])
+
+    starts = skip + np.arange(num_bins) * per_bin
+    positions = np.empty((num_bins, 2), dtype=np.int64)
+    positions[:, 0] = starts
+    positions[:, 1] = starts + per_bin - 1
+    return positions.reshape(-1), envelope.reshape(num_channels, 2 * num_bins)
@@ -0,0 +1,367 @@
+"""Streaming signal processing on ``(channels, samples)`` blocks.
+
+Every stage keeps the state it needs between blocks (filter history,
+decimation phase, partially filled windows), so feeding a signal through in
+blocks of any size gives the same result as processing it in one piece.
+Work is done on whole blocks with NumPy; Python only loops over channels or
+stages, never over samples.
+
+Stages:
+
+* :class:`FirFilter`: FIR filter with optional integrated decimation;
+  :func:`design_lowpass` makes windowed-sinc taps without SciPy.
+* :class:`Decimator`: anti-aliased downsampling by an integer factor.
+* :class:`WindowedStats`: RMS, peak, mean, min and max over fixed windows.
+* :class:`Spectrum`: windowed, overlapped FFT amplitude spectra.
+
+:class:`DspPipeline` chains filters and feature stages and can subscribe to
+a :class:`~nidaqmx_on_pi.streaming.BlockSource`. Throughput per core is
+measured by the ``dsp`` benchmarks in :mod:`nidaqmx_on_pi.bench`.
+"""
+
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def design_lowpass(
+    cutoff: float, rate: float, num_taps: int = 101, window: str = "hamming"
+) -> np.ndarray:
+    """Windowed-sinc low-pass FIR taps with unity gain at DC.
+
+    Args:
+        cutoff: -6 dB frequency in Hz; must be below ``rate / 2``.
+        rate: Sample rate in Hz.
+        num_taps: Filter length; odd lengths give a whole-sample delay of
+            ``(num_taps - 1) / 2``.
+        window: Any NumPy window function name (``hamming``, ``hanning``,
+            ``blackman``, ``bartlett``).
+    """
+    if not 0 < cutoff < rate / 2:
+        raise ValueError("cutoff must be between 0 and the Nyquist frequency")
+    n = np.arange(num_taps) - (num_taps - 1) / 2
+    taps = np.sinc(2 * cutoff / rate * n) * getattr(np, window)(num_taps)
+    return taps / taps.sum()
+
+
+class FirFilter:
+    """FIR filter over multi-channel blocks with state carried across calls.
+
+    The output for each block is exactly the corresponding part of
+    ``np.convolve(signal, taps)`` on the whole signal (zero initial state).
+    With ``decimation > 1`` only every ``decimation``-th output is computed,
+    so the cost per input sample drops by the same factor.
+
+    Args:
+        taps: Filter coefficients.
+        num_channels: Number of rows in every block.
+        decimation: Keep every n-th output sample.
+    """
+
+    def __init__(self, taps: Sequence[float], num_channels: int, decimation: int = 1):
+        self.taps = np.asarray(taps, dtype=np.float64)
+        if self.taps.ndim != 1 or len(self.taps) == 0:
+            raise ValueError("taps must be a non-empty 1-D sequence")
+        if decimation < 1:
+            raise ValueError("decimation must be at least 1")
+        self.num_channels = num_channels
+        self.decimation = decimation
+        self._reversed = self.taps[::-1].copy()
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget the signal history, as if starting a new signal."""
+        self._history = np.zeros((self.num_channels, len(self.taps) - 1))
+        self._phase = 0
+
+    def process(self, data: np.ndarray) -> np.ndarray:
+        """Filter one ``(channels, samples)`` block and return the output block."""
+        extended = np.concatenate((self._history, data), axis=1)
+        if self.decimation == 1:
+            out = np.empty((self.num_channels, data.shape[1]))
+            for row, channel in zip(out, extended):
+                row[:] = np.convolve(channel, self.taps, mode="valid")
+        else:
+            windows = sliding_window_view(extended, len(self.taps), axis=1)[
+                :, self._phase :: self.decimation
+            ]
+            out = windows @ self._reversed
+            self._phase = (self._phase - data.shape[1]) % self.decimation
+        if len(self.taps) > 1:
+            self._history = extended[:, -(len(self.taps) - 1) :].copy()
+        return out
+
+
+class Decimator(FirFilter):
+    """Low-pass filter and downsample by ``factor``.
+
+    The anti-aliasing cutoff is ``0.4 * rate / factor``, leaving a transition
+    band below the new Nyquist frequency.
+    """
+
+    def __init__(
+        self,
+        factor: int,
+        rate: float,
+        num_channels: int,
+        num_taps: Optional[int] = None,
+    ):
+        if num_taps is None:
+            num_taps = 20 * factor + 1
+        taps = (
+            design_lowpass(0.4 * rate / factor, rate, num_taps) if factor > 1 else [1.0]
+        )
+        super().__init__(taps, num_channels, decimation=factor)
+        self.factor = factor
+        self.output_rate = rate / factor
+
+
+class _Windowed:
+    """Collects samples until whole (possibly overlapping) windows are available."""
+
+    def __init__(self, num_channels: int, window: int, hop: int):
+        self.num_channels = num_channels
+        self.window = window
+        self.hop = hop
+        self.reset()
+
+    def reset(self) -> None:
+        self._pending = np.zeros((self.num_channels, 0))
+        self.windows_done = 0
+
+    def _frames(self, data: np.ndarray) -> np.ndarray:
+        """Return complete windows with shape ``(channels, frames, window)``."""
+        pending = (
+            np.concatenate((self._pending, data), axis=1)
+            if self._pending.shape[1]
+            else data
+        )
+        if pending.shape[1] < self.window:
+            self._pending = pending.copy()
+            return np.zeros((self.num_channels, 0, self.window))
+        count = (pending.shape[1] - self.window) // self.hop + 1
+        frames = sliding_window_view(pending, self.window, axis=1)[
+            :, : count * self.hop : self.hop
+        ]
+        self._pending = pending[:, count * self.hop :].copy()
+        self.windows_done += count
+        return frames
+
+
+class WindowStats:
+    """Per-window statistics; arrays have shape ``(channels, windows)``."""
+
+    def __init__(
+        self,
+        first_window: int,
+        rms: np.ndarray,
+        peak: np.ndarray,
+        mean: np.ndarray,
+        minimum: np.ndarray,
+        maximum: np.ndarray,
+    ):
+        self.first_window = first_window
+        self.rms = rms
+        self.peak = peak
+        self.mean = mean
+        self.min = minimum
+        self.max = maximum
+
+    @property
+    def num_windows(self) -> int:
+        return self.rms.shape[1]
+
+
+class WindowedStats(_Windowed):
+    """RMS, peak (largest absolute value), mean, min and max per window.
+
+    Args:
+        window: Samples per window.
+        num_channels: Number of rows in every block.
+        hop: Samples between window starts; defaults to ``window``
+            (non-overlapping).
+    """
+
+    def __init__(self, window: int, num_channels: int, hop: Optional[int] = None):
+        super().__init__(num_channels, window, hop or window)
+
+    def process(self, data: np.ndarray) -> WindowStats:
+        first = self.windows_done
+        frames = self._frames(data)
+        minimum = frames.min(axis=2)
+        maximum = frames.max(axis=2)
+        return WindowStats(
+            first,
+            np.sqrt(np.einsum("cfw,cfw->cf", frames, frames) / self.window),
+            np.maximum(np.abs(minimum), np.abs(maximum)),
+            frames.mean(axis=2),
+            minimum,
+            maximum,
+        )
+
+
+class Spectra:
+    """Amplitude spectra with shape ``(channels, frames, bins)``."""
+
+    def __init__(
+        self, first_frame: int, frequencies: np.ndarray, amplitudes: np.ndarray
+    ):
+        self.first_frame = first_frame
+        self.frequencies = frequencies
+        self.amplitudes = amplitudes
+
+    @property
+    def num_frames(self) -> int:
+        return self.amplitudes.shape[1]
+
+    def mean(self) -> np.ndarray:
+        """Average amplitude over the frames, shape ``(channels, bins)``."""
+        return self.amplitudes.mean(axis=1)
+
+
+class Spectrum(_Windowed):
+    """Single-sided amplitude spectrum of overlapping windowed frames.
+
+    Amplitudes are corrected for the window's coherent gain, so a sine of
+    amplitude ``A`` centred on a bin shows a peak of ``A``.
+
+    Args:
+        nfft: Samples per frame.
+        rate: Sample rate in Hz, used for the frequency axis.
+        num_channels: Number of rows in every block.
+        overlap: Fraction of a frame shared with the next one.
+        window: NumPy window function name.
+    """
+
+    def __init__(
+        self,
+        nfft: int,
+        rate: float,
+        num_channels: int,
+        overlap: float = 0.5,
+        window: str = "hanning",
+    ):
+        hop = max(int(round(nfft * (1 - overlap))), 1)
+        super().__init__(num_channels, nfft, hop)
+        self.rate = rate
+        self._window = getattr(np, window)(nfft)
+        self._scale = np.full(nfft // 2 + 1, 2.0 / self._window.sum())
+        self._scale[0] /= 2
+        if nfft % 2 == 0:
+            self._scale[-1] /= 2
+        self.frequencies = np.fft.rfftfreq(nfft, 1.0 / rate)
+
+    def process(self, data: np.ndarray) -> Spectra:
+        first = self.windows_done
+        frames = self._frames(data)
+        amplitudes = np.abs(np.fft.rfft(frames * self._window, axis=2)) * self._scale
+        return Spectra(first, self.frequencies, amplitudes)
+
+
+class DspResult:
+    """Output of one :meth:`DspPipeline.process` call.
+
+    ``data`` is the filtered (and possibly decimated) block and ``features``
+    maps each feature stage's name to its output for this block.
+    """
+
+    def __init__(self, data: np.ndarray, first_sample: int, features: Dict[str, Any]):
+        self.data = data
+        self.first_sample = first_sample
+        self.features = features
+
+
+class DspPipeline:
+    """Filters applied in order, then feature stages on the filtered signal.
+
+    Args:
+        filters: :class:`FirFilter`/:class:`Decimator` stages, in order.
+        features: Named stages with a ``process(data)`` method, such as
+            :class:`WindowedStats` and :class:`Spectrum`.
+
+    When attached to a block source the pipeline runs on the reader thread
+    and passes each :class:`DspResult` to its subscribers; keep it within the
+    block period (``stats``) or the reader falls behind.
+    """
+
+    def __init__(
+        self,
+        filters: Sequence[FirFilter] = (),
+        features: Optional[Dict[str, Any]] = None,
+    ):
+        self.filters = list(filters)
+        self.features = dict(features or {})
+        self._subscribers: List[Callable[[DspResult], None]] = []
+        self._sources: List[Any] = []
+        self._output_index = 0
+        self.blocks = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+
+    def reset(self) -> None:
+        for stage in self.filters + list(self.features.values()):
+            stage.reset()
+        self._output_index = 0
+
+    def process(self, data: np.ndarray) -> DspResult:
+        start = time.perf_counter()
+        for stage in self.filters:
+            data = stage.process(data)
+        features = {name: stage.process(data) for name, stage in self.features.items()}
+        result = DspResult(data, self._output_index, features)
+        self._output_index += data.shape[1]
+        elapsed = time.perf_counter() - start
+        self.blocks += 1
+        self.seconds += elapsed
+        self.max_seconds = max(self.max_seconds, elapsed)
+        return result
+
+    def subscribe(self, callback: Callable[[DspResult], None]) -> None:
+        self._subscribers = self._subscribers + [callback]
+
+    def unsubscribe(self, callback: Callable[[DspResult], None]) -> None:
+        self._subscribers = [cb for cb in self._subscribers if cb is not callback]
+
+    def attach(self, source: Any) -> None:
+        """Process every block of ``source``; raw blocks are scaled first."""
+        source.subscribe(self._on_block)
+        self._sources.append(source)
+
+    def detach(self) -> None:
+        for source in self._sources:
+            source.unsubscribe(self._on_block)
+        self._sources = []
+
+    close = detach
+
+    def _on_block(self, block: Any) -> None:
+        result = self.process(block.scaled())
+        for callback in self._subscribers:
+            callback(result)
+
+    @property
+    def stats(self) -> "DspStats":
+        return DspStats(self.blocks, self.seconds, self.max_seconds)
+
+
+class DspStats:
+    """Processing time counters of a :class:`DspPipeline`."""
+
+    def __init__(self, blocks: int, seconds: float, max_seconds: float):
+        self.blocks = blocks
+        self.seconds = seconds
+        self.max_seconds = max_seconds
+
+    @property
+    def mean_seconds(self) -> float:
+        return self.seconds / self.blocks if self.blocks else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "blocks": self.blocks,
+            "seconds": self.seconds,
+            "mean_seconds": self.mean_seconds,
+            "max_seconds": self.max_seconds,
+        }
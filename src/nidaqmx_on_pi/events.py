@@ -0,0 +1,225 @@
+"""Event-driven acquisition on the driver's every-N-samples callbacks.
+
+A :class:`~nidaqmx_on_pi.streaming.StreamingReader` keeps a thread parked in
+a blocking read. :class:`EventStream` lets the driver say when data is there
+instead: it registers an Every N Samples Acquired Into Buffer event with
+``N = samples_per_block`` and reads exactly one block, into a pooled buffer,
+each time the event fires. A registered done event reads whatever a finite
+acquisition left in the buffer and ends the stream, so finite and continuous
+tasks look the same to consumers.
+
+The driver calls back on its own event thread, and a slow callback there
+delays every later event, so the callback only reads and enqueues. A
+dispatcher thread hands blocks to subscribers and the pending queue. The
+queue between the two is bounded (``max_queue_blocks``): when subscribers
+fall that far behind, the oldest undelivered block is dropped and counted as
+*overwritten*, exactly like an unread pending block.
+
+Everything else is the :class:`~nidaqmx_on_pi.streaming.BlockSource`
+interface, including ``async for``::
+
+    task = start_continuous_ai_task("dev1", "ai0:3", rate=10000.0)
+    async for block in EventStream(task, samples_per_block=1000).start():
+        process(block.data)
+
+The task is stopped while the events are registered and then restarted,
+because DAQmx refuses to change events on a running task. The block size is
+fixed by the event interval, so a ``BlockSizeTuner`` cannot be used here.
+"""
+
+import threading
+from collections import deque
+from typing import Any, Deque, Optional
+
+from nidaqmx.constants import EveryNSamplesEventType
+
+from .streaming import Block, BlockSource, StreamingReader
+
+
+class EventStream(StreamingReader):
+    """Read a task's blocks from every-N-samples callbacks.
+
+    Args:
+        task: A created (started or not) task with one or more AI channels.
+        samples_per_block: Event interval and samples per channel per block.
+        num_buffers: Number of buffers in the pool.
+        timeout: Read timeout in seconds; reads normally return at once.
+        reader: Optional pre-built stream reader.
+        queue_blocks: Keep blocks for ``get()`` and ``async for``.
+        raw: Read int16 ADC codes, as for :class:`StreamingReader`.
+        max_queue_blocks: Blocks read by the callback but not yet delivered
+            that may wait for the dispatcher. Defaults to half the pool.
+    """
+
+    def __init__(
+        self,
+        task: Any,
+        samples_per_block: int = 1000,
+        num_buffers: int = 8,
+        timeout: float = 10.0,
+        reader: Any = None,
+        queue_blocks: bool = True,
+        raw: bool = False,
+        max_queue_blocks: Optional[int] = None,
+    ):
+        super().__init__(
+            task,
+            samples_per_block,
+            num_buffers=num_buffers,
+            timeout=timeout,
+            reader=reader,
+            queue_blocks=queue_blocks,
+            raw=raw,
+        )
+        self.max_queue_blocks = max_queue_blocks or max(num_buffers // 2, 1)
+        # Status passed to the done event, or None while running.
+        self.done_status: Optional[int] = None
+        self._dispatch: Deque[Block] = deque()
+        self._dispatch_cond = threading.Condition()
+        self._registered = False
+        # Set on the event thread when no more blocks will come; the
+        # dispatcher stops once it has delivered the rest.
+        self._finished = False
+
+    # Lifecycle
+    def start(self) -> "EventStream":
+        if self.running:
+            return self
+        self.done_status = None
+        self._finished = False
+        super().start()
+        try:
+            self._register()
+        except Exception:
+            super().stop()
+            raise
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop_event.set()
+        with self._dispatch_cond:
+            self._dispatch_cond.notify_all()
+        super().stop(timeout)
+        with self._dispatch_cond:
+            while self._dispatch:
+                self._dispatch.popleft().release()
+
+    def close(self) -> None:
+        """Stop the stream and the task and unregister the events."""
+        self.stop()
+        if not self._registered:
+            return
+        self.task.stop()
+        self.task.register_every_n_samples_acquired_into_buffer_event(
+            self.samples_per_block, None
+        )
+        self.task.register_done_event(None)
+        self._registered = False
+
+    def _register(self) -> None:
+        task = self.task
+        task.stop()
+        if not self._registered:
+            interval = self.samples_per_block
+            # Some devices require the buffer to be a whole number of events.
+            buffer_size = int(task.in_stream.input_buf_size)
+            if buffer_size % interval:
+                task.in_stream.input_buf_size = (buffer_size // interval + 1) * interval
+            task.register_every_n_samples_acquired_into_buffer_event(
+                interval, self._on_samples
+            )
+            task.register_done_event(self._on_done)
+            self._registered = True
+        task.start()
+
+    # Driver event thread
+    def _on_samples(
+        self,
+        task_handle: Any,
+        event_type: int,
+        number_of_samples: int,
+        callback_data: Any,
+    ) -> int:
+        if (
+            event_type != EveryNSamplesEventType.ACQUIRED_INTO_BUFFER.value
+            or self._finished
+            or self._stop_event.is_set()
+        ):
+            return 0
+        try:
+            self._read_block()
+        except Exception as e:
+            self._fail(e)
+        return 0
+
+    def _on_done(self, task_handle: Any, status: int, callback_data: Any) -> int:
+        try:
+            if status == 0 and not self._finished and not self._stop_event.is_set():
+                self._read_remaining()
+        except Exception as e:
+            self._fail(e)
+        self.done_status = status
+        self._finish()
+        return 0
+
+    def _read_remaining(self) -> None:
+        """Read the partial block a finite acquisition leaves behind."""
+        block_size = self.samples_per_block
+        try:
+            while True:
+                available = int(self.task.in_stream.avail_samp_per_chan)
+                if available <= 0:
+                    break
+                self._samples_per_block = min(available, block_size)
+                self._read_block()
+        finally:
+            self._samples_per_block = block_size
+
+    def _fail(self, error: BaseException) -> None:
+        if self._finished or self._stop_event.is_set():
+            return
+        self.stats.errors += 1
+        self.stats.last_error = error
+        if self.on_error is not None:
+            self.on_error(error)
+        self._finish()
+
+    def _finish(self) -> None:
+        with self._dispatch_cond:
+            self._finished = True
+            self._dispatch_cond.notify_all()
+
+    def _publish(self, block: Block) -> None:
+        # Runs on the driver's event thread: hand off and return quickly.
+        with self._dispatch_cond:
+            if len(self._dispatch) >= self.max_queue_blocks:
+                self._dispatch.popleft().release()
+                self.stats.overwritten += 1
+            self._dispatch.append(block)
+            self._dispatch_cond.notify()
+
+    # Dispatcher thread
+    def _run(self) -> None:
+        try:
+            while True:
+                with self._dispatch_cond:
+                    while (
+                        not self._dispatch
+                        and not self._finished
+                        and not self._stop_event.is_set()
+                    ):
+                        self._dispatch_cond.wait()
+                    if not self._dispatch:
+                        break
+                    block = self._dispatch.popleft()
+                BlockSource._publish(self, block)
+        except Exception as e:
+            self.stats.errors += 1
+            self.stats.last_error = e
+            if self.on_error is not None and not self._stop_event.is_set():
+                self.on_error(e)
+        finally:
+            self._stop_event.set()
+            with self._pending_cond:
+                self._pending_cond.notify_all()
+            self._wake_async()
@@ -1,524 +1,1441 @@
 """Tkinter GUI for nidaqmx API exploration and testing."""
 
+import logging
+import time
 import tkinter as tk
-from tkinter import ttk, simpledialog, messagebox, scrolledtext
+from tkinter import ttk, simpledialog, messagebox, scrolledtext, filedialog
 import nidaqmx
 from nidaqmx.constants import AcquisitionType, TerminalConfiguration
-import threading
-from typing import Optional, List, Dict, Any
+import numpy as np
+from typing import Optional, List, Dict, Any, Callable, Tuple
+from .autotune import (
+    AcquisitionPlan,
+    BlockSizeTuner,
+    plan_acquisition,
+    tune_input_buffer,
+)
+from .backends import Backend, get_backend
+from .inventory import DeviceInventory
+from .logview import LogView, RingLogHandler, add_rotating_file
+from .metrics import MetricsCollector, MetricsServer
+from .plotting import LivePlot
+from .profiles import (
+    DEFAULT_PROFILE_PATH,
+    TaskPool,
+    TaskProfile,
+    load_profiles,
+    save_profiles,
+)
+from .recording import Recorder
+from .ringbuffer import RingBuffer
+from .streaming import StreamingReader
+from .workers import DriverExecutor, Job, current_job
+
+logger = logging.getLogger(__name__)
+
+# Poll worker results at ~60 fps so the UI never waits on the driver.
+POLL_INTERVAL_MS = 16
+# Samples per channel per driver call when reading from the Acquisition tab.
+READ_CHUNK_SAMPLES = 100000
+READ_TIMEOUT = 10.0
+# Longest wait for the stream and pooled tasks to close when the window closes.
+CLOSE_TIMEOUT = 10.0
+# Live plot refresh rate and visible history.
+PLOT_FPS = 30
+PLOT_WINDOW_SECONDS = 2.0
+# Diagnostics tab refresh period while it is visible.
+DIAGNOSTICS_INTERVAL_MS = 1000
+DEFAULT_METRICS_PORT = 9108
+# Log records kept in memory, lines kept in the Log tab and its refresh rate.
+LOG_CAPACITY = 10000
+LOG_MAX_LINES = 5000
+LOG_REFRESH_MS = 100
+# Longest text shown in an output pane.
+MAX_OUTPUT_CHARS = 200000
 
 
 class NidaqmxGUI:
     """Main GUI application for nidaqmx control and exploration."""
 
-    def __init__(self, root: tk.Tk):
+    def __init__(
+        self,
+        root: tk.Tk,
+        backend: Optional[Backend] = None,
+        log_file: Optional[str] = None,
+        profile_path: str = DEFAULT_PROFILE_PATH,
+    ):
         self.root = root
-        self.root.title("nidaqmx API Explorer")
+        self.backend = backend if backend is not None else get_backend()
+        self.root.title(f"nidaqmx API Explorer [{self.backend.name}]")
+        # Device and channel lists come from this cache, not fresh enumeration.
+        self.inventory = DeviceInventory(self.backend)
         self.root.geometry("800x600")
-        
+
         self.current_task: Optional[nidaqmx.Task] = None
         self.acquisition_running = False
-        
+
+        # Saved profiles; their tasks stay committed in task_pool between
+        # starts. current_profile is set while current_task is pooled.
+        self.profile_path = profile_path
+        self.profiles = self._read_profiles()
+        self.task_pool = TaskPool(self.backend)
+        self.current_profile: Optional[TaskProfile] = None
+
+        # All driver calls run on these workers; see _poll_executor.
+        self.executor = DriverExecutor()
+        self._read_job: Optional[Job] = None
+
+        # Streaming: a StreamingReader feeds ring_buffer (read by the live
+        # plot) and the recorder while either of them is active.
+        self.stream_reader: Optional[StreamingReader] = None
+        self.ring_buffer: Optional[RingBuffer] = None
+        self._stream_layout: Tuple[float, List[str], List[Tuple[float, float]]] = (
+            0.0,
+            [],
+            [],
+        )
+        self._plot_active = False
+        self.recorder: Optional[Recorder] = None
+
+        # The stream and recorder register here while they exist; the
+        # Diagnostics tab and the optional HTTP endpoint read from it.
+        self.metrics = MetricsCollector()
+        self.metrics_server: Optional[MetricsServer] = None
+        self._diagnostics_job: Optional[Job] = None
+
+        # Everything logged under nidaqmx_on_pi, from any thread, lands in
+        # this ring; the Log tab shows it in batches (see logview).
+        self._package_logger = logging.getLogger("nidaqmx_on_pi")
+        if self._package_logger.level == logging.NOTSET:
+            self._package_logger.setLevel(logging.INFO)
+        self._log_handlers: List[logging.Handler] = [RingLogHandler(LOG_CAPACITY)]
+        if log_file:
+            self._log_handlers.append(add_rotating_file(self._package_logger, log_file))
+        self._package_logger.addHandler(self._log_handlers[0])
+
         self._create_widgets()
-    
+        self.root.protocol("WM_DELETE_WINDOW", self._on_close)
+        self._poll_executor()
+        self._refresh_diagnostics()
+
     def _create_widgets(self) -> None:
         """Create the main GUI layout."""
         # Main frame with notebook (tabs)
         notebook = ttk.Notebook(self.root)
+        self.notebook = notebook
         notebook.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-        
+
         # Tab 1: Device & System Info
         system_frame = ttk.Frame(notebook)
         notebook.add(system_frame, text="System")
         self._create_system_tab(system_frame)
-        
+
         # Tab 2: Task Management
         task_frame = ttk.Frame(notebook)
         notebook.add(task_frame, text="Task Management")
         self._create_task_tab(task_frame)
-        
+
         # Tab 3: Channels
         channel_frame = ttk.Frame(notebook)
         notebook.add(channel_frame, text="Channels")
         self._create_channel_tab(channel_frame)
-        
+
         # Tab 4: Data Acquisition
         acq_frame = ttk.Frame(notebook)
         notebook.add(acq_frame, text="Acquisition")
         self._create_acquisition_tab(acq_frame)
-        
-        # Tab 5: Log
+
+        # Tab 5: Live Plot
+        plot_frame = ttk.Frame(notebook)
+        notebook.add(plot_frame, text="Live Plot")
+        self._create_plot_tab(plot_frame)
+
+        # Tab 6: Diagnostics
+        self.diagnostics_frame = ttk.Frame(notebook)
+        notebook.add(self.diagnostics_frame, text="Diagnostics")
+        self._create_diagnostics_tab(self.diagnostics_frame)
+
+        # Tab 7: Log
         log_frame = ttk.Frame(notebook)
         notebook.add(log_frame, text="Log")
         self._create_log_tab(log_frame)
-    
+
     def _create_system_tab(self, parent: ttk.Frame) -> None:
         """System information tab."""
         btn_frame = ttk.Frame(parent)
         btn_frame.pack(fill=tk.X, padx=5, pady=5)
-        
-        ttk.Button(btn_frame, text="List Devices", command=self._list_devices).pack(side=tk.LEFT, padx=5)
-        ttk.Button(btn_frame, text="List Channels", command=self._list_channels).pack(side=tk.LEFT, padx=5)
-        ttk.Button(btn_frame, text="List Tasks", command=self._list_tasks).pack(side=tk.LEFT, padx=5)
-        
+
+        ttk.Button(btn_frame, text="List Devices", command=self._list_devices).pack(
+            side=tk.LEFT, padx=5
+        )
+        ttk.Button(btn_frame, text="List Channels", command=self._list_channels).pack(
+            side=tk.LEFT, padx=5
+        )
+        ttk.Button(btn_frame, text="List Tasks", command=self._list_tasks).pack(
+            side=tk.LEFT, padx=5
+        )
+        ttk.Button(
+            btn_frame, text="Refresh Devices", command=self._refresh_devices
+        ).pack(side=tk.LEFT, padx=5)
+
         # Output area
-        self.system_output = scrolledtext.ScrolledText(parent, height=20, width=80, state=tk.DISABLED)
+        self.system_output = scrolledtext.ScrolledText(
+            parent, height=20, width=80, state=tk.DISABLED
+        )
         self.system_output.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-    
+
     def _create_task_tab(self, parent: ttk.Frame) -> None:
         """Task management tab."""
         btn_frame = ttk.Frame(parent)
         btn_frame.pack(fill=tk.X, padx=5, pady=5)
-        
-        ttk.Button(btn_frame, text="Create Task", command=self._create_task).pack(side=tk.LEFT, padx=5)
-        ttk.Button(btn_frame, text="Close Task", command=self._close_task).pack(side=tk.LEFT, padx=5)
-        ttk.Button(btn_frame, text="Task Status", command=self._task_status).pack(side=tk.LEFT, padx=5)
-        
+
+        ttk.Button(btn_frame, text="Create Task", command=self._create_task).pack(
+            side=tk.LEFT, padx=5
+        )
+        ttk.Button(btn_frame, text="Close Task", command=self._close_task).pack(
+            side=tk.LEFT, padx=5
+        )
+        ttk.Button(btn_frame, text="Task Status", command=self._task_status).pack(
+            side=tk.LEFT, padx=5
+        )
+
+        profile_frame = ttk.Frame(parent)
+        profile_frame.pack(fill=tk.X, padx=5, pady=5)
+
+        ttk.Label(profile_frame, text="Profile:").pack(side=tk.LEFT, padx=5)
+        self.profile_var = tk.StringVar()
+        self.profile_combo = ttk.Combobox(
+            profile_frame, textvariable=self.profile_var, state="readonly", width=24
+        )
+        self.profile_combo.pack(side=tk.LEFT, padx=5)
+        ttk.Button(
+            profile_frame, text="Start Profile", command=self._start_profile
+        ).pack(side=tk.LEFT, padx=5)
+        ttk.Button(
+            profile_frame, text="Save Task as Profile", command=self._save_profile
+        ).pack(side=tk.LEFT, padx=5)
+        ttk.Button(
+            profile_frame, text="Delete Profile", command=self._delete_profile
+        ).pack(side=tk.LEFT, padx=5)
+        self._refresh_profile_list()
+
         # Task status display
-        self.task_output = scrolledtext.ScrolledText(parent, height=20, width=80, state=tk.DISABLED)
+        self.task_output = scrolledtext.ScrolledText(
+            parent, height=20, width=80, state=tk.DISABLED
+        )
         self.task_output.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-    
+
     def _create_channel_tab(self, parent: ttk.Frame) -> None:
         """Channel creation tab."""
         btn_frame = ttk.Frame(parent)
         btn_frame.pack(fill=tk.X, padx=5, pady=5)
-        
-        ttk.Button(btn_frame, text="Add AI Voltage Channel", command=self._add_ai_voltage).pack(side=tk.LEFT, padx=5)
-        ttk.Button(btn_frame, text="Add AO Voltage Channel", command=self._add_ao_voltage).pack(side=tk.LEFT, padx=5)
-        ttk.Button(btn_frame, text="Add DI Channel", command=self._add_di_channel).pack(side=tk.LEFT, padx=5)
-        ttk.Button(btn_frame, text="Add DO Channel", command=self._add_do_channel).pack(side=tk.LEFT, padx=5)
-        
-        self.channel_output = scrolledtext.ScrolledText(parent, height=20, width=80, state=tk.DISABLED)
+
+        ttk.Button(
+            btn_frame, text="Add AI Voltage Channel", command=self._add_ai_voltage
+        ).pack(side=tk.LEFT, padx=5)
+        ttk.Button(
+            btn_frame, text="Add AO Voltage Channel", command=self._add_ao_voltage
+        ).pack(side=tk.LEFT, padx=5)
+        ttk.Button(btn_frame, text="Add DI Channel", command=self._add_di_channel).pack(
+            side=tk.LEFT, padx=5
+        )
+        ttk.Button(btn_frame, text="Add DO Channel", command=self._add_do_channel).pack(
+            side=tk.LEFT, padx=5
+        )
+
+        self.channel_output = scrolledtext.ScrolledText(
+            parent, height=20, width=80, state=tk.DISABLED
+        )
         self.channel_output.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-    
+
     def _create_acquisition_tab(self, parent: ttk.Frame) -> None:
         """Data acquisition tab."""
         btn_frame = ttk.Frame(parent)
         btn_frame.pack(fill=tk.X, padx=5, pady=5)
-        
-        ttk.Button(btn_frame, text="Configure Timing", command=self._configure_timing).pack(side=tk.LEFT, padx=5)
-        ttk.Button(btn_frame, text="Start Task", command=self._start_task).pack(side=tk.LEFT, padx=5)
-        ttk.Button(btn_frame, text="Stop Task", command=self._stop_task).pack(side=tk.LEFT, padx=5)
-        ttk.Button(btn_frame, text="Read Samples", command=self._read_samples).pack(side=tk.LEFT, padx=5)
-        
-        self.acq_output = scrolledtext.ScrolledText(parent, height=20, width=80, state=tk.DISABLED)
+
+        ttk.Button(
+            btn_frame, text="Configure Timing", command=self._configure_timing
+        ).pack(side=tk.LEFT, padx=5)
+        ttk.Button(btn_frame, text="Start Task", command=self._start_task).pack(
+            side=tk.LEFT, padx=5
+        )
+        ttk.Button(btn_frame, text="Stop Task", command=self._stop_task).pack(
+            side=tk.LEFT, padx=5
+        )
+        ttk.Button(btn_frame, text="Read Samples", command=self._read_samples).pack(
+            side=tk.LEFT, padx=5
+        )
+        ttk.Button(btn_frame, text="Cancel Read", command=self._cancel_read).pack(
+            side=tk.LEFT, padx=5
+        )
+
+        record_frame = ttk.Frame(parent)
+        record_frame.pack(fill=tk.X, padx=5, pady=5)
+
+        ttk.Button(
+            record_frame, text="Start Recording", command=self._start_recording
+        ).pack(side=tk.LEFT, padx=5)
+        ttk.Button(
+            record_frame, text="Stop Recording", command=self._stop_recording
+        ).pack(side=tk.LEFT, padx=5)
+        self.record_status = ttk.Label(record_frame, text="Not recording.")
+        self.record_status.pack(side=tk.LEFT, padx=10)
+        # Raw int16 codes are a quarter of the bytes of float64 volts.
+        self.raw_stream_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            record_frame, text="Raw int16 stream", variable=self.raw_stream_var
+        ).pack(side=tk.RIGHT, padx=5)
+
+        self.acq_output = scrolledtext.ScrolledText(
+            parent, height=20, width=80, state=tk.DISABLED
+        )
         self.acq_output.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-    
+
+    def _create_plot_tab(self, parent: ttk.Frame) -> None:
+        """Live plot tab."""
+        btn_frame = ttk.Frame(parent)
+        btn_frame.pack(fill=tk.X, padx=5, pady=5)
+
+        ttk.Button(
+            btn_frame, text="Start Live Plot", command=self._start_live_plot
+        ).pack(side=tk.LEFT, padx=5)
+        ttk.Button(btn_frame, text="Stop Live Plot", command=self._stop_live_plot).pack(
+            side=tk.LEFT, padx=5
+        )
+        self.plot_status = ttk.Label(btn_frame, text="Stopped.")
+        self.plot_status.pack(side=tk.LEFT, padx=10)
+
+        plot_area = ttk.Frame(parent)
+        plot_area.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.live_plot = LivePlot(plot_area, window_seconds=PLOT_WINDOW_SECONDS)
+
+    def _create_diagnostics_tab(self, parent: ttk.Frame) -> None:
+        """Live metrics tab."""
+        btn_frame = ttk.Frame(parent)
+        btn_frame.pack(fill=tk.X, padx=5, pady=5)
+
+        ttk.Label(btn_frame, text="Metrics port:").pack(side=tk.LEFT, padx=5)
+        self.metrics_port_var = tk.StringVar(value=str(DEFAULT_METRICS_PORT))
+        ttk.Entry(btn_frame, textvariable=self.metrics_port_var, width=8).pack(
+            side=tk.LEFT
+        )
+        ttk.Button(
+            btn_frame, text="Serve Metrics", command=self._start_metrics_server
+        ).pack(side=tk.LEFT, padx=5)
+        ttk.Button(
+            btn_frame, text="Stop Serving", command=self._stop_metrics_server
+        ).pack(side=tk.LEFT, padx=5)
+        self.metrics_status = ttk.Label(btn_frame, text="Not serving.")
+        self.metrics_status.pack(side=tk.LEFT, padx=10)
+
+        self.diagnostics_output = scrolledtext.ScrolledText(
+            parent, height=20, width=80, state=tk.DISABLED
+        )
+        self.diagnostics_output.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+
     def _create_log_tab(self, parent: ttk.Frame) -> None:
         """Log display tab."""
-        self.log_output = scrolledtext.ScrolledText(parent, height=25, width=80, state=tk.DISABLED)
+        self.log_output = scrolledtext.ScrolledText(
+            parent, height=25, width=80, state=tk.DISABLED
+        )
         self.log_output.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-    
-    def _log(self, message: str) -> None:
-        """Append message to log."""
-        self.log_output.config(state=tk.NORMAL)
-        self.log_output.insert(tk.END, message + "\n")
-        self.log_output.see(tk.END)
-        self.log_output.config(state=tk.DISABLED)
-    
+        self.log_view = LogView(
+            self.log_output, self._log_handlers[0], LOG_MAX_LINES, LOG_REFRESH_MS
+        ).start()
+
+    def _log(self, message: str, level: int = logging.INFO) -> None:
+        """Log a message; the Log tab picks it up on its next refresh."""
+        logger.log(level, message)
+
     def _output(self, widget: scrolledtext.ScrolledText, message: str) -> None:
         """Write to a scrolled text widget."""
+        if len(message) > MAX_OUTPUT_CHARS:
+            message = (
+                message[:MAX_OUTPUT_CHARS]
+                + f"\n... ({len(message) - MAX_OUTPUT_CHARS:,} more characters not shown)\n"
+            )
         widget.config(state=tk.NORMAL)
         widget.delete(1.0, tk.END)
         widget.insert(tk.END, message)
         widget.config(state=tk.DISABLED)
-    
+
+    # Worker plumbing
+    def _poll_executor(self) -> None:
+        """Deliver finished driver calls on the Tk thread."""
+        self.executor.poll()
+        self.root.after(POLL_INTERVAL_MS, self._poll_executor)
+
+    def _on_close(self) -> None:
+        """Cancel outstanding driver calls and close the window."""
+        self._stop_metrics_server()
+        self.log_view.stop()
+        for handler in self._log_handlers:
+            self._package_logger.removeHandler(handler)
+            handler.close()
+        # Flush a recording in progress and release the pooled tasks on a
+        # worker; the window is hidden now and destroyed once they are done.
+        self.executor.cancel_all()
+        job = self.executor.submit(
+            self._stop_stream_then,
+            *self._detach_stream(),
+            self.task_pool.close,
+            timeout=CLOSE_TIMEOUT,
+            name="close",
+        )
+        self.root.withdraw()
+        self._finish_close(job)
+
+    def _finish_close(self, job: Job) -> None:
+        """Destroy the window once the closing job finished or timed out."""
+        if not job.finished:
+            self.root.after(POLL_INTERVAL_MS, self._finish_close, job)
+            return
+        self.executor.shutdown()
+        self.root.destroy()
+
+    def _error_handler(
+        self, action: str, activity: str
+    ) -> Callable[[BaseException], None]:
+        """Return an on_error callback that reports like the other handlers."""
+
+        def on_error(e: BaseException) -> None:
+            messagebox.showerror("Error", f"Failed to {action}: {e}")
+            self._log(f"Error {activity}: {e}", logging.ERROR)
+
+        return on_error
+
     # System functions
-    def _select_device_name(self) -> str:
-        """Prompt user to select a device name from available devices."""
-        try:
-            devices = nidaqmx.system.System.local().devices
-            device_names = [device.name for device in devices]
-            
-            if not device_names:
-                messagebox.showwarning("Warning", "No devices found.")
-                return ""
-            
-            # Create a simple dialog with dropdown
-            dialog = tk.Toplevel(self.root)
-            dialog.title("Select Device")
-            dialog.geometry("300x100")
-            dialog.transient(self.root)
-            dialog.grab_set()
-            
-            ttk.Label(dialog, text="Select a device:").pack(pady=5)
-            device_var = tk.StringVar(value=device_names[0])
-            dropdown = ttk.Combobox(dialog, textvariable=device_var, values=device_names, state="readonly")
-            dropdown.pack(pady=5, padx=5, fill=tk.X)
-            
-            device_name = None
-            
-            def confirm():
-                nonlocal device_name
-                device_name = device_var.get()
-                dialog.destroy()
-            
-            ttk.Button(dialog, text="OK", command=confirm).pack(pady=5)
-            dialog.wait_window()
-            
-            return device_name if device_name else ""
-        except Exception as e:
+    def _select_device_name(self, on_selected: Callable[[str], None]) -> None:
+        """Prompt user to select a device name, then call on_selected with it."""
+
+        def show_dialog(device_names: List[str]) -> None:
+            device_name = self._ask_device_name(device_names)
+            if device_name:
+                on_selected(device_name)
+
+        def on_error(e: BaseException) -> None:
             messagebox.showerror("Error", f"Failed to get devices: {e}")
+
+        self.executor.submit(self._device_names, on_done=show_dialog, on_error=on_error)
+
+    def _device_names(self) -> List[str]:
+        """Return the names of all devices (runs on a worker thread)."""
+        return self.inventory.device_names()
+
+    def _ask_device_name(self, device_names: List[str]) -> str:
+        """Show a dropdown dialog of device names and return the choice."""
+        if not device_names:
+            messagebox.showwarning("Warning", "No devices found.")
             return ""
-        
+
+        # Create a simple dialog with dropdown
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Select Device")
+        dialog.geometry("300x100")
+        dialog.transient(self.root)
+        dialog.grab_set()
+
+        ttk.Label(dialog, text="Select a device:").pack(pady=5)
+        device_var = tk.StringVar(value=device_names[0])
+        dropdown = ttk.Combobox(
+            dialog, textvariable=device_var, values=device_names, state="readonly"
+        )
+        dropdown.pack(pady=5, padx=5, fill=tk.X)
+
+        device_name = None
+
+        def confirm():
+            nonlocal device_name
+            device_name = device_var.get()
+            dialog.destroy()
+
+        ttk.Button(dialog, text="OK", command=confirm).pack(pady=5)
+        dialog.wait_window()
+
+        return device_name if device_name else ""
+
     def _list_devices(self) -> None:
         """List all available NI devices."""
-        try:
-            devices = nidaqmx.system.System.local().devices
-            output = "Available Devices:\n" + "-" * 40 + "\n"
-            for device in devices:
-                output += f"Device: {device.name}\n"
-                output += f"  Product Type: {device.product_type}\n"
-                # Use correct attribute name; fall back if unavailable
-                try:
-                    serial = getattr(device, "serial_num")
-                except Exception:
-                    serial = "N/A"
-                output += f"  Serial Number: {serial}\n\n"
+
+        def show(output: str) -> None:
             self._output(self.system_output, output)
             self._log("Listed devices successfully.")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to list devices: {e}")
-            self._log(f"Error listing devices: {e}")
-    
+
+        self.executor.submit(
+            self._format_devices,
+            on_done=show,
+            on_error=self._error_handler("list devices", "listing devices"),
+        )
+
+    def _format_devices(self) -> str:
+        """Describe all devices (runs on a worker thread)."""
+        devices = self.inventory.devices()
+        lines = ["Available Devices:", "-" * 40]
+        for device in devices:
+            serial = device.serial_num if device.serial_num is not None else "N/A"
+            lines.extend(
+                [
+                    f"Device: {device.name}",
+                    f"  Product Type: {device.product_type}",
+                    f"  Serial Number: {serial}",
+                    "",
+                ]
+            )
+        return "\n".join(lines) + "\n"
+
+    def _refresh_devices(self) -> None:
+        """Re-enumerate devices and channels, then list the devices."""
+
+        def show(output: str) -> None:
+            self._output(self.system_output, output)
+            self._log("Refreshed device inventory.")
+
+        def refresh() -> str:
+            self.inventory.refresh()
+            return self._format_devices()
+
+        self.executor.submit(
+            refresh,
+            on_done=show,
+            on_error=self._error_handler("refresh devices", "refreshing devices"),
+        )
+
     def _list_channels(self) -> None:
         """List all available channels on devices."""
-        device_name = self._select_device_name()
-        # try:
-        #     devices = nidaqmx.system.System.local().devices
-        #     device_names = [device.name for device in devices]
-        #     
-        #     if not device_names:
-        #         messagebox.showwarning("Warning", "No devices found.")
-        #         return
-        #     
-        #     # Create a simple dialog with dropdown
-        #     dialog = tk.Toplevel(self.root)
-        #     dialog.title("Select Device")
-        #     dialog.geometry("300x100")
-        #     dialog.transient(self.root)
-        #     dialog.grab_set()
-        #     
-        #     ttk.Label(dialog, text="Select a device:").pack(pady=5)
-        #     device_var = tk.StringVar(value=device_names[0])
-        #     dropdown = ttk.Combobox(dialog, textvariable=device_var, values=device_names, state="readonly")
-        #     dropdown.pack(pady=5, padx=5, fill=tk.X)
-        #     
-        #     device_name = None
-        #     
-        #     def confirm():
-        #         nonlocal device_name
-        #         device_name = device_var.get()
-        #         dialog.destroy()
-        #     
-        #     ttk.Button(dialog, text="OK", command=confirm).pack(pady=5)
-        #     dialog.wait_window()
-        #     
-        #     if not device_name:
-        #         return
-        # except Exception as e:
-        #     messagebox.showerror("Error", f"Failed to get devices: {e}")
-        #     return
-        # if not device_name:
-        #     return
-        
-        try:
-            device = nidaqmx.system.System.local().devices[device_name]
-            output = f"Channels on {device_name}:\n" + "-" * 40 + "\n"
-            try:
-                ai_chans = device.ai_physical_chans
-                output += f"AI Channels: {', '.join([ch.name for ch in ai_chans]) if ai_chans else 'None'}\n"
-            except Exception:
-                output += "AI Channels: N/A\n"
-            
-            try:
-                ao_chans = device.ao_physical_chans
-                output += f"AO Channels: {', '.join([ch.name for ch in ao_chans]) if ao_chans else 'None'}\n"
-            except Exception:
-                output += "AO Channels: N/A\n"
-            
-            try:
-                di_lines = device.di_lines
-                output += f"DI Channels: {', '.join([line.name for line in di_lines]) if di_lines else 'None'}\n"
-            except Exception:
-                output += "DI Channels: N/A\n"
-            
-            try:
-                do_lines = device.do_lines
-                output += f"DO Channels: {', '.join([line.name for line in do_lines]) if do_lines else 'None'}\n"
-            except Exception:
-                output += "DO Channels: N/A\n"
+        self._select_device_name(self._list_device_channels)
+
+    def _list_device_channels(self, device_name: str) -> None:
+        """List the channels of one device."""
+
+        def show(output: str) -> None:
             self._output(self.system_output, output)
             self._log(f"Listed channels for {device_name}.")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to list channels: {e}")
-            self._log(f"Error listing channels: {e}")
-    
+
+        self.executor.submit(
+            self._format_channels,
+            device_name,
+            on_done=show,
+            on_error=self._error_handler("list channels", "listing channels"),
+        )
+
+    def _format_channels(self, device_name: str) -> str:
+        """Describe the channels of a device (runs on a worker thread)."""
+        device = self.inventory.device(device_name)
+        lines = [f"Channels on {device_name}:", "-" * 40]
+        for label, names in (
+            ("AI Channels", device.ai_channels),
+            ("AO Channels", device.ao_channels),
+            ("DI Channels", device.di_lines),
+            ("DO Channels", device.do_lines),
+        ):
+            if names is None:
+                lines.append(f"{label}: N/A")
+            else:
+                lines.append(f"{label}: {', '.join(names) if names else 'None'}")
+        return "\n".join(lines) + "\n"
+
     def _list_tasks(self) -> None:
         """List all active tasks."""
-        try:
-            tasks = nidaqmx.system.System.local().tasks
-            output = f"Active Tasks: {len(tasks)}\n" + "-" * 40 + "\n"
-            for i, task in enumerate(tasks):
-                output += f"Task {i+1}: {task.name}\n"
-                output += f"  Number of channels: {len(task.channels)}\n"
-                output += f"  Is task done: {task.is_task_done()}\n\n"
-            if not tasks:
-                output += "No active tasks.\n"
+
+        def show(result: Tuple[str, int]) -> None:
+            output, count = result
             self._output(self.system_output, output)
-            self._log(f"Listed tasks: {len(tasks)} active.")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to list tasks: {e}")
-            self._log(f"Error listing tasks: {e}")
-    
+            self._log(f"Listed tasks: {count} active.")
+
+        self.executor.submit(
+            self._format_tasks,
+            on_done=show,
+            on_error=self._error_handler("list tasks", "listing tasks"),
+        )
+
+    def _format_tasks(self) -> Tuple[str, int]:
+        """Describe all active tasks (runs on a worker thread)."""
+        tasks = self.backend.tasks()
+        lines = [f"Active Tasks: {len(tasks)}", "-" * 40]
+        for i, task in enumerate(tasks):
+            lines.extend(
+                [
+                    f"Task {i+1}: {task.name}",
+                    f"  Number of channels: {len(task.channels)}",
+                    f"  Is task done: {task.is_task_done()}",
+                    "",
+                ]
+            )
+        if not tasks:
+            lines.append("No active tasks.")
+        return "\n".join(lines) + "\n", len(tasks)
+
     # Task management
     def _create_task(self) -> None:
         """Create a new task."""
-        try:
-            self.current_task = nidaqmx.Task()
+
+        def created(task: Any) -> None:
+            self.current_task = task
+            self.current_profile = None
             messagebox.showinfo("Success", "Task created successfully!")
             self._log("Created new task.")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to create task: {e}")
-            self._log(f"Error creating task: {e}")
-    
+
+        self.executor.submit(
+            self.backend.create_task,
+            on_done=created,
+            on_error=self._error_handler("create task", "creating task"),
+        )
+
     def _close_task(self) -> None:
         """Close the current task."""
         if not self.current_task:
             messagebox.showwarning("Warning", "No task is open.")
             return
-        
-        try:
-            self.current_task.close()
+
+        self._cancel_read()
+        reader, recorder = self._detach_stream()
+
+        def closed(_: Any) -> None:
             self.current_task = None
+            self.current_profile = None
             self.acquisition_running = False
             messagebox.showinfo("Success", "Task closed successfully!")
             self._log("Closed current task.")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to close task: {e}")
-            self._log(f"Error closing task: {e}")
-    
+
+        close = self.current_task.close
+        if self.current_profile is not None:
+            profile = self.current_profile
+            close = lambda: self.task_pool.discard(profile)
+        self.executor.submit(
+            self._stop_stream_then,
+            reader,
+            recorder,
+            close,
+            on_done=closed,
+            on_error=self._error_handler("close task", "closing task"),
+        )
+
     def _task_status(self) -> None:
         """Show status of current task."""
         if not self.current_task:
-            output = "No task is currently open."
-        else:
-            try:
-                output = f"Task Status:\n" + "-" * 40 + "\n"
-                output += f"Task Name: {self.current_task.name}\n"
-                output += f"Number of Channels: {len(self.current_task.channels)}\n"
-                output += f"Is Task Done: {self.current_task.is_task_done()}\n"
-                output += f"Channels:\n"
-                for ch in self.current_task.channels:
-                    output += f"  - {ch.name}\n"
-            except Exception as e:
-                output = f"Error reading task status: {e}"
-                self._log(f"Error reading task status: {e}")
-        
-        self._output(self.task_output, output)
-    
+            self._output(self.task_output, "No task is currently open.")
+            return
+
+        def show(output: str) -> None:
+            self._output(self.task_output, output)
+
+        def on_error(e: BaseException) -> None:
+            self._output(self.task_output, f"Error reading task status: {e}")
+            self._log(f"Error reading task status: {e}", logging.ERROR)
+
+        self.executor.submit(
+            self._format_task_status, self.current_task, on_done=show, on_error=on_error
+        )
+
+    def _format_task_status(self, task: Any) -> str:
+        """Describe a task (runs on a worker thread)."""
+        lines = [
+            "Task Status:",
+            "-" * 40,
+            f"Task Name: {task.name}",
+            f"Number of Channels: {len(task.channels)}",
+            f"Is Task Done: {task.is_task_done()}",
+            "Channels:",
+        ]
+        lines.extend(f"  - {ch.name}" for ch in task.channels)
+        return "\n".join(lines) + "\n"
+
+    # Task profiles
+    def _read_profiles(self) -> Dict[str, TaskProfile]:
+        """Load the saved profiles, starting empty if the file is unreadable."""
+        try:
+            return load_profiles(self.profile_path)
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring profiles in %s: %s", self.profile_path, e)
+            return {}
+
+    def _refresh_profile_list(self) -> None:
+        names = list(self.profiles)
+        self.profile_combo.config(values=names)
+        if self.profile_var.get() not in names:
+            self.profile_var.set(names[0] if names else "")
+
+    def _selected_profile(self) -> Optional[TaskProfile]:
+        profile = self.profiles.get(self.profile_var.get())
+        if profile is None:
+            messagebox.showwarning(
+                "Warning",
+                "No profile selected. Save a configured task as a profile first.",
+            )
+        return profile
+
+    def _save_profile(self) -> None:
+        """Save the current task's channels and timing as a profile."""
+        if not self.current_task:
+            messagebox.showwarning(
+                "Warning", "No task is open. Create and configure a task first."
+            )
+            return
+        name = simpledialog.askstring("Input", "Profile name:")
+        if not name:
+            return
+
+        def save(task: Any) -> TaskProfile:
+            profile = TaskProfile.from_task(task, name)
+            profiles = dict(self.profiles)
+            profiles[name] = profile
+            save_profiles(profiles.values(), self.profile_path)
+            return profile
+
+        def saved(profile: TaskProfile) -> None:
+            self.profiles[name] = profile
+            self._refresh_profile_list()
+            self.profile_var.set(name)
+            self._output(self.task_output, f"Saved profile {profile}.\n")
+            self._log(f"Saved profile {name!r} to {self.profile_path}.")
+
+        self.executor.submit(
+            save,
+            self.current_task,
+            on_done=saved,
+            on_error=self._error_handler("save profile", "saving profile"),
+        )
+
+    def _delete_profile(self) -> None:
+        """Forget the selected profile and close its pooled task."""
+        profile = self._selected_profile()
+        if profile is None:
+            return
+        if profile is self.current_profile:
+            messagebox.showwarning(
+                "Warning", "The profile's task is the current task. Close it first."
+            )
+            return
+        if not messagebox.askyesno(
+            "Delete Profile", f"Delete profile {profile.name!r}?"
+        ):
+            return
+
+        def delete() -> None:
+            self.task_pool.discard(profile)
+            save_profiles(
+                [p for p in self.profiles.values() if p is not profile],
+                self.profile_path,
+            )
+
+        def deleted(_: Any) -> None:
+            self.profiles.pop(profile.name, None)
+            self._refresh_profile_list()
+            self._log(f"Deleted profile {profile.name!r}.")
+
+        self.executor.submit(
+            delete,
+            on_done=deleted,
+            on_error=self._error_handler("delete profile", "deleting profile"),
+        )
+
+    def _start_profile(self) -> None:
+        """Make the selected profile's pooled task current and start it."""
+        profile = self._selected_profile()
+        if profile is None:
+            return
+        if self.current_task and self.current_profile is None:
+            messagebox.showwarning(
+                "Warning", "Close the current task before starting a profile."
+            )
+            return
+
+        self._cancel_read()
+        reader, recorder = self._detach_stream()
+        hits = self.task_pool.stats.hits
+
+        def switch() -> Tuple[Any, float]:
+            started = time.perf_counter()
+            task = self.task_pool.switch(profile, wait_first_sample=True)
+            return task, time.perf_counter() - started
+
+        def started(result: Tuple[Any, float]) -> None:
+            task, seconds = result
+            self.current_task = task
+            self.current_profile = profile
+            self.acquisition_running = True
+            source = "pooled task" if self.task_pool.stats.hits > hits else "new task"
+            output = f"Started profile {profile.name!r} ({source}): first sample after {seconds * 1e3:.1f} ms.\n"
+            self._output(self.task_output, output)
+            self._log(output.strip())
+
+        self.executor.submit(
+            self._stop_stream_then,
+            reader,
+            recorder,
+            switch,
+            on_done=started,
+            on_error=self._error_handler("start profile", "starting profile"),
+        )
+
     # Channel management
     def _add_ai_voltage(self) -> None:
         """Add an analog input voltage channel."""
         if not self.current_task:
             messagebox.showwarning("Warning", "No task is open. Create a task first.")
             return
-        
-#        device = simpledialog.askstring("Input", "Device name (e.g., dev3):")
-        device = self._select_device_name()
-        if not device:
+
+        #        device = simpledialog.askstring("Input", "Device name (e.g., dev3):")
+        self._select_device_name(self._add_ai_voltage_on)
+
+    def _add_ai_voltage_on(self, device: str) -> None:
+        """Ask for the AI channel on `device` and add it."""
+        task = self.current_task
+        if not task:
             return
         channel = simpledialog.askstring("Input", "Channel name (e.g., ai0):")
         if not channel:
             return
-        
-        try:
-            physical_channel = f"{device}/{channel}"
-            self.current_task.ai_channels.add_ai_voltage_chan(
-                physical_channel,
-                terminal_config=TerminalConfiguration.RSE,
-                min_val=-10.0,
-                max_val=10.0
-            )
+
+        physical_channel = f"{device}/{channel}"
+
+        def added(_: Any) -> None:
             output = f"Added AI voltage channel: {physical_channel}\n"
             output += f"Range: -10.0 to 10.0 V\n"
             output += f"Terminal Config: RSE\n"
             self._output(self.channel_output, output)
             self._log(f"Added AI channel: {physical_channel}")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to add AI channel: {e}")
-            self._log(f"Error adding AI channel: {e}")
-    
+
+        self.executor.submit(
+            task.ai_channels.add_ai_voltage_chan,
+            physical_channel,
+            terminal_config=TerminalConfiguration.RSE,
+            min_val=-10.0,
+            max_val=10.0,
+            on_done=added,
+            on_error=self._error_handler("add AI channel", "adding AI channel"),
+        )
+
     def _add_ao_voltage(self) -> None:
         """Add an analog output voltage channel."""
         if not self.current_task:
             messagebox.showwarning("Warning", "No task is open. Create a task first.")
             return
-        
+
         device = simpledialog.askstring("Input", "Device name (e.g., dev3):")
         if not device:
             return
         channel = simpledialog.askstring("Input", "Channel name (e.g., ao0):")
         if not channel:
             return
-        
-        try:
-            physical_channel = f"{device}/{channel}"
-            self.current_task.ao_channels.add_ao_voltage_chan(
-                physical_channel,
-                min_val=-10.0,
-                max_val=10.0
-            )
+
+        physical_channel = f"{device}/{channel}"
+
+        def added(_: Any) -> None:
             output = f"Added AO voltage channel: {physical_channel}\n"
             output += f"Range: -10.0 to 10.0 V\n"
             self._output(self.channel_output, output)
             self._log(f"Added AO channel: {physical_channel}")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to add AO channel: {e}")
-            self._log(f"Error adding AO channel: {e}")
-    
+
+        self.executor.submit(
+            self.current_task.ao_channels.add_ao_voltage_chan,
+            physical_channel,
+            min_val=-10.0,
+            max_val=10.0,
+            on_done=added,
+            on_error=self._error_handler("add AO channel", "adding AO channel"),
+        )
+
     def _add_di_channel(self) -> None:
         """Add a digital input channel."""
         if not self.current_task:
             messagebox.showwarning("Warning", "No task is open. Create a task first.")
             return
-        
+
         device = simpledialog.askstring("Input", "Device name (e.g., dev3):")
         if not device:
             return
         channel = simpledialog.askstring("Input", "Channel name (e.g., port0/line0):")
         if not channel:
             return
-        
-        try:
-            physical_channel = f"{device}/{channel}"
-            self.current_task.di_channels.add_di_chan(physical_channel)
+
+        physical_channel = f"{device}/{channel}"
+
+        def added(_: Any) -> None:
             output = f"Added DI channel: {physical_channel}\n"
             self._output(self.channel_output, output)
             self._log(f"Added DI channel: {physical_channel}")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to add DI channel: {e}")
-            self._log(f"Error adding DI channel: {e}")
-    
+
+        self.executor.submit(
+            self.current_task.di_channels.add_di_chan,
+            physical_channel,
+            on_done=added,
+            on_error=self._error_handler("add DI channel", "adding DI channel"),
+        )
+
     def _add_do_channel(self) -> None:
         """Add a digital output channel."""
         if not self.current_task:
             messagebox.showwarning("Warning", "No task is open. Create a task first.")
             return
-        
+
         device = simpledialog.askstring("Input", "Device name (e.g., dev3):")
         if not device:
             return
         channel = simpledialog.askstring("Input", "Channel name (e.g., port0/line0):")
         if not channel:
             return
-        
-        try:
-            physical_channel = f"{device}/{channel}"
-            self.current_task.do_channels.add_do_chan(physical_channel)
+
+        physical_channel = f"{device}/{channel}"
+
+        def added(_: Any) -> None:
             output = f"Added DO channel: {physical_channel}\n"
             self._output(self.channel_output, output)
             self._log(f"Added DO channel: {physical_channel}")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to add DO channel: {e}")
-            self._log(f"Error adding DO channel: {e}")
-    
+
+        self.executor.submit(
+            self.current_task.do_channels.add_do_chan,
+            physical_channel,
+            on_done=added,
+            on_error=self._error_handler("add DO channel", "adding DO channel"),
+        )
+
     # Acquisition functions
     def _configure_timing(self) -> None:
         """Configure timing for the task."""
         if not self.current_task:
             messagebox.showwarning("Warning", "No task is open. Create a task first.")
             return
-        
-        rate_str = simpledialog.askstring("Input", "Sample rate (S/s) [default: 1000]:", initialvalue="1000")
+
+        rate_str = simpledialog.askstring(
+            "Input", "Sample rate (S/s) [default: 1000]:", initialvalue="1000"
+        )
         if not rate_str:
             return
-        
+
         try:
             rate = float(rate_str)
-            self.current_task.timing.cfg_samp_clk_timing(
-                rate,
-                sample_mode=AcquisitionType.CONTINUOUS
-            )
+        except ValueError as e:
+            self._error_handler("configure timing", "configuring timing")(e)
+            return
+
+        def configured(plan: Optional[AcquisitionPlan]) -> None:
             output = f"Configured timing:\n"
             output += f"Sample Rate: {rate} S/s\n"
             output += f"Mode: Continuous\n"
+            if plan is not None:
+                output += f"Input Buffer: {plan.input_buffer_size} samples/ch ({plan.buffer_seconds:.1f} s)\n"
             self._output(self.acq_output, output)
             self._log(f"Configured timing: {rate} S/s, continuous mode.")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to configure timing: {e}")
-            self._log(f"Error configuring timing: {e}")
-    
+
+        self.executor.submit(
+            self._configure_timing_on,
+            self.current_task,
+            rate,
+            on_done=configured,
+            on_error=self._error_handler("configure timing", "configuring timing"),
+        )
+
+    @staticmethod
+    def _configure_timing_on(task: Any, rate: float) -> Optional[AcquisitionPlan]:
+        """Set a continuous sample clock and size the AI buffer for it (runs on a worker thread)."""
+        task.timing.cfg_samp_clk_timing(rate, sample_mode=AcquisitionType.CONTINUOUS)
+        if len(task.ai_channels) == 0:
+            return None
+        return tune_input_buffer(task)
+
     def _start_task(self) -> None:
         """Start the task."""
         if not self.current_task:
             messagebox.showwarning("Warning", "No task is open. Create a task first.")
             return
-        
-        try:
-            self.current_task.start()
+
+        def started(_: Any) -> None:
             self.acquisition_running = True
             output = "Task started successfully.\n"
             self._output(self.acq_output, output)
             self._log("Task started.")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to start task: {e}")
-            self._log(f"Error starting task: {e}")
-    
+
+        start = self.current_task.start
+        if self.current_profile is not None:
+            profile = self.current_profile
+            start = lambda: self.task_pool.start(profile)
+        self.executor.submit(
+            start,
+            on_done=started,
+            on_error=self._error_handler("start task", "starting task"),
+        )
+
     def _stop_task(self) -> None:
         """Stop the task."""
         if not self.current_task:
             messagebox.showwarning("Warning", "No task is open.")
             return
-        
-        try:
-            self.current_task.stop()
+
+        self._cancel_read()
+        reader, recorder = self._detach_stream()
+
+        def stopped(_: Any) -> None:
             self.acquisition_running = False
             output = "Task stopped successfully.\n"
             self._output(self.acq_output, output)
             self._log("Task stopped.")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to stop task: {e}")
-            self._log(f"Error stopping task: {e}")
-    
+
+        stop = self.current_task.stop
+        if self.current_profile is not None:
+            profile = self.current_profile
+            stop = lambda: self.task_pool.stop(profile)
+        self.executor.submit(
+            self._stop_stream_then,
+            reader,
+            recorder,
+            stop,
+            on_done=stopped,
+            on_error=self._error_handler("stop task", "stopping task"),
+        )
+
     def _read_samples(self) -> None:
         """Read samples from the task."""
         if not self.current_task:
             messagebox.showwarning("Warning", "No task is open.")
             return
-        
+
         if not self.acquisition_running:
-            messagebox.showwarning("Warning", "Task is not running. Start the task first.")
+            messagebox.showwarning(
+                "Warning", "Task is not running. Start the task first."
+            )
+            return
+
+        if self._read_job is not None and not self._read_job.finished:
+            messagebox.showwarning("Warning", "A read is already in progress.")
+            return
+
+        if self.stream_reader is not None:
+            messagebox.showwarning(
+                "Warning",
+                "The task is being streamed to the live plot or a recording. Stop them first.",
+            )
             return
-        
-        num_samples_str = simpledialog.askstring("Input", "Number of samples to read [default: 10]:", initialvalue="10")
+
+        num_samples_str = simpledialog.askstring(
+            "Input", "Number of samples to read [default: 10]:", initialvalue="10"
+        )
         if not num_samples_str:
             return
-        
+
         try:
             num_samples = int(num_samples_str)
-            data = self.current_task.read(num_samples)
-            
-            output = f"Read {num_samples} samples:\n" + "-" * 40 + "\n"
-            if isinstance(data, list):
-                for i, sample in enumerate(data[:20]):  # Show first 20
-                    output += f"Sample {i}: {sample}\n"
-                if len(data) > 20:
-                    output += f"... and {len(data) - 20} more samples.\n"
-            else:
-                output += f"Data: {data}\n"
-            
+        except ValueError as e:
+            self._error_handler("read samples", "reading samples")(e)
+            return
+
+        def show(output: str) -> None:
+            self._read_job = None
             self._output(self.acq_output, output)
             self._log(f"Read {num_samples} samples.")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to read samples: {e}")
-            self._log(f"Error reading samples: {e}")
+
+        def on_error(e: BaseException) -> None:
+            self._read_job = None
+            self._error_handler("read samples", "reading samples")(e)
+
+        self._output(self.acq_output, f"Reading {num_samples} samples...\n")
+        # Each driver read inside the job has its own timeout, so the job as a
+        # whole may run as long as the acquisition needs; use Cancel to stop it.
+        self._read_job = self.executor.submit(
+            self._read_chunked,
+            self.current_task,
+            num_samples,
+            on_done=show,
+            on_error=on_error,
+            timeout=None,
+        )
+
+    def _cancel_read(self) -> None:
+        """Cancel a read in progress, if any."""
+        if self._read_job is not None and not self._read_job.finished:
+            self._read_job.cancel()
+            self._output(self.acq_output, "Read cancelled.\n")
+            self._log("Read cancelled.")
+        self._read_job = None
+
+    def _read_chunked(self, task: Any, num_samples: int) -> str:
+        """Read in chunks so the job can be cancelled (runs on a worker thread)."""
+        job = current_job()
+        if len(task.ai_channels) == 0:
+            data: Any = task.read(num_samples, timeout=READ_TIMEOUT)
+        else:
+            reader = self.backend.ai_reader(task)
+            num_channels = len(task.ai_channels)
+            data = np.empty((num_channels, num_samples))
+            # A chunk larger than the driver buffer would overflow it (-200279)
+            # before the read returns.
+            chunk_samples = min(
+                READ_CHUNK_SAMPLES, max(int(task.in_stream.input_buf_size) // 2, 1)
+            )
+            chunk = np.empty((num_channels, min(num_samples, chunk_samples)))
+            position = 0
+            while position < num_samples:
+                if job is not None and job.cancelled:
+                    return ""
+                count = min(num_samples - position, chunk.shape[1])
+                buffer = (
+                    chunk
+                    if count == chunk.shape[1]
+                    else np.empty((num_channels, count))
+                )
+                reader.read_many_sample(
+                    buffer, number_of_samples_per_channel=count, timeout=READ_TIMEOUT
+                )
+                data[:, position : position + count] = buffer
+                position += count
+            # Match task.read(): one list for a single channel.
+            data = data[0] if num_channels == 1 else data
+
+        lines = [f"Read {num_samples} samples:", "-" * 40]
+        if isinstance(data, (list, np.ndarray)):
+            lines.extend(
+                f"Sample {i}: {sample}" for i, sample in enumerate(data[:20])
+            )  # Show first 20
+            if len(data) > 20:
+                lines.append(f"... and {len(data) - 20} more samples.")
+        else:
+            lines.append(f"Data: {data}")
+        return "\n".join(lines) + "\n"
+
+    # Streaming: one StreamingReader per running task feeds the live plot
+    # (through ring_buffer) and the recorder.
+    def _with_stream(
+        self, on_ready: Callable[[], None], action: str, activity: str
+    ) -> None:
+        """Open the shared stream if needed, then call on_ready on the Tk thread."""
+        if not self.current_task:
+            messagebox.showwarning("Warning", "No task is open.")
+            return
+
+        if not self.acquisition_running:
+            messagebox.showwarning(
+                "Warning", "Task is not running. Start the task first."
+            )
+            return
+
+        if self.stream_reader is not None:
+            on_ready()
+            return
+
+        if self._read_job is not None and not self._read_job.finished:
+            messagebox.showwarning("Warning", "A read is in progress. Cancel it first.")
+            return
+
+        def opened(
+            result: Tuple[
+                StreamingReader, RingBuffer, float, List[str], List[Tuple[float, float]]
+            ],
+        ) -> None:
+            reader, ring, rate, names, ranges = result
+            if self.current_task is not reader.task or self.stream_reader is not None:
+                # The task was stopped or closed while the stream was opening.
+                self.executor.submit(reader.stop)
+                return
+            self.stream_reader = reader
+            self.ring_buffer = ring
+            self.metrics.register("stream", reader)
+            self._stream_layout = (rate, names, ranges)
+            mode = " (raw int16)" if reader.raw else ""
+            self._log(f"Streaming {len(names)} channels at {rate} S/s{mode}.")
+            self._refresh_stream()
+            on_ready()
+
+        self.executor.submit(
+            self._open_stream,
+            self.current_task,
+            self.raw_stream_var.get(),
+            on_done=opened,
+            on_error=self._error_handler(action, activity),
+        )
+
+    def _open_stream(
+        self, task: Any, raw: bool = False
+    ) -> Tuple[
+        StreamingReader, RingBuffer, float, List[str], List[Tuple[float, float]]
+    ]:
+        """Start a StreamingReader feeding a ring buffer (runs on a worker thread)."""
+        if len(task.ai_channels) == 0:
+            raise ValueError("streaming needs at least one AI channel")
+        rate = float(task.timing.samp_clk_rate)
+        names = [channel.name for channel in task.ai_channels]
+        ranges = [(channel.ai_min, channel.ai_max) for channel in task.ai_channels]
+        # About one block per frame keeps latency low without tiny reads; the
+        # tuner grows blocks if the plot and recorder cannot keep up.
+        plan = plan_acquisition(
+            rate, len(names), target_latency=1.0 / PLOT_FPS, max_block_seconds=0.25
+        )
+        plan.input_buffer_size = int(task.in_stream.input_buf_size)
+        stream_reader = (
+            self.backend.ai_unscaled_reader(task)
+            if raw
+            else self.backend.ai_reader(task)
+        )
+        reader = StreamingReader(
+            task,
+            samples_per_block=plan.samples_per_block,
+            reader=stream_reader,
+            queue_blocks=False,
+            raw=raw,
+            max_samples_per_block=plan.max_samples_per_block,
+        )
+        ring = RingBuffer(
+            len(names),
+            int(rate * PLOT_WINDOW_SECONDS) + plan.max_samples_per_block,
+            dtype=reader.pool.dtype,
+        )
+        reader.subscribe(lambda block: ring.write(block.data))
+        BlockSizeTuner(reader, plan).attach()
+        reader.start()
+        return reader, ring, rate, names, ranges
+
+    def _refresh_stream(self) -> None:
+        """Redraw the live plot, update stream status and reschedule at PLOT_FPS."""
+        reader = self.stream_reader
+        if reader is None:
+            return
+        if not reader.running:
+            error = reader.stats.last_error
+            self._stop_stream_in_background(*self._detach_stream())
+            if error:
+                self._log(f"Streaming stopped: {error}", logging.ERROR)
+            else:
+                self._log("Streaming stopped.")
+            return
+        stats = reader.stats
+        if self._plot_active:
+            self.live_plot.update()
+            self.plot_status.config(
+                text=f"{stats.samples_per_second:,.0f} S/s/ch  lost: {stats.lost}  "
+                f"frame: {self.live_plot.last_frame_seconds * 1000:.1f} ms"
+            )
+        if self.recorder is not None:
+            rec = self.recorder.stats
+            self.record_status.config(
+                text=f"Recording: {rec.bytes_written / 1e6:,.1f} MB  "
+                f"pending chunks: {rec.pending_chunks}  dropped: {rec.samples_dropped}"
+            )
+        self.root.after(int(1000 / PLOT_FPS), self._refresh_stream)
+
+    def _release_stream_if_idle(self) -> None:
+        """Stop the shared stream once neither plot nor recorder uses it."""
+        if (
+            self.stream_reader is not None
+            and not self._plot_active
+            and self.recorder is None
+        ):
+            self._stop_stream_in_background(*self._detach_stream())
+
+    def _detach_stream(self) -> Tuple[Optional[StreamingReader], Optional[Recorder]]:
+        """Forget the stream and its consumers; return what the caller must stop."""
+        reader, recorder = self.stream_reader, self.recorder
+        self.stream_reader = None
+        self.ring_buffer = None
+        self.recorder = None
+        self.metrics.unregister("stream")
+        self.metrics.unregister("recorder")
+        if self._plot_active:
+            self._plot_active = False
+            self.live_plot.clear()
+            self.plot_status.config(text="Stopped.")
+        self.record_status.config(text="Not recording.")
+        return reader, recorder
+
+    def _stop_stream_in_background(
+        self, reader: Optional[StreamingReader], recorder: Optional[Recorder]
+    ) -> None:
+        """Stop a detached stream and recorder without blocking the Tk thread."""
+        if reader is not None or recorder is not None:
+            self.executor.submit(
+                self._stop_stream_then,
+                reader,
+                recorder,
+                lambda: None,
+                on_error=self._error_handler("stop streaming", "stopping streaming"),
+            )
+
+    @staticmethod
+    def _stop_stream_then(
+        reader: Optional[StreamingReader],
+        recorder: Optional[Recorder],
+        action: Callable[[], Any],
+    ) -> Any:
+        """Stop the stream reader and flush the recorder before a task call (runs on a worker thread)."""
+        if reader is not None:
+            reader.stop()
+        if recorder is not None:
+            recorder.close()
+        return action()
+
+    # Live plotting
+    def _start_live_plot(self) -> None:
+        """Plot the running task."""
+        if self._plot_active:
+            messagebox.showwarning("Warning", "The live plot is already running.")
+            return
+        self._with_stream(
+            self._begin_live_plot, "start live plot", "starting live plot"
+        )
+
+    def _begin_live_plot(self) -> None:
+        """Attach the live plot to the open stream."""
+        if self._plot_active or self.ring_buffer is None:
+            return
+        rate, names, ranges = self._stream_layout
+        self._plot_active = True
+        self.live_plot.configure(
+            self.ring_buffer, rate, names, ranges, scaling=self.stream_reader.scaling
+        )
+        self._log("Live plot started.")
+
+    def _stop_live_plot(self) -> None:
+        """Stop the live plot; the task keeps running."""
+        if not self._plot_active:
+            return
+        self._plot_active = False
+        self.live_plot.clear()
+        self.plot_status.config(text="Stopped.")
+        self._log("Live plot stopped.")
+        self._release_stream_if_idle()
+
+    # Recording
+    def _start_recording(self) -> None:
+        """Record the running task to a file."""
+        if self.recorder is not None:
+            messagebox.showwarning("Warning", "Already recording.")
+            return
+
+        path = filedialog.asksaveasfilename(
+            title="Record to",
+            defaultextension=".ndq",
+            filetypes=[("Recordings", "*.ndq"), ("All files", "*.*")],
+        )
+        if not path:
+            return
+        self._with_stream(
+            lambda: self._begin_recording(path), "start recording", "starting recording"
+        )
+
+    def _begin_recording(self, path: str) -> None:
+        """Create a recorder for the open stream."""
+        task = self.current_task
+
+        def created(recorder: Recorder) -> None:
+            if (
+                self.stream_reader is None
+                or self.stream_reader.task is not task
+                or self.recorder is not None
+            ):
+                self.executor.submit(recorder.close)
+                return
+            recorder.attach(self.stream_reader)
+            self.recorder = recorder
+            self.metrics.register("recorder", recorder)
+            self._log(f"Recording to {path}.")
+
+        self.executor.submit(
+            Recorder.from_task,
+            task,
+            path,
+            self.stream_reader.raw,
+            on_done=created,
+            on_error=self._error_handler("start recording", "starting recording"),
+        )
+
+    def _stop_recording(self) -> None:
+        """Stop recording and close the file; the task keeps running."""
+        recorder = self.recorder
+        if recorder is None:
+            return
+        self.recorder = None
+        self.metrics.unregister("recorder")
+        recorder.detach()
+        self.record_status.config(text="Not recording.")
+
+        def closed(_: Any) -> None:
+            stats = recorder.stats
+            self._log(
+                f"Recording saved to {recorder.path}: {stats.samples_written} samples, "
+                f"{stats.samples_dropped} dropped."
+            )
+
+        self.executor.submit(
+            recorder.close,
+            on_done=closed,
+            on_error=self._error_handler("stop recording", "stopping recording"),
+        )
+        self._release_stream_if_idle()
+
+    # Diagnostics
+    def _refresh_diagnostics(self) -> None:
+        """Update the Diagnostics tab while it is visible and reschedule."""
+        self.root.after(DIAGNOSTICS_INTERVAL_MS, self._refresh_diagnostics)
+        if self.notebook.select() != str(self.diagnostics_frame):
+            return
+        if self._diagnostics_job is not None and not self._diagnostics_job.finished:
+            return
+
+        def show(snapshot: Dict[str, Dict[str, Any]]) -> None:
+            self._output(self.diagnostics_output, self._format_diagnostics(snapshot))
+
+        # Reading the driver buffer level is a driver call.
+        self._diagnostics_job = self.executor.submit(
+            self.metrics.snapshot, on_done=show, on_error=lambda e: None
+        )
+
+    @staticmethod
+    def _format_diagnostics(snapshot: Dict[str, Dict[str, Any]]) -> str:
+        """Render a metrics snapshot as aligned text, one section per source."""
+        lines = []
+        for source, values in snapshot.items():
+            lines.append(source)
+            lines.append("-" * 40)
+            for key, value in values.items():
+                if key == "start_time_seconds":
+                    continue
+                if (
+                    key.endswith(("_mean", "_p50", "_p99", "_max"))
+                    and key.split("_")[-2] == "seconds"
+                ):
+                    text = f"{value * 1000:.3f} ms"
+                elif key.endswith("_bytes"):
+                    text = f"{value / 1e6:,.1f} MB"
+                elif key.endswith("_ratio"):
+                    text = f"{value * 100:.1f} %"
+                elif isinstance(value, float):
+                    text = f"{value:,.2f}"
+                else:
+                    text = f"{value:,}"
+                lines.append(f"  {key:<40} {text}")
+            lines.append("")
+        return "\n".join(lines)
+
+    def _start_metrics_server(self) -> None:
+        """Serve the collected metrics over HTTP in Prometheus format."""
+        if self.metrics_server is not None:
+            messagebox.showwarning("Warning", "Metrics are already being served.")
+            return
+        try:
+            port = int(self.metrics_port_var.get())
+            server = MetricsServer(self.metrics, port=port).start()
+        except (ValueError, OSError) as e:
+            messagebox.showerror("Error", f"Failed to serve metrics: {e}")
+            self._log(f"Error serving metrics: {e}", logging.ERROR)
+            return
+        self.metrics_server = server
+        host, port = server.address
+        self.metrics_status.config(text=f"Serving http://{host}:{port}/metrics")
+        self._log(f"Serving metrics on http://{host}:{port}/metrics.")
+
+    def _stop_metrics_server(self) -> None:
+        """Stop the metrics endpoint."""
+        server = self.metrics_server
+        if server is None:
+            return
+        self.metrics_server = None
+        server.stop()
+        self.metrics_status.config(text="Not serving.")
+        self._log("Stopped serving metrics.")
 
 
-def main() -> None:
-    """Launch the GUI application."""
+def main(backend: Optional[Backend] = None, log_file: Optional[str] = None) -> None:
+    """Launch the GUI application, optionally also logging to a rotating file."""
     root = tk.Tk()
-    app = NidaqmxGUI(root)
+    app = NidaqmxGUI(root, backend, log_file)
     root.mainloop()
 
 
@@ -0,0 +1,179 @@
+"""Cached inventory of devices and their physical channels.
+
+Walking ``System.local().devices`` and every device's channel and line
+collections costs one driver round trip per attribute; on a Pi with several
+USB DAQs that adds up to seconds for every dialog. :class:`DeviceInventory`
+enumerates once and answers from memory until the entry expires, the caller
+asks for a :meth:`~DeviceInventory.refresh`, or the set of devices changes.
+
+Device changes are noticed in two ways: backends that know about hot-plug
+events (such as the simulator) notify their listeners, and otherwise the
+inventory compares the backend's list of device names, a single cheap call,
+at most once per ``check_interval``.
+"""
+
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from .backends import Backend
+
+
+def _names(collection: Any) -> Optional[List[str]]:
+    """Names of a channel/line collection, or None if the device has none."""
+    try:
+        return [item.name for item in collection()]
+    except Exception:
+        return None
+
+
+class DeviceInfo:
+    """Snapshot of one device's identity and physical channels.
+
+    Channel lists are ``None`` when the driver could not report them.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        product_type: str = "",
+        serial_num: Optional[Any] = None,
+        ai_channels: Optional[List[str]] = None,
+        ao_channels: Optional[List[str]] = None,
+        di_lines: Optional[List[str]] = None,
+        do_lines: Optional[List[str]] = None,
+    ):
+        self.name = name
+        self.product_type = product_type
+        self.serial_num = serial_num
+        self.ai_channels = ai_channels
+        self.ao_channels = ao_channels
+        self.di_lines = di_lines
+        self.do_lines = do_lines
+
+    @classmethod
+    def from_device(cls, device: Any) -> "DeviceInfo":
+        """Read everything the inventory keeps from a driver device object."""
+        try:
+            product_type = device.product_type
+        except Exception:
+            product_type = ""
+        try:
+            serial_num = device.serial_num
+        except Exception:
+            serial_num = None
+        return cls(
+            device.name,
+            product_type,
+            serial_num,
+            _names(lambda: device.ai_physical_chans),
+            _names(lambda: device.ao_physical_chans),
+            _names(lambda: device.di_lines),
+            _names(lambda: device.do_lines),
+        )
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "product_type": self.product_type,
+            "serial_num": self.serial_num,
+            "ai_channels": self.ai_channels,
+            "ao_channels": self.ao_channels,
+            "di_lines": self.di_lines,
+            "do_lines": self.do_lines,
+        }
+
+    def __repr__(self) -> str:
+        return f"DeviceInfo(name={self.name!r}, product_type={self.product_type!r})"
+
+
+class DeviceInventory:
+    """Thread-safe, expiring cache of :class:`DeviceInfo` for a backend.
+
+    Args:
+        backend: Backend to enumerate.
+        ttl: Seconds before a full re-enumeration; ``None`` caches until
+            :meth:`refresh` or a detected device change.
+        check_interval: Minimum seconds between cheap device-name checks;
+            ``None`` disables them.
+    """
+
+    def __init__(
+        self,
+        backend: Backend,
+        ttl: Optional[float] = 300.0,
+        check_interval: Optional[float] = 2.0,
+    ):
+        self.backend = backend
+        self.ttl = ttl
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._devices: Optional[Dict[str, DeviceInfo]] = None
+        self._loaded_at = 0.0
+        self._checked_at = 0.0
+        self.enumerations = 0
+        backend.add_device_listener(self.invalidate)
+
+    def close(self) -> None:
+        """Stop listening for device changes."""
+        self.backend.remove_device_listener(self.invalidate)
+
+    def invalidate(self) -> None:
+        """Drop the cache; the next lookup enumerates again."""
+        self._devices = None
+
+    def refresh(self) -> List[DeviceInfo]:
+        """Enumerate all devices now and return them."""
+        with self._lock:
+            return list(self._load().values())
+
+    def _load(self) -> Dict[str, DeviceInfo]:
+        devices = {}
+        for device in self.backend.devices():
+            info = DeviceInfo.from_device(device)
+            devices[info.name.lower()] = info
+        now = time.monotonic()
+        self._devices = devices
+        self._loaded_at = self._checked_at = now
+        self.enumerations += 1
+        return devices
+
+    def _current(self) -> Dict[str, DeviceInfo]:
+        with self._lock:
+            devices = self._devices
+            now = time.monotonic()
+            if devices is None or (
+                self.ttl is not None and now - self._loaded_at > self.ttl
+            ):
+                return self._load()
+            if (
+                self.check_interval is not None
+                and now - self._checked_at > self.check_interval
+            ):
+                self._checked_at = now
+                names = {name.lower() for name in self.backend.device_names()}
+                if names != set(devices):
+                    return self._load()
+            return devices
+
+    def devices(self) -> List[DeviceInfo]:
+        """Return all devices, enumerating only if the cache is stale."""
+        return list(self._current().values())
+
+    def device_names(self) -> List[str]:
+        return [info.name for info in self._current().values()]
+
+    def device(self, name: str) -> DeviceInfo:
+        """Return one device by case-insensitive name.
+
+        Raises:
+            KeyError: If no such device exists, even after re-enumerating.
+        """
+        info = self._current().get(name.lower())
+        if info is None:
+            # It may have been plugged in since the last enumeration.
+            with self._lock:
+                info = self._load().get(name.lower())
+        if info is None:
+            raise KeyError(f"Device {name!r} not found")
+        return info
@@ -0,0 +1,178 @@
+"""Bounded, batched logging for long-running GUI sessions.
+
+Inserting every message into a Tk text widget as it happens neither scales
+nor stays bounded: the widget grows for as long as the session runs, and a
+worker thread logging thousands of lines per second would have to hop onto
+the Tk thread for each one. Here messages go through the standard
+:mod:`logging` machinery instead:
+
+* :class:`RingLogHandler` keeps the newest ``capacity`` formatted lines in
+  memory. ``emit`` only appends to a deque, so any thread can log at a high
+  rate without touching Tk.
+* :class:`LogView` copies new lines into a text widget from a Tk timer at a
+  fixed rate, in one insert per refresh, and trims the widget to
+  ``max_lines``. Lines that scrolled out of the ring between refreshes are
+  summarised as a single "skipped" line.
+* :func:`add_rotating_file` also writes the same records to a size-limited,
+  rotating log file.
+
+Typical use::
+
+    handler = RingLogHandler(capacity=10000)
+    logging.getLogger("nidaqmx_on_pi").addHandler(handler)
+    LogView(text_widget, handler).start()
+"""
+
+import logging
+import logging.handlers
+from collections import deque
+from typing import Any, Deque, List, Optional, Tuple
+
+DEFAULT_FORMAT = "%(asctime)s %(levelname)-7s %(message)s"
+DEFAULT_DATEFMT = "%H:%M:%S"
+
+
+class RingLogHandler(logging.Handler):
+    """Keep the newest ``capacity`` formatted log lines in memory.
+
+    Every line gets a sequence number; readers ask for everything after the
+    last number they saw with :meth:`since`.
+    """
+
+    def __init__(self, capacity: int = 10000, level: int = logging.NOTSET):
+        super().__init__(level)
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self._lines: Deque[str] = deque(maxlen=capacity)
+        self._sequence = 0
+        self.setFormatter(logging.Formatter(DEFAULT_FORMAT, DEFAULT_DATEFMT))
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            line = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+        # handle() holds self.lock around emit().
+        self._lines.append(line)
+        self._sequence += 1
+
+    @property
+    def sequence(self) -> int:
+        """Number of lines ever emitted."""
+        return self._sequence
+
+    def lines(self) -> List[str]:
+        """The lines currently held, oldest first."""
+        with self.lock:  # type: ignore[union-attr]
+            return list(self._lines)
+
+    def since(self, sequence: int) -> Tuple[int, List[str], int]:
+        """Lines emitted after ``sequence``.
+
+        Returns:
+            ``(new sequence, lines, skipped)``, where ``skipped`` counts lines
+            that were already evicted from the ring.
+        """
+        with self.lock:  # type: ignore[union-attr]
+            current = self._sequence
+            wanted = current - sequence
+            available = min(wanted, len(self._lines))
+            lines = (
+                list(self._lines)[len(self._lines) - available :]
+                if available > 0
+                else []
+            )
+        return current, lines, max(wanted - available, 0)
+
+    def clear(self) -> None:
+        with self.lock:  # type: ignore[union-attr]
+            self._lines.clear()
+
+
+class LogView:
+    """Mirror a :class:`RingLogHandler` into a Tk text widget at a fixed rate.
+
+    Args:
+        widget: A ``Text`` or ``ScrolledText``; kept read-only between
+            updates.
+        handler: Where the lines come from.
+        max_lines: Lines kept in the widget; older ones are deleted.
+        interval_ms: Refresh period. All lines that arrived in between are
+            inserted at once.
+    """
+
+    def __init__(
+        self,
+        widget: Any,
+        handler: RingLogHandler,
+        max_lines: int = 5000,
+        interval_ms: int = 100,
+    ):
+        self.widget = widget
+        self.handler = handler
+        self.max_lines = max_lines
+        self.interval_ms = interval_ms
+        self._seen = handler.sequence
+        self._after_id: Optional[str] = None
+
+    def start(self) -> "LogView":
+        if self._after_id is None:
+            self._after_id = self.widget.after(self.interval_ms, self._tick)
+        return self
+
+    def stop(self) -> None:
+        if self._after_id is not None:
+            self.widget.after_cancel(self._after_id)
+            self._after_id = None
+
+    def _tick(self) -> None:
+        self.flush()
+        self._after_id = self.widget.after(self.interval_ms, self._tick)
+
+    def flush(self) -> int:
+        """Insert lines logged since the last flush; returns how many."""
+        self._seen, lines, skipped = self.handler.since(self._seen)
+        if not lines:
+            return 0
+        if len(lines) > self.max_lines:
+            skipped += len(lines) - self.max_lines
+            lines = lines[-self.max_lines :]
+        if skipped:
+            lines.insert(0, f"... {skipped} messages skipped ...")
+        widget = self.widget
+        # Only follow the end if the user has not scrolled up.
+        following = widget.yview()[1] >= 0.999
+        widget.config(state="normal")
+        widget.insert("end", "\n".join(lines) + "\n")
+        excess = int(widget.index("end-1c").split(".")[0]) - 1 - self.max_lines
+        if excess > 0:
+            widget.delete("1.0", f"{excess + 1}.0")
+        widget.config(state="disabled")
+        if following:
+            widget.see("end")
+        return len(lines)
+
+
+def add_rotating_file(
+    logger: logging.Logger,
+    path: str,
+    max_bytes: int = 10 * 1024 * 1024,
+    backup_count: int = 5,
+    level: int = logging.NOTSET,
+) -> logging.handlers.RotatingFileHandler:
+    """Also write ``logger``'s records to ``path``, rotating at ``max_bytes``.
+
+    At most ``backup_count`` old files (``path.1``, ``path.2``, ...) are
+    kept. Returns the handler so the caller can remove and close it.
+    """
+    handler = logging.handlers.RotatingFileHandler(
+        path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+    )
+    handler.setLevel(level)
+    handler.setFormatter(
+        logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+    )
+    logger.addHandler(handler)
+    return handler
@@ -0,0 +1,537 @@
+"""Hardware-timed analog and digital output streaming.
+
+A :class:`StreamingWriter` keeps a continuous AO or DO task fed from a
+background thread. The waveform comes from a :class:`WaveformSource`: a
+precomputed NumPy array played cyclically (:class:`ArrayWaveform`) or a
+Python generator yielding blocks of any length (:class:`GeneratorWaveform`).
+
+Two modes are supported:
+
+* Streaming (``regeneration=False``, the default): the driver buffer holds
+  ``buffer_blocks`` blocks (double-buffered by default) and the thread writes
+  a new block whenever one has been generated. If the thread cannot keep up,
+  DAQmx stops the generation rather than repeating old samples; the writer
+  counts the underflow, refills the buffer and restarts the task.
+* Regeneration (``regeneration=True``): an :class:`ArrayWaveform` is written
+  once and the device repeats it without further writes.
+
+:meth:`StreamingWriter.update_waveform` switches to a new waveform at the next
+block boundary in streaming mode (the change reaches the output after the
+blocks already queued, at most ``buffer_blocks * samples_per_block``
+samples), or at the end of the current buffer pass in regeneration mode.
+
+Example::
+
+    task = create_output_task("dev3", "ao0:1", rate=10000.0)
+    t = np.arange(1000) / 10000.0
+    with StreamingWriter(task, np.sin(2 * np.pi * 50 * t) * [[1.0], [0.5]]) as writer:
+        time.sleep(1.0)
+        writer.update_waveform(np.zeros((2, 1000)))
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Union
+
+import numpy as np
+from nidaqmx.constants import AcquisitionType, RegenerationMode
+from nidaqmx.error_codes import DAQmxErrors
+from nidaqmx.errors import DaqError
+
+from .backends import Backend, backend_for_task, get_backend
+
+# Errors DAQmx reports when a non-regenerating generation runs out of data.
+UNDERFLOW_ERRORS = frozenset(
+    {
+        DAQmxErrors.GEN_STOPPED_TO_PREVENT_REGEN_OF_OLD_SAMPLES.value,
+        DAQmxErrors.GEN_STOPPED_TO_PREVENT_INTERMEDIATE_BUFFER_REGEN_OF_OLD_SAMPLES.value,
+        DAQmxErrors.OUTPUT_FIFO_UNDERFLOW.value,
+        DAQmxErrors.OUTPUT_FIFO_UNDERFLOW_2.value,
+        DAQmxErrors.DAC_UNDERFLOW.value,
+    }
+)
+
+
+class WaveformSource:
+    """Produces consecutive ``(channels, samples)`` blocks of an output signal."""
+
+    num_channels = 0
+
+    def next_block(self, num_samples: int) -> Optional[np.ndarray]:
+        """Return the next ``num_samples`` samples, fewer at the end, or None when done."""
+        raise NotImplementedError
+
+
+class ArrayWaveform(WaveformSource):
+    """Play a precomputed array, cyclically unless ``repeat`` is False.
+
+    Args:
+        data: ``(channels, samples)`` array, or 1-D for a single channel.
+        repeat: Start over after the last sample.
+    """
+
+    def __init__(self, data: np.ndarray, repeat: bool = True):
+        data = np.asarray(data)
+        if data.ndim == 1:
+            data = data[np.newaxis, :]
+        if data.ndim != 2 or data.shape[1] == 0:
+            raise ValueError(
+                "waveform data must be a non-empty (channels, samples) array"
+            )
+        self.data = data
+        self.repeat = repeat
+        self.num_channels = data.shape[0]
+        self.position = 0
+
+    @property
+    def period(self) -> int:
+        return self.data.shape[1]
+
+    def next_block(self, num_samples: int) -> Optional[np.ndarray]:
+        period = self.period
+        if not self.repeat:
+            if self.position >= period:
+                return None
+            num_samples = min(num_samples, period - self.position)
+        out = np.empty((self.num_channels, num_samples), dtype=self.data.dtype)
+        filled = 0
+        while filled < num_samples:
+            start = self.position % period
+            count = min(num_samples - filled, period - start)
+            out[:, filled : filled + count] = self.data[:, start : start + count]
+            filled += count
+            self.position += count
+        return out
+
+
+class GeneratorWaveform(WaveformSource):
+    """Re-chunk the arrays yielded by an iterator into blocks of any size.
+
+    Args:
+        blocks: Iterable of ``(channels, samples)`` arrays (1-D for one
+            channel) of any lengths; the waveform ends when it is exhausted.
+        num_channels: Number of channels; taken from the first block when
+            omitted.
+    """
+
+    def __init__(
+        self, blocks: Iterable[np.ndarray], num_channels: Optional[int] = None
+    ):
+        self._blocks: Iterator[np.ndarray] = iter(blocks)
+        self._pending: Optional[np.ndarray] = None
+        self._done = False
+        if num_channels is None:
+            self._pending = self._pull()
+            num_channels = 0 if self._pending is None else self._pending.shape[0]
+        self.num_channels = num_channels
+
+    def _pull(self) -> Optional[np.ndarray]:
+        for block in self._blocks:
+            block = np.asarray(block)
+            if block.ndim == 1:
+                block = block[np.newaxis, :]
+            if block.shape[1]:
+                return block
+        self._done = True
+        return None
+
+    def next_block(self, num_samples: int) -> Optional[np.ndarray]:
+        parts = []
+        have = 0
+        while have < num_samples:
+            if self._pending is None:
+                if self._done:
+                    break
+                self._pending = self._pull()
+                if self._pending is None:
+                    break
+            take = min(num_samples - have, self._pending.shape[1])
+            parts.append(self._pending[:, :take])
+            have += take
+            self._pending = (
+                self._pending[:, take:] if take < self._pending.shape[1] else None
+            )
+        if not parts:
+            return None
+        return parts[0] if len(parts) == 1 else np.concatenate(parts, axis=1)
+
+
+def as_waveform(
+    waveform: Union[WaveformSource, np.ndarray, Iterable[np.ndarray]],
+) -> WaveformSource:
+    """Wrap an array in :class:`ArrayWaveform` and an iterable in :class:`GeneratorWaveform`."""
+    if isinstance(waveform, WaveformSource):
+        return waveform
+    if isinstance(waveform, (np.ndarray, list, tuple)):
+        return ArrayWaveform(np.asarray(waveform))
+    return GeneratorWaveform(waveform)
+
+
+class OutputStats:
+    """Write and underflow counters for a :class:`StreamingWriter`.
+
+    Counters are only written by the writer thread; other threads may read
+    them at any time.
+    """
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self.blocks = 0
+        self.samples = 0
+        self.underflows = 0
+        self.restarts = 0
+        self.switches = 0
+        self.errors = 0
+        self.last_error: Optional[BaseException] = None
+        self.started_at: Optional[float] = None
+        self.last_block_at: Optional[float] = None
+
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        end = self.last_block_at if self.last_block_at is not None else self.started_at
+        return max(end - self.started_at, 0.0)
+
+    @property
+    def samples_per_second(self) -> float:
+        """Sustained per-channel write rate since start."""
+        elapsed = self.elapsed
+        return self.samples / elapsed if elapsed > 0 else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "blocks": self.blocks,
+            "samples": self.samples,
+            "underflows": self.underflows,
+            "restarts": self.restarts,
+            "switches": self.switches,
+            "errors": self.errors,
+            "elapsed": self.elapsed,
+            "samples_per_second": self.samples_per_second,
+            "last_error": str(self.last_error) if self.last_error else None,
+        }
+
+
+class StreamingWriter:
+    """Feed a hardware-timed AO or DO task from a background thread.
+
+    The task must have its sample clock configured (see
+    :func:`create_output_task`) and must not be started; the writer prefills
+    the buffer, starts the task and stops it again in :meth:`stop`.
+
+    Args:
+        task: Task with AO channels, or DO channels written as port values.
+        waveform: :class:`WaveformSource`, NumPy array or iterable of arrays.
+        samples_per_block: Samples per channel per write.
+        buffer_blocks: Driver buffer size in blocks (streaming mode).
+        regeneration: Let the device repeat a written :class:`ArrayWaveform`
+            instead of streaming.
+        restart_on_underflow: After an underflow, refill and restart the
+            task instead of stopping with an error.
+        timeout: Write timeout in seconds passed to the driver.
+        writer: Optional pre-built stream writer. Defaults to the backend's
+            ``AnalogMultiChannelWriter`` or ``DigitalMultiChannelWriter``.
+        digital: Write ``uint32`` port values; detected from the task's
+            channels when omitted.
+    """
+
+    def __init__(
+        self,
+        task: Any,
+        waveform: Union[WaveformSource, np.ndarray, Iterable[np.ndarray]],
+        samples_per_block: int = 1000,
+        buffer_blocks: int = 2,
+        regeneration: bool = False,
+        restart_on_underflow: bool = True,
+        timeout: float = 10.0,
+        writer: Any = None,
+        digital: Optional[bool] = None,
+    ):
+        if buffer_blocks < 2:
+            raise ValueError("buffer_blocks must be at least 2")
+        if digital is None:
+            digital = len(task.do_channels) > 0 and len(task.ao_channels) == 0
+        self.task = task
+        self.digital = digital
+        self.num_channels = len(task.do_channels) if digital else len(task.ao_channels)
+        self.dtype = np.dtype(np.uint32 if digital else np.float64)
+        if writer is None:
+            backend = backend_for_task(task)
+            writer = backend.do_writer(task) if digital else backend.ao_writer(task)
+        self.writer = writer
+        self.samples_per_block = samples_per_block
+        self.buffer_blocks = buffer_blocks
+        self.regeneration = regeneration
+        self.restart_on_underflow = restart_on_underflow
+        self.timeout = timeout
+        self.waveform = self._check_waveform(waveform)
+        self.stats = OutputStats()
+        self.on_error: Optional[Callable[[BaseException], None]] = None
+        self.written = 0
+        self.switched_at: Optional[int] = None
+        self.finished = False
+
+        self._pending_waveform: Optional[WaveformSource] = None
+        self._lock = threading.Lock()
+        self._update_cond = threading.Condition(self._lock)
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._generation_offset = 0
+
+    def _check_waveform(self, waveform: Any) -> WaveformSource:
+        waveform = as_waveform(waveform)
+        if waveform.num_channels != self.num_channels:
+            raise ValueError(
+                f"waveform has {waveform.num_channels} channels; the task has {self.num_channels}"
+            )
+        if self.regeneration and not isinstance(waveform, ArrayWaveform):
+            raise ValueError("regeneration needs an array waveform")
+        return waveform
+
+    # Properties
+    @property
+    def rate(self) -> float:
+        return float(self.task.timing.samp_clk_rate)
+
+    @property
+    def generated(self) -> int:
+        """Samples per channel generated since :meth:`start`, across restarts."""
+        return self._generation_offset + int(
+            self.task.out_stream.total_samp_per_chan_generated
+        )
+
+    @property
+    def latency(self) -> float:
+        """Seconds between writing a sample and the device generating it."""
+        if self.regeneration:
+            return self.waveform.period / self.rate
+        return max(self.written - self.generated, 0) / self.rate
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    # Lifecycle
+    def start(self) -> "StreamingWriter":
+        """Prefill the buffer, start the task and the writer thread."""
+        if self.running:
+            return self
+        self._stop_event.clear()
+        self.stats.reset()
+        self.stats.started_at = time.monotonic()
+        self.written = 0
+        self._generation_offset = 0
+        self.finished = False
+        stream = self.task.out_stream
+        if self.regeneration:
+            stream.regen_mode = RegenerationMode.ALLOW_REGENERATION
+            stream.output_buf_size = self.waveform.period
+            self._write(self.waveform.data)
+        else:
+            stream.regen_mode = RegenerationMode.DONT_ALLOW_REGENERATION
+            stream.output_buf_size = self.samples_per_block * self.buffer_blocks
+            self._prefill(self.buffer_blocks)
+        self.task.start()
+        self._thread = threading.Thread(
+            target=self._run, name=type(self).__name__, daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the writer thread and the task."""
+        self._stop_event.set()
+        with self._update_cond:
+            self._update_cond.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        self._thread = None
+        self.task.stop()
+
+    close = stop
+
+    def __enter__(self) -> "StreamingWriter":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait until a finite waveform has been generated completely."""
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.finished
+
+    # Waveform switching
+    def update_waveform(
+        self,
+        waveform: Union[WaveformSource, np.ndarray, Iterable[np.ndarray]],
+        wait: bool = False,
+        timeout: Optional[float] = None,
+    ) -> Optional[int]:
+        """Switch to ``waveform`` at the next block (or buffer) boundary.
+
+        Args:
+            waveform: The new waveform; same channel count as the task.
+            wait: Block until the writer has made the switch.
+            timeout: Maximum time to wait.
+
+        Returns:
+            With ``wait``, the absolute output sample index at which the new
+            waveform starts, or None on timeout. Otherwise None.
+        """
+        waveform = self._check_waveform(waveform)
+        if self.regeneration and waveform.period != self.waveform.period:
+            raise ValueError(
+                "in regeneration mode the new waveform must have the same length"
+            )
+        with self._update_cond:
+            self._pending_waveform = waveform
+            self._update_cond.notify_all()
+            if not wait:
+                return None
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while self._pending_waveform is waveform and not self._stop_event.is_set():
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._update_cond.wait(remaining)
+            return self.switched_at if self._pending_waveform is not waveform else None
+
+    def _take_update(self) -> None:
+        with self._update_cond:
+            if self._pending_waveform is None:
+                return
+            self.waveform = self._pending_waveform
+            self._pending_waveform = None
+            self.switched_at = self.written
+            self.stats.switches += 1
+            self._update_cond.notify_all()
+
+    # Writer thread
+    def _write(self, data: np.ndarray) -> None:
+        data = np.ascontiguousarray(data, dtype=self.dtype)
+        if self.digital:
+            written = self.writer.write_many_sample_port_uint32(
+                data, timeout=self.timeout
+            )
+        else:
+            written = self.writer.write_many_sample(data, timeout=self.timeout)
+        written = data.shape[1] if written is None else int(written)
+        self.written += written
+        stats = self.stats
+        stats.blocks += 1
+        stats.samples += written
+        stats.last_block_at = time.monotonic()
+
+    def _next_block(self) -> Optional[np.ndarray]:
+        self._take_update()
+        block = self.waveform.next_block(self.samples_per_block)
+        if block is not None and block.shape[0] != self.num_channels:
+            raise ValueError(
+                f"waveform block has {block.shape[0]} channels; the task has {self.num_channels}"
+            )
+        return block
+
+    def _prefill(self, num_blocks: int) -> bool:
+        """Write up to ``num_blocks`` blocks before starting; False if the waveform ended."""
+        for _ in range(num_blocks):
+            block = self._next_block()
+            if block is None:
+                return False
+            self._write(block)
+        return True
+
+    def _restart_after_underflow(self, pending: np.ndarray) -> None:
+        self._generation_offset = self.written
+        self.task.stop()
+        self._write(pending)
+        self._prefill(self.buffer_blocks - 1)
+        self.task.start()
+        self.stats.restarts += 1
+
+    def _run(self) -> None:
+        try:
+            if self.regeneration:
+                self._run_regeneration()
+            else:
+                self._run_streaming()
+        except Exception as e:
+            self.stats.errors += 1
+            self.stats.last_error = e
+            if self.on_error is not None and not self._stop_event.is_set():
+                self.on_error(e)
+
+    def _run_streaming(self) -> None:
+        while not self._stop_event.is_set():
+            block = self._next_block()
+            if block is None:
+                self._drain()
+                return
+            try:
+                self._write(block)
+            except DaqError as e:
+                if e.error_code not in UNDERFLOW_ERRORS:
+                    raise
+                self.stats.underflows += 1
+                self.stats.last_error = e
+                if not self.restart_on_underflow or self._stop_event.is_set():
+                    raise
+                self._restart_after_underflow(block)
+
+    def _run_regeneration(self) -> None:
+        while not self._stop_event.is_set():
+            with self._update_cond:
+                while self._pending_waveform is None and not self._stop_event.is_set():
+                    self._update_cond.wait()
+            if self._stop_event.is_set():
+                return
+            self._take_update()
+            # The write waits until the old buffer has been generated once,
+            # so the new waveform starts on a buffer boundary.
+            self._write(self.waveform.data)
+
+    def _drain(self) -> None:
+        """Let the device generate what was written, then stop the task."""
+        while not self._stop_event.is_set() and self.generated < self.written:
+            time.sleep(min(max(self.written - self.generated, 1) / self.rate, 0.05))
+        self.finished = True
+        if not self._stop_event.is_set():
+            self.task.stop()
+
+
+def create_output_task(
+    device: str,
+    channels: str,
+    rate: float,
+    digital: bool = False,
+    min_val: float = -10.0,
+    max_val: float = 10.0,
+    backend: Optional[Backend] = None,
+) -> Any:
+    """Create a continuous, not yet started AO (or DO) task for a :class:`StreamingWriter`.
+
+    Args:
+        device: Device name, for example ``"dev3"``.
+        channels: AO channels (``"ao0:1"``) or DO lines/ports.
+        rate: Sample clock rate in samples per second.
+        digital: Add DO channels instead of AO voltage channels.
+        min_val: Minimum AO voltage.
+        max_val: Maximum AO voltage.
+        backend: DAQ backend; defaults to ``get_backend()``.
+    """
+    if backend is None:
+        backend = get_backend()
+    task = backend.create_task()
+    physical_channel = f"{device}/{channels}"
+    if digital:
+        task.do_channels.add_do_chan(physical_channel)
+    else:
+        task.ao_channels.add_ao_voltage_chan(
+            physical_channel, min_val=min_val, max_val=max_val
+        )
+    task.timing.cfg_samp_clk_timing(rate, sample_mode=AcquisitionType.CONTINUOUS)
+    return task
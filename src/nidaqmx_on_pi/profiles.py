@@ -0,0 +1,501 @@
+"""Saved task profiles and a pool of ready-to-start tasks.
+
+A :class:`TaskProfile` is everything needed to rebuild an analog-input task:
+its channels (with range and terminal configuration) and its timing. Profiles
+are saved as JSON with :func:`save_profiles` and read back with
+:func:`load_profiles`.
+
+Creating a task, adding channels and having the driver verify and reserve
+them costs far more than starting a task that is already committed. A
+:class:`TaskPool` keeps one task per profile after its first use. The task
+is committed before it starts, so stopping it returns it to the committed
+state and the next :meth:`TaskPool.start` only starts it again::
+
+    pool = TaskPool()
+    task = pool.start(profiles["vibration"])
+    ...
+    pool.stop(profiles["vibration"])
+    pool.switch(profiles["strain"])   # stop everything, start another profile
+    pool.close()
+
+Committing reserves the device, and DAQmx lets only one task hold a device's
+analog input at a time. Before committing a profile, the pool unreserves
+idle tasks on the same devices. Switching between setups on one device
+therefore repeats the reservation but not the task creation and channel
+verification. Tasks on other devices stay committed. At most ``max_idle``
+stopped tasks are kept; the least recently used one beyond that is closed.
+
+``pool.stats`` reports pool hits, the cost of creating tasks, and the
+start-to-first-sample and profile-switch latencies.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from nidaqmx.constants import AcquisitionType, TaskMode, TerminalConfiguration
+
+from .backends import Backend, get_backend
+from .metrics import LatencyHistogram
+
+DEFAULT_PROFILE_PATH = os.path.join(
+    os.path.expanduser("~"), ".nidaqmx_on_pi", "profiles.json"
+)
+SAMPLE_MODES = ("continuous", "finite")
+
+
+class ChannelProfile:
+    """One AI voltage channel (or range such as ``dev1/ai0:3``) of a profile."""
+
+    def __init__(
+        self,
+        physical_channel: str,
+        min_val: float = -10.0,
+        max_val: float = 10.0,
+        terminal_config: str = "RSE",
+        name: str = "",
+    ):
+        if terminal_config.upper() not in TerminalConfiguration.__members__:
+            raise ValueError(
+                f"unknown terminal_config {terminal_config!r}; expected one of "
+                f"{sorted(TerminalConfiguration.__members__)}"
+            )
+        if min_val >= max_val:
+            raise ValueError(f"min_val ({min_val}) must be below max_val ({max_val})")
+        self.physical_channel = physical_channel
+        self.min_val = float(min_val)
+        self.max_val = float(max_val)
+        self.terminal_config = terminal_config.upper()
+        self.name = name
+
+    @property
+    def device(self) -> str:
+        return self.physical_channel.strip("/").split("/", 1)[0].lower()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "physical_channel": self.physical_channel,
+            "min_val": self.min_val,
+            "max_val": self.max_val,
+            "terminal_config": self.terminal_config,
+            "name": self.name,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ChannelProfile":
+        return cls(
+            data["physical_channel"],
+            data.get("min_val", -10.0),
+            data.get("max_val", 10.0),
+            data.get("terminal_config", "RSE"),
+            data.get("name", ""),
+        )
+
+    def __repr__(self) -> str:
+        return f"ChannelProfile({self.physical_channel!r}, {self.min_val:g} to {self.max_val:g} V, {self.terminal_config})"
+
+
+class TaskProfile:
+    """Channels and timing of a hardware-timed analog-input task.
+
+    Args:
+        name: Name the profile is saved and listed under.
+        channels: The task's channels, in order.
+        rate: Sample clock rate in S/s.
+        sample_mode: ``"continuous"`` or ``"finite"``.
+        samples_per_channel: Samples to acquire in finite mode; a buffer
+            size hint in continuous mode.
+        input_buffer_size: Driver input buffer in samples per channel;
+            the driver's default when None.
+        autotune: Size the input buffer with ``autotune.tune_input_buffer``
+            unless ``input_buffer_size`` is given.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        channels: Iterable[ChannelProfile],
+        rate: float = 1000.0,
+        sample_mode: str = "continuous",
+        samples_per_channel: int = 1000,
+        input_buffer_size: Optional[int] = None,
+        autotune: bool = False,
+    ):
+        self.name = name
+        self.channels = list(channels)
+        if not self.channels:
+            raise ValueError(f"profile {name!r} has no channels")
+        if rate <= 0:
+            raise ValueError(f"profile {name!r}: rate must be positive, got {rate}")
+        if sample_mode not in SAMPLE_MODES:
+            raise ValueError(
+                f"profile {name!r}: sample_mode must be one of {SAMPLE_MODES}, got {sample_mode!r}"
+            )
+        self.rate = float(rate)
+        self.sample_mode = sample_mode
+        self.samples_per_channel = int(samples_per_channel)
+        self.input_buffer_size = input_buffer_size
+        self.autotune = autotune
+
+    @classmethod
+    def continuous_ai(
+        cls,
+        device: str,
+        channel: str,
+        rate: float,
+        min_val: float = -10.0,
+        max_val: float = 10.0,
+        terminal_config: str = "RSE",
+        name: str = "",
+        **kwargs: Any,
+    ) -> "TaskProfile":
+        """The profile of ``cli.start_continuous_ai_task`` with the same arguments."""
+        physical_channel = f"{device}/{channel}"
+        return cls(
+            name or physical_channel,
+            [ChannelProfile(physical_channel, min_val, max_val, terminal_config)],
+            rate,
+            **kwargs,
+        )
+
+    @classmethod
+    def from_task(cls, task: Any, name: str) -> "TaskProfile":
+        """Capture the AI channels and sample clock of an existing task.
+
+        Raises:
+            ValueError: If the task has no AI channels or no sample clock.
+        """
+        channels = [
+            ChannelProfile(
+                channel.physical_channel.name,
+                channel.ai_min,
+                channel.ai_max,
+                getattr(channel.ai_term_cfg, "name", str(channel.ai_term_cfg)),
+                channel.name if channel.name != channel.physical_channel.name else "",
+            )
+            for channel in task.ai_channels
+        ]
+        rate = task.timing.samp_clk_rate
+        if not rate:
+            raise ValueError(
+                f"task {task.name!r} has no sample clock; configure timing first"
+            )
+        mode = (
+            "finite"
+            if task.timing.samp_quant_samp_mode == AcquisitionType.FINITE
+            else "continuous"
+        )
+        return cls(name, channels, rate, mode, task.timing.samp_quant_samp_per_chan)
+
+    @property
+    def devices(self) -> Set[str]:
+        return {channel.device for channel in self.channels}
+
+    @property
+    def key(self) -> str:
+        """Identifies the task setup; profiles with equal keys share a pooled task."""
+        settings = self.to_dict()
+        del settings["name"]
+        return json.dumps(settings, sort_keys=True)
+
+    def configure(self, task: Any) -> None:
+        """Add the channels and timing to a new task."""
+        for channel in self.channels:
+            task.ai_channels.add_ai_voltage_chan(
+                channel.physical_channel,
+                name_to_assign_to_channel=channel.name,
+                terminal_config=TerminalConfiguration[channel.terminal_config],
+                min_val=channel.min_val,
+                max_val=channel.max_val,
+            )
+        mode = (
+            AcquisitionType.FINITE
+            if self.sample_mode == "finite"
+            else AcquisitionType.CONTINUOUS
+        )
+        task.timing.cfg_samp_clk_timing(
+            self.rate, sample_mode=mode, samps_per_chan=self.samples_per_channel
+        )
+        if self.input_buffer_size is not None:
+            task.in_stream.input_buf_size = self.input_buffer_size
+        elif self.autotune:
+            from .autotune import tune_input_buffer
+
+            tune_input_buffer(task)
+
+    def create_task(
+        self, backend: Optional[Backend] = None, commit: bool = False
+    ) -> Any:
+        """Create, configure and verify (or commit) a task for this profile.
+
+        The task is closed again if the driver rejects the configuration.
+        """
+        if backend is None:
+            backend = get_backend()
+        task = backend.create_task()
+        try:
+            self.configure(task)
+            task.control(TaskMode.TASK_COMMIT if commit else TaskMode.TASK_VERIFY)
+        except Exception:
+            task.close()
+            raise
+        return task
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "channels": [channel.to_dict() for channel in self.channels],
+            "rate": self.rate,
+            "sample_mode": self.sample_mode,
+            "samples_per_channel": self.samples_per_channel,
+            "input_buffer_size": self.input_buffer_size,
+            "autotune": self.autotune,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TaskProfile":
+        return cls(
+            data["name"],
+            [ChannelProfile.from_dict(channel) for channel in data["channels"]],
+            data.get("rate", 1000.0),
+            data.get("sample_mode", "continuous"),
+            data.get("samples_per_channel", 1000),
+            data.get("input_buffer_size"),
+            data.get("autotune", False),
+        )
+
+    def __repr__(self) -> str:
+        channels = ", ".join(channel.physical_channel for channel in self.channels)
+        return f"TaskProfile({self.name!r}: {channels} at {self.rate:g} S/s {self.sample_mode})"
+
+
+def load_profiles(path: str = DEFAULT_PROFILE_PATH) -> "OrderedDict[str, TaskProfile]":
+    """Read the profiles saved in ``path``, by name; empty if it does not exist.
+
+    Raises:
+        ValueError: If the file is not a valid profile file.
+    """
+    if not os.path.exists(path):
+        return OrderedDict()
+    with open(path, "r", encoding="utf-8") as handle:
+        data = json.load(handle)
+    try:
+        profiles = [TaskProfile.from_dict(item) for item in data["profiles"]]
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"{path}: invalid profile file: {e}") from e
+    return OrderedDict((profile.name, profile) for profile in profiles)
+
+
+def save_profiles(
+    profiles: Iterable[TaskProfile], path: str = DEFAULT_PROFILE_PATH
+) -> None:
+    """Write ``profiles`` to ``path``, replacing the file atomically."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temporary = path + ".tmp"
+    with open(temporary, "w", encoding="utf-8") as handle:
+        json.dump(
+            {"profiles": [profile.to_dict() for profile in profiles]}, handle, indent=2
+        )
+    os.replace(temporary, path)
+
+
+class PoolStats:
+    """Hit counters and latencies of a :class:`TaskPool`."""
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.unreserves = 0
+        self.create_latency = LatencyHistogram()
+        self.start_latency = LatencyHistogram()
+        self.first_sample_latency = LatencyHistogram()
+        self.switch_latency = LatencyHistogram()
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "unreserves": self.unreserves,
+            "create_seconds": self.create_latency.as_dict(),
+            "start_seconds": self.start_latency.as_dict(),
+            "first_sample_seconds": self.first_sample_latency.as_dict(),
+            "switch_seconds": self.switch_latency.as_dict(),
+        }
+
+
+class _PooledTask:
+    def __init__(self, profile: TaskProfile, task: Any):
+        self.profile = profile
+        self.task = task
+        self.committed = False
+        self.running = False
+
+
+class TaskPool:
+    """Keep one verified (and, while usable, committed) task per profile.
+
+    Args:
+        backend: Creates the tasks; defaults to ``get_backend()``.
+        max_idle: Stopped tasks kept for later starts.
+
+    All methods may be called from any thread; the pool serialises them.
+    """
+
+    def __init__(self, backend: Optional[Backend] = None, max_idle: int = 4):
+        if max_idle < 1:
+            raise ValueError("max_idle must be at least 1")
+        self.backend = backend if backend is not None else get_backend()
+        self.max_idle = max_idle
+        self.stats = PoolStats()
+        self._entries: "OrderedDict[str, _PooledTask]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def owns(self, task: Any) -> bool:
+        return any(entry.task is task for entry in self._entries.values())
+
+    def running(self) -> List[TaskProfile]:
+        """Profiles whose tasks are running."""
+        return [entry.profile for entry in self._entries.values() if entry.running]
+
+    def get(self, profile: TaskProfile) -> Any:
+        """Return the profile's committed task, creating it on first use."""
+        with self._lock:
+            return self._prepare(profile).task
+
+    def start(
+        self,
+        profile: TaskProfile,
+        wait_first_sample: bool = False,
+        timeout: float = 10.0,
+    ) -> Any:
+        """Start the profile's task and return it.
+
+        With ``wait_first_sample`` the call returns once the first sample is
+        in the driver buffer and records the start-to-first-sample latency.
+
+        Raises:
+            TimeoutError: If no sample arrives within ``timeout`` seconds.
+        """
+        started = time.perf_counter()
+        with self._lock:
+            entry = self._prepare(profile)
+            if not entry.running:
+                entry.task.start()
+                entry.running = True
+        self.stats.start_latency.observe(time.perf_counter() - started)
+        if wait_first_sample:
+            self._wait_first_sample(entry.task, timeout)
+            self.stats.first_sample_latency.observe(time.perf_counter() - started)
+        return entry.task
+
+    def stop(self, profile: TaskProfile) -> None:
+        """Stop the profile's task; it stays committed for the next start."""
+        with self._lock:
+            entry = self._entries.get(profile.key)
+            if entry is not None and entry.running:
+                entry.task.stop()
+                entry.running = False
+                self._evict()
+
+    def switch(
+        self,
+        profile: TaskProfile,
+        wait_first_sample: bool = False,
+        timeout: float = 10.0,
+    ) -> Any:
+        """Stop every other running profile and start ``profile``."""
+        started = time.perf_counter()
+        with self._lock:
+            for entry in list(self._entries.values()):
+                if entry.running and entry.profile.key != profile.key:
+                    self.stop(entry.profile)
+            task = self.start(profile, wait_first_sample, timeout)
+        self.stats.switch_latency.observe(time.perf_counter() - started)
+        return task
+
+    def discard(self, profile: TaskProfile) -> None:
+        """Close the profile's task, for example after its device was removed."""
+        with self._lock:
+            entry = self._entries.pop(profile.key, None)
+            if entry is not None:
+                entry.task.close()
+
+    def close(self) -> None:
+        """Close every pooled task."""
+        with self._lock:
+            for entry in self._entries.values():
+                try:
+                    entry.task.close()
+                except Exception:
+                    pass
+            self._entries.clear()
+
+    def __enter__(self) -> "TaskPool":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def _prepare(self, profile: TaskProfile) -> _PooledTask:
+        key = profile.key
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            started = time.perf_counter()
+            entry = _PooledTask(profile, profile.create_task(self.backend))
+            self.stats.create_latency.observe(time.perf_counter() - started)
+            self._entries[key] = entry
+        else:
+            self.stats.hits += 1
+            entry.profile = profile
+        self._entries.move_to_end(key)
+        if not entry.committed:
+            self._unreserve_conflicts(entry)
+            entry.task.control(TaskMode.TASK_COMMIT)
+            entry.committed = True
+        self._evict()
+        return entry
+
+    def _unreserve_conflicts(self, wanted: _PooledTask) -> None:
+        devices = wanted.profile.devices
+        for entry in self._entries.values():
+            if (
+                entry is wanted
+                or not entry.committed
+                or not devices & entry.profile.devices
+            ):
+                continue
+            if entry.running:
+                raise RuntimeError(
+                    f"profile {entry.profile.name!r} is running on {sorted(devices & entry.profile.devices)}; "
+                    "stop it or use switch()"
+                )
+            entry.task.control(TaskMode.TASK_UNRESERVE)
+            entry.committed = False
+            self.stats.unreserves += 1
+
+    def _evict(self) -> None:
+        idle = [key for key, entry in self._entries.items() if not entry.running]
+        for key in idle[: max(len(idle) - self.max_idle, 0)]:
+            self._entries.pop(key).task.close()
+            self.stats.evictions += 1
+
+    @staticmethod
+    def _wait_first_sample(task: Any, timeout: float) -> None:
+        deadline = time.monotonic() + timeout
+        while int(task.in_stream.avail_samp_per_chan) == 0:
+            if time.monotonic() > deadline:
+                raise TimeoutError(
+                    f"no sample from task {task.name!r} within {timeout} s"
+                )
+            time.sleep(0.0001)
@@ -0,0 +1,948 @@
+"""Chunked binary recording of acquired samples.
+
+File format (``.ndq``)::
+
+    offset 0   8 bytes   magic b"NDQPIREC"
+    offset 8   uint32    format version
+    offset 12  uint32    length of the space padded JSON header in bytes
+    offset 16  ...       UTF-8 JSON header, space padded
+    data_offset ...      samples, row-major (samples x channels)
+
+``data_offset`` is stored in the header and is a multiple of 4096 so the data
+section can be memory-mapped. The header records the sample dtype, the rate,
+and per-channel metadata (device, channel, range, terminal configuration).
+Raw recordings store int16 ADC codes and the per-channel ``scaling``
+polynomials needed to convert them to volts (see :mod:`.scaling`).
+Samples are appended in large chunks; the number of samples is derived from
+the file size, so a file cut short by a power loss is still readable up to
+the last complete row.
+
+Samples that never reach the file, because the source lost blocks, the
+recorder had to drop them or a chunk could not be written, leave a gap: the samples on either side are
+adjacent in the file but not in time. The header's ``gaps`` lists each one
+as ``[file_sample, source_sample, missing]``: the file position after the
+gap, the source sample index stored there and the number of samples
+missing before it. ``first_sample`` is the source index of the first row.
+
+A :class:`Recorder` copies blocks from the acquisition thread into a bounded
+pool of chunk buffers and a dedicated writer thread appends full chunks to
+disk. The acquisition thread never waits for the disk: when every chunk
+buffer is queued the incoming samples are dropped and counted, and
+:class:`RecorderStats` exposes how close the writer is to that point. A
+chunk that fails to write (a full disk, say) is cut off again so later
+samples keep their place, and recording carries on after the gap.
+"""
+
+import json
+import os
+import queue
+import struct
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .decimation import envelope_decimate
+from .scaling import RAW_DTYPE, apply_scaling, scaling_coefficients
+
+MAGIC = b"NDQPIREC"
+FORMAT_VERSION = 1
+ALIGNMENT = 4096
+_PREFIX = struct.Struct("<8sII")
+# Room left in the header for fields filled in when the recording is closed.
+_HEADER_SLACK = 1024
+
+
+class ChannelInfo:
+    """Metadata for one recorded channel."""
+
+    def __init__(
+        self,
+        name: str,
+        physical_channel: str = "",
+        min_val: float = -10.0,
+        max_val: float = 10.0,
+        terminal_config: str = "",
+        units: str = "V",
+    ):
+        self.name = name
+        self.physical_channel = physical_channel or name
+        self.device = self.physical_channel.lstrip("/").split("/", 1)[0]
+        self.min_val = min_val
+        self.max_val = max_val
+        self.terminal_config = terminal_config
+        self.units = units
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "device": self.device,
+            "physical_channel": self.physical_channel,
+            "min_val": self.min_val,
+            "max_val": self.max_val,
+            "terminal_config": self.terminal_config,
+            "units": self.units,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ChannelInfo":
+        return cls(
+            data["name"],
+            data.get("physical_channel", ""),
+            data.get("min_val", -10.0),
+            data.get("max_val", 10.0),
+            data.get("terminal_config", ""),
+            data.get("units", "V"),
+        )
+
+    def __repr__(self) -> str:
+        return f"ChannelInfo(name={self.name!r}, physical_channel={self.physical_channel!r})"
+
+
+def channel_info_from_task(task: Any) -> List[ChannelInfo]:
+    """Read the AI channel configuration of a task."""
+    infos = []
+    for channel in task.ai_channels:
+        terminal_config = getattr(channel.ai_term_cfg, "name", str(channel.ai_term_cfg))
+        infos.append(
+            ChannelInfo(
+                channel.name,
+                channel.physical_channel.name,
+                channel.ai_min,
+                channel.ai_max,
+                terminal_config,
+            )
+        )
+    return infos
+
+
+def _write_header(
+    handle: Any, header: Dict[str, Any], data_offset: Optional[int] = None
+) -> int:
+    """Write the prefix and JSON header at the start of ``handle``.
+
+    Returns the data offset. When ``data_offset`` is given the header must
+    fit in the space before it.
+    """
+    header = dict(header)
+    body = json.dumps(header).encode("utf-8")
+    if data_offset is None:
+        needed = _PREFIX.size + len(body) + _HEADER_SLACK + 32
+        data_offset = -(-needed // ALIGNMENT) * ALIGNMENT
+    header["data_offset"] = data_offset
+    body = json.dumps(header).encode("utf-8")
+    space = data_offset - _PREFIX.size
+    if len(body) > space:
+        raise ValueError("Recording header does not fit in the reserved space")
+    handle.seek(0)
+    handle.write(_PREFIX.pack(MAGIC, FORMAT_VERSION, space))
+    handle.write(body.ljust(space, b" "))
+    return data_offset
+
+
+def read_header(path: str) -> Dict[str, Any]:
+    """Read the JSON header of a recording.
+
+    Raises:
+        ValueError: If the file is not a recording in a supported version.
+    """
+    with open(path, "rb") as handle:
+        prefix = handle.read(_PREFIX.size)
+        if len(prefix) < _PREFIX.size:
+            raise ValueError(f"{path} is too short to be a recording")
+        magic, version, length = _PREFIX.unpack(prefix)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a nidaqmx_on_pi recording")
+        if version > FORMAT_VERSION:
+            raise ValueError(
+                f"{path} uses format version {version}; this reader supports {FORMAT_VERSION}"
+            )
+        return json.loads(handle.read(length).decode("utf-8"))
+
+
+def write_recording(
+    path: str,
+    data: np.ndarray,
+    channels: Sequence[ChannelInfo],
+    sample_rate: float,
+    attrs: Optional[Dict[str, Any]] = None,
+    scaling: Optional[np.ndarray] = None,
+) -> int:
+    """Write a complete recording of ``(channels, samples)`` ``data`` at once.
+
+    For short segments, such as triggered captures, that do not need a
+    :class:`Recorder` and its writer thread. Returns the bytes written.
+    """
+    dtype = data.dtype.newbyteorder("<")
+    now = datetime.now(timezone.utc).isoformat()
+    header: Dict[str, Any] = {
+        "version": FORMAT_VERSION,
+        "dtype": dtype.str,
+        "num_channels": len(channels),
+        "sample_rate": float(sample_rate),
+        "started_at": now,
+        "channels": [channel.to_dict() for channel in channels],
+        "attrs": dict(attrs or {}),
+        "stopped_at": now,
+        "num_samples": data.shape[1],
+        "samples_dropped": 0,
+    }
+    if scaling is not None:
+        header["scaling"] = np.asarray(scaling, dtype=np.float64).tolist()
+    rows = np.ascontiguousarray(data.T, dtype=dtype)
+    with open(path, "wb") as handle:
+        data_offset = _write_header(handle, header)
+        handle.seek(data_offset)
+        handle.write(memoryview(rows).cast("B"))
+    return data_offset + rows.nbytes
+
+
+class RecorderStats:
+    """Throughput and back-pressure counters of a :class:`Recorder`."""
+
+    def __init__(self) -> None:
+        self.samples_received = 0
+        self.samples_written = 0
+        # Dropped by the producer thread because every chunk buffer was queued.
+        self.samples_dropped = 0
+        # Lost by the writer thread to chunks that failed to write.
+        self.samples_lost = 0
+        self.write_errors = 0
+        self.gaps = 0
+        self.samples_missing = 0
+        self.bytes_written = 0
+        self.chunks_written = 0
+        self.pending_chunks = 0
+        self.max_pending_chunks = 0
+        self.write_seconds = 0.0
+        self.max_write_seconds = 0.0
+        self.started_at = time.monotonic()
+        self.last_error: Optional[BaseException] = None
+
+    @property
+    def write_bytes_per_second(self) -> float:
+        """Disk throughput while writing (excludes idle time)."""
+        return (
+            self.bytes_written / self.write_seconds if self.write_seconds > 0 else 0.0
+        )
+
+    @property
+    def bytes_per_second(self) -> float:
+        """Sustained throughput since the recording started."""
+        elapsed = time.monotonic() - self.started_at
+        return self.bytes_written / elapsed if elapsed > 0 else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "samples_received": self.samples_received,
+            "samples_written": self.samples_written,
+            "samples_dropped": self.samples_dropped,
+            "samples_lost": self.samples_lost,
+            "write_errors": self.write_errors,
+            "gaps": self.gaps,
+            "samples_missing": self.samples_missing,
+            "bytes_written": self.bytes_written,
+            "chunks_written": self.chunks_written,
+            "pending_chunks": self.pending_chunks,
+            "max_pending_chunks": self.max_pending_chunks,
+            "bytes_per_second": self.bytes_per_second,
+            "write_bytes_per_second": self.write_bytes_per_second,
+            "max_write_seconds": self.max_write_seconds,
+            "last_error": str(self.last_error) if self.last_error else None,
+        }
+
+
+class Recorder:
+    """Append blocks of samples to a recording file on a writer thread.
+
+    Args:
+        path: Output file; an existing file is overwritten.
+        channels: Metadata for each channel, in block row order.
+        sample_rate: Sample rate in S/s.
+        dtype: Sample type stored on disk.
+        chunk_bytes: Size of each chunk handed to the writer thread.
+        max_buffer_bytes: Upper bound on memory used for chunk buffers.
+        fsync_interval: Seconds between ``os.fsync`` calls; ``None`` leaves
+            syncing to the OS.
+        attrs: Extra JSON-serialisable metadata stored in the header.
+        pyramid: Build the min/max pyramid (see :func:`build_pyramid`) when
+            the recording is closed.
+        scaling: ``(channels, terms)`` raw-to-volts coefficients when the
+            samples are unscaled ADC codes; stored in the header.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        channels: Sequence[ChannelInfo],
+        sample_rate: float,
+        dtype: Any = np.float64,
+        chunk_bytes: int = 4 << 20,
+        max_buffer_bytes: int = 64 << 20,
+        fsync_interval: Optional[float] = 10.0,
+        attrs: Optional[Dict[str, Any]] = None,
+        pyramid: bool = False,
+        scaling: Optional[np.ndarray] = None,
+    ):
+        self.path = path
+        self.channels = list(channels)
+        self.num_channels = len(self.channels)
+        self.sample_rate = float(sample_rate)
+        self.dtype = np.dtype(dtype).newbyteorder("<")
+        self.fsync_interval = fsync_interval
+        self.pyramid = pyramid
+        self.scaling = (
+            None if scaling is None else np.asarray(scaling, dtype=np.float64)
+        )
+        self.stats = RecorderStats()
+
+        row_bytes = self.num_channels * self.dtype.itemsize
+        self.chunk_samples = max(chunk_bytes // row_bytes, 1)
+        num_chunks = max(max_buffer_bytes // (self.chunk_samples * row_bytes), 2)
+        self._free: "queue.Queue[np.ndarray]" = queue.Queue()
+        for _ in range(num_chunks):
+            self._free.put(
+                np.empty((self.chunk_samples, self.num_channels), dtype=self.dtype)
+            )
+        self._full: "queue.Queue[Optional[Tuple[np.ndarray, int]]]" = queue.Queue()
+        self._current: Optional[np.ndarray] = None
+        self._fill = 0
+        self._closed = False
+        self._sources: List[Any] = []
+        # Serialises _on_block with close(): a source may still be running a
+        # callback it took before detach().
+        self._lock = threading.Lock()
+        # Discontinuities as (file_sample, source_sample, missing); see the
+        # module docstring. _next_source follows the last accepted sample.
+        self.gaps: List[Tuple[int, int, int]] = []
+        self.first_sample: Optional[int] = None
+        self._accepted = 0
+        self._next_source: Optional[int] = None
+        self._next_call = 0
+        # Chunks the writer thread failed to write, as (accepted_sample, count).
+        self._lost: List[Tuple[int, int]] = []
+
+        self.header: Dict[str, Any] = {
+            "version": FORMAT_VERSION,
+            "dtype": self.dtype.str,
+            "num_channels": self.num_channels,
+            "sample_rate": self.sample_rate,
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "channels": [channel.to_dict() for channel in self.channels],
+            "attrs": dict(attrs or {}),
+        }
+        if self.scaling is not None:
+            self.header["scaling"] = self.scaling.tolist()
+        # Unbuffered, so a failed write cannot leave bytes behind to be
+        # flushed later at the wrong place.
+        self._file = open(path, "w+b", buffering=0)
+        self.data_offset = _write_header(self._file, self.header)
+        self._file.seek(self.data_offset)
+        self._thread = threading.Thread(target=self._run, name="Recorder", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def from_task(
+        cls, task: Any, path: str, raw: bool = False, **kwargs: Any
+    ) -> "Recorder":
+        """Create a recorder using the channel and timing setup of ``task``.
+
+        With ``raw=True`` the recorder stores int16 codes from a raw
+        ``StreamingReader`` together with the task's scaling coefficients.
+        """
+        rate = task.timing.samp_clk_rate
+        if raw:
+            kwargs.setdefault("dtype", RAW_DTYPE)
+            kwargs.setdefault("scaling", scaling_coefficients(task))
+        return cls(path, channel_info_from_task(task), rate, **kwargs)
+
+    # Producer side
+    def attach(self, source: Any) -> None:
+        """Record every block produced by a ``StreamingReader`` (or any BlockSource).
+
+        Raises:
+            ValueError: If the source is raw and the recorder is not, or the
+                other way round.
+        """
+        if (getattr(source, "scaling", None) is None) != (self.scaling is None):
+            kind = "raw" if self.scaling is None else "scaled"
+            raise ValueError(
+                f"Cannot record a {kind} stream; create the recorder with raw={kind == 'raw'}"
+            )
+        source.subscribe(self._on_block)
+        self._sources.append(source)
+
+    def detach(self) -> None:
+        for source in self._sources:
+            source.unsubscribe(self._on_block)
+        self._sources = []
+
+    def _on_block(self, block: Any) -> None:
+        with self._lock:
+            if not self._closed:
+                self.write(block.data, block.first_sample)
+
+    def write(self, data: np.ndarray, first_sample: Optional[int] = None) -> int:
+        """Queue a ``(channels, samples)`` array for writing.
+
+        Never blocks. Returns the number of samples accepted; the rest were
+        dropped because every chunk buffer is waiting for the disk.
+
+        Args:
+            data: Samples, one row per channel.
+            first_sample: Source index of the first sample, such as
+                ``Block.first_sample``. A jump from the end of the previous
+                accepted samples is stored as a gap. When None the samples
+                are taken to follow the previous call.
+        """
+        if self._closed:
+            raise ValueError("Recorder is closed")
+        expected = self._next_source
+        if first_sample is None:
+            first_sample = self._next_call
+        self._next_call = first_sample + data.shape[1]
+        accepted = self._append(data)
+        if accepted:
+            if expected is None:
+                self.first_sample = first_sample
+            elif first_sample != expected:
+                self.gaps.append(
+                    (self._accepted, first_sample, first_sample - expected)
+                )
+                self.stats.gaps += 1
+                self.stats.samples_missing += first_sample - expected
+            self._accepted += accepted
+            self._next_source = first_sample + accepted
+        return accepted
+
+    def _append(self, data: np.ndarray) -> int:
+        num_samples = data.shape[1]
+        self.stats.samples_received += num_samples
+        position = 0
+        while position < num_samples:
+            if self._current is None:
+                try:
+                    self._current = self._free.get_nowait()
+                except queue.Empty:
+                    self.stats.samples_dropped += num_samples - position
+                    return position
+                self._fill = 0
+            count = min(num_samples - position, self.chunk_samples - self._fill)
+            self._current[self._fill : self._fill + count] = data[
+                :, position : position + count
+            ].T
+            self._fill += count
+            position += count
+            if self._fill == self.chunk_samples:
+                self._submit_current()
+        return num_samples
+
+    def _submit_current(self) -> None:
+        if self._current is None:
+            return
+        self._full.put((self._current, self._fill))
+        self._current = None
+        self._fill = 0
+        pending = self._full.qsize()
+        self.stats.pending_chunks = pending
+        if pending > self.stats.max_pending_chunks:
+            self.stats.max_pending_chunks = pending
+
+    def flush(self) -> None:
+        """Hand a partially filled chunk to the writer thread."""
+        if self._fill:
+            self._submit_current()
+
+    def close(self) -> None:
+        """Write everything still buffered, finalise the header and close."""
+        if self._closed:
+            return
+        self.detach()
+        with self._lock:
+            self.flush()
+            self._closed = True
+        self._full.put(None)
+        self._thread.join()
+        self.header["stopped_at"] = datetime.now(timezone.utc).isoformat()
+        self.header["num_samples"] = self.stats.samples_written
+        self.header["samples_dropped"] = (
+            self.stats.samples_dropped + self.stats.samples_lost
+        )
+        self.header["first_sample"] = self.first_sample
+        self.gaps = self._file_gaps()
+        self._write_final_header()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        if self.pyramid:
+            build_pyramid(self.path)
+
+    def _file_gaps(self) -> List[Tuple[int, int, int]]:
+        """Merge the source gaps with the chunks lost to write errors.
+
+        ``gaps`` counts file samples as accepted by :meth:`write`; every lost
+        chunk shifts the samples after it and becomes a gap of its own.
+        """
+        if not self._lost:
+            return list(self.gaps)
+
+        def resume(accepted: int) -> int:
+            # The first accepted sample at or after ``accepted`` in the file.
+            for start, count in self._lost:
+                if start <= accepted < start + count:
+                    accepted = start + count
+            return accepted
+
+        missing: Dict[int, int] = {}
+        for accepted, _, count in self.gaps:
+            at = resume(accepted)
+            missing[at] = missing.get(at, 0) + count
+        for start, count in self._lost:
+            at = resume(start)
+            missing[at] = missing.get(at, 0) + count
+        gaps = []
+        first_sample = self.first_sample or 0
+        for at in sorted(missing):
+            source = first_sample + at
+            source += sum(count for accepted, _, count in self.gaps if accepted <= at)
+            dropped = sum(count for start, count in self._lost if start + count <= at)
+            gaps.append((at - dropped, source, missing[at]))
+        return gaps
+
+    def _write_final_header(self) -> None:
+        # The header cannot grow past the data offset; keep the first gaps
+        # that fit and flag the list as truncated.
+        gaps = [list(gap) for gap in self.gaps]
+        while True:
+            self.header["gaps"] = gaps
+            if len(gaps) < len(self.gaps):
+                self.header["gaps_truncated"] = True
+            try:
+                _write_header(self._file, self.header, self.data_offset)
+                return
+            except ValueError:
+                if not gaps:
+                    raise
+                del gaps[len(gaps) // 2 :]
+
+    def __enter__(self) -> "Recorder":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    # Writer thread
+    def _write_chunk(self, chunk: np.ndarray, count: int) -> None:
+        view = memoryview(chunk[:count]).cast("B")
+        while view:
+            view = view[self._file.write(view) :]
+
+    def _run(self) -> None:
+        stats = self.stats
+        row_bytes = self.num_channels * self.dtype.itemsize
+        last_sync = time.monotonic()
+        while True:
+            item = self._full.get()
+            if item is None:
+                break
+            chunk, count = item
+            start = time.monotonic()
+            try:
+                self._write_chunk(chunk, count)
+            except Exception as e:
+                # Keep draining so the producer does not stall. Cut off what
+                # part of the chunk did reach the file, so the samples after
+                # it keep their place, and record the loss as a gap.
+                stats.last_error = e
+                stats.write_errors += 1
+                self._lost.append((stats.samples_written + stats.samples_lost, count))
+                stats.samples_lost += count
+                end = self.data_offset + stats.samples_written * row_bytes
+                try:
+                    self._file.truncate(end)
+                    self._file.seek(end)
+                except OSError:
+                    pass
+            else:
+                elapsed = time.monotonic() - start
+                stats.write_seconds += elapsed
+                stats.max_write_seconds = max(stats.max_write_seconds, elapsed)
+                stats.samples_written += count
+                stats.bytes_written += count * chunk.shape[1] * chunk.itemsize
+                stats.chunks_written += 1
+            stats.pending_chunks = self._full.qsize()
+            self._free.put(chunk)
+            if (
+                self.fsync_interval is not None
+                and time.monotonic() - last_sync > self.fsync_interval
+            ):
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                last_sync = time.monotonic()
+
+
+PYRAMID_MAGIC = b"NDQPIPYR"
+PYRAMID_SUFFIX = ".pyr"
+
+
+def _channel_index(channels: Sequence[ChannelInfo], key: Any) -> int:
+    if isinstance(key, str):
+        for i, channel in enumerate(channels):
+            if key in (channel.name, channel.physical_channel):
+                return i
+        raise KeyError(f"No channel named {key!r} in the recording")
+    return int(key)
+
+
+class Pyramid:
+    """Precomputed min/max envelope of a recording at several resolutions.
+
+    Level ``k`` summarises bins of ``bin_sizes[k]`` samples; each level is a
+    memory-mapped array of shape ``(bins, channels, 2)`` holding the minimum
+    and maximum of every bin. The sidecar file uses the same prefix and
+    aligned JSON header as a recording. Create one with :func:`build_pyramid`.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as handle:
+            magic, version, length = _PREFIX.unpack(handle.read(_PREFIX.size))
+            if magic != PYRAMID_MAGIC:
+                raise ValueError(f"{path} is not a recording pyramid")
+            self.header = json.loads(handle.read(length).decode("utf-8"))
+        self.source_samples: int = self.header["source_samples"]
+        dtype = np.dtype(self.header["dtype"])
+        num_channels = self.header["num_channels"]
+        self.bin_sizes: List[int] = []
+        self.levels: List[np.ndarray] = []
+        for level in self.header["levels"]:
+            self.bin_sizes.append(level["bin_size"])
+            shape = (level["num_bins"], num_channels, 2)
+            if level["num_bins"]:
+                array = np.memmap(
+                    path, dtype=dtype, mode="r", offset=level["offset"], shape=shape
+                )
+            else:
+                array = np.empty(shape, dtype=dtype)
+            self.levels.append(array)
+
+    def level_for(self, samples_per_bin: int) -> Optional[int]:
+        """Index of the coarsest level with bins no larger than ``samples_per_bin``."""
+        best = None
+        for i, bin_size in enumerate(self.bin_sizes):
+            if bin_size <= samples_per_bin:
+                best = i
+        return best
+
+
+def build_pyramid(
+    path: str, base_bin: int = 256, factor: int = 4, chunk_bins: int = 4096
+) -> Pyramid:
+    """Compute the min/max pyramid of a recording and store it next to it.
+
+    Reads the recording once in chunks of ``chunk_bins * base_bin`` samples,
+    so memory use stays bounded however long the recording is. Each level
+    is ``factor`` times coarser than the previous one, down to a single bin.
+    Samples after the last whole ``base_bin`` are not summarised; readers
+    fall back to the raw data for them.
+
+    Returns:
+        The new :class:`Pyramid`, stored at ``path + ".pyr"``.
+    """
+    with RecordingReader(path, load_pyramid=False) as reader:
+        source = reader.data
+        num_samples = reader.num_samples
+        num_channels = reader.num_channels
+        dtype = reader.dtype
+
+        levels = []
+        bin_size, num_bins = base_bin, num_samples // base_bin
+        while True:
+            levels.append({"bin_size": bin_size, "num_bins": num_bins})
+            if num_bins <= 1:
+                break
+            bin_size, num_bins = bin_size * factor, num_bins // factor
+        header: Dict[str, Any] = {
+            "version": FORMAT_VERSION,
+            "dtype": dtype.str,
+            "num_channels": num_channels,
+            "source_samples": num_samples,
+            "levels": levels,
+        }
+        # Reserve the header space first; level offsets only depend on sizes.
+        row_bytes = num_channels * 2 * dtype.itemsize
+        probe = dict(header, levels=[dict(level, offset=2**62) for level in levels])
+        offset = len(json.dumps(probe)) + _PREFIX.size + _HEADER_SLACK
+        offset = -(-offset // ALIGNMENT) * ALIGNMENT
+        for level in levels:
+            level["offset"] = offset
+            offset += -(-level["num_bins"] * row_bytes // ALIGNMENT) * ALIGNMENT
+
+        pyramid_path = path + PYRAMID_SUFFIX
+        with open(pyramid_path, "w+b") as handle:
+            body = json.dumps(header).encode("utf-8")
+            space = levels[0]["offset"] - _PREFIX.size
+            handle.write(_PREFIX.pack(PYRAMID_MAGIC, FORMAT_VERSION, space))
+            handle.write(body.ljust(space, b" "))
+            handle.truncate(offset)
+
+        previous: Optional[np.ndarray] = None
+        for i, level in enumerate(levels):
+            if level["num_bins"] == 0:
+                break
+            shape = (level["num_bins"], num_channels, 2)
+            target = np.memmap(
+                pyramid_path,
+                dtype=dtype,
+                mode="r+",
+                offset=level["offset"],
+                shape=shape,
+            )
+            # Level 0 reduces raw samples, later levels reduce the level below.
+            group = base_bin if previous is None else factor
+            for first in range(0, level["num_bins"], chunk_bins):
+                last = min(first + chunk_bins, level["num_bins"])
+                if previous is None:
+                    chunk = source[first * group : last * group].reshape(
+                        last - first, group, num_channels
+                    )
+                    np.min(chunk, axis=1, out=target[first:last, :, 0])
+                    np.max(chunk, axis=1, out=target[first:last, :, 1])
+                else:
+                    chunk = previous[first * group : last * group].reshape(
+                        last - first, group, num_channels, 2
+                    )
+                    np.min(chunk[..., 0], axis=1, out=target[first:last, :, 0])
+                    np.max(chunk[..., 1], axis=1, out=target[first:last, :, 1])
+            target.flush()
+            previous = target
+        del previous, target
+    return Pyramid(pyramid_path)
+
+
+class RecordingReader:
+    """Random access to a recording through a read-only memory map.
+
+    Nothing is read up front: slices are NumPy views into the mapped file
+    and the OS pages in only the parts that are touched, so multi-gigabyte
+    recordings can be browsed on a Raspberry Pi. Files that were cut short
+    (for example by a power loss) are readable up to the last complete row.
+
+    ``gaps`` lists the ``(file_sample, source_sample, missing)``
+    discontinuities recorded in the header. Sample positions in
+    :meth:`read` are rows of the file; :meth:`read_seconds` and
+    :attr:`duration` count time, including the missing samples.
+
+    If a pyramid built by :func:`build_pyramid` is present and matches the
+    recording, :meth:`envelope` uses it to summarise long ranges in time
+    proportional to the number of output bins rather than the number of
+    samples.
+
+    Args:
+        path: Recording file.
+        load_pyramid: Use ``path + ".pyr"`` when it exists and is current.
+    """
+
+    def __init__(self, path: str, load_pyramid: bool = True):
+        self.path = path
+        self.header = read_header(path)
+        self.dtype = np.dtype(self.header["dtype"])
+        self.num_channels: int = self.header["num_channels"]
+        self.sample_rate: float = self.header["sample_rate"]
+        self.channels = [ChannelInfo.from_dict(c) for c in self.header["channels"]]
+        scaling = self.header.get("scaling")
+        self.scaling: Optional[np.ndarray] = (
+            None if scaling is None else np.asarray(scaling, dtype=np.float64)
+        )
+        self.first_sample: int = self.header.get("first_sample") or 0
+        self.gaps: List[Tuple[int, int, int]] = [
+            (int(f), int(s), int(m)) for f, s, m in self.header.get("gaps", [])
+        ]
+        data_offset = self.header["data_offset"]
+        row_bytes = self.num_channels * self.dtype.itemsize
+        self.num_samples = max(os.path.getsize(path) - data_offset, 0) // row_bytes
+        if self.num_samples:
+            self.data: np.ndarray = np.memmap(
+                path,
+                dtype=self.dtype,
+                mode="r",
+                offset=data_offset,
+                shape=(self.num_samples, self.num_channels),
+            )
+        else:
+            self.data = np.empty((0, self.num_channels), dtype=self.dtype)
+
+        self.pyramid: Optional[Pyramid] = None
+        pyramid_path = path + PYRAMID_SUFFIX
+        if load_pyramid and os.path.exists(pyramid_path):
+            pyramid = Pyramid(pyramid_path)
+            if pyramid.source_samples == self.num_samples:
+                self.pyramid = pyramid
+
+    @property
+    def channel_names(self) -> List[str]:
+        return [channel.name for channel in self.channels]
+
+    @property
+    def duration(self) -> float:
+        """Time spanned by the recording in seconds, gaps included."""
+        return (
+            self.num_samples + sum(missing for _, _, missing in self.gaps)
+        ) / self.sample_rate
+
+    def file_sample(self, offset: int) -> int:
+        """File row of the sample ``offset`` samples after the first one.
+
+        A sample lost in a gap maps to the first row after the gap.
+        """
+        position = offset
+        for file_sample, source_sample, missing in self.gaps:
+            gap_end = source_sample - self.first_sample
+            if offset >= gap_end:
+                position = file_sample + offset - gap_end
+            else:
+                if offset > gap_end - missing:
+                    position = file_sample
+                break
+        return position
+
+    def _channel_selector(self, channels: Any) -> Any:
+        if channels is None:
+            return slice(None)
+        if isinstance(channels, slice):
+            return channels
+        if isinstance(channels, (str, int, np.integer)):
+            index = _channel_index(self.channels, channels)
+            return slice(index, index + 1)
+        return [_channel_index(self.channels, key) for key in channels]
+
+    @property
+    def raw(self) -> bool:
+        """True when the file stores unscaled ADC codes."""
+        return self.scaling is not None
+
+    def _scale(self, values: np.ndarray, selector: Any, scaled: bool) -> np.ndarray:
+        if not scaled or self.scaling is None:
+            return values
+        return apply_scaling(values, self.scaling[selector])
+
+    def read(
+        self,
+        start: int = 0,
+        stop: Optional[int] = None,
+        channels: Any = None,
+        scaled: bool = False,
+    ) -> np.ndarray:
+        """Return samples ``[start, stop)`` with shape ``(channels, samples)``.
+
+        Args:
+            channels: ``None`` for all channels, a channel name or index, a
+                slice, or a list of names/indices.
+            scaled: Convert raw recordings to volts. Has no effect on
+                recordings that are already scaled.
+
+        The result is a view into the file unless ``channels`` is a list or
+        ``scaled`` converts raw codes, both of which need a new array.
+        """
+        selector = self._channel_selector(channels)
+        return self._scale(self.data[start:stop, selector].T, selector, scaled)
+
+    def read_seconds(
+        self,
+        start: float,
+        stop: Optional[float] = None,
+        channels: Any = None,
+        scaled: bool = False,
+    ) -> np.ndarray:
+        """Like :meth:`read` with bounds given in seconds from the start.
+
+        Time runs on across gaps, so the result holds the samples recorded
+        in that interval, which is fewer than its length if it spans a gap.
+        """
+        first = self.file_sample(int(round(start * self.sample_rate)))
+        last = (
+            None
+            if stop is None
+            else self.file_sample(int(round(stop * self.sample_rate)))
+        )
+        return self.read(first, last, channels, scaled)
+
+    def envelope(
+        self,
+        start: int = 0,
+        stop: Optional[int] = None,
+        num_bins: int = 1000,
+        channels: Any = None,
+        scaled: bool = False,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Min/max envelope of samples ``[start, stop)`` for display.
+
+        The result has the same layout as
+        :func:`~nidaqmx_on_pi.decimation.envelope_decimate`: positions relative
+        to ``start`` and values of shape ``(channels, points)`` with each
+        bin's minimum followed by its maximum. Bins are aligned to whole
+        pyramid bins where a pyramid is used, so the edges of the range may
+        be trimmed by less than one bin. With ``scaled`` only the envelope
+        points of a raw recording are converted to volts, which assumes the
+        scaling polynomials are increasing (true for DAQmx devices).
+        """
+        start, stop, _ = slice(start, stop).indices(self.num_samples)
+        stop = max(stop, start)
+        num_bins = max(int(num_bins), 1)
+        per_bin = (stop - start) // num_bins
+        selector = self._channel_selector(channels)
+        level = self.pyramid.level_for(per_bin) if self.pyramid is not None else None
+        if level is None:
+            positions, values = envelope_decimate(
+                self.read(start, stop, selector), num_bins, start
+            )
+            return positions, self._scale(values, selector, scaled)
+
+        assert self.pyramid is not None
+        bin_size = self.pyramid.bin_sizes[level]
+        group = -(-per_bin // bin_size)
+        first_bin = -(-start // bin_size)
+        # Align groups to absolute bins so panning does not shimmer.
+        first_bin += (-first_bin) % group
+        count = (
+            min(stop, self.pyramid.source_samples) // bin_size - first_bin
+        ) // group
+        if count <= 0:
+            positions, values = envelope_decimate(
+                self.read(start, stop, selector), num_bins, start
+            )
+            return positions, self._scale(values, selector, scaled)
+        bins = self.pyramid.levels[level][
+            first_bin : first_bin + count * group, selector
+        ]
+        bins = bins.reshape(count, group, -1, 2)
+        out = np.empty((bins.shape[2], count, 2), dtype=self.dtype)
+        out[:, :, 0] = bins[..., 0].min(axis=1).T
+        out[:, :, 1] = bins[..., 1].max(axis=1).T
+
+        starts = (first_bin + np.arange(count) * group) * bin_size - start
+        positions = np.empty((count, 2), dtype=np.int64)
+        positions[:, 0] = starts
+        positions[:, 1] = starts + group * bin_size - 1
+        return positions.reshape(-1), self._scale(
+            out.reshape(out.shape[0], 2 * count), selector, scaled
+        )
+
+    def close(self) -> None:
+        """Drop the memory maps; views handed out earlier keep theirs alive."""
+        self.data = np.empty((0, self.num_channels), dtype=self.dtype)
+        self.num_samples = 0
+        self.pyramid = None
+
+    def __enter__(self) -> "RecordingReader":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return (
+            f"RecordingReader(path={self.path!r}, channels={self.num_channels}, "
+            f"samples={self.num_samples}, rate={self.sample_rate:g})"
+        )
@@ -0,0 +1,250 @@
+"""Replay recordings through the live acquisition pipeline.
+
+:class:`ReplaySource` is a :class:`~nidaqmx_on_pi.streaming.BlockSource` fed
+from ``.ndq`` recordings instead of a running task. Subscribers, ``get()``,
+``async for``, triggers, DSP stages, recorders and servers consume it exactly
+as they consume a :class:`~nidaqmx_on_pi.streaming.StreamingReader`, so a
+saved acquisition can be re-run to tune triggers and filters or as a
+repeatable regression input::
+
+    replay = ReplaySource("/data/run-1.ndq", samples_per_block=1000, speed=10.0)
+    capture = TriggeredCapture(EdgeTrigger(0, level=2.5), pre_samples=500, post_samples=2000)
+    capture.attach(replay)
+    replay.start().wait()
+
+Blocks are paced like a live acquisition: each one is published once its
+last sample would have been acquired at ``speed`` times the recorded rate.
+With ``speed=None`` blocks are published as fast as the subscribers process
+them, which measures the throughput of the processing pipeline on its own;
+``get()`` consumers that fall behind see overwritten blocks, as they would
+on a live reader. A replay that falls behind its schedule (slow
+subscribers) publishes the backlog without waiting, as a live reader drains
+the driver buffer.
+
+Gaps stored in a recording are replayed as gaps: no block spans one, and
+the block after it starts ``missing`` samples later (``first_sample`` jumps
+and pacing waits for the lost time), so consumers see the same
+discontinuity a live reader showed them.
+
+Several files are replayed back to back as one continuous stream and must
+agree on channel count, rate and raw scaling. Raw recordings produce raw
+blocks carrying the recorded scaling, like ``StreamingReader(raw=True)``,
+unless ``raw=False`` asks for volts.
+"""
+
+import time
+from typing import List, Optional, Sequence, Union
+
+import numpy as np
+
+from .recording import ChannelInfo, RecordingReader
+from .scaling import RAW_DTYPE, apply_scaling
+from .streaming import BlockSource
+
+
+class ReplaySource(BlockSource):
+    """Publish the samples of one or more recordings as pooled blocks.
+
+    Args:
+        paths: Recording file, or files replayed one after the other.
+        samples_per_block: Samples per channel per block; the last block of
+            a replay may be shorter.
+        speed: Multiple of the recorded rate to replay at (1.0 is real
+            time), or None for as fast as possible.
+        num_buffers: Number of buffers in the pool.
+        queue_blocks: Keep blocks for ``get()`` and ``async for``.
+        raw: Publish int16 codes with their scaling (True) or volts
+            (False). Defaults to the recordings' own format.
+        loop: Start again from the first file after the last one, for
+            replays that should run until stopped.
+
+    Raises:
+        ValueError: If the recordings do not match each other, ``speed`` is
+            not positive, or raw blocks are asked of a scaled recording.
+    """
+
+    def __init__(
+        self,
+        paths: Union[str, Sequence[str]],
+        samples_per_block: int = 1000,
+        speed: Optional[float] = 1.0,
+        num_buffers: int = 8,
+        queue_blocks: bool = True,
+        raw: Optional[bool] = None,
+        loop: bool = False,
+    ):
+        if isinstance(paths, str):
+            paths = [paths]
+        if not paths:
+            raise ValueError("at least one recording is required")
+        if speed is not None and speed <= 0:
+            raise ValueError(f"speed must be positive or None, got {speed}")
+        self.readers: List[RecordingReader] = []
+        try:
+            for path in paths:
+                self.readers.append(RecordingReader(path, load_pyramid=False))
+            first = self.readers[0]
+            for reader in self.readers[1:]:
+                if (
+                    reader.num_channels != first.num_channels
+                    or reader.sample_rate != first.sample_rate
+                ):
+                    raise ValueError(
+                        f"{reader.path}: {reader.num_channels} channels at {reader.sample_rate:g} S/s "
+                        f"do not match {first.path} ({first.num_channels} at {first.sample_rate:g} S/s)"
+                    )
+                if reader.raw != first.raw or (
+                    first.raw and not np.array_equal(reader.scaling, first.scaling)
+                ):
+                    raise ValueError(
+                        f"{reader.path}: raw scaling does not match {first.path}"
+                    )
+            if raw and not first.raw:
+                raise ValueError(
+                    f"{first.path} stores volts; raw blocks need a raw recording"
+                )
+            if loop and not self.num_samples:
+                raise ValueError("cannot loop over recordings without samples")
+        except Exception:
+            for reader in self.readers:
+                reader.close()
+            raise
+        self.paths = list(paths)
+        self.speed = speed
+        self.loop = loop
+        self.raw = first.raw if raw is None else raw
+        super().__init__(
+            first.num_channels,
+            samples_per_block,
+            num_buffers=num_buffers,
+            dtype=RAW_DTYPE if self.raw else np.float64,
+            queue_blocks=queue_blocks,
+        )
+        if self.raw:
+            self.scaling = first.scaling
+        # Converts raw recordings when volts were asked for.
+        self._convert = first.scaling if first.raw and not self.raw else None
+        # Gaps recorded in each file, as {file_sample: missing}.
+        self._gaps = [
+            {gap[0]: gap[2] for gap in reader.gaps} for reader in self.readers
+        ]
+        self._file = 0
+        self._offset = 0
+        self._paced_from = 0.0
+        self._paced_samples = 0
+
+    @property
+    def sample_rate(self) -> float:
+        return self.readers[0].sample_rate
+
+    @property
+    def channels(self) -> List[ChannelInfo]:
+        """Channel metadata of the recordings, in block row order."""
+        return self.readers[0].channels
+
+    @property
+    def num_samples(self) -> int:
+        """Samples per channel in all recordings together."""
+        return sum(reader.num_samples for reader in self.readers)
+
+    @property
+    def position(self) -> int:
+        """Samples per channel replayed since the start of the first file."""
+        return (
+            sum(reader.num_samples for reader in self.readers[: self._file])
+            + self._offset
+        )
+
+    @property
+    def finished(self) -> bool:
+        """True once every sample has been published (never when looping)."""
+        return not self.loop and self._file >= len(self.readers)
+
+    # Lifecycle
+    def start(self) -> "ReplaySource":
+        if not self.running:
+            self._paced_from = time.monotonic()
+            self._paced_samples = 0
+        super().start()
+        return self
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the replay to end; returns False on timeout."""
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        return not self.running
+
+    def rewind(self) -> None:
+        """Replay again from the first sample of the first file.
+
+        Block sequence numbers and ``first_sample`` start again from zero.
+
+        Raises:
+            RuntimeError: While the replay is running.
+        """
+        if self.running:
+            raise RuntimeError("stop the replay before rewinding it")
+        self._file = 0
+        self._offset = 0
+        self._sequence = 0
+        self._sample_index = 0
+
+    def close(self) -> None:
+        """Stop the replay and release the recordings."""
+        self.stop()
+        for reader in self.readers:
+            reader.close()
+
+    # Producer side
+    def _read_into(self, data: np.ndarray) -> int:
+        wanted = data.shape[1]
+        filled = 0
+        while filled < wanted:
+            if self._file >= len(self.readers):
+                if not self.loop:
+                    break
+                self._file = 0
+            reader = self.readers[self._file]
+            count = min(wanted - filled, reader.num_samples - self._offset)
+            if count <= 0:
+                self._file += 1
+                self._offset = 0
+                continue
+            missing = self._gaps[self._file].get(self._offset)
+            if missing is not None:
+                # A block never spans a gap; the next one starts after it.
+                if filled:
+                    break
+                self._sample_index += missing
+                self._paced_samples += max(missing, 0)
+            following = [f for f in self._gaps[self._file] if f > self._offset]
+            if following:
+                count = min(count, min(following) - self._offset)
+            rows = reader.data[self._offset : self._offset + count].T
+            if self._convert is not None:
+                apply_scaling(rows, self._convert, data[:, filled : filled + count])
+            else:
+                data[:, filled : filled + count] = rows
+            self._offset += count
+            filled += count
+        if not filled:
+            return -1
+        self._pace(filled)
+        return filled
+
+    def _pace(self, num_samples: int) -> None:
+        self._paced_samples += num_samples
+        if self.speed is None:
+            return
+        due = self._paced_from + self._paced_samples / (self.sample_rate * self.speed)
+        delay = due - time.monotonic()
+        if delay > 0:
+            self._stop_event.wait(delay)
+
+    def __repr__(self) -> str:
+        speed = "max" if self.speed is None else f"{self.speed:g}x"
+        return (
+            f"ReplaySource({len(self.readers)} file(s), channels={self.num_channels}, "
+            f"samples={self.num_samples}, rate={self.sample_rate:g}, speed={speed})"
+        )
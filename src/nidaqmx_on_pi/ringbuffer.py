@@ -0,0 +1,202 @@
+"""Fixed-capacity multi-channel ring buffer for one producer and many consumers.
+
+The ring stores ``(channels, capacity)`` samples in a single NumPy array.
+Positions are absolute sample indices that only ever grow, so a consumer can
+tell exactly how far it has fallen behind. The producer publishes a write by
+bumping an integer after the copy; consumers never take a lock.
+
+Reads return zero-copy views when the requested span is contiguous in storage
+and a single concatenated copy when it wraps around the end. Because the
+producer keeps writing, a view may be overwritten after it is returned; use
+:meth:`RingBuffer.is_valid` (or :meth:`RingCursor.still_valid`) after
+processing if that matters.
+
+A typical setup feeds the ring from a ``StreamingReader``::
+
+    ring = RingBuffer(reader.num_channels, capacity=rate * 10)
+    reader.subscribe(lambda block: ring.write(block.data))
+"""
+
+from typing import Any, Optional, Tuple
+
+import numpy as np
+
+
+class RingBuffer:
+    """NumPy-backed ring of ``num_channels`` x ``capacity`` samples.
+
+    Only one thread may call :meth:`write`. Any number of threads may read.
+    """
+
+    def __init__(self, num_channels: int, capacity: int, dtype: Any = np.float64):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.num_channels = num_channels
+        self.capacity = int(capacity)
+        # Samples in [_claimed - capacity, _written) are readable. _claimed runs
+        # ahead of _written while a write is being copied in. Both live in
+        # ``_counters`` so subclasses can place them in shared memory.
+        self._data, self._counters = self._allocate(np.dtype(dtype))
+
+    def _allocate(self, dtype: np.dtype) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the sample storage and the ``[written, claimed]`` counters."""
+        return np.zeros((self.num_channels, self.capacity), dtype=dtype), np.zeros(
+            2, dtype=np.int64
+        )
+
+    @property
+    def _written(self) -> int:
+        return int(self._counters[0])
+
+    @_written.setter
+    def _written(self, value: int) -> None:
+        self._counters[0] = value
+
+    @property
+    def _claimed(self) -> int:
+        return int(self._counters[1])
+
+    @_claimed.setter
+    def _claimed(self, value: int) -> None:
+        self._counters[1] = value
+
+    @property
+    def dtype(self) -> np.dtype:
+        return self._data.dtype
+
+    @property
+    def written(self) -> int:
+        """Total number of samples per channel ever written."""
+        return self._written
+
+    @property
+    def oldest(self) -> int:
+        """Absolute index of the oldest sample that is still intact."""
+        return max(self._claimed - self.capacity, 0)
+
+    def __len__(self) -> int:
+        return min(self._written, self.capacity)
+
+    def clear(self) -> None:
+        self._written = 0
+        self._claimed = 0
+
+    def write(self, data: np.ndarray) -> None:
+        """Append a ``(channels, samples)`` array."""
+        n = data.shape[1]
+        if n == 0:
+            return
+        capacity = self.capacity
+        if n > capacity:
+            # Only the newest `capacity` samples can survive anyway.
+            self._claimed = self._written + n
+            data = data[:, n - capacity :]
+            start_index = self._written + n - capacity
+            n = capacity
+        else:
+            start_index = self._written
+            self._claimed = start_index + n
+
+        start = start_index % capacity
+        first = min(n, capacity - start)
+        self._data[:, start : start + first] = data[:, :first]
+        if first < n:
+            self._data[:, : n - first] = data[:, first:]
+        self._written = self._claimed
+
+    def is_valid(self, start: int) -> bool:
+        """Whether samples from absolute index ``start`` are still intact."""
+        return start >= self._claimed - self.capacity
+
+    def read(self, start: int, stop: int) -> np.ndarray:
+        """Return samples ``[start, stop)`` by absolute index.
+
+        Raises:
+            IndexError: If the span is not (or no longer) in the buffer.
+        """
+        if stop > self._written or start < self.oldest or stop < start:
+            raise IndexError(
+                f"samples [{start}, {stop}) not available; buffer holds "
+                f"[{self.oldest}, {self._written})"
+            )
+        capacity = self.capacity
+        begin = start % capacity
+        end = begin + (stop - start)
+        if end <= capacity:
+            return self._data[:, begin:end]
+        return np.concatenate(
+            (self._data[:, begin:], self._data[:, : end - capacity]), axis=1
+        )
+
+    def latest(self, num_samples: int) -> np.ndarray:
+        """Return the newest ``num_samples`` (or fewer if not yet written)."""
+        return self.latest_with_start(num_samples)[1]
+
+    def latest_with_start(self, num_samples: int) -> Tuple[int, np.ndarray]:
+        """Like :meth:`latest`, also returning the absolute index of the first sample.
+
+        Both come from the same snapshot of the write position, so the index
+        matches the data even while the producer keeps writing.
+        """
+        while True:
+            stop = self._written
+            start = max(stop - min(num_samples, self.capacity), 0)
+            try:
+                return start, self.read(start, stop)
+            except IndexError:
+                # A write started between reading the indices; retry.
+                continue
+
+    def cursor(self, from_start: bool = False) -> "RingCursor":
+        """Create an independent read cursor.
+
+        Args:
+            from_start: Begin at the oldest available sample instead of the
+                current write position.
+        """
+        return RingCursor(self, self.oldest if from_start else self._written)
+
+
+class RingCursor:
+    """A consumer's private read position in a :class:`RingBuffer`."""
+
+    def __init__(self, ring: RingBuffer, position: int):
+        self.ring = ring
+        self.position = position
+        self.last_start = position
+        self.overruns = 0
+        self.dropped_samples = 0
+
+    @property
+    def available(self) -> int:
+        return self.ring.written - self.position
+
+    def read(self, max_samples: Optional[int] = None) -> np.ndarray:
+        """Return the next unread samples and advance the cursor.
+
+        If the producer has lapped this cursor, the cursor jumps to the oldest
+        intact sample and the skipped samples are counted in
+        ``dropped_samples``.
+        """
+        ring = self.ring
+        while True:
+            stop = ring.written
+            oldest = ring.oldest
+            if self.position < oldest:
+                self.overruns += 1
+                self.dropped_samples += oldest - self.position
+                self.position = oldest
+            if max_samples is not None:
+                stop = min(stop, self.position + max_samples)
+            try:
+                data = ring.read(self.position, stop)
+            except IndexError:
+                # The producer lapped us between the checks; try again.
+                continue
+            self.last_start = self.position
+            self.position = stop
+            return data
+
+    def still_valid(self) -> bool:
+        """Whether the data returned by the last ``read`` is still intact."""
+        return self.ring.is_valid(self.last_start)
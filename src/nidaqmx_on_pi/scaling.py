@@ -0,0 +1,58 @@
+"""Deferred scaling of raw (unscaled) analog-input samples.
+
+In raw mode a task is read with ``read_int16`` instead of
+``read_many_sample``: the device's native 16-bit ADC codes are moved, queued
+and stored instead of float64 volts, a quarter of the bytes at every step.
+Each channel's conversion to volts is a polynomial whose coefficients the
+driver reports once per channel (``ai_dev_scaling_coeff``), so scaling can be
+applied later, and only to the samples a consumer actually looks at.
+
+Coefficients are kept as a ``(channels, terms)`` float64 array, lowest order
+first, which is the layout stored in recording headers.
+"""
+
+from typing import Any, Optional, Sequence
+
+import numpy as np
+
+RAW_DTYPE = np.dtype(np.int16)
+
+
+def scaling_coefficients(task: Any) -> np.ndarray:
+    """Return the raw-to-volts polynomial of every AI channel in ``task``."""
+    return coefficient_array(
+        [channel.ai_dev_scaling_coeff for channel in task.ai_channels]
+    )
+
+
+def coefficient_array(coefficients: Sequence[Sequence[float]]) -> np.ndarray:
+    """Pack per-channel coefficient lists into a zero-padded 2D array."""
+    terms = max((len(c) for c in coefficients), default=1)
+    array = np.zeros((len(coefficients), max(terms, 1)))
+    for row, coeffs in zip(array, coefficients):
+        row[: len(coeffs)] = coeffs
+    return array
+
+
+def apply_scaling(
+    raw: np.ndarray, coefficients: np.ndarray, out: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """Convert ``(channels, samples)`` raw codes to volts.
+
+    Evaluates each channel's polynomial with Horner's rule in a few
+    vectorised passes over the block.
+
+    Args:
+        raw: Raw samples, one row per channel.
+        coefficients: ``(channels, terms)`` array, lowest order first.
+        out: Optional float array of the same shape to write into.
+    """
+    coefficients = np.asarray(coefficients, dtype=np.float64)
+    if out is None:
+        out = np.empty(raw.shape, dtype=np.float64)
+    terms = coefficients.shape[1]
+    out[...] = coefficients[:, terms - 1 : terms]
+    for k in range(terms - 2, -1, -1):
+        out *= raw
+        out += coefficients[:, k : k + 1]
+    return out
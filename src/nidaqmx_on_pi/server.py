@@ -0,0 +1,546 @@
+"""Publish acquired blocks to remote subscribers over TCP.
+
+A :class:`StreamServer` subscribes to a block source (for example a
+:class:`~nidaqmx_on_pi.streaming.StreamingReader`) and serves any number of
+clients from an asyncio event loop. Each client picks its channels, a
+decimation factor and a sample format when it connects, and receives a
+metadata frame followed by data frames.
+
+Wire protocol
+-------------
+
+The client sends one line of JSON (an empty line selects the defaults)::
+
+    {"channels": [0, 2], "decimation": 10, "format": "float32"}
+
+``format`` is ``"float32"`` (volts) or ``"int16"`` (raw ADC codes, only for
+raw sources; scale them with the ``scaling`` coefficients from the metadata).
+Every message from the server is a frame: a fixed 40-byte little-endian
+header (:data:`FRAME_HEADER`) followed by ``payload_bytes`` bytes::
+
+    magic         4s   b"NDQF"
+    kind          u8   FRAME_METADATA, FRAME_DATA or FRAME_ERROR
+    dtype         u8   DTYPE_INT16 or DTYPE_FLOAT32 (data frames)
+    decimation    u16  every n-th sample is sent
+    channel_mask  u64  bit i set when source channel i is included
+    sequence      u64  block sequence number at the source
+    first_sample  u64  absolute index of the first sample before decimation
+    num_samples   u32  samples per channel in the payload
+    payload_bytes u32
+
+Data payloads are channel-major ``(channels, num_samples)`` arrays; metadata
+and error payloads are UTF-8 JSON.
+
+Backpressure
+------------
+
+Frames are encoded on the reader thread and appended to a bounded queue per
+client; a client that cannot keep up loses its oldest queued frames (counted
+in :class:`ClientStats` and visible as gaps in ``sequence``) while the reader
+and every other client carry on. The reader thread never waits for a socket.
+"""
+
+import asyncio
+import json
+import socket
+import struct
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .scaling import apply_scaling
+
+FRAME_MAGIC = b"NDQF"
+FRAME_HEADER = struct.Struct("<4sBBHQQQII")
+FRAME_METADATA = 0
+FRAME_DATA = 1
+FRAME_ERROR = 2
+DTYPE_INT16 = 1
+DTYPE_FLOAT32 = 2
+_DTYPES = {DTYPE_INT16: np.dtype("<i2"), DTYPE_FLOAT32: np.dtype("<f4")}
+_FORMATS = {"int16": DTYPE_INT16, "float32": DTYPE_FLOAT32}
+MAX_CHANNELS = 64
+
+
+def encode_frame(
+    kind: int,
+    payload: bytes,
+    dtype: int = 0,
+    decimation: int = 1,
+    channel_mask: int = 0,
+    sequence: int = 0,
+    first_sample: int = 0,
+    num_samples: int = 0,
+) -> bytes:
+    header = FRAME_HEADER.pack(
+        FRAME_MAGIC,
+        kind,
+        dtype,
+        decimation,
+        channel_mask,
+        sequence,
+        first_sample,
+        num_samples,
+        len(payload),
+    )
+    return header + payload
+
+
+class Frame:
+    """A decoded frame. ``data`` is set for data frames, ``info`` otherwise."""
+
+    def __init__(
+        self,
+        kind: int,
+        dtype: int,
+        decimation: int,
+        channel_mask: int,
+        sequence: int,
+        first_sample: int,
+        num_samples: int,
+        payload: bytes,
+    ):
+        self.kind = kind
+        self.dtype = dtype
+        self.decimation = decimation
+        self.channel_mask = channel_mask
+        self.sequence = sequence
+        self.first_sample = first_sample
+        self.num_samples = num_samples
+        self.data: Optional[np.ndarray] = None
+        self.info: Optional[Dict[str, Any]] = None
+        if kind == FRAME_DATA:
+            values = np.frombuffer(payload, dtype=_DTYPES[dtype])
+            self.data = (
+                values.reshape(-1, num_samples) if num_samples else values.reshape(0, 0)
+            )
+        else:
+            self.info = json.loads(payload.decode("utf-8"))
+
+    @property
+    def channels(self) -> List[int]:
+        """Source channel indices included in the frame."""
+        return [i for i in range(MAX_CHANNELS) if self.channel_mask >> i & 1]
+
+    @classmethod
+    def decode(cls, header: bytes, payload: bytes) -> "Frame":
+        magic, kind, dtype, decimation, mask, sequence, first, num, _ = (
+            FRAME_HEADER.unpack(header)
+        )
+        if magic != FRAME_MAGIC:
+            raise ValueError("Not a nidaqmx_on_pi stream frame")
+        return cls(kind, dtype, decimation, mask, sequence, first, num, payload)
+
+    def __repr__(self) -> str:
+        return f"Frame(kind={self.kind}, sequence={self.sequence}, num_samples={self.num_samples})"
+
+
+class ClientStats:
+    """Per-client delivery counters."""
+
+    def __init__(self) -> None:
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self.bytes_sent = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "frames_sent": self.frames_sent,
+            "frames_dropped": self.frames_dropped,
+            "bytes_sent": self.bytes_sent,
+        }
+
+
+class ServerStats(ClientStats):
+    """Delivery counters summed over the connected clients."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.clients = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return dict(super().as_dict(), clients=self.clients)
+
+
+class _Client:
+    """Server-side state of one connection."""
+
+    def __init__(
+        self,
+        peer: Any,
+        channels: List[int],
+        decimation: int,
+        dtype: int,
+        max_frames: int,
+    ):
+        self.peer = peer
+        self.channels = channels
+        self.decimation = decimation
+        self.dtype = dtype
+        self.channel_mask = sum(1 << i for i in channels)
+        self.frames: Deque[bytes] = deque()
+        self.max_frames = max_frames
+        self.stats = ClientStats()
+        self.wakeup = asyncio.Event()
+
+    @property
+    def key(self) -> Tuple[int, int, int]:
+        return (self.channel_mask, self.decimation, self.dtype)
+
+
+class StreamServer:
+    """Serve blocks from ``source`` to TCP clients.
+
+    Args:
+        source: A block source with ``subscribe``/``unsubscribe``, typically
+            a running ``StreamingReader``.
+        host: Interface to bind; ``"0.0.0.0"`` to accept remote clients.
+        port: TCP port; 0 picks a free port (see :attr:`address`).
+        sample_rate: Rate announced to clients. Defaults to the rate of the
+            source's task.
+        channel_names: Names announced to clients. Defaults to the source's
+            task channel names.
+        max_queue_frames: Frames queued per client before the oldest are
+            dropped.
+    """
+
+    def __init__(
+        self,
+        source: Any,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        sample_rate: Optional[float] = None,
+        channel_names: Optional[Sequence[str]] = None,
+        max_queue_frames: int = 32,
+    ):
+        self.source = source
+        self.host = host
+        self.port = port
+        task = getattr(source, "task", None)
+        if sample_rate is None and task is not None:
+            sample_rate = task.timing.samp_clk_rate
+        if channel_names is None and task is not None:
+            channel_names = [channel.name for channel in task.ai_channels]
+        self.sample_rate = float(sample_rate or 0.0)
+        self.num_channels = source.num_channels
+        self.channel_names = list(
+            channel_names or [f"ch{i}" for i in range(self.num_channels)]
+        )
+        if self.num_channels > MAX_CHANNELS:
+            raise ValueError(f"Streaming supports at most {MAX_CHANNELS} channels")
+        self.max_queue_frames = max_queue_frames
+        self.clients: List[_Client] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        """``(host, port)`` the server is listening on."""
+        if self._server is None:
+            raise RuntimeError("Server is not running")
+        return self._server.sockets[0].getsockname()[:2]
+
+    # Asyncio API
+    async def start_async(self) -> None:
+        """Start listening on the running event loop."""
+        self._loop = asyncio.get_running_loop()
+        self._server = await asyncio.start_server(
+            self._handle_client, self.host, self.port
+        )
+        self.source.subscribe(self._on_block)
+
+    async def stop_async(self) -> None:
+        self.source.unsubscribe(self._on_block)
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for client in list(self.clients):
+            client.wakeup.set()
+
+    # Thread API
+    def start(self) -> "StreamServer":
+        """Run the server on its own event loop thread; returns once listening."""
+        ready = threading.Event()
+        errors: List[BaseException] = []
+
+        def run() -> None:
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            try:
+                loop.run_until_complete(self.start_async())
+            except BaseException as e:
+                errors.append(e)
+                ready.set()
+                loop.close()
+                return
+            ready.set()
+            loop.run_forever()
+            loop.run_until_complete(self.stop_async())
+            # Let client handlers see the closed server and finish.
+            pending = [t for t in asyncio.all_tasks(loop) if not t.done()]
+            for t in pending:
+                t.cancel()
+            loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            loop.close()
+
+        self._thread = threading.Thread(target=run, name="StreamServer", daemon=True)
+        self._thread.start()
+        ready.wait()
+        if errors:
+            raise errors[0]
+        return self
+
+    def stop(self) -> None:
+        """Stop a server started with :meth:`start` and disconnect clients."""
+        if self._thread is None or self._loop is None:
+            return
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._thread = None
+        self._loop = None
+
+    close = stop
+
+    def __enter__(self) -> "StreamServer":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+    @property
+    def stats(self) -> "ServerStats":
+        """Totals over the connected clients."""
+        stats = ServerStats()
+        for client in self.clients:
+            stats.clients += 1
+            stats.frames_sent += client.stats.frames_sent
+            stats.frames_dropped += client.stats.frames_dropped
+            stats.bytes_sent += client.stats.bytes_sent
+        return stats
+
+    # Reader thread
+    def _encode(self, block: Any, client: _Client) -> bytes:
+        step = client.decimation
+        # Align the decimation to absolute sample indices across blocks.
+        offset = (-block.first_sample) % step
+        data = block.data[client.channels, offset::step]
+        if data.shape[1] == 0:
+            return b""
+        if client.dtype == DTYPE_INT16:
+            payload = data.astype("<i2", copy=False).tobytes()
+        elif block.scaling is not None:
+            payload = (
+                apply_scaling(data, block.scaling[client.channels])
+                .astype("<f4")
+                .tobytes()
+            )
+        else:
+            payload = data.astype("<f4").tobytes()
+        return encode_frame(
+            FRAME_DATA,
+            payload,
+            client.dtype,
+            step,
+            client.channel_mask,
+            block.sequence,
+            block.first_sample + offset,
+            data.shape[1],
+        )
+
+    def _on_block(self, block: Any) -> None:
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            # A late callback after stop(); the clients are gone.
+            return
+        encoded: Dict[Tuple[int, int, int], bytes] = {}
+        for client in self.clients:
+            frame = encoded.get(client.key)
+            if frame is None:
+                frame = encoded[client.key] = self._encode(block, client)
+            if not frame:
+                continue
+            frames = client.frames
+            if len(frames) >= client.max_frames:
+                frames.popleft()
+                client.stats.frames_dropped += 1
+            frames.append(frame)
+            if not client.wakeup.is_set():
+                try:
+                    loop.call_soon_threadsafe(client.wakeup.set)
+                except RuntimeError:
+                    # The loop closed after the check above.
+                    return
+
+    # Event loop
+    def _metadata(self, client: _Client, raw: bool) -> bytes:
+        scaling = getattr(self.source, "scaling", None)
+        info = {
+            "sample_rate": self.sample_rate,
+            "channels": [self.channel_names[i] for i in client.channels],
+            "channel_indices": client.channels,
+            "decimation": client.decimation,
+            "format": "int16" if client.dtype == DTYPE_INT16 else "float32",
+            "raw": raw,
+            "scaling": (
+                scaling[client.channels].tolist() if scaling is not None else None
+            ),
+        }
+        return encode_frame(
+            FRAME_METADATA,
+            json.dumps(info).encode("utf-8"),
+            channel_mask=client.channel_mask,
+            decimation=client.decimation,
+        )
+
+    def _parse_request(self, line: bytes) -> Tuple[List[int], int, int]:
+        request = json.loads(line.decode("utf-8")) if line.strip() else {}
+        if not isinstance(request, dict):
+            raise ValueError("the request must be a JSON object")
+        channels = request.get("channels")
+        if channels is None:
+            channels = list(range(self.num_channels))
+        if not isinstance(channels, list):
+            raise ValueError("channels must be a list of indices or names")
+        try:
+            channels = [
+                self.channel_names.index(c) if isinstance(c, str) else int(c)
+                for c in channels
+            ]
+        except TypeError as e:
+            raise ValueError(f"channels must be indices or names: {e}") from e
+        if not channels or any(not 0 <= c < self.num_channels for c in channels):
+            raise ValueError(
+                f"channels must be indices or names of the {self.num_channels} source channels"
+            )
+        if len(set(channels)) != len(channels) or channels != sorted(channels):
+            raise ValueError("channels must be unique and in source order")
+        decimation = request.get("decimation", 1)
+        if isinstance(decimation, bool) or not isinstance(decimation, int):
+            raise ValueError(f"decimation must be an integer, got {decimation!r}")
+        if not 1 <= decimation <= 0xFFFF:
+            raise ValueError("decimation must be between 1 and 65535")
+        fmt = request.get("format", "float32")
+        if not isinstance(fmt, str) or fmt not in _FORMATS:
+            raise ValueError(f"format must be one of {sorted(_FORMATS)}")
+        if fmt == "int16" and getattr(self.source, "scaling", None) is None:
+            raise ValueError(
+                "int16 is only available when the source reads raw samples"
+            )
+        return channels, decimation, _FORMATS[fmt]
+
+    async def _handle_client(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        peer = writer.get_extra_info("peername")
+        try:
+            line = await reader.readline()
+            try:
+                channels, decimation, dtype = self._parse_request(line)
+            except ValueError as e:
+                writer.write(
+                    encode_frame(
+                        FRAME_ERROR, json.dumps({"error": str(e)}).encode("utf-8")
+                    )
+                )
+                await writer.drain()
+                return
+            client = _Client(peer, channels, decimation, dtype, self.max_queue_frames)
+            writer.write(
+                self._metadata(
+                    client, getattr(self.source, "scaling", None) is not None
+                )
+            )
+            await writer.drain()
+            self.clients = self.clients + [client]
+            try:
+                while self._server is not None and self._server.is_serving():
+                    await client.wakeup.wait()
+                    client.wakeup.clear()
+                    while client.frames:
+                        frame = client.frames.popleft()
+                        writer.write(frame)
+                        client.stats.frames_sent += 1
+                        client.stats.bytes_sent += len(frame)
+                        await writer.drain()
+            finally:
+                self.clients = [c for c in self.clients if c is not client]
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+
+
+class StreamClient:
+    """Blocking client for :class:`StreamServer`, for scripts and notebooks.
+
+    Args:
+        host: Server host.
+        port: Server port.
+        channels: Source channel indices or names; ``None`` for all.
+        decimation: Keep every n-th sample.
+        format: ``"float32"`` or ``"int16"``.
+
+    Raises:
+        ConnectionError: If the server rejects the request.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        channels: Optional[Sequence[Any]] = None,
+        decimation: int = 1,
+        format: str = "float32",
+        timeout: Optional[float] = 10.0,
+    ):
+        self._socket = socket.create_connection((host, port), timeout=timeout)
+        self._file = self._socket.makefile("rb")
+        request: Dict[str, Any] = {"decimation": decimation, "format": format}
+        if channels is not None:
+            request["channels"] = list(channels)
+        self._socket.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        frame = self.recv()
+        if frame.kind == FRAME_ERROR:
+            self.close()
+            raise ConnectionError(
+                frame.info["error"] if frame.info else "request rejected"
+            )
+        self.metadata: Dict[str, Any] = frame.info or {}
+
+    def _read_exact(self, size: int) -> bytes:
+        data = self._file.read(size)
+        if len(data) < size:
+            raise ConnectionError("Stream closed by server")
+        return data
+
+    def recv(self) -> Frame:
+        """Block until the next frame arrives."""
+        header = self._read_exact(FRAME_HEADER.size)
+        payload = self._read_exact(FRAME_HEADER.unpack(header)[-1])
+        return Frame.decode(header, payload)
+
+    def __iter__(self) -> "StreamClient":
+        return self
+
+    def __next__(self) -> Frame:
+        try:
+            return self.recv()
+        except ConnectionError:
+            raise StopIteration from None
+
+    def close(self) -> None:
+        self._file.close()
+        self._socket.close()
+
+    def __enter__(self) -> "StreamClient":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
@@ -0,0 +1,325 @@
+"""Fan acquired blocks out to other processes through shared memory.
+
+One Python process cannot use more than one core for NumPy-light work
+because of the GIL. In this mode the process that owns the task publishes
+its blocks into a :class:`SharedRing`, a :class:`~nidaqmx_on_pi.ringbuffer.RingBuffer`
+whose samples and write counters live in a
+:mod:`multiprocessing.shared_memory` segment. Consumer processes attach to
+the segment by name and read with ordinary :class:`RingCursor` objects:
+reads are views into the shared segment (no copy, no pickling), and because
+positions are absolute sample indices a consumer that falls more than one
+ring behind sees exactly how many samples it missed.
+
+Producer::
+
+    task = start_continuous_ai_task("dev1", "ai0:7", rate=50000.0)
+    reader = StreamingReader(task, samples_per_block=5000, queue_blocks=False)
+    publisher = SharedMemoryPublisher(reader, seconds=10.0, name="vib")
+    reader.start()
+    processes = [spawn_consumer(analyse, "vib") for _ in range(3)]
+
+Consumer (in another process, for example via :func:`spawn_consumer`)::
+
+    def analyse(ring):
+        cursor = ring.cursor()
+        while ring.wait(cursor.position):
+            block = cursor.read()
+            ...
+
+Writes follow the ring's claim/copy/publish protocol: ``claimed`` is bumped
+before the samples are copied in and ``written`` after. NumPy stores issue no
+memory fence, so on weakly ordered CPUs (the Pi's ARM cores) another process
+is not guaranteed to observe the samples before the counter that publishes
+them, and a view it holds can be overwritten at any time. Consumers that
+need a consistent snapshot use :meth:`SharedRing.copy`, which re-checks
+``claimed`` after copying like a seqlock reader, or check
+:meth:`RingCursor.still_valid` after processing a view.
+
+Segment layout: a 4096-byte header holding the int64 counters
+``[written, claimed, closed]`` followed by a JSON description (channels,
+capacity, dtype, rate, names, scaling), then the ``(channels, capacity)``
+sample array.
+"""
+
+import json
+import multiprocessing
+import struct
+import threading
+import time
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from .ringbuffer import RingBuffer
+
+HEADER_BYTES = 4096
+_MAGIC = b"NDQPISHM"
+_COUNTERS = 3
+_META_OFFSET = 8 + 8 * _COUNTERS + 4
+_META_LENGTH = struct.Struct("<I")
+
+
+class SharedRing(RingBuffer):
+    """A :class:`RingBuffer` stored in a named shared-memory segment.
+
+    Use :meth:`create` in the producer and :meth:`attach` in consumers; the
+    producer must be the only writer. Call :meth:`close` when done, and
+    :meth:`unlink` (producer) to free the segment.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, info: Dict[str, Any]):
+        self._shm = shm
+        self.info = info
+        super().__init__(info["num_channels"], info["capacity"], info["dtype"])
+
+    def _allocate(self, dtype: np.dtype) -> Tuple[np.ndarray, np.ndarray]:
+        buf = self._shm.buf
+        counters = np.ndarray((_COUNTERS,), dtype=np.int64, buffer=buf, offset=8)
+        data = np.ndarray(
+            (self.num_channels, self.capacity),
+            dtype=dtype,
+            buffer=buf,
+            offset=HEADER_BYTES,
+        )
+        return data, counters
+
+    @classmethod
+    def create(
+        cls,
+        num_channels: int,
+        capacity: int,
+        dtype: Any = np.float64,
+        name: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> "SharedRing":
+        """Create a new zero-filled segment.
+
+        Args:
+            name: Segment name; random when omitted (see :attr:`name`).
+            metadata: JSON-serialisable data for consumers, for example the
+                sample rate and channel names.
+        """
+        dtype = np.dtype(dtype)
+        info = {
+            "num_channels": num_channels,
+            "capacity": int(capacity),
+            "dtype": dtype.str,
+            "metadata": dict(metadata or {}),
+        }
+        body = json.dumps(info).encode("utf-8")
+        if _META_OFFSET + len(body) > HEADER_BYTES:
+            raise ValueError("Shared ring metadata is too large")
+        size = HEADER_BYTES + num_channels * int(capacity) * dtype.itemsize
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        shm.buf[:8] = _MAGIC
+        shm.buf[_META_OFFSET - 4 : _META_OFFSET] = _META_LENGTH.pack(len(body))
+        shm.buf[_META_OFFSET : _META_OFFSET + len(body)] = body
+        return cls(shm, info)
+
+    @classmethod
+    def attach(cls, name: str) -> "SharedRing":
+        """Open an existing segment created by :meth:`create`.
+
+        Raises:
+            FileNotFoundError: If no segment has that name.
+            ValueError: If the segment was not created by :meth:`create`.
+        """
+        shm = shared_memory.SharedMemory(name=name)
+        _untrack(shm)
+        if bytes(shm.buf[:8]) != _MAGIC:
+            shm.close()
+            raise ValueError(f"Shared memory segment {name!r} is not a SharedRing")
+        (length,) = _META_LENGTH.unpack(bytes(shm.buf[_META_OFFSET - 4 : _META_OFFSET]))
+        info = json.loads(
+            bytes(shm.buf[_META_OFFSET : _META_OFFSET + length]).decode("utf-8")
+        )
+        return cls(shm, info)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        return self.info["metadata"]
+
+    @property
+    def closed(self) -> bool:
+        """True once the producer called :meth:`mark_closed`."""
+        return bool(self._counters[2])
+
+    def mark_closed(self) -> None:
+        """Tell consumers that no more samples will be written."""
+        self._counters[2] = 1
+
+    def copy(self, start: int, stop: int) -> np.ndarray:
+        """Return a private copy of samples ``[start, stop)``.
+
+        The span is checked again after the copy, so a write that overwrote
+        it meanwhile raises instead of returning torn samples.
+
+        Raises:
+            IndexError: If the span is not (or no longer) in the buffer.
+        """
+        data = np.array(self.read(start, stop))
+        if not self.is_valid(start):
+            raise IndexError(
+                f"samples [{start}, {stop}) were overwritten while being copied"
+            )
+        return data
+
+    def wait(
+        self,
+        position: int,
+        timeout: Optional[float] = None,
+        poll_interval: float = 0.001,
+    ) -> bool:
+        """Sleep until samples beyond ``position`` exist.
+
+        Returns False if the producer closed the ring (and everything written
+        before that was consumed) or the timeout expired.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._written <= position:
+            if self.closed:
+                return False
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(poll_interval)
+        return True
+
+    def close(self) -> None:
+        """Detach from the segment.
+
+        Views returned by reads must be dropped first; otherwise the mapping
+        stays alive until they are garbage-collected.
+        """
+        self._data = np.empty((self.num_channels, 0), dtype=self._data.dtype)
+        self._counters = np.zeros(_COUNTERS, dtype=np.int64)
+        try:
+            self._shm.close()
+        except BufferError:
+            pass
+
+    def unlink(self) -> None:
+        """Remove the segment name; existing mappings stay valid until closed."""
+        try:
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self) -> "SharedRing":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def _untrack(shm: shared_memory.SharedMemory) -> None:
+    """Stop this process's resource tracker from unlinking a segment it did not create.
+
+    Before Python 3.13 attaching registers the segment as if it were owned,
+    so the first consumer to exit would destroy it for everyone.
+    """
+    try:
+        from multiprocessing import resource_tracker
+
+        resource_tracker.unregister(shm._name, "shared_memory")  # type: ignore[attr-defined]
+    except Exception:
+        pass
+
+
+class SharedMemoryPublisher:
+    """Copy every block of a source into a new :class:`SharedRing`.
+
+    Args:
+        source: A block source, typically a ``StreamingReader``.
+        seconds: Ring length in seconds of data (needs a known rate).
+        capacity: Ring length in samples; overrides ``seconds``.
+        name: Segment name for consumers; random when omitted.
+    """
+
+    def __init__(
+        self,
+        source: Any,
+        seconds: float = 10.0,
+        capacity: Optional[int] = None,
+        name: Optional[str] = None,
+    ):
+        task = getattr(source, "task", None)
+        rate = float(task.timing.samp_clk_rate) if task is not None else 0.0
+        names = (
+            [channel.name for channel in task.ai_channels] if task is not None else []
+        )
+        if capacity is None:
+            if not rate:
+                raise ValueError(
+                    "capacity is required when the source has no task rate"
+                )
+            capacity = int(rate * seconds)
+        scaling = getattr(source, "scaling", None)
+        metadata = {
+            "sample_rate": rate,
+            "channels": names,
+            "scaling": scaling.tolist() if scaling is not None else None,
+        }
+        self.source = source
+        self.ring = SharedRing.create(
+            source.num_channels, capacity, source.pool.dtype, name, metadata
+        )
+        self._closed = False
+        # Held while a block is copied in, so close() never frees a segment
+        # the reader thread is still writing to.
+        self._lock = threading.Lock()
+        source.subscribe(self._on_block)
+
+    @property
+    def name(self) -> str:
+        return self.ring.name
+
+    def _on_block(self, block: Any) -> None:
+        with self._lock:
+            if not self._closed:
+                self.ring.write(block.data)
+
+    def close(self) -> None:
+        """Stop publishing, tell consumers and free the segment.
+
+        Safe to call while the source is running: a block being written
+        finishes first, and blocks that arrive afterwards are ignored.
+        """
+        self.source.unsubscribe(self._on_block)
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self.ring.mark_closed()
+            self.ring.close()
+            self.ring.unlink()
+
+
+def _consumer_main(
+    target: Callable[..., Any], name: str, args: Tuple[Any, ...]
+) -> None:
+    ring = SharedRing.attach(name)
+    try:
+        target(ring, *args)
+    finally:
+        ring.close()
+
+
+def spawn_consumer(
+    target: Callable[..., Any], name: str, *args: Any, start_method: str = "spawn"
+) -> multiprocessing.process.BaseProcess:
+    """Start a process that attaches to ring ``name`` and calls ``target(ring, *args)``.
+
+    ``target`` must be importable (a module-level function). The default
+    ``spawn`` start method avoids forking a process that has reader threads.
+    """
+    context = multiprocessing.get_context(start_method)
+    process = context.Process(
+        target=_consumer_main, args=(target, name, args), daemon=True
+    )
+    process.start()
+    return process
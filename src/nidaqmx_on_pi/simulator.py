@@ -0,0 +1,1196 @@
+"""In-process simulated DAQ backend.
+
+The simulator mimics the parts of the ``nidaqmx`` API this package uses:
+``Task`` with AI/AO/DI/DO channel collections, sample-clock timing, an input
+stream with a finite driver buffer, ``task.read``, a multi-channel stream
+reader, and an output stream with AO/DO stream writers. Devices, their
+channels and the waveform on every AI channel are configurable.
+
+Start triggers, exported signals and external sample clocks are modelled
+for synchronising several devices: a task with a digital-edge start trigger
+or an external clock source stays armed until a task that exports the
+matching signal starts. PFI (and RTSI) terminals with the same name are
+treated as wired together across devices, so a master exporting its start
+trigger to ``/dev1/PFI0`` fires slaves triggered on ``/dev2/PFI0``.
+Each device can have a sample-clock error in ppm to exercise drift handling.
+
+Every-N-samples-acquired and done events are delivered on a per-task event
+thread, like the driver's callback thread: the every-N callback fires each
+time another ``sample_interval`` samples are in the buffer and the done
+callback when a finite acquisition completes. As in DAQmx, events can only
+be registered or unregistered while the task is stopped.
+
+With ``realtime=True`` (the default) samples become available at the
+configured sample rate, reads block until enough samples have been
+"acquired", and a reader that falls behind by more than the input buffer gets
+the same ``-200279`` error as on hardware. With ``realtime=False`` reads
+return immediately, which is useful to measure the cost of the pipeline
+itself.
+
+Output tasks are paced the same way: written samples are "generated" at the
+sample rate, writes block while the output buffer is full, and a
+non-regenerating task whose generation catches up with the written data stops
+with ``-200290`` on the next write. Without ``realtime`` every written sample
+counts as generated immediately.
+
+Example::
+
+    from nidaqmx_on_pi.simulator import SimulatedBackend, SimulatedDevice, Waveform
+
+    backend = SimulatedBackend([
+        SimulatedDevice("dev3", waveforms={"ai0": Waveform("sine", frequency=50.0)}),
+    ])
+    task = start_continuous_ai_task("dev3", "ai0:3", rate=100000.0, backend=backend)
+"""
+
+import itertools
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from nidaqmx.constants import (
+    READ_ALL_AVAILABLE,
+    AcquisitionType,
+    Edge,
+    EveryNSamplesEventType,
+    RegenerationMode,
+    Signal,
+    TaskMode,
+    TerminalConfiguration,
+)
+from nidaqmx.error_codes import DAQmxErrors
+from nidaqmx.errors import DaqError, DaqReadError, DaqWriteError
+
+from .backends import Backend
+
+_UNSET = object()
+_RANGE_RE = re.compile(r"^(?P<prefix>.*?)(?P<first>\d+):(?P<last>\d+)$")
+
+
+class Waveform:
+    """Synthetic signal generator for one simulated AI channel.
+
+    Args:
+        kind: ``"sine"``, ``"step"`` (square steps between
+            ``offset - amplitude`` and ``offset + amplitude``), ``"noise"``
+            (Gaussian with standard deviation ``amplitude``) or ``"dc"``.
+        frequency: Frequency in Hz for sine and step waveforms.
+        amplitude: Peak amplitude in volts.
+        offset: DC offset in volts.
+        phase: Phase in radians for the sine waveform.
+        noise: Standard deviation of Gaussian noise added on top.
+        seed: Seed for the noise generator.
+    """
+
+    KINDS = ("sine", "step", "noise", "dc")
+
+    def __init__(
+        self,
+        kind: str = "sine",
+        frequency: float = 10.0,
+        amplitude: float = 1.0,
+        offset: float = 0.0,
+        phase: float = 0.0,
+        noise: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        if kind not in self.KINDS:
+            raise ValueError(
+                f"Unknown waveform kind {kind!r}; expected one of {self.KINDS}"
+            )
+        self.kind = kind
+        self.frequency = frequency
+        self.amplitude = amplitude
+        self.offset = offset
+        self.phase = phase
+        self.noise = noise
+        self._rng = np.random.default_rng(seed)
+
+    def generate(
+        self,
+        start: int,
+        num_samples: int,
+        rate: float,
+        out: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """Return samples ``start .. start + num_samples`` at ``rate`` S/s."""
+        if out is None:
+            out = np.empty(num_samples)
+        if self.kind in ("sine", "step"):
+            t = np.arange(start, start + num_samples, dtype=np.float64)
+            t *= self.frequency / rate
+            if self.kind == "sine":
+                np.sin(2 * np.pi * t + self.phase, out=out)
+            else:
+                # +1 for the first half of every period, -1 for the second.
+                np.floor(2 * t, out=t)
+                np.mod(t, 2, out=t)
+                np.subtract(1, 2 * t, out=out)
+            out *= self.amplitude
+            out += self.offset
+        elif self.kind == "noise":
+            out[:] = self._rng.normal(self.offset, self.amplitude, num_samples)
+        else:
+            out.fill(self.offset)
+        if self.noise:
+            out += self._rng.normal(0.0, self.noise, num_samples)
+        return out
+
+
+class SimulatedPhysicalChannel:
+    """A physical channel or line on a simulated device."""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __repr__(self) -> str:
+        return f"SimulatedPhysicalChannel(name={self.name!r})"
+
+
+class SimulatedDevice:
+    """A simulated DAQ device with AI, AO and digital lines.
+
+    Args:
+        name: Device name, for example ``"dev3"``.
+        product_type: Reported product type.
+        serial_num: Reported serial number.
+        num_ai: Number of analog input channels (``ai0`` ...).
+        num_ao: Number of analog output channels (``ao0`` ...).
+        num_di_lines: Number of digital input lines on ``port0``.
+        num_do_lines: Number of digital output lines on ``port1``.
+        waveforms: Waveform per short AI channel name (``"ai0"``). Channels
+            without an entry get a sine of ``10 * (index + 1)`` Hz.
+        clock_error_ppm: Deviation of the device's sample clock from the
+            configured rate, in parts per million.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        product_type: str = "USB-6002 (simulated)",
+        serial_num: int = 0,
+        num_ai: int = 8,
+        num_ao: int = 2,
+        num_di_lines: int = 8,
+        num_do_lines: int = 8,
+        waveforms: Optional[Dict[str, Waveform]] = None,
+        clock_error_ppm: float = 0.0,
+    ):
+        self.name = name
+        self.clock_error_ppm = clock_error_ppm
+        self.product_type = product_type
+        self.serial_num = serial_num
+        self.ai_physical_chans = [
+            SimulatedPhysicalChannel(f"{name}/ai{i}") for i in range(num_ai)
+        ]
+        self.ao_physical_chans = [
+            SimulatedPhysicalChannel(f"{name}/ao{i}") for i in range(num_ao)
+        ]
+        self.di_lines = [
+            SimulatedPhysicalChannel(f"{name}/port0/line{i}")
+            for i in range(num_di_lines)
+        ]
+        self.do_lines = [
+            SimulatedPhysicalChannel(f"{name}/port1/line{i}")
+            for i in range(num_do_lines)
+        ]
+        self.waveforms: Dict[str, Waveform] = dict(waveforms or {})
+
+    def waveform(self, short_name: str) -> Waveform:
+        """Return the waveform for an AI channel, creating the default one."""
+        if short_name not in self.waveforms:
+            index = int(re.sub(r"\D", "", short_name) or 0)
+            self.waveforms[short_name] = Waveform("sine", frequency=10.0 * (index + 1))
+        return self.waveforms[short_name]
+
+    def __repr__(self) -> str:
+        return f"SimulatedDevice(name={self.name!r})"
+
+
+class SimulatedChannel:
+    """A virtual channel in a simulated task."""
+
+    def __init__(
+        self,
+        name: str,
+        physical_channel: SimulatedPhysicalChannel,
+        device: SimulatedDevice,
+    ):
+        self.name = name
+        self.physical_channel = physical_channel
+        self.device = device
+        self.waveform: Optional[Waveform] = None
+        self.ai_min = -5.0
+        self.ai_max = 5.0
+        self.ai_term_cfg = TerminalConfiguration.DEFAULT
+        self.ao_min = -10.0
+        self.ao_max = 10.0
+
+    @property
+    def ai_dev_scaling_coeff(self) -> List[float]:
+        """Polynomial mapping 16-bit ADC codes to volts, lowest order first."""
+        span = max(abs(self.ai_min), abs(self.ai_max))
+        return [0.0, span / 32768.0]
+
+    def __repr__(self) -> str:
+        return f"SimulatedChannel(name={self.name!r})"
+
+
+class _ChannelCollection:
+    """Ordered channels of one type in a simulated task."""
+
+    _physical_attr = ""
+
+    def __init__(self, task: "SimulatedTask"):
+        self._task = task
+        self._channels: List[SimulatedChannel] = []
+
+    def __iter__(self) -> Iterator[SimulatedChannel]:
+        return iter(self._channels)
+
+    def __len__(self) -> int:
+        return len(self._channels)
+
+    def __getitem__(self, index: Union[int, str]) -> SimulatedChannel:
+        if isinstance(index, str):
+            for channel in self._channels:
+                if channel.name == index:
+                    return channel
+            raise KeyError(index)
+        return self._channels[index]
+
+    @property
+    def channel_names(self) -> List[str]:
+        return [channel.name for channel in self._channels]
+
+    def _add(
+        self, physical_channel: str, name_to_assign: str
+    ) -> List[SimulatedChannel]:
+        backend = self._task.backend
+        added = []
+        for physical_name in expand_physical_channels(physical_channel):
+            device, physical = backend._find_physical_channel(
+                physical_name, self._physical_attr
+            )
+            name = (
+                name_to_assign if name_to_assign and len(added) == 0 else physical.name
+            )
+            channel = SimulatedChannel(name, physical, device)
+            self._channels.append(channel)
+            added.append(channel)
+        return added
+
+
+class SimulatedAIChannelCollection(_ChannelCollection):
+    _physical_attr = "ai_physical_chans"
+
+    def add_ai_voltage_chan(
+        self,
+        physical_channel: str,
+        name_to_assign_to_channel: str = "",
+        terminal_config: TerminalConfiguration = TerminalConfiguration.DEFAULT,
+        min_val: float = -5.0,
+        max_val: float = 5.0,
+        units: Any = None,
+        custom_scale_name: str = "",
+    ) -> SimulatedChannel:
+        """Add AI voltage channels; returns the first channel added."""
+        added = self._add(physical_channel, name_to_assign_to_channel)
+        for channel in added:
+            channel.ai_min = min_val
+            channel.ai_max = max_val
+            channel.ai_term_cfg = terminal_config
+            channel.waveform = channel.device.waveform(
+                channel.physical_channel.name.split("/")[-1]
+            )
+        return added[0]
+
+
+class SimulatedAOChannelCollection(_ChannelCollection):
+    _physical_attr = "ao_physical_chans"
+
+    def add_ao_voltage_chan(
+        self,
+        physical_channel: str,
+        name_to_assign_to_channel: str = "",
+        min_val: float = -10.0,
+        max_val: float = 10.0,
+        units: Any = None,
+        custom_scale_name: str = "",
+    ) -> SimulatedChannel:
+        """Add AO voltage channels; returns the first channel added."""
+        added = self._add(physical_channel, name_to_assign_to_channel)
+        for channel in added:
+            channel.ao_min = min_val
+            channel.ao_max = max_val
+        return added[0]
+
+
+class SimulatedDIChannelCollection(_ChannelCollection):
+    _physical_attr = "di_lines"
+
+    def add_di_chan(
+        self, lines: str, name_to_assign_to_lines: str = "", line_grouping: Any = None
+    ) -> SimulatedChannel:
+        return self._add(lines, name_to_assign_to_lines)[0]
+
+
+class SimulatedDOChannelCollection(_ChannelCollection):
+    _physical_attr = "do_lines"
+
+    def add_do_chan(
+        self, lines: str, name_to_assign_to_lines: str = "", line_grouping: Any = None
+    ) -> SimulatedChannel:
+        return self._add(lines, name_to_assign_to_lines)[0]
+
+
+class SimulatedTiming:
+    """Sample clock configuration of a simulated task."""
+
+    def __init__(self) -> None:
+        self.samp_clk_rate: Optional[float] = None
+        self.samp_clk_src = ""
+        self.samp_quant_samp_mode = AcquisitionType.FINITE
+        self.samp_quant_samp_per_chan = 1000
+
+    def cfg_samp_clk_timing(
+        self,
+        rate: float,
+        source: str = "",
+        active_edge: Any = None,
+        sample_mode: AcquisitionType = AcquisitionType.FINITE,
+        samps_per_chan: int = 1000,
+    ) -> None:
+        self.samp_clk_rate = float(rate)
+        self.samp_clk_src = source
+        self.samp_quant_samp_mode = sample_mode
+        self.samp_quant_samp_per_chan = samps_per_chan
+
+
+def _default_input_buffer_size(
+    rate: float, sample_mode: AcquisitionType, samps_per_chan: int
+) -> int:
+    """Input buffer size DAQmx picks when none is configured."""
+    if sample_mode == AcquisitionType.FINITE:
+        return samps_per_chan
+    if rate <= 100:
+        return 1000
+    if rate <= 10000:
+        return 10000
+    if rate <= 1000000:
+        return 100000
+    return 1000000
+
+
+class SimulatedInStream:
+    """Input stream properties of a simulated task."""
+
+    def __init__(self, task: "SimulatedTask"):
+        self._task = task
+        self._input_buf_size: Optional[int] = None
+
+    @property
+    def num_chans(self) -> int:
+        return len(self._task.ai_channels)
+
+    @property
+    def input_buf_size(self) -> int:
+        if self._input_buf_size is not None:
+            return self._input_buf_size
+        timing = self._task.timing
+        return _default_input_buffer_size(
+            timing.samp_clk_rate or 0.0,
+            timing.samp_quant_samp_mode,
+            timing.samp_quant_samp_per_chan,
+        )
+
+    @input_buf_size.setter
+    def input_buf_size(self, value: int) -> None:
+        self._input_buf_size = int(value)
+
+    @property
+    def avail_samp_per_chan(self) -> int:
+        task = self._task
+        return max(task._acquired() - task._read_position, 0)
+
+    @property
+    def curr_read_pos(self) -> int:
+        return self._task._read_position
+
+    @property
+    def total_samp_per_chan_acquired(self) -> int:
+        return self._task._acquired()
+
+
+class SimulatedOutStream:
+    """Output stream properties of a simulated task."""
+
+    def __init__(self, task: "SimulatedTask"):
+        self._task = task
+        self._output_buf_size: Optional[int] = None
+        self.regen_mode = RegenerationMode.ALLOW_REGENERATION
+
+    @property
+    def num_chans(self) -> int:
+        return len(self._task._output_channels)
+
+    @property
+    def output_buf_size(self) -> int:
+        if self._output_buf_size is not None:
+            return self._output_buf_size
+        return self._task.timing.samp_quant_samp_per_chan
+
+    @output_buf_size.setter
+    def output_buf_size(self, value: int) -> None:
+        self._output_buf_size = int(value)
+
+    @property
+    def space_avail(self) -> int:
+        task = self._task
+        return max(self.output_buf_size - (task._write_position - task._generated()), 0)
+
+    @property
+    def curr_write_pos(self) -> int:
+        return self._task._write_position
+
+    @property
+    def total_samp_per_chan_generated(self) -> int:
+        return self._task._generated()
+
+
+def _terminal_key(terminal: str) -> str:
+    """Routing key of a terminal; PFI/RTSI lines are shared across devices."""
+    name = terminal.strip().strip("/").lower()
+    last = name.rsplit("/", 1)[-1]
+    if last.startswith(("pfi", "rtsi")):
+        return last
+    return name
+
+
+class SimulatedStartTrigger:
+    """Start trigger configuration of a simulated task."""
+
+    def __init__(self) -> None:
+        self.dig_edge_src = ""
+        self.dig_edge_edge = Edge.RISING
+
+    def cfg_dig_edge_start_trig(
+        self, trigger_source: str, trigger_edge: Edge = Edge.RISING
+    ) -> None:
+        self.dig_edge_src = trigger_source
+        self.dig_edge_edge = trigger_edge
+
+    def disable_start_trig(self) -> None:
+        self.dig_edge_src = ""
+
+
+class SimulatedTriggers:
+    def __init__(self) -> None:
+        self.start_trigger = SimulatedStartTrigger()
+
+
+class SimulatedExportSignals:
+    """Signal routes a simulated task drives when it starts."""
+
+    def __init__(self) -> None:
+        self.routes: List[Tuple[Signal, str]] = []
+
+    def export_signal(self, signal_id: Signal, output_terminal: str) -> None:
+        self.routes.append((signal_id, output_terminal))
+
+
+class SimulatedTask:
+    """Subset of ``nidaqmx.Task`` backed by synthetic data."""
+
+    _counter = itertools.count(1)
+
+    def __init__(self, backend: "SimulatedBackend", new_task_name: str = ""):
+        self.backend = backend
+        self.name = new_task_name or f"_unnamedTask<{next(self._counter)}>"
+        self.ai_channels = SimulatedAIChannelCollection(self)
+        self.ao_channels = SimulatedAOChannelCollection(self)
+        self.di_channels = SimulatedDIChannelCollection(self)
+        self.do_channels = SimulatedDOChannelCollection(self)
+        self.timing = SimulatedTiming()
+        self.in_stream = SimulatedInStream(self)
+        self.out_stream = SimulatedOutStream(self)
+        self.triggers = SimulatedTriggers()
+        self.export_signals = SimulatedExportSignals()
+        self._running = False
+        self._armed_on: Optional[str] = None
+        self._clock_ppm = 0.0
+        self._closed = False
+        self._t0 = 0.0
+        self._read_position = 0
+        self._write_position = 0
+        self._generated_at_stop = 0
+        self._every_n: Optional[Tuple[int, Callable[..., Any]]] = None
+        self._done_callback: Optional[Callable[..., Any]] = None
+        # Bumped on every start and stop so a stale event thread exits.
+        self._event_generation = 0
+        # Set by control(TASK_COMMIT/TASK_RESERVE); stop() keeps it.
+        self._reserved = False
+
+    # Task properties
+    @property
+    def channels(self) -> List[SimulatedChannel]:
+        return (
+            list(self.ai_channels)
+            + list(self.ao_channels)
+            + list(self.di_channels)
+            + list(self.do_channels)
+        )
+
+    @property
+    def channel_names(self) -> List[str]:
+        return [channel.name for channel in self.channels]
+
+    @property
+    def number_of_channels(self) -> int:
+        return len(self.channels)
+
+    @property
+    def rate(self) -> float:
+        """Sample clock rate, or 1 kS/s for software-timed tasks."""
+        return self.timing.samp_clk_rate or 1000.0
+
+    @property
+    def _output_channels(self) -> List[SimulatedChannel]:
+        return list(self.ao_channels) + list(self.do_channels)
+
+    # Lifecycle
+    def start(self) -> None:
+        self._check_open()
+        self._check_resources()
+        if (
+            self._output_channels
+            and self.timing.samp_clk_rate is not None
+            and self._write_position == 0
+        ):
+            raise DaqError(
+                "Generation cannot be started, because the output buffer is empty.",
+                DAQmxErrors.OUTPUT_BUFFER_EMPTY,
+                self.name,
+            )
+        self._t0 = time.monotonic()
+        self._read_position = 0
+        self._generated_at_stop = 0
+        devices = {channel.device for channel in self.channels}
+        self._clock_ppm = max(
+            (device.clock_error_ppm for device in devices), key=abs, default=0.0
+        )
+        trigger = self.triggers.start_trigger.dig_edge_src or self.timing.samp_clk_src
+        self._armed_on = _terminal_key(trigger) if trigger else None
+        self._running = True
+        if self._armed_on is None:
+            self.backend._fire(self)
+        self._start_events()
+
+    def _fired_signals(self) -> Dict[str, Signal]:
+        """Routing keys this task drives when it starts, with the signal on each."""
+        keys: Dict[str, Signal] = {}
+        for device in {channel.device.name.lower() for channel in self.ai_channels}:
+            keys[f"{device}/ai/starttrigger"] = Signal.START_TRIGGER
+            keys[f"{device}/ai/sampleclock"] = Signal.SAMPLE_CLOCK
+        for signal_id, terminal in self.export_signals.routes:
+            keys[_terminal_key(terminal)] = signal_id
+        return keys
+
+    def _trigger(self, source: "SimulatedTask", signal_id: Signal) -> None:
+        """Start acquiring now that the armed-on signal arrived from ``source``."""
+        self._armed_on = None
+        self._t0 = source._t0
+        if signal_id == Signal.SAMPLE_CLOCK:
+            self._clock_ppm = source._clock_ppm
+
+    def stop(self) -> None:
+        self._check_open()
+        self._event_generation += 1
+        self._armed_on = None
+        if self._running:
+            self._generated_at_stop = self._generated()
+        self._running = False
+        if self.out_stream.regen_mode == RegenerationMode.DONT_ALLOW_REGENERATION:
+            # Samples that were never generated are discarded.
+            self._write_position = 0
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._event_generation += 1
+        self._running = False
+        self._reserved = False
+        self._closed = True
+        self.backend._forget_task(self)
+
+    def control(self, action: TaskMode) -> None:
+        """Verify, commit, reserve or unreserve the task, or start/stop/abort it.
+
+        Committing reserves the task's analog-input devices until
+        ``TASK_UNRESERVE`` or ``close()``; like hardware, another task then
+        cannot commit or start AI on them (``-50103``, PAL_RESOURCE_RESERVED).
+        """
+        self._check_open()
+        if action == TaskMode.TASK_START:
+            self.start()
+        elif action in (TaskMode.TASK_STOP, TaskMode.TASK_ABORT):
+            self.stop()
+        elif action == TaskMode.TASK_UNRESERVE:
+            if not self._running:
+                self._reserved = False
+        else:
+            if not self.channels:
+                raise DaqError(
+                    "Operation cannot be performed when there are no channels in the task.",
+                    DAQmxErrors.CAN_NOT_PERFORM_OP_WHEN_NO_CHANS_IN_TASK,
+                    self.name,
+                )
+            if action in (TaskMode.TASK_COMMIT, TaskMode.TASK_RESERVE):
+                self._check_resources(running_too=True)
+                self._reserved = True
+
+    def _check_resources(self, running_too: bool = False) -> None:
+        devices = {channel.device.name for channel in self.ai_channels}
+        if not devices:
+            return
+        for task in self.backend.tasks():
+            if task is self or not (task._reserved or (running_too and task._running)):
+                continue
+            if devices & {channel.device.name for channel in task.ai_channels}:
+                raise DaqError(
+                    "The specified resource is reserved. The operation could not be completed as specified.",
+                    DAQmxErrors.PAL_RESOURCE_RESERVED,
+                    self.name,
+                )
+
+    def is_task_done(self) -> bool:
+        if not self._running:
+            return True
+        return (
+            self._is_finite and self._acquired() >= self.timing.samp_quant_samp_per_chan
+        )
+
+    # Events
+    def register_every_n_samples_acquired_into_buffer_event(
+        self, sample_interval: int, callback_method: Optional[Callable[..., Any]]
+    ) -> None:
+        """Call ``callback_method(task_handle, event_type, sample_interval, None)`` every ``sample_interval`` samples."""
+        self._check_can_register()
+        if callback_method is None:
+            self._every_n = None
+            return
+        if self._every_n is not None:
+            raise DaqError(
+                "Every N Samples Acquired into Buffer event is already registered.",
+                DAQmxErrors.EVERY_N_SAMPS_ACQ_INTO_BUFFER_EVENT_ALREADY_REGISTERED,
+                self.name,
+            )
+        if sample_interval <= 0:
+            raise DaqError(
+                "Every N Samples event interval of zero is not supported.",
+                DAQmxErrors.EVERY_N_SAMPS_EVENT_INTERVAL_ZERO_NOT_SUPPORTED,
+                self.name,
+            )
+        self._every_n = (int(sample_interval), callback_method)
+
+    def register_done_event(
+        self, callback_method: Optional[Callable[..., Any]]
+    ) -> None:
+        """Call ``callback_method(task_handle, status, None)`` when a finite acquisition completes."""
+        self._check_can_register()
+        if callback_method is not None and self._done_callback is not None:
+            raise DaqError(
+                "Done event is already registered.",
+                DAQmxErrors.DONE_EVENT_ALREADY_REGISTERED,
+                self.name,
+            )
+        self._done_callback = callback_method
+
+    def _check_can_register(self) -> None:
+        self._check_open()
+        if self._running:
+            raise DaqError(
+                "DAQmx software events cannot be registered or unregistered while the task is running.",
+                DAQmxErrors.CANNOT_REGISTER_DA_QMX_SOFTWARE_EVENT_WHILE_TASK_IS_RUNNING,
+                self.name,
+            )
+
+    def _start_events(self) -> None:
+        if self._every_n is None and self._done_callback is None:
+            return
+        self._event_generation += 1
+        thread = threading.Thread(
+            target=self._event_loop,
+            args=(self._event_generation,),
+            name=f"{self.name} events",
+            daemon=True,
+        )
+        thread.start()
+
+    def _event_loop(self, generation: int) -> None:
+        """Deliver every-N and done events until the task stops."""
+        interval, on_samples = self._every_n if self._every_n is not None else (0, None)
+        on_done = self._done_callback
+        fired = 0
+        while self._running and self._event_generation == generation:
+            acquired = self._acquired()
+            while on_samples is not None and acquired >= (fired + 1) * interval:
+                fired += 1
+                _call_event(
+                    on_samples,
+                    id(self),
+                    EveryNSamplesEventType.ACQUIRED_INTO_BUFFER.value,
+                    interval,
+                    None,
+                )
+                if not self._running or self._event_generation != generation:
+                    return
+                acquired = self._acquired()
+            if self._is_finite and acquired >= self.timing.samp_quant_samp_per_chan:
+                if on_done is not None:
+                    _call_event(on_done, id(self), 0, None)
+                return
+            if (
+                self.backend.realtime
+                and self.timing.samp_clk_rate
+                and on_samples is not None
+            ):
+                wait = ((fired + 1) * interval - acquired) / self.rate
+            else:
+                wait = 0.001
+            time.sleep(min(max(wait, 0.0005), 0.05))
+
+    def __enter__(self) -> "SimulatedTask":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    # Acquisition model
+    @property
+    def _is_finite(self) -> bool:
+        timing = self.timing
+        return (
+            timing.samp_clk_rate is not None
+            and timing.samp_quant_samp_mode == AcquisitionType.FINITE
+        )
+
+    def _check_open(self) -> None:
+        if self._closed:
+            raise DaqError(
+                "Task specified is invalid or does not exist.",
+                DAQmxErrors.INVALID_TASK,
+                self.name,
+            )
+
+    def _acquired(self, now: Optional[float] = None) -> int:
+        """Samples per channel acquired into the buffer so far."""
+        if not self._running or self._armed_on is not None:
+            return self._read_position
+        timing = self.timing
+        if not self.backend.realtime or timing.samp_clk_rate is None:
+            # Unpaced: pretend the hardware is always exactly one buffer ahead.
+            acquired = self._read_position + self.in_stream.input_buf_size
+        else:
+            if now is None:
+                now = time.monotonic()
+            acquired = int(
+                (now - self._t0) * timing.samp_clk_rate * (1.0 + self._clock_ppm * 1e-6)
+            )
+        if self._is_finite:
+            acquired = min(acquired, timing.samp_quant_samp_per_chan)
+        return acquired
+
+    def _wait_for_samples(self, num_samples: int, timeout: float) -> int:
+        """Block until ``num_samples`` are available and return how many to read."""
+        rate = self.rate
+        buffer_size = self.in_stream.input_buf_size
+        deadline = time.monotonic() + timeout
+        while True:
+            now = time.monotonic()
+            acquired = self._acquired(now)
+            backlog = acquired - self._read_position
+            if backlog > buffer_size:
+                self._running = False
+                raise DaqReadError(
+                    "The application is not able to keep up with the acquisition. "
+                    "Attempted to read samples that are no longer available. "
+                    "Increasing the buffer size, reading the data more frequently, "
+                    "or specifying a fixed number of samples to read instead of "
+                    "reading all available samples might correct the problem.",
+                    DAQmxErrors.SAMPLES_NO_LONGER_AVAILABLE,
+                    0,
+                    self.name,
+                )
+            if num_samples == READ_ALL_AVAILABLE:
+                return backlog
+            if backlog >= num_samples:
+                return num_samples
+            if self._is_finite and acquired >= self.timing.samp_quant_samp_per_chan:
+                return backlog
+            wait = (self._read_position + num_samples - acquired) / rate
+            if now + wait > deadline:
+                raise DaqReadError(
+                    "Some or all of the samples requested have not yet been acquired.",
+                    DAQmxErrors.SAMPLES_NOT_YET_AVAILABLE,
+                    0,
+                    self.name,
+                )
+            time.sleep(wait)
+
+    def _read_into(self, data: np.ndarray, num_samples: int, timeout: float) -> int:
+        """Fill ``data[:, :n]`` with AI samples and return ``n``."""
+        self._check_open()
+        if not self._running:
+            self.start()
+        if num_samples == READ_ALL_AVAILABLE:
+            num_samples = min(
+                self._wait_for_samples(READ_ALL_AVAILABLE, timeout), data.shape[1]
+            )
+        else:
+            num_samples = self._wait_for_samples(num_samples, timeout)
+        start = self._read_position
+        rate = self.rate
+        for row, channel in zip(data, self.ai_channels):
+            out = row[:num_samples]
+            channel.waveform.generate(start, num_samples, rate, out=out)
+            np.clip(out, channel.ai_min, channel.ai_max, out=out)
+        self._read_position = start + num_samples
+        return num_samples
+
+    def _read_raw_into(self, data: np.ndarray, num_samples: int, timeout: float) -> int:
+        """Fill ``data[:, :n]`` with int16 ADC codes and return ``n``."""
+        scaled = np.empty(data.shape)
+        num_samples = self._read_into(scaled, num_samples, timeout)
+        for row, out, channel in zip(scaled, data, self.ai_channels):
+            offset, gain = channel.ai_dev_scaling_coeff
+            codes = np.rint((row[:num_samples] - offset) / gain)
+            np.clip(codes, -32768, 32767, out=codes)
+            out[:num_samples] = codes
+        return num_samples
+
+    def _generated(self, now: Optional[float] = None) -> int:
+        """Samples per channel generated from the output buffer so far."""
+        if not self._running:
+            return self._generated_at_stop
+        timing = self.timing
+        if not self.backend.realtime or timing.samp_clk_rate is None:
+            generated = self._write_position
+        else:
+            if now is None:
+                now = time.monotonic()
+            generated = int((now - self._t0) * timing.samp_clk_rate)
+            if self.out_stream.regen_mode == RegenerationMode.DONT_ALLOW_REGENERATION:
+                generated = min(generated, self._write_position)
+        if self._is_finite:
+            generated = min(generated, timing.samp_quant_samp_per_chan)
+        return generated
+
+    def _underflowed(self, now: float) -> bool:
+        """Whether a non-regenerating generation ran out of written samples."""
+        timing = self.timing
+        if (
+            not self._running
+            or not self.backend.realtime
+            or timing.samp_clk_rate is None
+            or self._is_finite
+            or self.out_stream.regen_mode != RegenerationMode.DONT_ALLOW_REGENERATION
+        ):
+            return False
+        return int((now - self._t0) * timing.samp_clk_rate) > self._write_position
+
+    def _write_from(self, data: np.ndarray, timeout: float) -> int:
+        """Queue ``data`` (``(output channels, samples)``) for generation."""
+        self._check_open()
+        num_samples = data.shape[1]
+        stream = self.out_stream
+        if not self._running:
+            # Data written before the task starts sizes the buffer, as in DAQmx.
+            stream._output_buf_size = max(
+                stream.output_buf_size, self._write_position + num_samples
+            )
+            self._write_position += num_samples
+            return num_samples
+        deadline = time.monotonic() + timeout
+        remaining = num_samples
+        while remaining:
+            now = time.monotonic()
+            if self._underflowed(now):
+                self.stop()
+                raise DaqWriteError(
+                    "The generation has stopped to prevent the regeneration of old samples. "
+                    "Your application was unable to write samples to the background buffer "
+                    "fast enough to prevent old samples from being regenerated.",
+                    DAQmxErrors.GEN_STOPPED_TO_PREVENT_REGEN_OF_OLD_SAMPLES,
+                    num_samples - remaining,
+                    self.name,
+                )
+            space = stream.output_buf_size - (
+                self._write_position - self._generated(now)
+            )
+            chunk = min(remaining, stream.output_buf_size)
+            if space >= chunk:
+                self._write_position += chunk
+                remaining -= chunk
+                continue
+            wait = (chunk - space) / self.rate
+            if now + wait > deadline:
+                raise DaqWriteError(
+                    "Some or all of the samples to write could not be written to the buffer "
+                    "yet. More space will free up as samples currently in the buffer are "
+                    "generated.",
+                    DAQmxErrors.SAMPLES_CAN_NOT_YET_BE_WRITTEN,
+                    num_samples - remaining,
+                    self.name,
+                )
+            time.sleep(wait)
+        return num_samples
+
+    def read(
+        self, number_of_samples_per_channel: Any = _UNSET, timeout: float = 10.0
+    ) -> Any:
+        """Read scaled AI samples and return them as Python lists like ``nidaqmx``."""
+        self._check_open()
+        if not self._running:
+            self.start()
+        single_sample = number_of_samples_per_channel is _UNSET
+        num_samples = 1 if single_sample else number_of_samples_per_channel
+        if num_samples == READ_ALL_AVAILABLE:
+            num_samples = self._wait_for_samples(READ_ALL_AVAILABLE, timeout)
+        data = np.empty((len(self.ai_channels), num_samples))
+        data = data[:, : self._read_into(data, num_samples, timeout)]
+        if single_sample:
+            return data[0, 0] if len(data) == 1 else data[:, 0].tolist()
+        if len(data) == 1:
+            return data[0].tolist()
+        return data.tolist()
+
+
+def _call_event(callback: Callable[..., Any], *args: Any) -> None:
+    # The driver ignores what callbacks return or raise.
+    try:
+        callback(*args)
+    except Exception:
+        pass
+
+
+class SimulatedAIReader:
+    """Drop-in for ``AnalogMultiChannelReader`` on a simulated task."""
+
+    def __init__(self, task: SimulatedTask):
+        self._task = task
+        self.verify_array_shape = True
+
+    def _verify_shape(
+        self, data: np.ndarray, number_of_samples_per_channel: int
+    ) -> None:
+        if (
+            self.verify_array_shape
+            and number_of_samples_per_channel != READ_ALL_AVAILABLE
+        ):
+            expected = (len(self._task.ai_channels), number_of_samples_per_channel)
+            if data.shape != expected:
+                raise DaqError(
+                    "Read cannot be performed because the NumPy array passed into "
+                    "this function is not shaped correctly.\n\n"
+                    f"Shape of NumPy Array provided: {data.shape}\n"
+                    f"Shape of NumPy Array required: {expected}",
+                    DAQmxErrors.UNKNOWN,
+                    self._task.name,
+                )
+
+    def read_many_sample(
+        self,
+        data: np.ndarray,
+        number_of_samples_per_channel: int = READ_ALL_AVAILABLE,
+        timeout: float = 10.0,
+    ) -> int:
+        self._verify_shape(data, number_of_samples_per_channel)
+        return self._task._read_into(data, number_of_samples_per_channel, timeout)
+
+
+class SimulatedUnscaledReader(SimulatedAIReader):
+    """Drop-in for ``AnalogUnscaledReader`` on a simulated task."""
+
+    def read_int16(
+        self,
+        data: np.ndarray,
+        number_of_samples_per_channel: int = READ_ALL_AVAILABLE,
+        timeout: float = 10.0,
+    ) -> int:
+        self._verify_shape(data, number_of_samples_per_channel)
+        return self._task._read_raw_into(data, number_of_samples_per_channel, timeout)
+
+
+class _SimulatedWriter:
+    """Shape checks shared by the simulated stream writers."""
+
+    def __init__(self, task: SimulatedTask, auto_start: bool = False):
+        self._task = task
+        self.auto_start = auto_start
+        self.verify_array_shape = True
+
+    def _write(
+        self,
+        data: np.ndarray,
+        channels: Sequence[SimulatedChannel],
+        dtype: Any,
+        timeout: float,
+    ) -> int:
+        if self.verify_array_shape and (
+            data.ndim != 2 or data.shape[0] != len(channels)
+        ):
+            raise DaqError(
+                "Write cannot be performed because the NumPy array passed into "
+                "this function is not shaped correctly. You must pass in a NumPy "
+                "array of the correct number of dimensions based on the write method.\n\n"
+                f"Shape of NumPy Array provided: {data.shape}\n"
+                f"Number of channels in the task: {len(channels)}",
+                DAQmxErrors.UNKNOWN,
+                self._task.name,
+            )
+        if data.dtype != dtype:
+            raise DaqError(
+                f"Write cannot be performed because the NumPy array passed into this "
+                f"function has dtype {data.dtype}; {np.dtype(dtype)} is required.",
+                DAQmxErrors.UNKNOWN,
+                self._task.name,
+            )
+        written = self._task._write_from(data, timeout)
+        if self.auto_start and not self._task._running:
+            self._task.start()
+        return written
+
+
+class SimulatedAOWriter(_SimulatedWriter):
+    """Drop-in for ``AnalogMultiChannelWriter`` on a simulated task."""
+
+    def write_many_sample(self, data: np.ndarray, timeout: float = 10.0) -> int:
+        return self._write(data, self._task.ao_channels, np.float64, timeout)
+
+
+class SimulatedDOWriter(_SimulatedWriter):
+    """Drop-in for ``DigitalMultiChannelWriter`` on a simulated task."""
+
+    def write_many_sample_port_uint32(
+        self, data: np.ndarray, timeout: float = 10.0
+    ) -> int:
+        return self._write(data, self._task.do_channels, np.uint32, timeout)
+
+
+def expand_physical_channels(spec: str) -> List[str]:
+    """Expand ``"dev3/ai0:2, dev3/ai5"`` into individual channel names."""
+    names = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        head, _, last = part.rpartition("/")
+        match = _RANGE_RE.match(last)
+        if match is None:
+            names.append(part)
+            continue
+        first_index, last_index = int(match.group("first")), int(match.group("last"))
+        step = 1 if last_index >= first_index else -1
+        for index in range(first_index, last_index + step, step):
+            names.append(
+                f"{head}/{match.group('prefix')}{index}"
+                if head
+                else f"{match.group('prefix')}{index}"
+            )
+    return names
+
+
+class SimulatedBackend(Backend):
+    """Backend that runs entirely in-process on synthetic devices.
+
+    Args:
+        devices: Simulated devices. Defaults to one eight-channel device
+            called ``"dev3"`` to match ``start_continuous_ai_task``.
+        realtime: Pace acquisition at the configured sample rate.
+    """
+
+    name = "sim"
+
+    def __init__(
+        self, devices: Optional[Sequence[SimulatedDevice]] = None, realtime: bool = True
+    ):
+        super().__init__()
+        if devices is None:
+            devices = [SimulatedDevice("dev3")]
+        self.realtime = realtime
+        self._devices: Dict[str, SimulatedDevice] = {}
+        self._tasks: List[SimulatedTask] = []
+        self._lock = threading.Lock()
+        for device in devices:
+            self.add_device(device)
+
+    def add_device(self, device: SimulatedDevice) -> None:
+        with self._lock:
+            self._devices[device.name.lower()] = device
+        self._notify_devices_changed()
+
+    def remove_device(self, name: str) -> None:
+        with self._lock:
+            del self._devices[name.lower()]
+        self._notify_devices_changed()
+
+    def create_task(self, new_task_name: str = "") -> SimulatedTask:
+        task = SimulatedTask(self, new_task_name)
+        with self._lock:
+            self._tasks.append(task)
+        return task
+
+    def devices(self) -> List[SimulatedDevice]:
+        return list(self._devices.values())
+
+    def device(self, name: str) -> SimulatedDevice:
+        try:
+            return self._devices[name.lower()]
+        except KeyError:
+            raise KeyError(f"Device {name!r} not found") from None
+
+    def tasks(self) -> List[SimulatedTask]:
+        return list(self._tasks)
+
+    def ai_reader(self, task: SimulatedTask) -> SimulatedAIReader:
+        return SimulatedAIReader(task)
+
+    def ai_unscaled_reader(self, task: SimulatedTask) -> SimulatedUnscaledReader:
+        return SimulatedUnscaledReader(task)
+
+    def ao_writer(self, task: SimulatedTask) -> SimulatedAOWriter:
+        return SimulatedAOWriter(task)
+
+    def do_writer(self, task: SimulatedTask) -> SimulatedDOWriter:
+        return SimulatedDOWriter(task)
+
+    def _fire(self, source: SimulatedTask) -> None:
+        """Trigger every task armed on a signal that ``source`` drives."""
+        signals = source._fired_signals()
+        for task in self.tasks():
+            if task._running and task._armed_on in signals:
+                task._trigger(source, signals[task._armed_on])
+
+    def _forget_task(self, task: SimulatedTask) -> None:
+        with self._lock:
+            if task in self._tasks:
+                self._tasks.remove(task)
+
+    def _find_physical_channel(
+        self, physical_name: str, attr: str
+    ) -> Tuple[SimulatedDevice, SimulatedPhysicalChannel]:
+        device_name = physical_name.lstrip("/").split("/", 1)[0]
+        device = self._devices.get(device_name.lower())
+        if device is not None:
+            wanted = physical_name.lstrip("/").lower()
+            for physical in getattr(device, attr):
+                if physical.name.lower() == wanted:
+                    return device, physical
+        raise DaqError(
+            f"Physical channel specified does not exist on this device.\n\n"
+            f"Physical Channel Name: {physical_name}",
+            DAQmxErrors.PHYSICAL_CHAN_DOES_NOT_EXIST,
+        )
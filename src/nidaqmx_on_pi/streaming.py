@@ -0,0 +1,551 @@
+"""Zero-copy streaming acquisition for continuous analog-input tasks.
+
+A :class:`StreamingReader` wraps a running task (for example one returned by
+``cli.start_continuous_ai_task``) with an ``AnalogMultiChannelReader`` and reads
+into a fixed pool of preallocated NumPy buffers. Consumers receive
+:class:`Block` objects whose ``data`` is a view into a pooled buffer, so no
+sample is copied between the driver and the consumer.
+
+Blocks can be consumed in three ways:
+
+* ``subscribe(callback)``: the callback runs on the reader thread for every
+  block. The view is only valid for the duration of the call.
+* ``get()``: pull the oldest pending block and ``release()`` it (or use it as a
+  context manager) to return its buffer to the pool.
+* ``async for block in reader``: the same pending queue from asyncio code.
+  Each block is released when the loop moves on to the next one.
+
+A subscriber that raises is logged, counted in ``stats.subscriber_errors``
+and unsubscribed; the source and its other consumers carry on.
+
+When pull consumers fall behind, the oldest pending block is recycled and
+counted as *overwritten*. When no buffer can be recycled because consumers
+hold the rest, the read still happens (so the driver buffer keeps draining)
+but the block is counted as *lost*.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .backends import backend_for_task
+from .metrics import LatencyHistogram
+from .scaling import RAW_DTYPE, apply_scaling, scaling_coefficients
+
+logger = logging.getLogger(__name__)
+
+
+class Block:
+    """A block of samples living in a pooled buffer."""
+
+    __slots__ = (
+        "data",
+        "sequence",
+        "first_sample",
+        "timestamp",
+        "scaling",
+        "_source",
+        "_slot",
+    )
+
+    def __init__(
+        self,
+        data: np.ndarray,
+        sequence: int,
+        first_sample: int,
+        timestamp: float,
+        source: Optional["BlockSource"] = None,
+        slot: Optional[int] = None,
+        scaling: Optional[np.ndarray] = None,
+    ):
+        self.data = data
+        self.sequence = sequence
+        self.first_sample = first_sample
+        self.timestamp = timestamp
+        self.scaling = scaling
+        self._source = source
+        self._slot = slot
+
+    @property
+    def num_channels(self) -> int:
+        return self.data.shape[0]
+
+    @property
+    def num_samples(self) -> int:
+        return self.data.shape[1]
+
+    @property
+    def raw(self) -> bool:
+        """True when ``data`` holds unscaled ADC codes."""
+        return self.scaling is not None
+
+    def scaled(self, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Return the samples in volts.
+
+        Scaled blocks return ``data`` itself; raw blocks are converted with
+        the channel scaling polynomials into ``out`` or a new array.
+        """
+        if self.scaling is None:
+            return self.data
+        return apply_scaling(self.data, self.scaling, out)
+
+    def release(self) -> None:
+        """Return the underlying buffer to the pool."""
+        if self._source is not None and self._slot is not None:
+            self._source._release_slot(self._slot)
+            self._slot = None
+
+    def __enter__(self) -> "Block":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.release()
+
+
+class BufferPool:
+    """Fixed set of preallocated ``(channels, samples)`` buffers.
+
+    Buffers are addressed by slot index. Each slot is stored flat so that a
+    view of any length up to ``samples_per_buffer`` is C-contiguous, which is
+    what the DAQmx stream readers require.
+    """
+
+    def __init__(
+        self,
+        num_buffers: int,
+        num_channels: int,
+        samples_per_buffer: int,
+        dtype: Any = np.float64,
+    ):
+        if num_buffers < 2:
+            raise ValueError("A buffer pool needs at least two buffers.")
+        self.num_buffers = num_buffers
+        self.num_channels = num_channels
+        self.samples_per_buffer = samples_per_buffer
+        self.dtype = np.dtype(dtype)
+        self._storage = np.zeros(
+            (num_buffers, num_channels * samples_per_buffer), dtype=self.dtype
+        )
+        self._free: Deque[int] = deque(range(num_buffers))
+
+    @property
+    def nbytes(self) -> int:
+        return self._storage.nbytes
+
+    @property
+    def free_count(self) -> int:
+        return len(self._free)
+
+    def acquire(self) -> Optional[int]:
+        """Take a free slot, or return None when every buffer is in use."""
+        try:
+            return self._free.popleft()
+        except IndexError:
+            return None
+
+    def release(self, slot: int) -> None:
+        self._free.append(slot)
+
+    def view(self, slot: int, num_samples: Optional[int] = None) -> np.ndarray:
+        """Return a contiguous ``(channels, num_samples)`` view of a slot."""
+        if num_samples is None:
+            num_samples = self.samples_per_buffer
+        flat = self._storage[slot, : self.num_channels * num_samples]
+        return flat.reshape(self.num_channels, num_samples)
+
+
+class StreamStats:
+    """Throughput and loss counters for a block source.
+
+    Counters are only written by the reader thread; other threads may read
+    them at any time. ``read_latency`` times each ``_read_into`` call and
+    ``callback_latency`` each round of subscriber callbacks.
+    """
+
+    def __init__(self) -> None:
+        self.read_latency = LatencyHistogram()
+        self.callback_latency = LatencyHistogram()
+        self.reset()
+
+    def reset(self) -> None:
+        self.blocks = 0
+        self.samples = 0
+        self.overwritten = 0
+        self.lost = 0
+        self.errors = 0
+        self.subscriber_errors = 0
+        self.last_error: Optional[BaseException] = None
+        self.started_at: Optional[float] = None
+        self.last_block_at: Optional[float] = None
+        self.read_latency.reset()
+        self.callback_latency.reset()
+
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        end = self.last_block_at if self.last_block_at is not None else self.started_at
+        return max(end - self.started_at, 0.0)
+
+    @property
+    def samples_per_second(self) -> float:
+        """Sustained per-channel sample rate since start."""
+        elapsed = self.elapsed
+        return self.samples / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def blocks_per_second(self) -> float:
+        elapsed = self.elapsed
+        return self.blocks / elapsed if elapsed > 0 else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "blocks": self.blocks,
+            "samples": self.samples,
+            "overwritten": self.overwritten,
+            "lost": self.lost,
+            "errors": self.errors,
+            "subscriber_errors": self.subscriber_errors,
+            "elapsed": self.elapsed,
+            "samples_per_second": self.samples_per_second,
+            "blocks_per_second": self.blocks_per_second,
+            "read_seconds": self.read_latency.as_dict(),
+            "callback_seconds": self.callback_latency.as_dict(),
+            "last_error": str(self.last_error) if self.last_error else None,
+        }
+
+
+class BlockSource:
+    """Base class for anything that produces pooled sample blocks.
+
+    Subclasses implement ``_read_into(data)``, which fills the given
+    ``(channels, samples)`` array and returns the number of samples per channel
+    written. The base class owns the buffer pool, the reader thread, the
+    pending queue and the statistics.
+
+    ``samples_per_block`` may be changed while running (for example by
+    ``autotune.BlockSizeTuner``) up to ``max_samples_per_block``, which sizes
+    the pool; the next read uses the new size.
+    """
+
+    def __init__(
+        self,
+        num_channels: int,
+        samples_per_block: int,
+        num_buffers: int = 8,
+        dtype: Any = np.float64,
+        queue_blocks: bool = True,
+        max_samples_per_block: Optional[int] = None,
+    ):
+        max_samples = max(max_samples_per_block or samples_per_block, samples_per_block)
+        self.num_channels = num_channels
+        self.queue_blocks = queue_blocks
+        self.pool = BufferPool(num_buffers, num_channels, max_samples, dtype)
+        self.samples_per_block = samples_per_block
+        # Extra buffer used to keep draining the driver when every pooled
+        # buffer is held by a consumer.
+        self._scratch = np.zeros(num_channels * max_samples, dtype=self.pool.dtype)
+        self.stats = StreamStats()
+        # Raw-to-volts coefficients attached to every block of a raw source.
+        self.scaling: Optional[np.ndarray] = None
+
+        self._subscribers: List[Callable[[Block], None]] = []
+        self._async_waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = []
+        self._pending: Deque[Block] = deque()
+        self._pending_cond = threading.Condition()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._sequence = 0
+        self._sample_index = 0
+        self.on_error: Optional[Callable[[BaseException], None]] = None
+
+    @property
+    def samples_per_block(self) -> int:
+        return self._samples_per_block
+
+    @samples_per_block.setter
+    def samples_per_block(self, value: int) -> None:
+        limit = self.pool.samples_per_buffer
+        if not 0 < value <= limit:
+            raise ValueError(f"samples_per_block must be in [1, {limit}], got {value}")
+        self._samples_per_block = int(value)
+
+    @property
+    def max_samples_per_block(self) -> int:
+        return self.pool.samples_per_buffer
+
+    # Consumer API
+    def subscribe(self, callback: Callable[[Block], None]) -> None:
+        """Call ``callback(block)`` on the reader thread for every block."""
+        self._subscribers = self._subscribers + [callback]
+
+    def unsubscribe(self, callback: Callable[[Block], None]) -> None:
+        self._subscribers = [cb for cb in self._subscribers if cb is not callback]
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Block]:
+        """Return the oldest pending block, or None on timeout/stop."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._pending_cond:
+            # The reader may recycle a pending block between our wake-up and
+            # re-acquiring the lock, so wait until the deadline, not once.
+            while not self._pending and not self._stop_event.is_set():
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._pending_cond.wait(remaining)
+            if self._pending:
+                return self._pending.popleft()
+        return None
+
+    def __aiter__(self) -> AsyncIterator[Block]:
+        """Iterate over pending blocks without blocking the event loop.
+
+        Ends when the source stops and the queue is empty. Each block is
+        released when the next one is requested; copy data to keep it.
+        """
+        if not self.queue_blocks:
+            raise RuntimeError("async iteration needs queue_blocks=True")
+        return self._iterate_async()
+
+    async def _iterate_async(self) -> AsyncIterator[Block]:
+        wakeup = asyncio.Event()
+        waiter = (asyncio.get_running_loop(), wakeup)
+        self._async_waiters = self._async_waiters + [waiter]
+        try:
+            while True:
+                block = self.get(timeout=0)
+                if block is None:
+                    if self._stop_event.is_set() and not self._pending:
+                        return
+                    await wakeup.wait()
+                    wakeup.clear()
+                    continue
+                try:
+                    yield block
+                finally:
+                    block.release()
+        finally:
+            self._async_waiters = [w for w in self._async_waiters if w is not waiter]
+
+    def _wake_async(self) -> None:
+        for loop, event in self._async_waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # The loop was closed without finishing the iteration.
+                pass
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    # Lifecycle
+    def start(self) -> "BlockSource":
+        if self.running:
+            return self
+        self._stop_event.clear()
+        self.stats.reset()
+        self.stats.started_at = time.monotonic()
+        self._thread = threading.Thread(
+            target=self._run, name=type(self).__name__, daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop_event.set()
+        with self._pending_cond:
+            self._pending_cond.notify_all()
+        self._wake_async()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        self._thread = None
+
+    def __enter__(self) -> "BlockSource":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+    # Producer side
+    def _read_into(self, data: np.ndarray) -> int:
+        raise NotImplementedError
+
+    def _release_slot(self, slot: int) -> None:
+        self.pool.release(slot)
+
+    def _claim_slot(self) -> Optional[int]:
+        slot = self.pool.acquire()
+        if slot is not None:
+            return slot
+        # Recycle the oldest block nobody has picked up yet, but always leave
+        # the newest one so a consumer holding the rest can still catch up.
+        with self._pending_cond:
+            if len(self._pending) > 1:
+                evicted = self._pending.popleft()
+                slot = evicted._slot
+                evicted._slot = None
+                self.stats.overwritten += 1
+        return slot
+
+    def _publish(self, block: Block) -> None:
+        started = time.perf_counter()
+        for callback in self._subscribers:
+            try:
+                callback(block)
+            except Exception as e:
+                self._drop_subscriber(callback, e)
+        self.stats.callback_latency.observe(time.perf_counter() - started)
+        if self.queue_blocks:
+            with self._pending_cond:
+                self._pending.append(block)
+                self._pending_cond.notify()
+            if self._async_waiters:
+                self._wake_async()
+        else:
+            block.release()
+
+    def _drop_subscriber(
+        self, callback: Callable[[Block], None], error: Exception
+    ) -> None:
+        # One failing consumer must not stop the source for all the others.
+        self.stats.subscriber_errors += 1
+        self.stats.last_error = error
+        logger.error(
+            "Unsubscribed %r after it raised: %s", callback, error, exc_info=error
+        )
+        self.unsubscribe(callback)
+
+    def _read_block(self) -> bool:
+        """Read and publish one block. Returns False when the source is done."""
+        slot = self._claim_slot()
+        if slot is None:
+            data = self._scratch[: self.num_channels * self.samples_per_block].reshape(
+                self.num_channels, self.samples_per_block
+            )
+        else:
+            data = self.pool.view(slot, self.samples_per_block)
+
+        stats = self.stats
+        started = time.perf_counter()
+        try:
+            num_samples = self._read_into(data)
+        except Exception:
+            if slot is not None:
+                self.pool.release(slot)
+            raise
+
+        if num_samples <= 0:
+            if slot is not None:
+                self.pool.release(slot)
+            return num_samples == 0
+        stats.read_latency.observe(time.perf_counter() - started)
+
+        now = time.monotonic()
+        stats.blocks += 1
+        stats.samples += num_samples
+        stats.last_block_at = now
+        if num_samples != data.shape[1]:
+            data = data[:, :num_samples]
+        block = Block(
+            data, self._sequence, self._sample_index, now, self, slot, self.scaling
+        )
+        self._sequence += 1
+        self._sample_index += num_samples
+
+        if slot is None:
+            stats.lost += 1
+            return True
+        self._publish(block)
+        return True
+
+    def _run(self) -> None:
+        try:
+            while not self._stop_event.is_set():
+                if not self._read_block():
+                    break
+        except Exception as e:
+            self.stats.errors += 1
+            self.stats.last_error = e
+            if self.on_error is not None and not self._stop_event.is_set():
+                self.on_error(e)
+        finally:
+            self._stop_event.set()
+            with self._pending_cond:
+                self._pending_cond.notify_all()
+            self._wake_async()
+
+
+class StreamingReader(BlockSource):
+    """Read a running analog-input task into pooled buffers on a thread.
+
+    Args:
+        task: A started task with one or more AI channels, for example the
+            result of ``cli.start_continuous_ai_task``.
+        samples_per_block: Samples per channel read per call.
+        num_buffers: Number of buffers in the pool.
+        timeout: Read timeout in seconds passed to the driver.
+        reader: Optional pre-built stream reader. Defaults to the task's
+            backend reader (``AnalogMultiChannelReader`` on hardware, or
+            ``AnalogUnscaledReader`` in raw mode).
+        queue_blocks: Keep blocks for ``get()``. Disable when only
+            ``subscribe`` callbacks are used.
+        raw: Read int16 ADC codes with ``read_int16`` instead of float64
+            volts. Blocks carry the channel scaling coefficients and convert
+            on demand with :meth:`Block.scaled`. Only suitable for devices
+            with ADCs of 16 bits or fewer, such as the USB-600x family.
+        max_samples_per_block: Largest block size ``samples_per_block`` may
+            later be changed to; defaults to ``samples_per_block``.
+    """
+
+    def __init__(
+        self,
+        task: Any,
+        samples_per_block: int = 1000,
+        num_buffers: int = 8,
+        timeout: float = 10.0,
+        reader: Any = None,
+        queue_blocks: bool = True,
+        raw: bool = False,
+        max_samples_per_block: Optional[int] = None,
+    ):
+        if reader is None:
+            backend = backend_for_task(task)
+            reader = (
+                backend.ai_unscaled_reader(task) if raw else backend.ai_reader(task)
+            )
+        # The pool always hands out correctly shaped arrays.
+        if hasattr(reader, "verify_array_shape"):
+            reader.verify_array_shape = False
+        self.task = task
+        self.reader = reader
+        self.timeout = timeout
+        self.raw = raw
+        super().__init__(
+            task.number_of_channels,
+            samples_per_block,
+            num_buffers=num_buffers,
+            dtype=RAW_DTYPE if raw else np.float64,
+            queue_blocks=queue_blocks,
+            max_samples_per_block=max_samples_per_block,
+        )
+        if raw:
+            self.scaling = scaling_coefficients(task)
+
+    def _read_into(self, data: np.ndarray) -> int:
+        if self.raw:
+            return self.reader.read_int16(
+                data, number_of_samples_per_channel=data.shape[1], timeout=self.timeout
+            )
+        return self.reader.read_many_sample(
+            data, number_of_samples_per_channel=data.shape[1], timeout=self.timeout
+        )
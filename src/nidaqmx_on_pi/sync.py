@@ -0,0 +1,487 @@
+"""Synchronised acquisition from several DAQ devices as one stream.
+
+:class:`SynchronizedAcquisition` creates one continuous AI task per device,
+arms them so they start on the same sample clock edge, reads each with its
+own :class:`~nidaqmx_on_pi.streaming.StreamingReader` thread and merges the
+blocks by absolute sample index into a single multi-channel
+:class:`~nidaqmx_on_pi.streaming.BlockSource`. Recorders, the stream server
+and DSP pipelines attach to it like to a single-device reader.
+
+Synchronisation modes (the first device is the master):
+
+* ``"start_trigger"``: the master exports its AI start trigger to
+  ``master.terminal`` and every other device starts on a digital edge at its
+  own ``terminal``; wire those PFI lines together. Each device keeps its own
+  timebase, so the devices drift apart slowly.
+* ``"clock"``: the master exports its AI sample clock and the other devices
+  use it as their sample clock source, so they start together and never drift.
+* ``"software"``: no wiring; tasks are started back to back and alignment is
+  only as good as the start latency.
+
+Hot path: each device's reader thread copies its blocks into a private
+:class:`~nidaqmx_on_pi.ringbuffer.RingBuffer` and updates its own drift
+estimate; nothing is shared between device threads. The merge thread polls
+the rings' write counters and copies the span every device has delivered.
+
+Example::
+
+    sync = SynchronizedAcquisition(
+        [DeviceSpec("dev1", "ai0:3"), DeviceSpec("dev2", "ai0:3")], rate=10000.0
+    )
+    with sync:
+        with sync.get(timeout=1.0) as block:  # (8, samples), aligned by index
+            print(block.first_sample, sync.sample_time(block.first_sample))
+        print(sync.sync_stats.as_dict())
+    sync.close()
+"""
+
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from nidaqmx.constants import AcquisitionType, Edge, Signal, TerminalConfiguration
+
+from .backends import Backend, get_backend
+from .ringbuffer import RingBuffer
+from .scaling import coefficient_array
+from .streaming import BlockSource, StreamingReader
+
+SYNC_MODES = ("start_trigger", "clock", "software")
+
+
+class DeviceSpec:
+    """One device taking part in a synchronised acquisition.
+
+    Args:
+        device: Device name, for example ``"dev1"``.
+        channels: AI channels on the device, for example ``"ai0:3"``.
+        min_val: Minimum expected voltage.
+        max_val: Maximum expected voltage.
+        terminal_config: Terminal configuration name (``"RSE"``, ``"DIFF"``...).
+        terminal: PFI terminal wired to the shared trigger or clock line.
+    """
+
+    def __init__(
+        self,
+        device: str,
+        channels: str = "ai0",
+        min_val: float = -10.0,
+        max_val: float = 10.0,
+        terminal_config: str = "RSE",
+        terminal: str = "PFI0",
+    ):
+        self.device = device
+        self.channels = channels
+        self.min_val = min_val
+        self.max_val = max_val
+        self.terminal_config = terminal_config
+        self.terminal = terminal
+
+    def terminal_path(self) -> str:
+        return f"/{self.device}/{self.terminal}"
+
+
+class DriftEstimator:
+    """Least-squares fit of samples received against host time for one device.
+
+    Only the owning reader thread calls :meth:`add`; the running sums are
+    replaced as one tuple so other threads always read a consistent set.
+    """
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self._origin: Optional[float] = None
+        self._sums = (0, 0.0, 0.0, 0.0, 0.0)
+
+    def add(self, timestamp: float, samples: int) -> None:
+        """Record that ``samples`` samples had arrived at host time ``timestamp``."""
+        if self._origin is None:
+            self._origin = timestamp
+        t = timestamp - self._origin
+        n, st, ss, stt, sts = self._sums
+        self._sums = (n + 1, st + t, ss + samples, stt + t * t, sts + t * samples)
+
+    @property
+    def count(self) -> int:
+        return self._sums[0]
+
+    def _fit(self) -> Optional[tuple]:
+        n, st, ss, stt, sts = self._sums
+        denominator = n * stt - st * st
+        if n < 3 or denominator <= 0:
+            return None
+        slope = (n * sts - st * ss) / denominator
+        return st / n, ss / n, slope
+
+    @property
+    def rate(self) -> Optional[float]:
+        """Measured samples per second, or None with too few points."""
+        fit = self._fit()
+        return None if fit is None else fit[2]
+
+    def samples_at(self, timestamp: float) -> Optional[float]:
+        """Estimated samples acquired at host time ``timestamp``."""
+        fit = self._fit()
+        if fit is None or self._origin is None:
+            return None
+        mean_t, mean_s, slope = fit
+        return mean_s + slope * (timestamp - self._origin - mean_t)
+
+    def time_of(self, sample: int) -> Optional[float]:
+        """Estimated host time at which sample index ``sample`` was acquired."""
+        fit = self._fit()
+        if fit is None or self._origin is None or fit[2] <= 0:
+            return None
+        mean_t, mean_s, slope = fit
+        return self._origin + mean_t + (sample - mean_s) / slope
+
+
+class DeviceStream:
+    """A device's task, reader thread, ring and drift estimate."""
+
+    def __init__(
+        self, spec: DeviceSpec, task: Any, reader: StreamingReader, ring_capacity: int
+    ):
+        self.spec = spec
+        self.task = task
+        self.reader = reader
+        self.num_channels = reader.num_channels
+        self.ring = RingBuffer(self.num_channels, ring_capacity, reader.pool.dtype)
+        self.drift = DriftEstimator()
+        reader.subscribe(self._on_block)
+
+    def _on_block(self, block: Any) -> None:
+        self.ring.write(block.data)
+        self.drift.add(block.timestamp, block.first_sample + block.num_samples)
+
+
+class DeviceSyncStats:
+    """Alignment of one device relative to the master."""
+
+    def __init__(
+        self,
+        device: str,
+        samples: int,
+        rate: Optional[float],
+        drift_ppm: Optional[float],
+        skew_samples: Optional[float],
+        backlog: int,
+        lost: int,
+    ):
+        self.device = device
+        self.samples = samples
+        self.rate = rate
+        self.drift_ppm = drift_ppm
+        self.skew_samples = skew_samples
+        self.backlog = backlog
+        self.lost = lost
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "device": self.device,
+            "samples": self.samples,
+            "rate": self.rate,
+            "drift_ppm": self.drift_ppm,
+            "skew_samples": self.skew_samples,
+            "backlog": self.backlog,
+            "lost": self.lost,
+        }
+
+
+class SyncStats:
+    """Per-device alignment metrics of a :class:`SynchronizedAcquisition`.
+
+    ``drift_ppm`` is each device's measured rate relative to the master and
+    ``skew_samples`` how many samples it is ahead of the master at the same
+    host time. Both come from fits of block arrival times, so they include
+    USB transfer jitter averaged over the run; a skew that keeps growing
+    means the devices do not share a clock.
+    """
+
+    def __init__(self, devices: List[DeviceSyncStats], gap_samples: int):
+        self.devices = devices
+        self.gap_samples = gap_samples
+
+    @property
+    def max_skew_samples(self) -> float:
+        return max(
+            (abs(d.skew_samples) for d in self.devices if d.skew_samples is not None),
+            default=0.0,
+        )
+
+    @property
+    def max_drift_ppm(self) -> float:
+        return max(
+            (abs(d.drift_ppm) for d in self.devices if d.drift_ppm is not None),
+            default=0.0,
+        )
+
+    def aligned(self, tolerance_samples: float = 1.0) -> bool:
+        """Whether every device is within ``tolerance_samples`` of the master."""
+        return self.max_skew_samples <= tolerance_samples
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "devices": [device.as_dict() for device in self.devices],
+            "gap_samples": self.gap_samples,
+            "max_skew_samples": self.max_skew_samples,
+            "max_drift_ppm": self.max_drift_ppm,
+        }
+
+
+class SynchronizedAcquisition(BlockSource):
+    """Acquire from several devices and publish index-aligned merged blocks.
+
+    Channels of the merged blocks are the devices' channels in order. Block
+    ``first_sample`` is the common sample index; if any device's ring is
+    overrun by the merge thread falling behind, the skipped span is counted
+    in ``gap_samples`` and ``first_sample`` jumps accordingly.
+
+    Args:
+        devices: Devices to acquire from; the first one is the master.
+        rate: Sample rate of every device.
+        samples_per_block: Samples per channel per merged (and device) block.
+        sync: One of :data:`SYNC_MODES`.
+        backend: DAQ backend; defaults to ``get_backend()``.
+        num_buffers: Pool size for the merged stream and each device reader.
+        ring_seconds: Per-device buffering between the readers and the merge.
+        raw: Read int16 codes; merged blocks carry every channel's scaling.
+        timeout: Read timeout of the device readers in seconds.
+        queue_blocks: Keep merged blocks for ``get()``.
+    """
+
+    def __init__(
+        self,
+        devices: Sequence[DeviceSpec],
+        rate: float,
+        samples_per_block: Optional[int] = None,
+        sync: str = "start_trigger",
+        backend: Optional[Backend] = None,
+        num_buffers: int = 8,
+        ring_seconds: float = 2.0,
+        raw: bool = False,
+        timeout: float = 10.0,
+        queue_blocks: bool = True,
+    ):
+        if not devices:
+            raise ValueError("at least one device is required")
+        if sync not in SYNC_MODES:
+            raise ValueError(
+                f"Unknown sync mode {sync!r}; expected one of {SYNC_MODES}"
+            )
+        if backend is None:
+            backend = get_backend()
+        self.rate = float(rate)
+        self.sync = sync
+        self.backend = backend
+        self.raw = raw
+        samples_per_block = samples_per_block or max(int(self.rate / 10), 1)
+        ring_capacity = max(int(self.rate * ring_seconds), 2 * samples_per_block)
+        self.devices: List[DeviceStream] = []
+        try:
+            for index, spec in enumerate(devices):
+                task = self._create_task(spec, index == 0, devices[0])
+                reader = StreamingReader(
+                    task,
+                    samples_per_block,
+                    num_buffers,
+                    timeout=timeout,
+                    queue_blocks=False,
+                    raw=raw,
+                )
+                self.devices.append(DeviceStream(spec, task, reader, ring_capacity))
+        except Exception:
+            self.close()
+            raise
+        super().__init__(
+            sum(device.num_channels for device in self.devices),
+            samples_per_block,
+            num_buffers=num_buffers,
+            dtype=self.devices[0].reader.pool.dtype,
+            queue_blocks=queue_blocks,
+        )
+        if raw:
+            self.scaling = coefficient_array(
+                [
+                    row
+                    for device in self.devices
+                    for row in device.reader.scaling.tolist()
+                ]
+            )
+        self.gap_samples = 0
+        self._position = 0
+
+    def _create_task(
+        self, spec: DeviceSpec, master: bool, master_spec: DeviceSpec
+    ) -> Any:
+        task = self.backend.create_task()
+        try:
+            task.ai_channels.add_ai_voltage_chan(
+                f"{spec.device}/{spec.channels}",
+                terminal_config=TerminalConfiguration[spec.terminal_config.upper()],
+                min_val=spec.min_val,
+                max_val=spec.max_val,
+            )
+            clock_source = ""
+            if self.sync == "clock":
+                if master:
+                    task.export_signals.export_signal(
+                        Signal.SAMPLE_CLOCK, master_spec.terminal_path()
+                    )
+                else:
+                    clock_source = spec.terminal_path()
+            task.timing.cfg_samp_clk_timing(
+                self.rate, source=clock_source, sample_mode=AcquisitionType.CONTINUOUS
+            )
+            if self.sync == "start_trigger":
+                if master:
+                    task.export_signals.export_signal(
+                        Signal.START_TRIGGER, master_spec.terminal_path()
+                    )
+                else:
+                    task.triggers.start_trigger.cfg_dig_edge_start_trig(
+                        spec.terminal_path(), trigger_edge=Edge.RISING
+                    )
+        except Exception:
+            task.close()
+            raise
+        return task
+
+    @property
+    def tasks(self) -> List[Any]:
+        return [device.task for device in self.devices]
+
+    @property
+    def task(self) -> Any:
+        """The master task (its rate and timing apply to every device)."""
+        return self.devices[0].task
+
+    @property
+    def channel_names(self) -> List[str]:
+        return [channel.name for task in self.tasks for channel in task.ai_channels]
+
+    def channel_info(self) -> List[Any]:
+        """Per-channel recording metadata for all devices, in merged order."""
+        from .recording import channel_info_from_task
+
+        return [info for task in self.tasks for info in channel_info_from_task(task)]
+
+    def create_recorder(self, path: str, **kwargs: Any) -> Any:
+        """Create a :class:`~nidaqmx_on_pi.recording.Recorder` for the merged stream."""
+        from .recording import Recorder
+
+        if self.raw:
+            kwargs.setdefault("dtype", self.pool.dtype)
+            kwargs.setdefault("scaling", self.scaling)
+        return Recorder(path, self.channel_info(), self.rate, **kwargs)
+
+    # Lifecycle
+    def start(self) -> "SynchronizedAcquisition":
+        """Arm the slaves, start the master, then the reader and merge threads."""
+        if self.running:
+            return self
+        self._position = 0
+        self._sample_index = 0
+        self.gap_samples = 0
+        for device in self.devices:
+            device.ring.clear()
+            device.drift.reset()
+        for device in self.devices[1:] + self.devices[:1]:
+            device.task.start()
+        for device in self.devices:
+            device.reader.start()
+        super().start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        super().stop(timeout)
+        for device in self.devices:
+            device.reader.stop(timeout)
+        for device in self.devices:
+            try:
+                device.task.stop()
+            except Exception:
+                pass
+
+    def close(self) -> None:
+        """Stop and release every task."""
+        if getattr(self, "_thread", None) is not None:
+            self.stop()
+        for device in self.devices:
+            device.reader.stop()
+            device.task.close()
+        self.devices = []
+
+    # Merge thread
+    def _read_into(self, data: np.ndarray) -> int:
+        num_samples = data.shape[1]
+        poll_interval = min(num_samples / self.rate / 4, 0.01)
+        while not self._stop_event.is_set():
+            oldest = max(device.ring.oldest for device in self.devices)
+            if self._position < oldest:
+                self.gap_samples += oldest - self._position
+                self._position = oldest
+            ready = min(device.ring.written for device in self.devices) - self._position
+            if ready >= num_samples:
+                start, stop = self._position, self._position + num_samples
+                row = 0
+                try:
+                    for device in self.devices:
+                        data[row : row + device.num_channels] = device.ring.read(
+                            start, stop
+                        )
+                        row += device.num_channels
+                except IndexError:
+                    # A device ring lapped us during the copy; resync above.
+                    continue
+                if not all(device.ring.is_valid(start) for device in self.devices):
+                    continue
+                self._sample_index = start
+                self._position = stop
+                return num_samples
+            for device in self.devices:
+                if not device.reader.running and not self._stop_event.is_set():
+                    error = device.reader.stats.last_error
+                    raise RuntimeError(
+                        f"Device {device.spec.device} stopped acquiring: {error}"
+                    )
+            time.sleep(poll_interval)
+        return 0
+
+    # Metrics
+    def sample_time(self, sample: int) -> Optional[float]:
+        """Host ``time.monotonic()`` estimate of merged sample index ``sample``."""
+        return self.devices[0].drift.time_of(sample)
+
+    @property
+    def sync_stats(self) -> SyncStats:
+        now = time.monotonic()
+        master = self.devices[0].drift
+        master_rate = master.rate
+        master_samples = master.samples_at(now)
+        devices = []
+        for device in self.devices:
+            rate = device.drift.rate
+            drift = None
+            if rate is not None and master_rate:
+                drift = (rate / master_rate - 1.0) * 1e6
+            samples = device.drift.samples_at(now)
+            skew = (
+                None
+                if samples is None or master_samples is None
+                else samples - master_samples
+            )
+            devices.append(
+                DeviceSyncStats(
+                    device.spec.device,
+                    device.ring.written,
+                    rate,
+                    drift,
+                    skew,
+                    device.ring.written - self._position,
+                    device.reader.stats.lost,
+                )
+            )
+        return SyncStats(devices, self.gap_samples)
@@ -0,0 +1,656 @@
+"""Triggered capture: keep only short windows around events.
+
+A :class:`TriggeredCapture` attached to a block source keeps the last
+``pre_samples`` in a :class:`~nidaqmx_on_pi.ringbuffer.RingBuffer`, runs a
+software trigger over one channel of every block and emits a
+:class:`Capture` of ``pre_samples + post_samples`` samples (all channels)
+around each trigger. Everything outside those windows is dropped, so a
+mostly quiet signal costs a fraction of the disk space and bandwidth of a
+full recording.
+
+Triggers are vectorised over each block with NumPy; state carried between
+blocks (the previous sample, the hysteresis state) means an event spanning a
+block boundary is found exactly once:
+
+* :class:`LevelTrigger` fires whenever the signal is above (or below) a level.
+* :class:`EdgeTrigger` fires when it crosses a level, with optional
+  hysteresis against noise.
+* :class:`WindowTrigger` fires when it enters (or leaves) a band.
+* :class:`SlopeTrigger` fires when it changes faster than a threshold in V/s.
+
+As with a DAQmx reference trigger, a trigger is only accepted once
+``pre_samples`` have been acquired. After a trigger the capture re-arms when
+its post-trigger samples are complete plus ``holdoff`` samples; triggers in
+between are ignored. Gaps in the source (lost blocks) discard the pending
+captures and the history, since their data would not be contiguous.
+
+:class:`CaptureWriter` saves every capture as its own recording (see
+:mod:`.recording`) on a writer thread::
+
+    capture = TriggeredCapture(EdgeTrigger(0, level=2.5), pre_samples=1000, post_samples=4000)
+    capture.attach(reader)
+    writer = CaptureWriter.from_task(task, "/data/events")
+    writer.attach(capture)
+
+``python -m nidaqmx_on_pi.bench trigger.capture`` measures the detection cost
+per block and the re-arm latency.
+"""
+
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Type
+
+import numpy as np
+
+from .metrics import LatencyHistogram
+from .recording import ChannelInfo, channel_info_from_task, write_recording
+from .ringbuffer import RingBuffer
+from .scaling import RAW_DTYPE, apply_scaling, scaling_coefficients
+
+# Largest slice of a block processed at once; bounds the history ring.
+MAX_SLICE_SAMPLES = 65536
+
+TRIGGER_TYPES: Dict[str, Type["Trigger"]] = {}
+
+
+def register_trigger(name: str) -> Callable[[Type["Trigger"]], Type["Trigger"]]:
+    """Register a trigger class under ``name`` for :func:`make_trigger`."""
+
+    def decorator(cls: Type["Trigger"]) -> Type["Trigger"]:
+        TRIGGER_TYPES[name] = cls
+        cls.kind = name
+        return cls
+
+    return decorator
+
+
+def make_trigger(options: Dict[str, Any]) -> "Trigger":
+    """Create a trigger from ``{"kind": "edge", "channel": 0, "level": 1.0, ...}``.
+
+    Raises:
+        ValueError: If the kind is unknown.
+    """
+    options = dict(options)
+    kind = options.pop("kind", "edge")
+    if kind not in TRIGGER_TYPES:
+        raise ValueError(
+            f"unknown trigger kind {kind!r}; expected one of {sorted(TRIGGER_TYPES)}"
+        )
+    return TRIGGER_TYPES[kind](**options)
+
+
+def _rising(condition: np.ndarray, previous: bool) -> np.ndarray:
+    """Indices where ``condition`` becomes true, given its value before index 0."""
+    edges = np.flatnonzero(condition[1:] & ~condition[:-1]) + 1
+    if condition[0] and not previous:
+        edges = np.concatenate(([0], edges))
+    return edges
+
+
+class Trigger:
+    """Base class: finds trigger points in one channel, block by block.
+
+    Args:
+        channel: Row of the block the trigger looks at.
+    """
+
+    kind = ""
+
+    def __init__(self, channel: int = 0):
+        self.channel = channel
+
+    def reset(self) -> None:
+        """Forget the state carried over from the previous block."""
+
+    def detect(self, samples: np.ndarray) -> np.ndarray:
+        """Return the sorted indices into ``samples`` (volts) where the trigger fires."""
+        raise NotImplementedError
+
+    def describe(self) -> Dict[str, Any]:
+        """JSON-serialisable settings, stored with saved captures."""
+        settings = {
+            key: value for key, value in vars(self).items() if not key.startswith("_")
+        }
+        return {"kind": self.kind, **settings}
+
+    def __repr__(self) -> str:
+        settings = ", ".join(
+            f"{key}={value!r}"
+            for key, value in self.describe().items()
+            if key != "kind"
+        )
+        return f"{type(self).__name__}({settings})"
+
+
+@register_trigger("level")
+class LevelTrigger(Trigger):
+    """Fire on every sample at or above (``direction="above"``) or at or below ``level``."""
+
+    def __init__(self, channel: int = 0, level: float = 0.0, direction: str = "above"):
+        super().__init__(channel)
+        if direction not in ("above", "below"):
+            raise ValueError(f"direction must be 'above' or 'below', got {direction!r}")
+        self.level = level
+        self.direction = direction
+
+    def detect(self, samples: np.ndarray) -> np.ndarray:
+        if self.direction == "above":
+            return np.flatnonzero(samples >= self.level)
+        return np.flatnonzero(samples <= self.level)
+
+
+@register_trigger("edge")
+class EdgeTrigger(Trigger):
+    """Fire where the signal crosses ``level`` in the direction of ``slope``.
+
+    With ``hysteresis`` a rising edge is only re-armed once the signal has
+    gone below ``level - hysteresis`` (above ``level + hysteresis`` for a
+    falling edge), so noise around the level does not fire repeatedly.
+    """
+
+    def __init__(
+        self,
+        channel: int = 0,
+        level: float = 0.0,
+        slope: str = "rising",
+        hysteresis: float = 0.0,
+    ):
+        super().__init__(channel)
+        if slope not in ("rising", "falling"):
+            raise ValueError(f"slope must be 'rising' or 'falling', got {slope!r}")
+        if hysteresis < 0:
+            raise ValueError("hysteresis must not be negative")
+        self.level = level
+        self.slope = slope
+        self.hysteresis = hysteresis
+        self._state = 0
+
+    def reset(self) -> None:
+        self._state = 0
+
+    def detect(self, samples: np.ndarray) -> np.ndarray:
+        if self.slope == "rising":
+            fired = samples >= self.level
+            armed = samples < self.level - self.hysteresis
+        else:
+            fired = samples <= self.level
+            armed = samples > self.level + self.hysteresis
+        # +1 past the level, -1 armed, 0 in the hysteresis band: carry the
+        # last definite state forward through the band.
+        marks = np.empty(len(samples) + 1, dtype=np.int8)
+        marks[0] = self._state
+        marks[1:] = fired
+        marks[1:] -= armed
+        index = np.where(marks != 0, np.arange(len(marks)), 0)
+        np.maximum.accumulate(index, out=index)
+        state = marks[index]
+        self._state = int(state[-1])
+        return np.flatnonzero((state[1:] == 1) & (state[:-1] == -1))
+
+
+@register_trigger("window")
+class WindowTrigger(Trigger):
+    """Fire where the signal enters (``mode="enter"``) or leaves ``[low, high]``."""
+
+    def __init__(
+        self,
+        channel: int = 0,
+        low: float = -1.0,
+        high: float = 1.0,
+        mode: str = "enter",
+    ):
+        super().__init__(channel)
+        if mode not in ("enter", "leave"):
+            raise ValueError(f"mode must be 'enter' or 'leave', got {mode!r}")
+        if low > high:
+            raise ValueError(f"low ({low}) must not exceed high ({high})")
+        self.low = low
+        self.high = high
+        self.mode = mode
+        self._previous: Optional[bool] = None
+
+    def reset(self) -> None:
+        self._previous = None
+
+    def detect(self, samples: np.ndarray) -> np.ndarray:
+        inside = (samples >= self.low) & (samples <= self.high)
+        condition = inside if self.mode == "enter" else ~inside
+        # Being in the target state from the first sample on is not an event.
+        previous = bool(condition[0]) if self._previous is None else self._previous
+        self._previous = bool(condition[-1])
+        return _rising(condition, previous)
+
+
+@register_trigger("slope")
+class SlopeTrigger(Trigger):
+    """Fire where the signal starts changing faster than ``threshold`` V/s.
+
+    Args:
+        channel: Row of the block the trigger looks at.
+        threshold: Rate of change in V/s; must be positive.
+        rate: Sample rate in S/s.
+        slope: ``"rising"`` for increases, ``"falling"`` for decreases.
+    """
+
+    def __init__(
+        self,
+        channel: int = 0,
+        threshold: float = 1.0,
+        rate: float = 1.0,
+        slope: str = "rising",
+    ):
+        super().__init__(channel)
+        if threshold <= 0 or rate <= 0:
+            raise ValueError("threshold and rate must be positive")
+        if slope not in ("rising", "falling"):
+            raise ValueError(f"slope must be 'rising' or 'falling', got {slope!r}")
+        self.threshold = threshold
+        self.rate = rate
+        self.slope = slope
+        self._last: Optional[float] = None
+        self._previous = False
+
+    def reset(self) -> None:
+        self._last = None
+        self._previous = False
+
+    def detect(self, samples: np.ndarray) -> np.ndarray:
+        last = samples[0] if self._last is None else self._last
+        step = np.diff(samples, prepend=last)
+        limit = self.threshold / self.rate
+        condition = step >= limit if self.slope == "rising" else step <= -limit
+        edges = _rising(condition, self._previous)
+        self._last = float(samples[-1])
+        self._previous = bool(condition[-1])
+        return edges
+
+
+class Capture:
+    """Samples around one trigger.
+
+    ``data`` is a ``(channels, pre_samples + post_samples)`` copy that the
+    consumer may keep; the trigger sample is ``data[:, pre_samples]``.
+    """
+
+    __slots__ = ("data", "sequence", "trigger_sample", "pre_samples", "scaling")
+
+    def __init__(
+        self,
+        data: np.ndarray,
+        sequence: int,
+        trigger_sample: int,
+        pre_samples: int,
+        scaling: Optional[np.ndarray] = None,
+    ):
+        self.data = data
+        self.sequence = sequence
+        self.trigger_sample = trigger_sample
+        self.pre_samples = pre_samples
+        self.scaling = scaling
+
+    @property
+    def first_sample(self) -> int:
+        """Index of ``data[:, 0]`` in the source's sample count."""
+        return self.trigger_sample - self.pre_samples
+
+    @property
+    def num_samples(self) -> int:
+        return self.data.shape[1]
+
+    def scaled(self) -> np.ndarray:
+        """The samples in volts (see ``streaming.Block.scaled``)."""
+        if self.scaling is None:
+            return self.data
+        return apply_scaling(self.data, self.scaling)
+
+    def __repr__(self) -> str:
+        return f"Capture(sequence={self.sequence}, trigger_sample={self.trigger_sample}, samples={self.num_samples})"
+
+
+class CaptureStats:
+    """Counters of a :class:`TriggeredCapture`."""
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self.blocks = 0
+        self.samples = 0
+        self.triggers = 0
+        self.captures = 0
+        self.samples_captured = 0
+        self.captures_discarded = 0
+        self.gaps = 0
+        self.process_latency = LatencyHistogram()
+
+    @property
+    def reduction(self) -> float:
+        """Samples in per sample kept; higher means less data to store."""
+        return self.samples / self.samples_captured if self.samples_captured else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "blocks": self.blocks,
+            "samples": self.samples,
+            "triggers": self.triggers,
+            "captures": self.captures,
+            "samples_captured": self.samples_captured,
+            "captures_discarded": self.captures_discarded,
+            "gaps": self.gaps,
+            "reduction": self.reduction,
+            "process_seconds": self.process_latency.as_dict(),
+        }
+
+
+class TriggeredCapture:
+    """Emit the samples around software trigger events of a block source.
+
+    Args:
+        trigger: Decides where events are; looks at ``trigger.channel``.
+        pre_samples: Samples per channel kept before the trigger sample.
+        post_samples: Samples per channel from the trigger sample on.
+        holdoff: Samples after a capture's last sample before the next
+            trigger is accepted.
+
+    When attached to a block source the capture runs on the reader thread
+    and calls its subscribers from there with each :class:`Capture`.
+    """
+
+    def __init__(
+        self,
+        trigger: Trigger,
+        pre_samples: int = 1000,
+        post_samples: int = 1000,
+        holdoff: int = 0,
+    ):
+        if pre_samples < 0 or post_samples <= 0 or holdoff < 0:
+            raise ValueError(
+                "pre_samples and holdoff must not be negative and post_samples must be positive"
+            )
+        self.trigger = trigger
+        self.pre_samples = int(pre_samples)
+        self.post_samples = int(post_samples)
+        self.holdoff = int(holdoff)
+        self.stats = CaptureStats()
+        self.scaling: Optional[np.ndarray] = None
+        self._ring: Optional[RingBuffer] = None
+        # Sample index of the source corresponding to ring index 0.
+        self._offset = 0
+        self._rearm_at = 0
+        self._pending: List[int] = []
+        self._sequence = 0
+        self._subscribers: List[Callable[[Capture], None]] = []
+        self._sources: List[Any] = []
+
+    @property
+    def window(self) -> int:
+        """Samples per channel in every capture."""
+        return self.pre_samples + self.post_samples
+
+    @property
+    def pending(self) -> int:
+        """Accepted triggers still waiting for their post-trigger samples."""
+        return len(self._pending)
+
+    def reset(self, first_sample: int = 0) -> None:
+        """Drop the history and pending captures; the next sample is ``first_sample``."""
+        self.stats.captures_discarded += len(self._pending)
+        self._pending = []
+        self.trigger.reset()
+        if self._ring is not None:
+            self._ring.clear()
+        self._offset = first_sample
+        self._rearm_at = 0
+
+    # Consumer API
+    def subscribe(self, callback: Callable[[Capture], None]) -> None:
+        self._subscribers = self._subscribers + [callback]
+
+    def unsubscribe(self, callback: Callable[[Capture], None]) -> None:
+        self._subscribers = [cb for cb in self._subscribers if cb is not callback]
+
+    def attach(self, source: Any) -> None:
+        """Look for triggers in every block of ``source``."""
+        self.scaling = getattr(source, "scaling", None)
+        source.subscribe(self._on_block)
+        self._sources.append(source)
+
+    def detach(self) -> None:
+        for source in self._sources:
+            source.unsubscribe(self._on_block)
+        self._sources = []
+
+    close = detach
+
+    def _on_block(self, block: Any) -> None:
+        self.scaling = block.scaling
+        for capture in self.process(block.data, block.first_sample):
+            for callback in self._subscribers:
+                callback(capture)
+
+    # Processing
+    def process(
+        self, data: np.ndarray, first_sample: Optional[int] = None
+    ) -> List[Capture]:
+        """Feed a ``(channels, samples)`` block and return the completed captures.
+
+        ``first_sample`` is the block's index in the source; when it does not
+        follow the previous block the capture :meth:`reset`\\ s first.
+        """
+        started = time.perf_counter()
+        stats = self.stats
+        ring = self._ring
+        if (
+            ring is None
+            or ring.num_channels != data.shape[0]
+            or ring.dtype != data.dtype
+        ):
+            capacity = self.window + min(
+                max(data.shape[1], self.window), MAX_SLICE_SAMPLES
+            )
+            ring = self._ring = RingBuffer(data.shape[0], capacity, data.dtype)
+            self.reset(self._offset if first_sample is None else first_sample)
+        elif first_sample is not None and first_sample != self._offset + ring.written:
+            stats.gaps += 1
+            self.reset(first_sample)
+        step = ring.capacity - self.window
+        captures: List[Capture] = []
+        for start in range(0, data.shape[1], step):
+            self._process_slice(data[:, start : start + step], captures)
+        stats.blocks += 1
+        stats.samples += data.shape[1]
+        stats.process_latency.observe(time.perf_counter() - started)
+        return captures
+
+    def _process_slice(self, data: np.ndarray, captures: List[Capture]) -> None:
+        ring = self._ring
+        assert ring is not None
+        base = ring.written
+        row = data[self.trigger.channel]
+        if self.scaling is not None and data.dtype == RAW_DTYPE:
+            channel = self.trigger.channel
+            row = apply_scaling(
+                data[channel : channel + 1], self.scaling[channel : channel + 1]
+            )[0]
+        hits = self.trigger.detect(row) + base
+        ring.write(data)
+
+        # Accept triggers once the pre-trigger history exists and the
+        # previous capture plus hold-off is over.
+        spacing = self.post_samples + self.holdoff
+        next_allowed = max(self._rearm_at, self.pre_samples)
+        position = int(np.searchsorted(hits, next_allowed))
+        while position < len(hits):
+            sample = int(hits[position])
+            self._pending.append(sample)
+            self.stats.triggers += 1
+            next_allowed = sample + spacing
+            position += int(np.searchsorted(hits[position:], next_allowed))
+        self._rearm_at = next_allowed
+
+        written = ring.written
+        while self._pending and self._pending[0] + self.post_samples <= written:
+            sample = self._pending.pop(0)
+            data = ring.read(
+                sample - self.pre_samples, sample + self.post_samples
+            ).copy()
+            captures.append(
+                Capture(
+                    data,
+                    self._sequence,
+                    sample + self._offset,
+                    self.pre_samples,
+                    self.scaling,
+                )
+            )
+            self._sequence += 1
+            self.stats.captures += 1
+            self.stats.samples_captured += self.window
+
+
+class CaptureWriterStats:
+    """Counters of a :class:`CaptureWriter`."""
+
+    def __init__(self) -> None:
+        self.captures_received = 0
+        self.captures_written = 0
+        self.captures_dropped = 0
+        self.bytes_written = 0
+        self.pending = 0
+        self.last_error: Optional[BaseException] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "captures_received": self.captures_received,
+            "captures_written": self.captures_written,
+            "captures_dropped": self.captures_dropped,
+            "bytes_written": self.bytes_written,
+            "pending_captures": self.pending,
+            "last_error": str(self.last_error) if self.last_error else None,
+        }
+
+
+class CaptureWriter:
+    """Save each capture as a recording ``{directory}/{prefix}-{sequence:06d}.ndq``.
+
+    Captures are queued for a writer thread, so the reader thread never
+    waits for the disk; when ``max_pending`` captures are queued new ones are
+    dropped and counted. Each file's ``attrs`` hold the trigger settings,
+    ``trigger_sample`` and ``pre_samples``.
+
+    Args:
+        directory: Created if missing.
+        channels: Metadata for each channel, in block row order.
+        sample_rate: Sample rate in S/s.
+        scaling: Raw-to-volts coefficients for raw captures.
+        prefix: File name prefix.
+        max_pending: Captures that may wait for the writer thread.
+        attrs: Extra metadata stored in every file.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        channels: Sequence[ChannelInfo],
+        sample_rate: float,
+        scaling: Optional[np.ndarray] = None,
+        prefix: str = "capture",
+        max_pending: int = 64,
+        attrs: Optional[Dict[str, Any]] = None,
+    ):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.channels = list(channels)
+        self.sample_rate = float(sample_rate)
+        self.scaling = scaling
+        self.prefix = prefix
+        self.attrs = dict(attrs or {})
+        self.stats = CaptureWriterStats()
+        self.paths: List[str] = []
+        self._queue: "queue.Queue[Optional[Capture]]" = queue.Queue(max_pending)
+        self._captures: List[TriggeredCapture] = []
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name="CaptureWriter", daemon=True
+        )
+        self._thread.start()
+
+    @classmethod
+    def from_task(
+        cls, task: Any, directory: str, raw: bool = False, **kwargs: Any
+    ) -> "CaptureWriter":
+        """Create a writer using the channel and timing setup of ``task``."""
+        if raw:
+            kwargs.setdefault("scaling", scaling_coefficients(task))
+        return cls(
+            directory, channel_info_from_task(task), task.timing.samp_clk_rate, **kwargs
+        )
+
+    def attach(self, capture: TriggeredCapture) -> None:
+        """Save every capture ``capture`` emits; its trigger is recorded too."""
+        self.attrs.setdefault("trigger", capture.trigger.describe())
+        self.attrs.setdefault("holdoff", capture.holdoff)
+        capture.subscribe(self.write)
+        self._captures.append(capture)
+
+    def detach(self) -> None:
+        for capture in self._captures:
+            capture.unsubscribe(self.write)
+        self._captures = []
+
+    def write(self, capture: Capture) -> None:
+        """Queue ``capture`` for writing; never blocks."""
+        self.stats.captures_received += 1
+        try:
+            self._queue.put_nowait(capture)
+        except queue.Full:
+            self.stats.captures_dropped += 1
+        self.stats.pending = self._queue.qsize()
+
+    def close(self) -> None:
+        """Write everything still queued and stop the writer thread."""
+        if self._closed:
+            return
+        self.detach()
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+    def __enter__(self) -> "CaptureWriter":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def _run(self) -> None:
+        stats = self.stats
+        while True:
+            capture = self._queue.get()
+            if capture is None:
+                break
+            path = os.path.join(
+                self.directory, f"{self.prefix}-{capture.sequence:06d}.ndq"
+            )
+            attrs = dict(
+                self.attrs,
+                trigger_sample=capture.trigger_sample,
+                pre_samples=capture.pre_samples,
+            )
+            try:
+                stats.bytes_written += write_recording(
+                    path,
+                    capture.data,
+                    self.channels,
+                    self.sample_rate,
+                    attrs,
+                    self.scaling,
+                )
+            except Exception as e:
+                stats.last_error = e
+                stats.captures_dropped += 1
+            else:
+                stats.captures_written += 1
+                self.paths.append(path)
+            stats.pending = self._queue.qsize()
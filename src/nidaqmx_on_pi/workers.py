@@ -0,0 +1,237 @@
+"""Run blocking driver calls on worker threads and deliver results to the UI.
+
+Tk is single-threaded: widgets may only be touched from the thread running the
+event loop, and anything slow on that thread freezes the window. The
+:class:`DriverExecutor` runs calls on background threads and queues their
+outcome. The UI drains that queue with :meth:`DriverExecutor.poll` from a
+``root.after`` timer, so ``on_done``/``on_error`` callbacks always run on the
+Tk thread.
+
+Every job has a timeout and can be cancelled. Python cannot interrupt a
+thread blocked inside the driver, so cancelling or timing out a job stops its
+result from being delivered and sets :attr:`Job.cancelled`; long-running
+functions can check ``current_job().cancelled`` between chunks of work to
+stop early.
+"""
+
+import queue
+import threading
+import time
+from typing import Any, Callable, List, Optional, Tuple
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+TIMED_OUT = "timed out"
+
+_local = threading.local()
+
+
+def current_job() -> Optional["Job"]:
+    """Return the job running on the calling worker thread, if any."""
+    return getattr(_local, "job", None)
+
+
+class Job:
+    """Handle for a call submitted to a :class:`DriverExecutor`."""
+
+    def __init__(
+        self,
+        fn: Callable[..., Any],
+        args: Tuple[Any, ...],
+        kwargs: dict,
+        on_done: Optional[Callable[[Any], None]],
+        on_error: Optional[Callable[[BaseException], None]],
+        timeout: Optional[float],
+        name: str = "",
+    ):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.on_done = on_done
+        self.on_error = on_error
+        self.timeout = timeout
+        self.name = name or getattr(fn, "__name__", "job")
+        self.state = PENDING
+        self.submitted_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._cancel_event = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        """True once the job was cancelled or timed out."""
+        return self._cancel_event.is_set()
+
+    @property
+    def finished(self) -> bool:
+        return self.state in (DONE, FAILED, CANCELLED, TIMED_OUT)
+
+    def cancel(self) -> None:
+        """Cancel the job; its result (if any) will not be delivered."""
+        if not self.finished:
+            self.state = CANCELLED
+        self._cancel_event.set()
+
+    def _expired(self, now: float) -> bool:
+        # A job whose result is already queued is delivered, not expired.
+        if self.timeout is None or self.finished or self.finished_at is not None:
+            return False
+        start = self.started_at if self.started_at is not None else self.submitted_at
+        return now - start > self.timeout
+
+    def __repr__(self) -> str:
+        return f"Job(name={self.name!r}, state={self.state!r})"
+
+
+class DriverExecutor:
+    """Small thread pool for driver calls with UI-thread result delivery.
+
+    Args:
+        max_workers: Number of worker threads.
+        default_timeout: Timeout in seconds for jobs that do not set one.
+            ``None`` disables the timeout.
+    """
+
+    def __init__(self, max_workers: int = 2, default_timeout: Optional[float] = 30.0):
+        self.max_workers = max_workers
+        self.default_timeout = default_timeout
+        self._jobs: "queue.Queue[Optional[Job]]" = queue.Queue()
+        self._results: "queue.Queue[Tuple[Job, bool, Any]]" = queue.Queue()
+        self._active: List[Job] = []
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self._retire = 0
+        self._shutdown = False
+        for _ in range(max_workers):
+            self._spawn_worker()
+
+    def submit(
+        self,
+        fn: Callable[..., Any],
+        *args: Any,
+        on_done: Optional[Callable[[Any], None]] = None,
+        on_error: Optional[Callable[[BaseException], None]] = None,
+        timeout: Any = "default",
+        name: str = "",
+        **kwargs: Any,
+    ) -> Job:
+        """Queue ``fn(*args, **kwargs)`` for a worker thread.
+
+        Args:
+            on_done: Called with the return value on the UI thread.
+            on_error: Called with the exception on the UI thread, including
+                ``TimeoutError`` when the job exceeds its timeout.
+            timeout: Seconds allowed from start to result; ``None`` for no
+                limit. Defaults to ``default_timeout``.
+            name: Label used in ``repr`` and error messages.
+        """
+        if self._shutdown:
+            raise RuntimeError("DriverExecutor has been shut down")
+        if timeout == "default":
+            timeout = self.default_timeout
+        job = Job(fn, args, kwargs, on_done, on_error, timeout, name)
+        with self._lock:
+            self._active.append(job)
+        self._jobs.put(job)
+        return job
+
+    @property
+    def pending(self) -> int:
+        """Jobs submitted whose outcome has not been delivered yet."""
+        return len(self._active)
+
+    def poll(self, max_results: int = 50) -> int:
+        """Deliver finished results and expire timed-out jobs.
+
+        Must be called from the UI thread. Returns the number of callbacks
+        run. ``max_results`` bounds the work done per call so a burst of
+        results cannot stall a frame.
+        """
+        delivered = 0
+        while delivered < max_results:
+            try:
+                job, ok, value = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if job.cancelled:
+                continue
+            self._forget(job)
+            job.state = DONE if ok else FAILED
+            callback = job.on_done if ok else job.on_error
+            if callback is not None:
+                callback(value)
+                delivered += 1
+
+        now = time.monotonic()
+        for job in [job for job in self._active if job._expired(now)]:
+            started = job.started_at is not None
+            job.state = TIMED_OUT
+            job._cancel_event.set()
+            self._forget(job)
+            if started:
+                # The worker is stuck in the call; keep the pool at full size.
+                with self._lock:
+                    self._retire += 1
+                self._spawn_worker()
+            if job.on_error is not None:
+                job.on_error(
+                    TimeoutError(f"{job.name} timed out after {job.timeout:g} s")
+                )
+                delivered += 1
+
+        for job in [job for job in self._active if job.state == CANCELLED]:
+            self._forget(job)
+        return delivered
+
+    def cancel_all(self) -> None:
+        for job in list(self._active):
+            job.cancel()
+
+    def shutdown(self, wait: bool = False) -> None:
+        """Cancel outstanding jobs and stop the worker threads."""
+        self._shutdown = True
+        self.cancel_all()
+        for _ in self._threads:
+            self._jobs.put(None)
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def _forget(self, job: Job) -> None:
+        with self._lock:
+            if job in self._active:
+                self._active.remove(job)
+
+    def _spawn_worker(self) -> None:
+        thread = threading.Thread(
+            target=self._worker, name="DriverExecutor", daemon=True
+        )
+        self._threads = [t for t in self._threads if t.is_alive()] + [thread]
+        thread.start()
+
+    def _worker(self) -> None:
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            if job.cancelled:
+                continue
+            job.state = RUNNING
+            job.started_at = time.monotonic()
+            _local.job = job
+            try:
+                result = job.fn(*job.args, **job.kwargs)
+                outcome: Tuple[Job, bool, Any] = (job, True, result)
+            except Exception as e:
+                outcome = (job, False, e)
+            finally:
+                _local.job = None
+                job.finished_at = time.monotonic()
+            self._results.put(outcome)
+            with self._lock:
+                if self._retire > 0 and job.state == TIMED_OUT:
+                    self._retire -= 1
+                    return
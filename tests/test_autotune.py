@@ -0,0 +1,71 @@
+import logging
+import time
+
+from nidaqmx_on_pi.autotune import BlockSizeTuner, plan_acquisition
+from nidaqmx_on_pi.cli import start_continuous_ai_task
+from nidaqmx_on_pi.simulator import SimulatedBackend
+from nidaqmx_on_pi.streaming import StreamingReader
+
+
+def test_plan_scales_with_rate_and_respects_memory_limit():
+    plan = plan_acquisition(100000.0, 8)
+    assert plan.samples_per_block == 10000
+    assert (plan.min_samples_per_block, plan.max_samples_per_block) == (1000, 50000)
+    assert plan.input_buffer_size == 500000
+    assert plan_acquisition(100000.0, 8).as_dict() == plan.as_dict()
+
+    small = plan_acquisition(100000.0, 8, max_buffer_bytes=1600000)
+    assert small.input_buffer_size == 100000
+    assert small.max_samples_per_block == 25000
+    assert plan_acquisition(50.0, 1, target_latency=0.01).samples_per_block == 10
+
+
+def test_autotune_sizes_the_driver_buffer_and_logs_it(caplog):
+    with caplog.at_level(logging.INFO, logger="nidaqmx_on_pi.autotune"):
+        task = start_continuous_ai_task(
+            "dev3", "ai0:1", rate=20000.0, backend=SimulatedBackend(), autotune=True
+        )
+    try:
+        assert task.in_stream.input_buf_size == 100000
+    finally:
+        task.close()
+    assert "input buffer 100000 samples/ch" in caplog.text
+
+
+def test_tuner_grows_blocks_for_busy_consumers_and_shrinks_back():
+    task = start_continuous_ai_task(
+        "dev3", "ai0", rate=10000.0, backend=SimulatedBackend()
+    )
+    plan = plan_acquisition(10000.0, 1, target_latency=0.01)
+    reader = StreamingReader(
+        task,
+        plan.samples_per_block,
+        queue_blocks=False,
+        max_samples_per_block=plan.max_samples_per_block,
+    )
+    slow = [True]
+
+    def consumer(block):
+        if slow[0]:
+            time.sleep(0.8 * block.num_samples / 10000.0)
+
+    reader.subscribe(consumer)
+    tuner = BlockSizeTuner(reader, plan, interval=0.1).attach()
+    reader.start()
+    try:
+        deadline = time.monotonic() + 5.0
+        while not tuner.decisions and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert tuner.decisions[0].reason == "consumers busy"
+        assert reader.samples_per_block > plan.samples_per_block
+        slow[0] = False
+        while (
+            reader.samples_per_block != plan.samples_per_block
+            and time.monotonic() < deadline + 5.0
+        ):
+            time.sleep(0.01)
+        assert reader.samples_per_block == plan.samples_per_block
+        assert tuner.decisions[-1].reason == "consumers idle"
+    finally:
+        reader.stop()
+        task.close()
@@ -0,0 +1,112 @@
+import json
+
+from nidaqmx_on_pi.bench import (
+    BENCHMARKS,
+    BenchmarkResult,
+    compare,
+    load_json,
+    main,
+    run_benchmark,
+    run_suite,
+    write_csv,
+    write_json,
+)
+
+
+def test_suite_sweeps_parameters_and_round_trips(tmp_path):
+    results = run_suite(
+        ["read.call", "stream.latency"],
+        channels=[1, 4],
+        blocks=[500],
+        rates=[10000.0, 20000.0],
+        min_seconds=0.01,
+    )
+    # Only the rate-dependent benchmark runs once per rate.
+    assert [(r.name, r.num_channels, r.rate) for r in results] == [
+        ("read.call", 1, 10000.0),
+        ("read.call", 4, 10000.0),
+        ("stream.latency", 1, 10000.0),
+        ("stream.latency", 1, 20000.0),
+        ("stream.latency", 4, 10000.0),
+        ("stream.latency", 4, 20000.0),
+    ]
+    assert all(
+        r.metrics["latency_p99_ms"] >= r.metrics["latency_p50_ms"] >= 0
+        for r in results[2:]
+    )
+    write_json(results, str(tmp_path / "results.json"))
+    write_csv(results, str(tmp_path / "results.csv"))
+    loaded = load_json(str(tmp_path / "results.json"))
+    assert [r.as_dict() for r in loaded] == [r.as_dict() for r in results]
+    assert (
+        "python" in json.loads((tmp_path / "results.json").read_text())["environment"]
+    )
+    header = (tmp_path / "results.csv").read_text().splitlines()[0].split(",")
+    assert "us_per_call" in header and "latency_p50_ms" in header
+
+
+def test_compare_flags_regressions_by_metric_direction():
+    baseline = [
+        BenchmarkResult("read.call", 2, 100, 1000, 1.0, metrics={"us_per_call": 10.0})
+    ]
+    slower = [
+        BenchmarkResult(
+            "read.call", 2, 100, 800, 1.0, rate=123.0, metrics={"us_per_call": 12.5}
+        )
+    ]
+    comparisons = {c.metric: c for c in compare(slower, baseline, tolerance=0.1)}
+    assert (
+        comparisons["us_per_call"].change == -0.25
+        and comparisons["us_per_call"].regressed
+    )
+    assert comparisons["samples_per_second"].regressed
+    assert not any(c.regressed for c in compare(baseline, baseline))
+
+
+def test_cli_exits_nonzero_on_regression(tmp_path, capsys):
+    path = str(tmp_path / "baseline.json")
+    assert (
+        main(
+            [
+                "read.call",
+                "--channels",
+                "2",
+                "--block",
+                "100",
+                "--seconds",
+                "0.01",
+                "--json",
+                path,
+            ]
+        )
+        == 0
+    )
+    data = json.loads(open(path).read())
+    data["results"][0]["us_per_call"] /= 100
+    with open(path, "w") as handle:
+        json.dump(data, handle)
+    assert (
+        main(
+            [
+                "read.call",
+                "--channels",
+                "2",
+                "--block",
+                "100",
+                "--seconds",
+                "0.01",
+                "--baseline",
+                path,
+            ]
+        )
+        == 1
+    )
+    assert "REGRESSION read.call/ch=2/block=100 us_per_call" in capsys.readouterr().out
+
+
+def test_every_registered_benchmark_runs():
+    for name in BENCHMARKS:
+        result = run_benchmark(
+            name, num_channels=2, samples_per_block=2048, min_seconds=0.01
+        )
+        assert result.blocks > 0 and result.samples_per_second > 0, name
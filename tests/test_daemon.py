@@ -0,0 +1,206 @@
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from nidaqmx_on_pi.daemon import AcquisitionDaemon, DaemonConfig
+from nidaqmx_on_pi.recording import RecordingReader, read_header
+from nidaqmx_on_pi.simulator import SimulatedBackend, SimulatedDevice
+
+CONFIG = """
+status_interval = 0.05
+
+[[task]]
+name = "fast"
+device = "dev1"
+channels = "ai0:1"
+rate = 20000.0
+raw = true
+
+[[task.sink]]
+type = "record"
+path = "{directory}/{{task}}.ndq"
+
+[[task]]
+name = "slow"
+device = "dev2"
+channels = "ai0"
+rate = 1000.0
+min_val = -5.0
+max_val = 5.0
+terminal_config = "diff"
+
+[[task.sink]]
+type = "record"
+path = "{directory}/{{task}}.ndq"
+"""
+
+
+def _write_config(tmp_path):
+    path = tmp_path / "acq.toml"
+    path.write_text(CONFIG.format(directory=tmp_path.as_posix()))
+    return str(path)
+
+
+def test_daemon_runs_tasks_concurrently_and_flushes_on_stop(tmp_path):
+    config = DaemonConfig.load(_write_config(tmp_path))
+    backend = SimulatedBackend([SimulatedDevice("dev1"), SimulatedDevice("dev2")])
+    daemon = AcquisitionDaemon(config, backend)
+    result = []
+    thread = threading.Thread(target=lambda: result.append(daemon.run()))
+    thread.start()
+    deadline = time.monotonic() + 5.0
+    while time.monotonic() < deadline:
+        status = daemon.status()
+        if all(s.get("reader", {}).get("blocks", 0) >= 3 for s in status.values()):
+            break
+        time.sleep(0.01)
+    daemon.request_stop()
+    thread.join(5.0)
+    assert result == [0]
+    assert backend.tasks() == []
+
+    with RecordingReader(str(tmp_path / "fast.ndq")) as fast:
+        assert fast.raw and fast.num_channels == 2
+        assert fast.num_samples == fast.header["num_samples"] >= 6000
+    slow = read_header(str(tmp_path / "slow.ndq"))
+    assert slow["channels"][0]["terminal_config"] == "DIFF"
+    assert slow["attrs"] == {"task": "slow"}
+
+
+def test_config_errors_are_reported():
+    with pytest.raises(ValueError, match="missing required key 'rate'"):
+        DaemonConfig.from_dict({"task": [{"device": "dev1", "channels": "ai0"}]})
+    with pytest.raises(ValueError, match="unknown sink type"):
+        DaemonConfig.from_dict(
+            {
+                "task": [
+                    {
+                        "device": "d",
+                        "channels": "ai0",
+                        "rate": 1.0,
+                        "sink": [{"type": "x"}],
+                    }
+                ]
+            }
+        )
+    with pytest.raises(ValueError, match="unknown terminal_config 'bogus'"):
+        DaemonConfig.from_dict(
+            {
+                "task": [
+                    {
+                        "device": "d",
+                        "channels": "ai0",
+                        "rate": 1.0,
+                        "terminal_config": "bogus",
+                    }
+                ]
+            }
+        )
+    bad_sinks = [
+        ({"type": "record", "path": "x.ndq"}, "list of tables"),
+        ([{"type": "record"}], "record sink is missing required keys \\['path'\\]"),
+        ([{"type": "trigger", "trigger": {}}], "trigger sink is missing"),
+    ]
+    for sink, message in bad_sinks:
+        task = {"device": "d", "channels": "ai0", "rate": 1.0, "sink": sink}
+        with pytest.raises(ValueError, match=message):
+            DaemonConfig.from_dict({"task": [task]})
+    with pytest.raises(ValueError, match="no \\[\\[task\\]\\]"):
+        DaemonConfig.from_dict({})
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="SIGTERM delivery")
+def test_run_command_stops_cleanly_on_sigterm(tmp_path):
+    config = tmp_path / "acq.json"
+    config.write_text(
+        '{"task": [{"name": "t", "device": "dev3", "channels": "ai0", "rate": 1000.0,'
+        f' "sink": [{{"type": "record", "path": "{(tmp_path / "t.ndq").as_posix()}"}}]}}]}}'
+    )
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "nidaqmx_on_pi",
+            "run",
+            "--config",
+            str(config),
+            "--backend",
+            "sim",
+        ],
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    output = tmp_path / "t.ndq"
+    deadline = time.monotonic() + 10.0
+    while not output.exists() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    time.sleep(0.3)
+    process.send_signal(signal.SIGTERM)
+    _, stderr = process.communicate(timeout=10.0)
+    assert process.returncode == 0, stderr
+    header = read_header(str(output))
+    assert header["num_samples"] > 0
+    assert os.path.getsize(output) == header["data_offset"] + header["num_samples"] * 8
+
+
+def test_serve_sink_publishes_task_blocks():
+    from nidaqmx_on_pi.server import StreamClient
+
+    config = DaemonConfig.from_dict(
+        {
+            "task": [
+                {
+                    "name": "t",
+                    "device": "dev3",
+                    "channels": "ai0:1",
+                    "rate": 1000.0,
+                    "sink": [{"type": "serve"}],
+                }
+            ]
+        }
+    )
+    daemon = AcquisitionDaemon(config, SimulatedBackend())
+    daemon.start()
+    try:
+        server = daemon.runners[0].sinks[0]
+        with StreamClient(*server.address, decimation=2) as client:
+            assert client.metadata["channels"] == ["dev3/ai0", "dev3/ai1"]
+            assert client.metadata["sample_rate"] == 1000.0
+            frame = client.recv()
+            assert frame.data.shape == (2, 50)
+        assert daemon.status()["t"]["sinks"][0]["clients"] <= 1
+    finally:
+        daemon.stop()
+
+
+def test_shared_memory_sink_publishes_task_blocks():
+    from nidaqmx_on_pi.sharedmem import SharedRing
+
+    config = DaemonConfig.from_dict(
+        {
+            "task": [
+                {
+                    "name": "shm",
+                    "device": "dev3",
+                    "channels": "ai0:1",
+                    "rate": 1000.0,
+                    "sink": [{"type": "shared_memory", "seconds": 1.0}],
+                }
+            ]
+        }
+    )
+    daemon = AcquisitionDaemon(config, SimulatedBackend())
+    daemon.start()
+    try:
+        ring = SharedRing.attach(daemon.runners[0].sinks[0].name)
+        assert ring.capacity == 1000 and ring.metadata["sample_rate"] == 1000.0
+        assert ring.wait(0, timeout=5.0)
+    finally:
+        daemon.stop()
+    assert ring.closed
+    ring.close()
@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+
+from nidaqmx_on_pi.bench import BENCHMARKS, run_benchmark
+from nidaqmx_on_pi.dsp import (
+    Decimator,
+    DspPipeline,
+    FirFilter,
+    Spectrum,
+    WindowedStats,
+    design_lowpass,
+)
+
+
+def _in_blocks(stage, signal, sizes):
+    outputs, start = [], 0
+    for size in sizes:
+        outputs.append(stage.process(signal[:, start : start + size]))
+        start += size
+    return outputs
+
+
+SIZES = [1, 7, 100, 3, 999, 50, 1840]
+
+
+def test_block_filtering_matches_offline_convolution():
+    signal = np.random.default_rng(0).normal(size=(3, sum(SIZES)))
+    taps = design_lowpass(100.0, 1000.0, 31)
+    assert taps.sum() == pytest.approx(1.0)
+    expected = np.stack([np.convolve(row, taps)[: signal.shape[1]] for row in signal])
+
+    filtered = np.concatenate(_in_blocks(FirFilter(taps, 3), signal, SIZES), axis=1)
+    assert np.allclose(filtered, expected)
+
+    decimated = np.concatenate(
+        _in_blocks(FirFilter(taps, 3, decimation=4), signal, SIZES), axis=1
+    )
+    assert np.allclose(decimated, expected[:, ::4])
+
+
+def test_decimator_removes_out_of_band_tone():
+    rate, n = 10000.0, 20000
+    t = np.arange(n) / rate
+    signal = np.vstack([np.sin(2 * np.pi * 50 * t) + np.sin(2 * np.pi * 3000 * t)])
+    decimator = Decimator(10, rate, 1)
+    out = np.concatenate(
+        _in_blocks(decimator, signal, [1234] * 16 + [n - 1234 * 16]), axis=1
+    )
+    assert out.shape == (1, n // 10) and decimator.output_rate == 1000.0
+    settled = out[0, 100:]
+    expected = np.sin(2 * np.pi * 50 * t[::10][100:] - 2 * np.pi * 50 * 100 / rate)
+    assert np.abs(settled - expected).max() < 0.02
+
+
+def test_windowed_stats_and_spectrum_span_blocks():
+    rate = 1000.0
+    t = np.arange(sum(SIZES)) / rate
+    signal = np.vstack([2.0 * np.sin(2 * np.pi * 125 * t), np.full_like(t, -3.0)])
+
+    results = _in_blocks(WindowedStats(200, 2), signal, SIZES)
+    rms = np.concatenate([r.rms for r in results], axis=1)
+    assert rms.shape == (2, sum(SIZES) // 200)
+    assert np.allclose(rms[0], np.sqrt(2.0)) and np.allclose(rms[1], 3.0)
+    peak = np.concatenate([r.peak for r in results], axis=1)
+    assert np.allclose(peak[1], 3.0) and np.all(peak[0] <= 2.0)
+    assert [r.first_window for r in results if r.num_windows][:2] == [0, 5]
+
+    spectra = _in_blocks(Spectrum(256, rate, 2), signal, SIZES)
+    amplitudes = np.concatenate([s.amplitudes for s in spectra], axis=1)
+    assert amplitudes.shape[1] == (sum(SIZES) - 256) // 128 + 1
+    bin_125 = np.argmin(np.abs(spectra[0].frequencies - 125.0))
+    assert np.allclose(amplitudes[0, :, bin_125], 2.0, rtol=1e-3)
+    assert np.allclose(amplitudes[1, :, 0], 3.0)
+
+
+def test_pipeline_chains_filters_and_features():
+    pipeline = DspPipeline([Decimator(5, 5000.0, 2)], {"stats": WindowedStats(100, 2)})
+    results = []
+    pipeline.subscribe(results.append)
+
+    class FakeBlock:
+        def __init__(self, data):
+            self.data = data
+
+        def scaled(self):
+            return self.data
+
+    for _ in range(4):
+        pipeline._on_block(FakeBlock(np.ones((2, 500))))
+    assert [r.first_sample for r in results] == [0, 100, 200, 300]
+    assert sum(r.features["stats"].num_windows for r in results) == 4
+    assert pipeline.stats.blocks == 4
+
+
+def test_dsp_benchmarks_run():
+    names = [name for name in BENCHMARKS if name.startswith("dsp.")]
+    assert names
+    for name in names:
+        result = run_benchmark(
+            name, num_channels=2, samples_per_block=2048, min_seconds=0.01
+        )
+        assert result.blocks > 0 and result.samples_per_second > 0
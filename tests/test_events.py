@@ -0,0 +1,90 @@
+import asyncio
+import time
+
+import numpy as np
+import pytest
+from nidaqmx.constants import AcquisitionType
+from nidaqmx.errors import DaqError
+
+from nidaqmx_on_pi.cli import start_continuous_ai_task
+from nidaqmx_on_pi.events import EventStream
+from nidaqmx_on_pi.simulator import SimulatedBackend, SimulatedDevice, Waveform
+
+
+def _ramp_backend(realtime=True):
+    # Rises monotonically for the first 1.25 s, so repeats show up in the data.
+    device = SimulatedDevice("dev3", waveforms={"ai0": Waveform("sine", frequency=0.2)})
+    return SimulatedBackend([device], realtime=realtime)
+
+
+def test_simulated_every_n_and_done_events():
+    backend = SimulatedBackend()
+    task = backend.create_task()
+    task.ai_channels.add_ai_voltage_chan("dev3/ai0")
+    task.timing.cfg_samp_clk_timing(
+        10000.0, sample_mode=AcquisitionType.FINITE, samps_per_chan=1050
+    )
+    events = []
+    done = []
+    task.register_every_n_samples_acquired_into_buffer_event(
+        100, lambda handle, kind, n, data: events.append(len(task.read(n))) or 0
+    )
+    task.register_done_event(lambda handle, status, data: done.append(status) or 0)
+    with pytest.raises(DaqError):
+        task.register_done_event(lambda *args: 0)
+    task.start()
+    with pytest.raises(DaqError):
+        task.register_every_n_samples_acquired_into_buffer_event(100, None)
+    deadline = time.monotonic() + 2.0
+    while not done and time.monotonic() < deadline:
+        time.sleep(0.01)
+    task.close()
+    assert events == [100] * 10
+    assert done == [0]
+
+
+def test_event_stream_delivers_contiguous_blocks():
+    backend = _ramp_backend()
+    task = start_continuous_ai_task("dev3", "ai0", rate=20000.0, backend=backend)
+    stream = EventStream(task, samples_per_block=200, queue_blocks=False)
+    firsts = []
+    stream.subscribe(
+        lambda block: firsts.append((block.first_sample, block.num_samples))
+    )
+    stream.start()
+    time.sleep(0.3)
+    stream.close()
+    task.close()
+    assert stream.stats.errors == 0, stream.stats.last_error
+    assert len(firsts) >= 10
+    assert [first for first, _ in firsts] == [200 * i for i in range(len(firsts))]
+    assert {n for _, n in firsts} == {200}
+    # The events were unregistered again.
+    assert task._every_n is None and task._done_callback is None
+
+
+def test_async_iteration_ends_with_finite_task():
+    backend = _ramp_backend(realtime=False)
+    task = backend.create_task()
+    task.ai_channels.add_ai_voltage_chan("dev3/ai0")
+    task.timing.cfg_samp_clk_timing(
+        1000.0, sample_mode=AcquisitionType.FINITE, samps_per_chan=1050
+    )
+
+    async def consume(stream):
+        chunks = []
+        async for block in stream:
+            chunks.append(block.data[0].copy())
+        return chunks
+
+    # Large enough that no block is dropped between the two threads.
+    stream = EventStream(
+        task, samples_per_block=100, num_buffers=16, max_queue_blocks=16
+    ).start()
+    chunks = asyncio.run(consume(stream))
+    stream.close()
+    task.close()
+    assert stream.done_status == 0
+    assert [len(c) for c in chunks] == [100] * 10 + [50]
+    data = np.concatenate(chunks)
+    assert np.all(np.diff(data)[:999] > 0)
@@ -0,0 +1,59 @@
+import pytest
+
+from nidaqmx_on_pi.inventory import DeviceInventory
+from nidaqmx_on_pi.simulator import SimulatedBackend, SimulatedDevice
+
+
+class CountingBackend(SimulatedBackend):
+    def __init__(self, *args, **kwargs):
+        self.enumerated = 0
+        self.name_checks = 0
+        super().__init__(*args, **kwargs)
+
+    def devices(self):
+        self.enumerated += 1
+        return super().devices()
+
+    def device_names(self):
+        self.name_checks += 1
+        return [device.name for device in super().devices()]
+
+
+def test_inventory_enumerates_once_and_answers_from_cache():
+    backend = CountingBackend([SimulatedDevice("dev1", serial_num=1234, num_ai=4)])
+    inventory = DeviceInventory(backend, check_interval=None)
+    for _ in range(5):
+        assert inventory.device_names() == ["dev1"]
+    info = inventory.device("DEV1")
+    assert info.serial_num == 1234
+    assert info.ai_channels == ["dev1/ai0", "dev1/ai1", "dev1/ai2", "dev1/ai3"]
+    assert info.do_lines[0] == "dev1/port1/line0"
+    assert backend.enumerated == 1
+
+    inventory.refresh()
+    assert backend.enumerated == 2
+    with pytest.raises(KeyError):
+        inventory.device("missing")
+
+
+def test_inventory_follows_added_and_removed_devices():
+    backend = CountingBackend([SimulatedDevice("dev1")])
+    inventory = DeviceInventory(backend, check_interval=None)
+    assert inventory.device_names() == ["dev1"]
+    backend.add_device(SimulatedDevice("dev2"))
+    assert inventory.device_names() == ["dev1", "dev2"]
+    backend.remove_device("dev1")
+    assert inventory.device_names() == ["dev2"]
+    inventory.close()
+
+
+def test_name_check_detects_changes_without_notifications(monkeypatch):
+    backend = CountingBackend([SimulatedDevice("dev1")])
+    inventory = DeviceInventory(backend, ttl=None, check_interval=0.0)
+    monkeypatch.setattr(backend, "_device_listeners", [])
+    inventory.devices()
+    inventory.devices()
+    assert backend.enumerated == 1 and backend.name_checks >= 1
+    backend.add_device(SimulatedDevice("dev2"))
+    assert sorted(inventory.device_names()) == ["dev1", "dev2"]
+    assert backend.enumerated == 2
@@ -0,0 +1,73 @@
+import logging
+import threading
+import time
+
+from nidaqmx_on_pi.logview import RingLogHandler, add_rotating_file
+
+
+def _logger(name, handler):
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.addHandler(handler)
+    return logger
+
+
+def test_ring_keeps_newest_lines_and_counts_skipped():
+    handler = RingLogHandler(capacity=5)
+    logger = _logger("test_logview.ring", handler)
+    try:
+        for i in range(3):
+            logger.info("message %d", i)
+        sequence, lines, skipped = handler.since(0)
+        assert (sequence, skipped) == (3, 0)
+        assert lines[-1].endswith("message 2")
+
+        for i in range(3, 12):
+            logger.info("message %d", i)
+        sequence, lines, skipped = handler.since(sequence)
+        assert (sequence, skipped) == (12, 4)
+        assert [line.split()[-1] for line in lines] == ["7", "8", "9", "10", "11"]
+        assert handler.since(sequence) == (12, [], 0)
+    finally:
+        logger.removeHandler(handler)
+
+
+def test_many_threads_can_log_without_blocking():
+    handler = RingLogHandler(capacity=1000)
+    logger = _logger("test_logview.threads", handler)
+
+    def flood():
+        for i in range(5000):
+            logger.info("event %d", i)
+
+    threads = [threading.Thread(target=flood) for _ in range(4)]
+    started = time.perf_counter()
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        logger.removeHandler(handler)
+    assert time.perf_counter() - started < 10.0
+    assert handler.sequence == 20000
+    assert len(handler.lines()) == 1000
+
+
+def test_rotating_file_is_bounded(tmp_path):
+    path = tmp_path / "gui.log"
+    logger = logging.getLogger("test_logview.file")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    handler = add_rotating_file(logger, str(path), max_bytes=2000, backup_count=2)
+    try:
+        for i in range(500):
+            logger.info("line %d", i)
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+    files = sorted(p.name for p in tmp_path.iterdir())
+    assert files == ["gui.log", "gui.log.1", "gui.log.2"]
+    assert all((tmp_path / name).stat().st_size <= 2000 for name in files)
+    assert "line 499" in path.read_text()
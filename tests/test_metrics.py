@@ -0,0 +1,100 @@
+import json
+import time
+import urllib.request
+
+from nidaqmx_on_pi.cli import start_continuous_ai_task
+from nidaqmx_on_pi.daemon import AcquisitionDaemon, DaemonConfig
+from nidaqmx_on_pi.metrics import LatencyHistogram, MetricsCollector, MetricsServer
+from nidaqmx_on_pi.simulator import SimulatedBackend
+from nidaqmx_on_pi.streaming import StreamingReader
+
+
+def test_histogram_buckets_and_quantiles():
+    histogram = LatencyHistogram([0.001, 0.01, 0.1])
+    for value in [0.0005] * 90 + [0.05] * 9 + [2.0]:
+        histogram.observe(value)
+    assert histogram.count == 100
+    assert histogram.cumulative() == [
+        (0.001, 90),
+        (0.01, 90),
+        (0.1, 99),
+        (float("inf"), 100),
+    ]
+    assert histogram.quantile(0.5) == 0.001
+    assert histogram.quantile(0.99) == 0.1
+    assert histogram.quantile(1.0) == 2.0
+    histogram.reset()
+    assert histogram.count == 0 and histogram.quantile(0.5) == 0.0
+
+
+def test_reader_metrics_render_as_prometheus_text():
+    task = start_continuous_ai_task(
+        "dev3", "ai0:1", rate=10000.0, backend=SimulatedBackend()
+    )
+    reader = StreamingReader(task, samples_per_block=100).start()
+    metrics = MetricsCollector()
+    metrics.register("acq", reader)
+    try:
+        deadline = time.monotonic() + 5.0
+        while reader.stats.blocks < 5 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        text = metrics.render()
+        snapshot = metrics.snapshot()
+    finally:
+        reader.stop()
+        task.close()
+    assert "# TYPE daq_read_seconds histogram" in text
+    assert 'daq_read_seconds_bucket{source="acq",le="+Inf"}' in text
+    assert 'daq_driver_buffer_size_samples{source="acq"}' in text
+    assert "daq_process_resident_memory_bytes " in text
+    acq = snapshot["acq"]
+    assert acq["blocks_total"] >= 5
+    assert acq["read_seconds_count"] >= 5
+    assert acq["pending_blocks"] >= 0 and "consumer_lag_samples" in acq
+    assert snapshot["process"]["resident_memory_bytes"] > 0
+
+
+def test_daemon_serves_metrics_over_http(tmp_path):
+    config = DaemonConfig.from_dict(
+        {
+            "metrics_port": 0,
+            "task": [
+                {
+                    "name": "t",
+                    "device": "dev3",
+                    "channels": "ai0",
+                    "rate": 1000.0,
+                    "sink": [{"type": "record", "path": str(tmp_path / "{task}.ndq")}],
+                }
+            ],
+        }
+    )
+    daemon = AcquisitionDaemon(config, SimulatedBackend())
+    daemon.start()
+    try:
+        host, port = daemon.metrics_server.address
+        with urllib.request.urlopen(
+            f"http://{host}:{port}/metrics", timeout=5.0
+        ) as response:
+            assert response.headers["Content-Type"].startswith("text/plain")
+            text = response.read().decode("utf-8")
+        with urllib.request.urlopen(
+            f"http://{host}:{port}/metrics.json", timeout=5.0
+        ) as response:
+            snapshot = json.loads(response.read())
+    finally:
+        daemon.stop()
+    assert 'daq_blocks_total{source="t"}' in text
+    assert 'daq_recorder_samples_dropped_total{source="t/record"}' in text
+    assert "t/record" in snapshot
+
+
+def test_server_answers_unknown_paths_with_404():
+    with MetricsServer(MetricsCollector(), port=0) as server:
+        host, port = server.address
+        try:
+            urllib.request.urlopen(f"http://{host}:{port}/other", timeout=5.0)
+        except urllib.error.HTTPError as e:
+            assert e.code == 404
+        else:
+            raise AssertionError("expected 404")
@@ -0,0 +1,124 @@
+import time
+
+import numpy as np
+import pytest
+from nidaqmx.errors import DaqError
+
+from nidaqmx_on_pi.output import (
+    ArrayWaveform,
+    GeneratorWaveform,
+    StreamingWriter,
+    create_output_task,
+)
+from nidaqmx_on_pi.simulator import SimulatedAOWriter, SimulatedBackend
+
+
+class RecordingWriter(SimulatedAOWriter):
+    """Simulated AO writer that keeps a copy of everything written."""
+
+    def __init__(self, task):
+        super().__init__(task)
+        self.blocks = []
+
+    def write_many_sample(self, data, timeout=10.0):
+        written = super().write_many_sample(data, timeout)
+        self.blocks.append(data.copy())
+        return written
+
+    @property
+    def data(self):
+        return np.concatenate(self.blocks, axis=1)
+
+
+def test_waveform_sources_rechunk():
+    cyclic = ArrayWaveform(np.arange(5.0))
+    assert cyclic.next_block(7).tolist() == [[0, 1, 2, 3, 4, 0, 1]]
+    assert cyclic.next_block(4).tolist() == [[2, 3, 4, 0]]
+    once = ArrayWaveform(np.arange(5.0), repeat=False)
+    assert once.next_block(3).shape == (1, 3) and once.next_block(3).shape == (1, 2)
+    assert once.next_block(3) is None
+    blocks = GeneratorWaveform(np.full((2, n), n) for n in (3, 0, 4))
+    assert blocks.num_channels == 2
+    assert blocks.next_block(5)[0].tolist() == [3, 3, 3, 4, 4]
+    assert blocks.next_block(5).shape == (2, 2)
+    assert blocks.next_block(5) is None
+
+
+def test_streaming_switches_waveform_at_block_boundary():
+    backend = SimulatedBackend()
+    task = create_output_task("dev3", "ao0:1", rate=20000.0, backend=backend)
+    writer = RecordingWriter(task)
+    first = np.vstack([np.arange(300.0) / 100, -np.arange(300.0) / 100])
+    with StreamingWriter(
+        task, first, samples_per_block=200, writer=writer
+    ) as streaming:
+        assert task.out_stream.output_buf_size == 400
+        time.sleep(0.05)
+        switched_at = streaming.update_waveform(
+            np.ones((2, 50)), wait=True, timeout=2.0
+        )
+        time.sleep(0.03)
+        assert streaming.latency <= 400 / 20000.0
+    data = writer.data
+    assert switched_at % 200 == 0 and switched_at >= 400
+    expected = np.tile(first, (1, -(-switched_at // 300)))[:, :switched_at]
+    assert np.array_equal(data[:, :switched_at], expected)
+    assert np.all(data[:, switched_at:] == 1.0)
+    assert streaming.stats.underflows == 0 and streaming.stats.switches == 1
+    assert streaming.generated > switched_at
+    assert not task._running
+    task.close()
+
+
+def test_underflow_is_counted_and_generation_restarts():
+    backend = SimulatedBackend()
+    task = create_output_task("dev3", "ao0", rate=10000.0, backend=backend)
+
+    def blocks():
+        for i in range(30):
+            if i == 5:
+                time.sleep(0.1)  # starve the 20 ms output buffer
+            yield np.zeros(100)
+
+    streaming = StreamingWriter(task, blocks(), samples_per_block=100)
+    streaming.start()
+    assert streaming.wait(5.0)
+    streaming.stop()
+    assert streaming.stats.underflows == 1 and streaming.stats.restarts == 1
+    assert streaming.written == 3000 and streaming.generated == 3000
+    task.close()
+
+
+def test_regeneration_writes_once_and_switches_per_buffer():
+    backend = SimulatedBackend()
+    task = create_output_task("dev3", "ao0", rate=10000.0, backend=backend)
+    streaming = StreamingWriter(task, np.zeros(500), regeneration=True).start()
+    time.sleep(0.12)
+    assert (
+        streaming.stats.blocks == 1
+        and task.out_stream.total_samp_per_chan_generated > 1000
+    )
+    assert streaming.update_waveform(np.ones(500), wait=True, timeout=2.0) == 500
+    assert streaming.stats.blocks == 2
+    with pytest.raises(ValueError):
+        streaming.update_waveform(np.ones(400))
+    streaming.stop()
+    task.close()
+
+
+def test_digital_output_and_empty_buffer_start():
+    backend = SimulatedBackend(realtime=False)
+    task = create_output_task(
+        "dev3", "port1/line0:1", rate=1000.0, digital=True, backend=backend
+    )
+    with pytest.raises(DaqError):
+        task.start()
+    pattern = np.array([[0, 1, 0, 1], [1, 1, 0, 0]], dtype=np.uint32)
+    streaming = StreamingWriter(
+        task, ArrayWaveform(pattern, repeat=False), samples_per_block=2
+    )
+    assert streaming.digital
+    streaming.start()
+    assert streaming.wait(2.0) and streaming.written == 4
+    streaming.stop()
+    task.close()
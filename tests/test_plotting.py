@@ -0,0 +1,31 @@
+import numpy as np
+
+from nidaqmx_on_pi.decimation import envelope_decimate
+
+
+def test_short_data_is_returned_unchanged():
+    data = np.arange(10.0).reshape(2, 5)
+    positions, envelope = envelope_decimate(data, 100)
+    assert envelope is data
+    assert positions.tolist() == [0, 1, 2, 3, 4]
+
+
+def test_envelope_keeps_min_and_max_of_every_bin():
+    rng = np.random.default_rng(0)
+    data = rng.normal(size=(8, 100000))
+    positions, envelope = envelope_decimate(data, 500)
+    assert envelope.shape == (8, 1000)
+    assert positions.shape == (1000,)
+    assert np.array_equal(envelope[:, 0::2], data.reshape(8, 500, 200).min(axis=2))
+    assert np.array_equal(envelope[:, 1::2], data.reshape(8, 500, 200).max(axis=2))
+    assert positions[:4].tolist() == [0, 199, 200, 399]
+
+
+def test_bins_stay_aligned_to_absolute_sample_index():
+    signal = np.sin(np.arange(20000) / 50.0)[np.newaxis, :]
+    # The same samples seen through a window that moved by 37 samples must
+    # produce the same bins where the windows overlap.
+    _, first = envelope_decimate(signal[:, :10000], 100, first_sample=0)
+    positions, second = envelope_decimate(signal[:, 37:10037], 100, first_sample=37)
+    assert (positions[0] + 37) % 100 == 0
+    assert np.array_equal(first[:, 2:], second[:, : first.shape[1] - 2])
@@ -0,0 +1,98 @@
+import pytest
+from nidaqmx.constants import AcquisitionType, TerminalConfiguration
+from nidaqmx.errors import DaqError
+
+from nidaqmx_on_pi.cli import start_continuous_ai_task
+from nidaqmx_on_pi.profiles import (
+    ChannelProfile,
+    TaskPool,
+    TaskProfile,
+    load_profiles,
+    save_profiles,
+)
+from nidaqmx_on_pi.simulator import SimulatedBackend, SimulatedDevice
+
+
+def _backend():
+    return SimulatedBackend([SimulatedDevice("dev1"), SimulatedDevice("dev2")])
+
+
+def test_profiles_round_trip_through_file_and_task(tmp_path):
+    backend = _backend()
+    task = backend.create_task()
+    task.ai_channels.add_ai_voltage_chan(
+        "dev1/ai0:1",
+        terminal_config=TerminalConfiguration.DIFF,
+        min_val=-5.0,
+        max_val=5.0,
+    )
+    task.timing.cfg_samp_clk_timing(
+        2000.0, sample_mode=AcquisitionType.FINITE, samps_per_chan=500
+    )
+    profile = TaskProfile.from_task(task, "strain")
+    task.close()
+    assert (
+        profile.sample_mode == "finite"
+        and profile.rate == 2000.0
+        and profile.devices == {"dev1"}
+    )
+
+    path = str(tmp_path / "profiles.json")
+    save_profiles([profile, TaskProfile("other", [ChannelProfile("dev2/ai0")])], path)
+    loaded = load_profiles(path)
+    assert list(loaded) == ["strain", "other"]
+    assert loaded["strain"].to_dict() == profile.to_dict()
+
+    rebuilt = loaded["strain"].create_task(backend)
+    assert [c.ai_term_cfg for c in rebuilt.ai_channels] == [
+        TerminalConfiguration.DIFF
+    ] * 2
+    assert rebuilt.timing.samp_quant_samp_per_chan == 500
+    with pytest.raises(ValueError):
+        ChannelProfile("dev1/ai0", min_val=1.0, max_val=-1.0)
+    assert load_profiles(str(tmp_path / "missing.json")) == {}
+
+
+def test_pool_restarts_the_committed_task():
+    backend = _backend()
+    with TaskPool(backend) as pool:
+        task = start_continuous_ai_task("dev1", "ai0:3", rate=10000.0, pool=pool)
+        assert pool.stats.first_sample_latency.count == 0
+        profile = TaskProfile.continuous_ai("dev1", "ai0:3", 10000.0)
+        pool.stop(profile)
+        assert pool.start(profile, wait_first_sample=True) is task
+        assert task.in_stream.avail_samp_per_chan > 0
+        assert (pool.stats.misses, pool.stats.hits) == (1, 1)
+        assert pool.stats.first_sample_latency.count == 1
+        # The committed task holds dev1: an unpooled task cannot start there.
+        pool.stop(profile)
+        other = backend.create_task()
+        other.ai_channels.add_ai_voltage_chan("dev1/ai4")
+        with pytest.raises(DaqError) as excinfo:
+            other.start()
+        assert excinfo.value.error_code == -50103
+        other.close()
+    assert backend.tasks() == []
+
+
+def test_switch_unreserves_idle_tasks_on_the_same_device():
+    backend = _backend()
+    first = TaskProfile.continuous_ai("dev1", "ai0", 1000.0, name="first")
+    second = TaskProfile.continuous_ai(
+        "dev1", "ai0", 1000.0, min_val=-1.0, max_val=1.0, name="second"
+    )
+    elsewhere = TaskProfile.continuous_ai("dev2", "ai0", 1000.0, name="elsewhere")
+    pool = TaskPool(backend)
+    a = pool.start(first)
+    with pytest.raises(RuntimeError):
+        pool.start(second)
+    pool.start(elsewhere)
+    b = pool.switch(second)
+    assert [p.name for p in pool.running()] == ["second"]
+    assert pool.stats.unreserves == 1 and pool.stats.switch_latency.count == 1
+    assert pool.switch(first) is a
+    pool.stop(first)
+    assert pool.get(second) is b
+    assert pool.stats.unreserves == 3
+    pool.close()
+    assert backend.tasks() == []
@@ -0,0 +1,238 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from nidaqmx_on_pi.cli import start_continuous_ai_task
+from nidaqmx_on_pi.recording import (
+    ChannelInfo,
+    Recorder,
+    RecordingReader,
+    build_pyramid,
+    read_header,
+)
+from nidaqmx_on_pi.simulator import SimulatedBackend
+from nidaqmx_on_pi.streaming import StreamingReader
+
+
+def _load(path):
+    header = read_header(path)
+    data = np.fromfile(path, dtype=header["dtype"], offset=header["data_offset"])
+    return header, data.reshape(-1, header["num_channels"]).T
+
+
+def test_recording_from_streaming_reader_keeps_metadata_and_samples(tmp_path):
+    backend = SimulatedBackend(realtime=False)
+    task = start_continuous_ai_task(
+        "dev3", "ai0:2", rate=10000.0, min_val=-5.0, max_val=5.0, backend=backend
+    )
+    path = str(tmp_path / "run.ndq")
+    recorder = Recorder.from_task(
+        task, path, chunk_bytes=4096, attrs={"operator": "test"}
+    )
+    reader = StreamingReader(task, samples_per_block=1000, queue_blocks=False)
+    recorder.attach(reader)
+    seen = []
+    reader.subscribe(lambda block: seen.append(block.data.copy()))
+    reader.start()
+    while reader.stats.blocks < 20:
+        time.sleep(0.001)
+    reader.stop()
+    recorder.close()
+    task.close()
+
+    header, data = _load(path)
+    assert header["data_offset"] % 4096 == 0
+    assert header["sample_rate"] == 10000.0
+    assert header["attrs"] == {"operator": "test"}
+    channel = header["channels"][1]
+    assert channel["device"] == "dev3"
+    assert channel["physical_channel"] == "dev3/ai1"
+    assert (channel["min_val"], channel["max_val"]) == (-5.0, 5.0)
+    assert channel["terminal_config"] == "RSE"
+    expected = np.concatenate(seen, axis=1)
+    assert header["num_samples"] == expected.shape[1] == recorder.stats.samples_written
+    assert np.array_equal(data, expected)
+
+
+def test_full_buffers_drop_samples_instead_of_blocking(tmp_path):
+    class SlowRecorder(Recorder):
+        def _write_chunk(self, chunk, count):
+            time.sleep(0.05)
+            super()._write_chunk(chunk, count)
+
+    channels = [ChannelInfo("dev3/ai0")]
+    recorder = SlowRecorder(
+        str(tmp_path / "slow.ndq"),
+        channels,
+        1000.0,
+        chunk_bytes=800,
+        max_buffer_bytes=1600,
+    )
+    start = time.monotonic()
+    accepted = [recorder.write(np.ones((1, 100))) for _ in range(50)]
+    assert time.monotonic() - start < 0.05
+    recorder.close()
+    stats = recorder.stats
+    assert stats.samples_dropped > 0
+    assert stats.samples_written + stats.samples_dropped == 5000
+    assert sum(accepted) == stats.samples_written
+    assert stats.max_pending_chunks >= 1
+    size = os.path.getsize(recorder.path) - recorder.data_offset
+    assert size == stats.samples_written * 8
+
+
+def test_read_header_rejects_other_files(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"not a recording at all")
+    with pytest.raises(ValueError):
+        read_header(str(path))
+
+
+def _write_recording(path, data, rate=1000.0):
+    channels = [ChannelInfo(f"dev3/ai{i}") for i in range(data.shape[0])]
+    with Recorder(path, channels, rate, chunk_bytes=1 << 16) as recorder:
+        assert recorder.write(data) == data.shape[1]
+
+
+def test_reader_returns_views_of_time_and_channel_slices(tmp_path):
+    path = str(tmp_path / "run.ndq")
+    data = np.random.default_rng(1).normal(size=(3, 10000))
+    _write_recording(path, data)
+
+    with RecordingReader(path) as reader:
+        assert reader.num_samples == 10000
+        assert reader.duration == 10.0
+        view = reader.read(2000, 3000)
+        assert np.shares_memory(view, reader.data)
+        assert np.array_equal(view, data[:, 2000:3000])
+        assert np.array_equal(reader.read(channels="dev3/ai2"), data[2:3])
+        assert np.array_equal(
+            reader.read_seconds(1.5, 2.0, channels=[2, 0]), data[[2, 0], 1500:2000]
+        )
+
+
+def test_reader_handles_truncated_file(tmp_path):
+    path = str(tmp_path / "cut.ndq")
+    data = np.arange(2000.0).reshape(2, 1000)
+    _write_recording(path, data)
+    with open(path, "r+b") as handle:
+        handle.truncate(os.path.getsize(path) - 20)
+    with RecordingReader(path) as reader:
+        assert reader.num_samples == 998
+        assert np.array_equal(reader.read(), data[:, :998])
+
+
+def test_pyramid_envelope_matches_full_scan(tmp_path):
+    path = str(tmp_path / "long.ndq")
+    data = np.random.default_rng(2).normal(size=(2, 200000))
+    _write_recording(path, data)
+    pyramid = build_pyramid(path, base_bin=64, factor=4, chunk_bins=100)
+    assert pyramid.bin_sizes[:3] == [64, 256, 1024]
+    assert pyramid.levels[0].shape == (200000 // 64, 2, 2)
+
+    with RecordingReader(path) as reader:
+        assert reader.pyramid is not None
+        start, stop = 12345, 190000
+        positions, envelope = reader.envelope(start, stop, num_bins=100)
+        assert len(positions) == envelope.shape[1] <= 200
+        for i in range(0, len(positions), 2):
+            first, last = positions[i] + start, positions[i + 1] + start + 1
+            assert start <= first and last <= stop
+            assert np.array_equal(envelope[:, i], data[:, first:last].min(axis=1))
+            assert np.array_equal(envelope[:, i + 1], data[:, first:last].max(axis=1))
+
+        # Short ranges are below the finest level and use the raw samples.
+        positions, envelope = reader.envelope(0, 1000, num_bins=100)
+        assert envelope[0, 0] == data[0, :10].min()
+
+
+def test_stale_pyramid_is_ignored(tmp_path):
+    path = str(tmp_path / "run.ndq")
+    _write_recording(path, np.zeros((1, 5000)))
+    build_pyramid(path, base_bin=64)
+    _write_recording(path, np.zeros((1, 6000)))
+    with RecordingReader(path) as reader:
+        assert reader.pyramid is None
+
+
+def test_raw_recording_stores_codes_and_scales_on_read(tmp_path):
+    backend = SimulatedBackend(realtime=False)
+    task = start_continuous_ai_task(
+        "dev3", "ai0:1", rate=1000.0, min_val=-10.0, max_val=10.0, backend=backend
+    )
+    path = str(tmp_path / "raw.ndq")
+    reader = StreamingReader(task, samples_per_block=250, raw=True, queue_blocks=False)
+    with pytest.raises(ValueError):
+        Recorder.from_task(task, str(tmp_path / "scaled.ndq")).attach(reader)
+    recorder = Recorder.from_task(task, path, raw=True)
+    recorder.attach(reader)
+    seen = []
+    reader.subscribe(lambda block: seen.append(block.scaled()))
+    reader.start()
+    while reader.stats.blocks < 4:
+        time.sleep(0.001)
+    reader.stop()
+    recorder.close()
+    task.close()
+
+    with RecordingReader(path) as rec:
+        assert rec.raw and rec.data.dtype == np.int16
+        assert (
+            os.path.getsize(path) - rec.header["data_offset"] == rec.num_samples * 2 * 2
+        )
+        expected = np.concatenate(seen, axis=1)
+        assert np.array_equal(rec.read(scaled=True), expected)
+        assert np.array_equal(rec.read(channels=1, scaled=True), expected[1:])
+        _, envelope = rec.envelope(0, 1000, num_bins=10, scaled=True)
+        assert envelope[0, 0] == expected[0, :100].min()
+
+
+def test_gaps_are_recorded_and_time_runs_on_across_them(tmp_path):
+    path = str(tmp_path / "gaps.ndq")
+    recorder = Recorder(path, [ChannelInfo("dev3/ai0")], 1000.0)
+    # Blocks start at source sample 5000; the one at 5200 was lost upstream.
+    for first in (5000, 5100, 5300):
+        recorder.write(np.arange(first, first + 100, dtype=float)[None, :], first)
+    recorder.close()
+    assert recorder.stats.gaps == 1 and recorder.stats.samples_missing == 100
+
+    with RecordingReader(path) as reader:
+        assert reader.first_sample == 5000
+        assert reader.gaps == [(200, 5300, 100)]
+        assert reader.num_samples == 300 and reader.duration == 0.4
+        assert [reader.file_sample(offset) for offset in (150, 250, 300, 350)] == [
+            150,
+            200,
+            200,
+            250,
+        ]
+        assert reader.read_seconds(0.25, 0.35)[0].tolist() == list(range(5300, 5350))
+
+
+def test_failed_chunk_write_is_cut_off_and_recorded_as_a_gap(tmp_path):
+    path = str(tmp_path / "full.ndq")
+    recorder = Recorder(path, [ChannelInfo("dev3/ai0")], 1000.0, chunk_bytes=800)
+    write_chunk = recorder._write_chunk
+
+    def failing(chunk, count):
+        if chunk[0, 0] == 100:
+            # Half the chunk reaches the disk before it fills up.
+            recorder._file.write(memoryview(chunk[: count // 2]).cast("B"))
+            raise OSError(28, "No space left on device")
+        write_chunk(chunk, count)
+
+    recorder._write_chunk = failing
+    for first in (0, 100, 200, 400):
+        recorder.write(np.arange(first, first + 100, dtype=float)[None, :], first)
+    recorder.close()
+    assert recorder.stats.write_errors == 1 and recorder.stats.samples_lost == 100
+    assert recorder.stats.samples_dropped == 0
+
+    with RecordingReader(path) as reader:
+        assert reader.num_samples == 300
+        assert reader.gaps == [(100, 200, 100), (200, 400, 100)]
+        expected = list(range(100)) + list(range(200, 300)) + list(range(400, 500))
+        assert reader.data[:, 0].tolist() == expected
+        assert reader.header["samples_dropped"] == 100
@@ -0,0 +1,142 @@
+import asyncio
+import time
+
+import numpy as np
+import pytest
+
+from nidaqmx_on_pi.cli import start_continuous_ai_task
+from nidaqmx_on_pi.recording import ChannelInfo, Recorder, write_recording
+from nidaqmx_on_pi.replay import ReplaySource
+from nidaqmx_on_pi.simulator import SimulatedBackend, SimulatedDevice, Waveform
+from nidaqmx_on_pi.streaming import StreamingReader
+from nidaqmx_on_pi.trigger import EdgeTrigger, TriggeredCapture
+
+
+def _write(path, data, rate=10000.0, scaling=None):
+    channels = [ChannelInfo(f"dev1/ai{i}") for i in range(data.shape[0])]
+    write_recording(str(path), data, channels, rate, scaling=scaling)
+    return str(path)
+
+
+def test_replay_concatenates_files_and_converts_raw(tmp_path):
+    data = np.arange(2 * 2500, dtype=np.int16).reshape(2, 2500)
+    scaling = np.array([[0.0, 0.5], [1.0, 2.0]])
+    first, second = _write(tmp_path / "a.ndq", data, scaling=scaling), _write(
+        tmp_path / "b.ndq", data, scaling=scaling
+    )
+    with ReplaySource([first, second], samples_per_block=1000, speed=None) as replay:
+        assert replay.wait(5.0) and replay.finished
+        blocks = []
+        while replay.pending:
+            with replay.get() as block:
+                assert block.raw and block.data.dtype == np.int16
+                blocks.append((block.first_sample, block.data.copy()))
+    assert [first_sample for first_sample, _ in blocks] == [0, 1000, 2000, 3000, 4000]
+    assert np.array_equal(
+        np.concatenate([b for _, b in blocks], axis=1),
+        np.concatenate([data, data], axis=1),
+    )
+
+    volts = ReplaySource(first, samples_per_block=1000, speed=None, raw=False)
+    chunks = []
+    volts.subscribe(lambda block: chunks.append(block.data.copy()))
+    volts.start().wait(5.0)
+    assert [c.shape[1] for c in chunks] == [1000, 1000, 500]
+    assert np.allclose(
+        np.concatenate(chunks, axis=1), scaling[:, :1] + scaling[:, 1:] * data
+    )
+    # A rewound replay starts over, block numbering included.
+    volts.rewind()
+    volts.start().wait(5.0)
+    assert volts.stats.blocks == 3 and volts._sample_index == 2500
+    volts.close()
+
+    with pytest.raises(ValueError):
+        ReplaySource([first, _write(tmp_path / "c.ndq", data[:1], scaling=scaling[:1])])
+    with pytest.raises(ValueError):
+        ReplaySource(_write(tmp_path / "volts.ndq", data.astype(float)), raw=True)
+
+
+def test_replay_paces_blocks_at_the_requested_speed(tmp_path):
+    path = _write(tmp_path / "run.ndq", np.zeros((1, 2000)), rate=10000.0)
+    timings = {}
+    for speed in (1.0, 4.0, None):
+        replay = ReplaySource(
+            path, samples_per_block=200, speed=speed, queue_blocks=False
+        )
+        started = time.monotonic()
+        assert replay.start().wait(5.0)
+        timings[speed] = time.monotonic() - started
+    assert timings[1.0] >= 0.19
+    assert 0.045 <= timings[4.0] < timings[1.0]
+    assert timings[None] < timings[4.0]
+    with pytest.raises(ValueError):
+        ReplaySource(path, speed=0)
+
+
+def test_replayed_recording_reproduces_live_triggers(tmp_path):
+    device = SimulatedDevice(
+        "dev1", waveforms={"ai0": Waveform("step", frequency=50.0, amplitude=2.0)}
+    )
+    task = start_continuous_ai_task(
+        "dev1",
+        "ai0:1",
+        rate=10000.0,
+        backend=SimulatedBackend([device], realtime=False),
+    )
+    path = str(tmp_path / "live.ndq")
+    recorder = Recorder.from_task(task, path, raw=True, chunk_bytes=4096)
+    reader = StreamingReader(task, samples_per_block=500, queue_blocks=False, raw=True)
+
+    def capture():
+        return TriggeredCapture(
+            EdgeTrigger(0, level=0.0), pre_samples=100, post_samples=300
+        )
+
+    live = capture()
+    live.attach(reader)
+    recorder.attach(reader)
+    live_triggers = []
+    live.subscribe(lambda c: live_triggers.append(c.trigger_sample))
+    reader.start()
+    while reader.stats.blocks < 40:
+        time.sleep(0.001)
+    reader.stop()
+    recorder.close()
+    task.close()
+
+    # Enough buffers that the async consumer never loses a block.
+    replay = ReplaySource(path, samples_per_block=700, speed=None, num_buffers=32)
+    replayed = capture()
+    replayed.attach(replay)
+    triggers = []
+    replayed.subscribe(lambda c: triggers.append(c.trigger_sample))
+
+    async def consume():
+        return sum([block.num_samples async for block in replay.start()])
+
+    assert asyncio.run(consume()) == replay.num_samples == reader.stats.samples
+    assert triggers and triggers == live_triggers[: len(triggers)]
+    assert len(live_triggers) - len(triggers) <= 1
+
+
+def test_replay_reproduces_recorded_gaps(tmp_path):
+    path = str(tmp_path / "gaps.ndq")
+    recorder = Recorder(path, [ChannelInfo("dev1/ai0")], 10000.0)
+    for first in (0, 100, 300):
+        recorder.write(np.arange(first, first + 100, dtype=float)[None, :], first)
+    recorder.close()
+    replay = ReplaySource(path, samples_per_block=150, speed=None)
+    blocks = []
+    replay.subscribe(
+        lambda block: blocks.append((block.first_sample, block.data[0].tolist()))
+    )
+    replay.start().wait(5.0)
+    assert [(first, values[0], len(values)) for first, values in blocks] == [
+        (0, 0, 150),
+        (150, 150, 50),
+        (300, 300, 100),
+    ]
+    assert all(
+        values == list(range(first, first + len(values))) for first, values in blocks
+    )
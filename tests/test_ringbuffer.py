@@ -0,0 +1,78 @@
+import threading
+
+import numpy as np
+import pytest
+
+from nidaqmx_on_pi.ringbuffer import RingBuffer
+
+
+def _block(start, n, channels=2):
+    return np.tile(np.arange(start, start + n, dtype=float), (channels, 1))
+
+
+def test_latest_is_view_until_wraparound():
+    ring = RingBuffer(2, 10)
+    ring.write(_block(0, 6))
+    latest = ring.latest(4)
+    assert np.shares_memory(latest, ring._data)
+    assert latest[0].tolist() == [2, 3, 4, 5]
+
+    ring.write(_block(6, 6))
+    wrapped = ring.latest(8)
+    assert not np.shares_memory(wrapped, ring._data)
+    assert wrapped[1].tolist() == list(range(4, 12))
+    assert len(ring) == 10
+    start, newest = ring.latest_with_start(3)
+    assert start == 9 and newest[0].tolist() == [9, 10, 11]
+
+
+def test_oversized_write_keeps_newest_samples():
+    ring = RingBuffer(2, 10)
+    ring.write(_block(0, 25))
+    assert ring.written == 25
+    assert ring.latest(10)[0].tolist() == list(range(15, 25))
+    with pytest.raises(IndexError):
+        ring.read(0, 5)
+
+
+def test_cursors_are_independent_and_detect_overrun():
+    ring = RingBuffer(2, 10)
+    fast = ring.cursor()
+    slow = ring.cursor()
+    ring.write(_block(0, 8))
+    assert fast.read()[0].tolist() == list(range(8))
+    ring.write(_block(8, 8))
+    assert fast.read(max_samples=3)[0].tolist() == [8, 9, 10]
+    assert fast.available == 5
+
+    data = slow.read()
+    assert slow.overruns == 1
+    assert slow.dropped_samples == 6
+    assert data[0].tolist() == list(range(6, 16))
+    assert slow.still_valid()
+    ring.write(_block(16, 4))
+    assert not slow.still_valid()
+
+
+def test_concurrent_producer_and_consumer_see_ordered_samples():
+    ring = RingBuffer(1, 1000)
+    cursor = ring.cursor()
+    total = 20000
+
+    def produce():
+        for start in range(0, total, 100):
+            ring.write(_block(start, 100, channels=1))
+
+    producer = threading.Thread(target=produce)
+    producer.start()
+    seen = 0
+    while seen < total:
+        expected_start = cursor.position
+        data = cursor.read()
+        if data.shape[1] and cursor.still_valid():
+            assert data[0, 0] == cursor.last_start
+            assert np.all(np.diff(data[0]) == 1)
+        seen = cursor.position
+        assert cursor.last_start >= expected_start
+    producer.join()
+    assert cursor.position == total
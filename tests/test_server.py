@@ -0,0 +1,128 @@
+import asyncio
+import socket
+import time
+
+import numpy as np
+import pytest
+
+from nidaqmx_on_pi.server import (
+    FRAME_DATA,
+    FRAME_ERROR,
+    FRAME_HEADER,
+    Frame,
+    StreamClient,
+    StreamServer,
+)
+from nidaqmx_on_pi.streaming import BlockSource
+
+
+class CountingSource(BlockSource):
+    """Emits consecutive sample indices, channel c offset by 1000 * c."""
+
+    def __init__(self, num_channels=3, samples_per_block=100, delay=0.001, raw=False):
+        super().__init__(
+            num_channels,
+            samples_per_block,
+            dtype=np.int16 if raw else np.float64,
+            queue_blocks=False,
+        )
+        self.delay = delay
+        self.next_sample = 0
+        if raw:
+            self.scaling = np.array([[0.0, 0.5]] * num_channels)
+
+    def _read_into(self, data):
+        n = data.shape[1]
+        indices = np.arange(self.next_sample, self.next_sample + n) % 1000
+        data[:] = indices + 1000 * np.arange(data.shape[0])[:, None]
+        self.next_sample += n
+        time.sleep(self.delay)
+        return n
+
+
+def test_clients_get_their_own_channels_decimation_and_format():
+    source = CountingSource(raw=True)
+    with StreamServer(source, sample_rate=1000.0) as server:
+        host, port = server.address
+        source.start()
+        with StreamClient(
+            host, port, channels=[0, 2], decimation=7
+        ) as decimated, StreamClient(
+            host, port, channels=["ch1"], format="int16"
+        ) as raw:
+            assert decimated.metadata["channels"] == ["ch0", "ch2"]
+            assert decimated.metadata["scaling"] == [[0.0, 0.5], [0.0, 0.5]]
+            assert raw.metadata["format"] == "int16"
+            frames = [decimated.recv() for _ in range(10)]
+            raw_frame = raw.recv()
+        source.stop()
+
+    for frame in frames:
+        assert frame.kind == FRAME_DATA and frame.channels == [0, 2]
+        assert frame.data.dtype == np.float32 and frame.first_sample % 7 == 0
+        expected = (frame.first_sample + 7 * np.arange(frame.num_samples)) % 1000
+        assert np.array_equal(frame.data[0], expected * 0.5)
+        assert np.array_equal(frame.data[1], (expected + 2000) * 0.5)
+    assert raw_frame.data.dtype == np.int16
+    assert np.array_equal(
+        raw_frame.data[0], (raw_frame.first_sample + np.arange(100)) % 1000 + 1000
+    )
+
+
+def test_bad_requests_are_rejected():
+    source = CountingSource()
+    with StreamServer(source) as server:
+        with pytest.raises(ConnectionError, match="int16"):
+            StreamClient(*server.address, format="int16")
+        with pytest.raises(ConnectionError, match="channels"):
+            StreamClient(*server.address, channels=[5])
+        for request, message in (
+            (b"[1]\n", "JSON object"),
+            (b'{"channels": [{}]}\n', "channels"),
+            (b'{"decimation": [2]}\n', "decimation must be an integer"),
+            (b'{"decimation": {}}\n', "decimation must be an integer"),
+            (b'{"format": ["int16"]}\n', "format must be one of"),
+        ):
+            with socket.create_connection(server.address, timeout=5.0) as sock:
+                sock.sendall(request)
+                stream = sock.makefile("rb")
+                header = stream.read(FRAME_HEADER.size)
+                frame = Frame.decode(
+                    header, stream.read(FRAME_HEADER.unpack(header)[-1])
+                )
+            assert frame.kind == FRAME_ERROR and message in frame.info["error"]
+
+
+def test_blocks_after_stop_are_ignored():
+    source = CountingSource()
+    server = StreamServer(source).start()
+    server.stop()
+    server._on_block(None)
+    # Even a callback that still holds the closed loop returns quietly.
+    closed = asyncio.new_event_loop()
+    closed.close()
+    server._loop = closed
+    server._on_block(None)
+
+
+def test_slow_client_drops_frames_without_stalling_reader_or_others():
+    source = CountingSource(samples_per_block=1000, delay=0.0005)
+    with StreamServer(source, max_queue_frames=4) as server:
+        host, port = server.address
+        slow = StreamClient(host, port)
+        fast = StreamClient(host, port)
+        source.start()
+        sequences = []
+        deadline = time.monotonic() + 1.0
+        while time.monotonic() < deadline:
+            sequences.append(fast.recv().sequence)
+        stalled_blocks = source.stats.blocks
+        stats = {id(c): c.stats for c in server.clients}
+        source.stop()
+        slow.close()
+        fast.close()
+    # The slow client never read, so the server dropped frames for it ...
+    assert max(s.frames_dropped for s in stats.values()) > 0
+    # ... while the reader kept producing and the fast client kept receiving.
+    assert stalled_blocks > 200
+    assert len(sequences) > 100 and sequences == sorted(sequences)
@@ -0,0 +1,133 @@
+import time
+
+import numpy as np
+import pytest
+
+from nidaqmx_on_pi.cli import start_continuous_ai_task
+from nidaqmx_on_pi.sharedmem import SharedMemoryPublisher, SharedRing, spawn_consumer
+from nidaqmx_on_pi.simulator import SimulatedBackend
+from nidaqmx_on_pi.streaming import StreamingReader
+
+
+def _check_continuity(ring, results, count):
+    """Consumer: read `count` samples and verify they are consecutive indices."""
+    cursor = ring.cursor(from_start=True)
+    total, errors = 0, 0
+    while total < count and ring.wait(cursor.position, timeout=10.0):
+        start = cursor.position
+        data = cursor.read()
+        errors += int(
+            not np.array_equal(data[0], np.arange(start, start + data.shape[1]))
+        )
+        total += data.shape[1]
+    results.put((ring.metadata["label"], total, errors, cursor.overruns))
+
+
+def test_attached_ring_sees_writes_and_detects_overruns():
+    producer = SharedRing.create(2, 1000, np.int16, metadata={"sample_rate": 100.0})
+    try:
+        consumer = SharedRing.attach(producer.name)
+        assert consumer.metadata == {"sample_rate": 100.0}
+        assert consumer.dtype == np.int16 and consumer.capacity == 1000
+        cursor = consumer.cursor()
+        producer.write(np.ones((2, 300), dtype=np.int16))
+        view = cursor.read()
+        assert view.shape == (2, 300) and np.shares_memory(view, consumer._data)
+        producer.write(np.full((2, 1500), 2, dtype=np.int16))
+        assert np.all(cursor.read() == 2)
+        assert cursor.overruns == 1 and cursor.dropped_samples == 500
+        assert not consumer.wait(cursor.position, timeout=0.01)
+        producer.mark_closed()
+        assert consumer.closed and not consumer.wait(cursor.position)
+        del view
+        consumer.close()
+    finally:
+        producer.close()
+        producer.unlink()
+    with pytest.raises(FileNotFoundError):
+        SharedRing.attach(producer.name)
+
+
+def test_consumer_processes_read_without_gaps():
+    import multiprocessing
+
+    ring = SharedRing.create(1, 100000, metadata={"label": "counting"})
+    results = multiprocessing.get_context("spawn").Queue()
+    processes = [
+        spawn_consumer(_check_continuity, ring.name, results, 50000) for _ in range(2)
+    ]
+    try:
+        time.sleep(0.2)
+        for start in range(0, 60000, 1000):
+            ring.write(np.arange(start, start + 1000, dtype=np.float64)[None, :])
+            time.sleep(0.001)
+        outcomes = [results.get(timeout=30.0) for _ in processes]
+    finally:
+        ring.mark_closed()
+        for process in processes:
+            process.join(10.0)
+        ring.close()
+        ring.unlink()
+    for label, total, errors, overruns in outcomes:
+        assert label == "counting"
+        assert total >= 50000 and errors == 0 and overruns == 0
+
+
+def test_publisher_shares_a_raw_stream():
+    backend = SimulatedBackend(realtime=False)
+    task = start_continuous_ai_task("dev3", "ai0:1", rate=1000.0, backend=backend)
+    reader = StreamingReader(task, samples_per_block=100, raw=True, queue_blocks=False)
+    publisher = SharedMemoryPublisher(reader, seconds=2.0)
+    consumer = SharedRing.attach(publisher.name)
+    assert consumer.metadata["channels"] == ["dev3/ai0", "dev3/ai1"]
+    assert len(consumer.metadata["scaling"]) == 2 and consumer.dtype == np.int16
+    cursor = consumer.cursor()
+    seen = []
+    reader.subscribe(lambda block: seen.append(block.data.copy()))
+    reader.start()
+    while reader.stats.blocks < 5:
+        time.sleep(0.001)
+    reader.stop()
+    data = cursor.read().copy()
+    publisher.close()
+    consumer.close()
+    task.close()
+    assert consumer.capacity == 2000
+    assert np.array_equal(data, np.concatenate(seen, axis=1)[:, : data.shape[1]])
+
+
+def test_publisher_closes_while_the_source_runs():
+    backend = SimulatedBackend(realtime=False)
+    task = start_continuous_ai_task("dev3", "ai0:1", rate=1000.0, backend=backend)
+    reader = StreamingReader(task, samples_per_block=100, queue_blocks=False)
+    publisher = SharedMemoryPublisher(reader, seconds=2.0)
+    reader.start()
+    while reader.stats.blocks < 3:
+        time.sleep(0.001)
+    late = []
+    reader.subscribe(late.append)
+    while not late:
+        time.sleep(0.001)
+    publisher.close()
+    publisher.close()
+    # A block already dispatched to the old subscriber list is ignored.
+    publisher._on_block(late[-1])
+    reader.stop()
+    task.close()
+    assert reader.stats.subscriber_errors == 0
+
+
+def test_copy_rechecks_the_span_after_copying():
+    ring = SharedRing.create(1, 100)
+    try:
+        ring.write(np.arange(80, dtype=np.float64)[None, :])
+        data = ring.copy(10, 50)
+        assert not np.shares_memory(data, ring._data) and np.array_equal(
+            data[0], np.arange(10, 50)
+        )
+        ring.write(np.zeros((1, 50)))
+        with pytest.raises(IndexError):
+            ring.copy(10, 50)
+    finally:
+        ring.close()
+        ring.unlink()
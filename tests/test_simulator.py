@@ -0,0 +1,133 @@
+import time
+
+import numpy as np
+import pytest
+from nidaqmx.constants import AcquisitionType
+from nidaqmx.errors import DaqError, DaqReadError
+
+from nidaqmx_on_pi.backends import NidaqmxBackend, backend_for_task, get_backend
+from nidaqmx_on_pi.cli import start_continuous_ai_task
+from nidaqmx_on_pi.simulator import (
+    SimulatedBackend,
+    SimulatedDevice,
+    Waveform,
+    expand_physical_channels,
+)
+from nidaqmx_on_pi.streaming import StreamingReader
+
+
+def test_get_backend_reads_environment(monkeypatch):
+    monkeypatch.setenv("NIDAQMX_ON_PI_BACKEND", "sim")
+    assert isinstance(get_backend(), SimulatedBackend)
+    assert isinstance(get_backend("nidaqmx"), NidaqmxBackend)
+    with pytest.raises(ValueError):
+        get_backend("bogus")
+
+
+def test_expand_physical_channels():
+    assert expand_physical_channels("dev3/ai0:2, dev3/ai5") == [
+        "dev3/ai0",
+        "dev3/ai1",
+        "dev3/ai2",
+        "dev3/ai5",
+    ]
+    assert expand_physical_channels("dev3/port0/line3:2") == [
+        "dev3/port0/line3",
+        "dev3/port0/line2",
+    ]
+
+
+def test_devices_and_channel_validation():
+    backend = SimulatedBackend(
+        [SimulatedDevice("Dev1", num_ai=2), SimulatedDevice("dev2")]
+    )
+    assert [d.name for d in backend.devices()] == ["Dev1", "dev2"]
+    assert [c.name for c in backend.device("dev1").ai_physical_chans] == [
+        "Dev1/ai0",
+        "Dev1/ai1",
+    ]
+    task = backend.create_task()
+    assert backend_for_task(task) is backend
+    with pytest.raises(DaqError):
+        task.ai_channels.add_ai_voltage_chan("Dev1/ai2")
+    task.close()
+    assert backend.tasks() == []
+
+
+def test_waveforms_are_continuous_across_reads():
+    device = SimulatedDevice(
+        "dev3",
+        waveforms={
+            "ai0": Waveform("sine", frequency=5.0),
+            "ai1": Waveform("step", frequency=1.0, amplitude=2.0),
+        },
+    )
+    backend = SimulatedBackend([device], realtime=False)
+    task = start_continuous_ai_task("dev3", "ai0:1", rate=100.0, backend=backend)
+    first = np.array(task.read(50))
+    second = np.array(task.read(50))
+    data = np.concatenate([first, second], axis=1)
+    t = np.arange(100) / 100.0
+    assert np.allclose(data[0], np.sin(2 * np.pi * 5.0 * t))
+    assert data[1, :50].tolist() == [2.0] * 50
+    assert data[1, 50:].tolist() == [-2.0] * 50
+    task.close()
+
+
+def test_realtime_overflow_and_timeout():
+    backend = SimulatedBackend()
+    task = backend.create_task()
+    task.ai_channels.add_ai_voltage_chan("dev3/ai0")
+    task.timing.cfg_samp_clk_timing(1000.0, sample_mode=AcquisitionType.CONTINUOUS)
+    task.in_stream.input_buf_size = 10
+    task.start()
+    with pytest.raises(DaqReadError) as excinfo:
+        task.read(1000, timeout=0.05)
+    assert excinfo.value.error_code == -200284
+    time.sleep(0.05)
+    with pytest.raises(DaqReadError) as excinfo:
+        task.read(5)
+    assert excinfo.value.error_code == -200279
+    task.close()
+
+
+def test_streaming_reader_keeps_up_at_100ks_per_second():
+    backend = SimulatedBackend()
+    task = start_continuous_ai_task("dev3", "ai0:3", rate=100000.0, backend=backend)
+    reader = StreamingReader(task, samples_per_block=5000, queue_blocks=False)
+    with reader:
+        deadline = reader.stats.started_at + 0.5
+        while (
+            reader.stats.last_block_at is None or reader.stats.last_block_at < deadline
+        ):
+            if not reader.running:
+                break
+            time.sleep(0.01)
+    task.close()
+    stats = reader.stats
+    assert stats.errors == 0, stats.last_error
+    assert stats.lost == 0
+    assert stats.samples >= 40000
+    assert 50000 < stats.samples_per_second < 150000
+
+
+def test_raw_stream_carries_scaling_and_matches_scaled_read():
+    backend = SimulatedBackend(realtime=False)
+    scaled_task = start_continuous_ai_task(
+        "dev3", "ai0:1", rate=1000.0, min_val=-5.0, max_val=5.0, backend=backend
+    )
+    expected = np.array(scaled_task.read(number_of_samples_per_channel=500))
+    scaled_task.close()
+
+    task = start_continuous_ai_task(
+        "dev3", "ai0:1", rate=1000.0, min_val=-5.0, max_val=5.0, backend=backend
+    )
+    with StreamingReader(task, samples_per_block=500, raw=True) as reader:
+        block = reader.get(timeout=5.0)
+    task.close()
+    assert block.raw and block.data.dtype == np.int16
+    assert block.scaling.shape == (2, 2)
+    volts = block.scaled()
+    assert volts.dtype == np.float64
+    assert np.allclose(volts, expected, atol=5.0 / 32768)
+    block.release()
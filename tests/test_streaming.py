@@ -0,0 +1,133 @@
+import time
+
+import numpy as np
+
+from nidaqmx_on_pi.streaming import BufferPool, StreamingReader
+
+
+class FakeReader:
+    """Fills each requested block with consecutive sample indices."""
+
+    def __init__(self, num_channels, delay=0.0):
+        self.num_channels = num_channels
+        self.delay = delay
+        self.next_sample = 0
+        self.verify_array_shape = True
+
+    def read_many_sample(self, data, number_of_samples_per_channel, timeout=10.0):
+        n = number_of_samples_per_channel
+        assert data.shape == (self.num_channels, n)
+        assert data.flags["C_CONTIGUOUS"]
+        data[:] = np.arange(self.next_sample, self.next_sample + n)
+        self.next_sample += n
+        if self.delay:
+            time.sleep(self.delay)
+        return n
+
+
+class FakeTask:
+    def __init__(self, num_channels):
+        self.number_of_channels = num_channels
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.001)
+    assert predicate()
+
+
+def test_buffer_pool_views_are_contiguous():
+    pool = BufferPool(2, 3, 100)
+    view = pool.view(0, 40)
+    assert view.shape == (3, 40)
+    assert view.flags["C_CONTIGUOUS"]
+    assert np.shares_memory(view, pool.view(0))
+
+
+def test_blocks_are_views_into_the_pool():
+    reader = StreamingReader(
+        FakeTask(2), samples_per_block=50, reader=FakeReader(2, 0.001)
+    )
+    assert reader.reader.verify_array_shape is False
+    with reader:
+        block = reader.get(timeout=1.0)
+    assert block is not None
+    assert block.data.shape == (2, 50)
+    assert np.shares_memory(block.data, reader.pool._storage)
+    assert block.first_sample == 0
+    assert np.array_equal(block.data[1], np.arange(50))
+    block.release()
+
+
+def test_slow_consumer_counts_overwritten_blocks():
+    reader = StreamingReader(
+        FakeTask(1), samples_per_block=10, num_buffers=4, reader=FakeReader(1)
+    )
+    reader.start()
+    _wait_for(lambda: reader.stats.overwritten > 0)
+    reader.stop()
+    assert reader.pending <= 4
+    block = reader.get(timeout=0)
+    assert block.sequence > 0
+
+
+def test_held_buffers_count_lost_blocks_and_stats():
+    reader = StreamingReader(
+        FakeTask(1), samples_per_block=10, num_buffers=2, reader=FakeReader(1, 0.001)
+    )
+    seen = []
+    reader.subscribe(lambda block: seen.append(block.sequence))
+    reader.start()
+    held = [reader.get(timeout=1.0), reader.get(timeout=1.0)]
+    _wait_for(lambda: reader.stats.lost > 0)
+    reader.stop()
+    for block in held:
+        block.release()
+    stats = reader.stats.as_dict()
+    assert stats["errors"] == 0
+    assert stats["blocks"] == stats["samples"] // 10
+    assert stats["samples_per_second"] > 0
+    assert len(seen) == stats["blocks"] - stats["lost"]
+
+
+def test_read_error_stops_reader_and_is_reported():
+    class FailingReader(FakeReader):
+        def read_many_sample(self, data, number_of_samples_per_channel, timeout=10.0):
+            raise RuntimeError("overflow")
+
+    errors = []
+    reader = StreamingReader(FakeTask(1), reader=FailingReader(1))
+    reader.on_error = errors.append
+    reader.start()
+    _wait_for(lambda: not reader.running)
+    assert reader.stats.errors == 1
+    assert str(errors[0]) == "overflow"
+    assert reader.pool.free_count == reader.pool.num_buffers
+
+
+def test_failing_subscriber_is_dropped_and_others_keep_receiving(tmp_path):
+    from nidaqmx_on_pi.recording import ChannelInfo, Recorder
+
+    reader = StreamingReader(
+        FakeTask(1), samples_per_block=10, reader=FakeReader(1), queue_blocks=False
+    )
+    recorder = Recorder(str(tmp_path / "late.ndq"), [ChannelInfo("dev1/ai0")], 1000.0)
+    seen = []
+
+    def failing(block):
+        raise RuntimeError("consumer bug")
+
+    reader.subscribe(failing)
+    reader.subscribe(seen.append)
+    reader.subscribe(recorder._on_block)
+    reader.start()
+    _wait_for(lambda: len(seen) >= 5)
+    # A callback that arrives after close() is ignored instead of raising.
+    recorder.close()
+    recorder._on_block(seen[-1])
+    _wait_for(lambda: len(seen) >= 10)
+    reader.stop()
+    assert reader.stats.subscriber_errors == 1 and reader.stats.errors == 0
+    assert str(reader.stats.last_error) == "consumer bug"
+    assert failing not in reader._subscribers
@@ -0,0 +1,108 @@
+import time
+
+import numpy as np
+import pytest
+
+from nidaqmx_on_pi.recording import RecordingReader
+from nidaqmx_on_pi.simulator import SimulatedBackend, SimulatedDevice, Waveform
+from nidaqmx_on_pi.sync import DeviceSpec, DriftEstimator, SynchronizedAcquisition
+
+
+def _backend(slave_ppm=0.0):
+    ramp = {"ai0": Waveform("sine", frequency=1.0, amplitude=5.0)}
+    return SimulatedBackend(
+        [
+            SimulatedDevice("dev1", waveforms=dict(ramp)),
+            SimulatedDevice("dev2", waveforms=dict(ramp), clock_error_ppm=slave_ppm),
+        ]
+    )
+
+
+def _collect(sync, seconds):
+    blocks = []
+    sync.start()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        block = sync.get(timeout=1.0)
+        if block is not None:
+            with block:
+                blocks.append((block.first_sample, block.data.copy()))
+    return blocks
+
+
+def test_drift_estimator_fits_rate_and_offset():
+    drift = DriftEstimator()
+    for i in range(10):
+        drift.add(100.0 + i * 0.1, 1000 + i * 101)
+    assert drift.rate == pytest.approx(1010.0)
+    assert drift.samples_at(100.5) == pytest.approx(1505.0)
+    assert drift.time_of(1505) == pytest.approx(100.5)
+
+
+def test_start_trigger_aligns_devices_sample_for_sample():
+    backend = _backend()
+    sync = SynchronizedAcquisition(
+        [DeviceSpec("dev1", "ai0:1"), DeviceSpec("dev2", "ai0")],
+        rate=10000.0,
+        samples_per_block=500,
+        backend=backend,
+    )
+    assert sync.num_channels == 3
+    assert sync.channel_names == ["dev1/ai0", "dev1/ai1", "dev2/ai0"]
+    try:
+        blocks = _collect(sync, 0.5)
+        stats = sync.sync_stats
+        assert sync.sample_time(0) is not None
+    finally:
+        sync.close()
+    assert [first for first, _ in blocks] == list(range(0, 500 * len(blocks), 500))
+    data = np.concatenate([data for _, data in blocks], axis=1)
+    # Same waveform on both devices' ai0: identical when aligned by index.
+    assert np.array_equal(data[0], data[2])
+    assert stats.gap_samples == 0 and stats.devices[1].lost == 0
+    assert stats.aligned(tolerance_samples=50)
+
+
+def test_drift_is_measured_without_shared_clock_and_removed_with_it():
+    for mode, expected in (("start_trigger", 5000.0), ("clock", 0.0)):
+        backend = _backend(slave_ppm=5000.0)
+        sync = SynchronizedAcquisition(
+            [DeviceSpec("dev1"), DeviceSpec("dev2")],
+            rate=10000.0,
+            samples_per_block=100,
+            sync=mode,
+            backend=backend,
+        )
+        try:
+            _collect(sync, 1.0)
+            stats = sync.sync_stats
+        finally:
+            sync.close()
+        assert stats.devices[1].drift_ppm == pytest.approx(expected, abs=1500.0)
+
+
+def test_merged_raw_stream_records_with_all_channels(tmp_path):
+    backend = SimulatedBackend([SimulatedDevice("dev1"), SimulatedDevice("dev2")])
+    sync = SynchronizedAcquisition(
+        [DeviceSpec("dev1", "ai0"), DeviceSpec("dev2", "ai0:1")],
+        rate=10000.0,
+        samples_per_block=200,
+        sync="software",
+        backend=backend,
+        raw=True,
+        queue_blocks=False,
+    )
+    recorder = sync.create_recorder(str(tmp_path / "merged.ndq"))
+    recorder.attach(sync)
+    sync.start()
+    while sync.stats.blocks < 5:
+        time.sleep(0.001)
+    sync.close()
+    recorder.close()
+    with RecordingReader(str(tmp_path / "merged.ndq")) as reader:
+        assert reader.raw and [c.name for c in reader.channels] == [
+            "dev1/ai0",
+            "dev2/ai0",
+            "dev2/ai1",
+        ]
+        assert reader.num_samples >= 1000
@@ -0,0 +1,120 @@
+import time
+
+import numpy as np
+import pytest
+
+from nidaqmx_on_pi.daemon import AcquisitionDaemon, DaemonConfig
+from nidaqmx_on_pi.recording import RecordingReader
+from nidaqmx_on_pi.simulator import SimulatedBackend, SimulatedDevice, Waveform
+from nidaqmx_on_pi.trigger import (
+    EdgeTrigger,
+    LevelTrigger,
+    SlopeTrigger,
+    TriggeredCapture,
+    WindowTrigger,
+    make_trigger,
+)
+
+
+def _detect_in_blocks(trigger, samples, block):
+    hits = [
+        trigger.detect(samples[i : i + block]) + i
+        for i in range(0, len(samples), block)
+    ]
+    return np.concatenate(hits).tolist()
+
+
+@pytest.mark.parametrize("block", [1, 3, 7, 100])
+def test_triggers_are_independent_of_block_boundaries(block):
+    x = np.array([0.0, 1.1, 0.95, 1.05, 0.7, 1.2, 1.3, 0.0, 2.0, 0.5, 0.5, 3.0])
+    assert _detect_in_blocks(EdgeTrigger(level=1.0, hysteresis=0.2), x, block) == [
+        1,
+        5,
+        8,
+        11,
+    ]
+    assert _detect_in_blocks(EdgeTrigger(level=1.0, slope="falling"), x, block) == [
+        2,
+        4,
+        7,
+        9,
+    ]
+    assert _detect_in_blocks(
+        WindowTrigger(low=0.4, high=1.0, mode="enter"), x, block
+    ) == [2, 4, 9]
+    assert _detect_in_blocks(SlopeTrigger(threshold=1.5, rate=1.0), x, block) == [8, 11]
+    assert _detect_in_blocks(LevelTrigger(level=2.0), x, block) == [8, 11]
+    assert (
+        repr(make_trigger({"kind": "window", "low": 0.4}))
+        == "WindowTrigger(channel=0, low=0.4, high=1.0, mode='enter')"
+    )
+    with pytest.raises(ValueError):
+        make_trigger({"kind": "bogus"})
+
+
+def test_capture_windows_holdoff_and_gaps():
+    data = np.zeros((2, 60))
+    data[1] = np.arange(60)
+    # Pulses at 2 (no pre-trigger history yet), 10, 14 (in hold-off) and 22.
+    data[0, [2, 10, 14, 22, 40]] = 1.0
+    capture = TriggeredCapture(
+        EdgeTrigger(0, level=0.5), pre_samples=3, post_samples=5, holdoff=2
+    )
+    captures = []
+    for start in range(0, 35, 5):
+        captures += capture.process(data[:, start : start + 5], start)
+    assert [c.trigger_sample for c in captures] == [10, 22]
+    assert captures[0].data[1].tolist() == list(range(7, 15))
+    assert captures[0].data[1, captures[0].pre_samples] == 10
+    # Samples 35..39 are lost: the history restarts, so the pulse at 40 has none.
+    captures = capture.process(data[:, 40:60], 40)
+    assert captures == []
+    assert capture.stats.gaps == 1
+    assert capture.stats.triggers == 2 and capture.stats.reduction == 55 / 16
+
+
+def test_trigger_sink_saves_only_event_windows(tmp_path):
+    device = SimulatedDevice(
+        "dev3", waveforms={"ai0": Waveform("step", frequency=10.0, amplitude=2.0)}
+    )
+    config = DaemonConfig.from_dict(
+        {
+            "task": [
+                {
+                    "name": "events",
+                    "device": "dev3",
+                    "channels": "ai0:1",
+                    "rate": 10000.0,
+                    "raw": True,
+                    "sink": [
+                        {
+                            "type": "trigger",
+                            "path": f"{tmp_path.as_posix()}/{{task}}",
+                            "pre_seconds": 0.01,
+                            "post_seconds": 0.02,
+                            "trigger": {"kind": "edge", "channel": 0, "level": 0.0},
+                        }
+                    ],
+                }
+            ]
+        }
+    )
+    daemon = AcquisitionDaemon(config, SimulatedBackend([device]))
+    daemon.start()
+    try:
+        writer = daemon.runners[0].sinks[0]
+        deadline = time.monotonic() + 5.0
+        while writer.stats.captures_written < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        daemon.stop()
+    assert writer.stats.captures_written >= 2
+    with RecordingReader(writer.paths[0]) as reader:
+        assert reader.raw and reader.num_samples == 300
+        assert reader.header["attrs"]["trigger"]["kind"] == "edge"
+        volts = reader.read(0, 300, channels=0, scaled=True)[0]
+        pre = reader.header["attrs"]["pre_samples"]
+        assert pre == 100
+        assert np.all(volts[:pre] < 0) and np.all(volts[pre:] > 0)
+        # The step rises at the start of every 1000-sample period.
+        assert reader.header["attrs"]["trigger_sample"] % 1000 == 0
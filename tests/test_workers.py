@@ -0,0 +1,99 @@
+import threading
+import time
+
+from nidaqmx_on_pi.workers import (
+    CANCELLED,
+    DONE,
+    TIMED_OUT,
+    DriverExecutor,
+    current_job,
+)
+
+
+def _poll_until(executor, predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        executor.poll()
+        time.sleep(0.001)
+    assert predicate()
+
+
+def test_results_and_errors_are_delivered_by_poll():
+    executor = DriverExecutor()
+    results, errors = [], []
+    ui_thread = threading.current_thread()
+    job = executor.submit(lambda x: x * 2, 21, on_done=results.append)
+    executor.submit(lambda: 1 / 0, on_error=errors.append)
+    time.sleep(0.05)
+    assert results == []  # nothing is delivered outside poll()
+    _poll_until(executor, lambda: results and errors)
+    assert results == [42]
+    assert isinstance(errors[0], ZeroDivisionError)
+    assert job.state == DONE
+    assert threading.current_thread() is ui_thread
+    assert executor.pending == 0
+    executor.shutdown(wait=True)
+
+
+def test_timeout_reports_error_and_discards_late_result():
+    executor = DriverExecutor(max_workers=1, default_timeout=0.05)
+    release = threading.Event()
+    results, errors = [], []
+    slow = executor.submit(release.wait, on_done=results.append, on_error=errors.append)
+    _poll_until(executor, lambda: errors)
+    assert isinstance(errors[0], TimeoutError)
+    assert slow.state == TIMED_OUT and slow.cancelled
+
+    # A replacement worker keeps the executor usable while the call is stuck.
+    executor.submit(lambda: "fast", on_done=results.append, timeout=None)
+    _poll_until(executor, lambda: results)
+    release.set()
+    time.sleep(0.05)
+    executor.poll()
+    assert results == ["fast"]
+    executor.shutdown(wait=True)
+
+
+def test_cancel_is_visible_to_running_job():
+    executor = DriverExecutor(max_workers=1)
+    started = threading.Event()
+    chunks = []
+
+    def read_chunks():
+        job = current_job()
+        started.set()
+        while not job.cancelled:
+            chunks.append(1)
+            time.sleep(0.001)
+        return "stopped"
+
+    results = []
+    job = executor.submit(read_chunks, on_done=results.append)
+    started.wait(1.0)
+    job.cancel()
+    time.sleep(0.05)
+    executor.poll()
+    assert job.state == CANCELLED
+    assert results == []
+    assert executor.pending == 0
+    executor.shutdown(wait=True)
+
+
+def test_result_queued_before_the_deadline_is_not_expired():
+    executor = DriverExecutor(max_workers=1)
+    results, errors = [], []
+    jobs = [
+        executor.submit(
+            lambda n=n: n, on_done=results.append, on_error=errors.append, timeout=0.02
+        )
+        for n in range(2)
+    ]
+    while jobs[1].finished_at is None:
+        time.sleep(0.001)
+    # Both results are queued; the UI thread takes one per poll, after the deadline.
+    time.sleep(0.05)
+    executor.poll(max_results=1)
+    executor.poll(max_results=1)
+    assert results == [0, 1] and errors == []
+    assert [job.state for job in jobs] == [DONE, DONE]
+    executor.shutdown(wait=True)